@@ -1,11 +1,21 @@
 # Importing packages
+import os
+import time
 import pandas as pd
 from sklearn import set_config
 set_config(transform_output='pandas')
 from src.components.create_custom_data import CustomData
 from src.components.make_prediction import MakePredictions
+from src.components.make_prediction import model_file_version
+from src.components.request_capture import RequestCapture
+from src.components.drift_monitor import DriftMonitor
+from src.components.prediction_explainer import PredictionExplainer
+from src.components.admission_control import AdmissionController
+from src.components.admission_control import RequestShed
 from src.components.config_entity import DataTransformationConfig
-from src.components.config_entity import ModelTrainerConfig
+from src.components.config_entity import DriftConfig
+from src.components.config_entity import ExplainConfig
+from src.components.config_entity import AdmissionConfig
 from src.utils import convert_preds_to_string
 from src.utils import load_object
 from src.utils import load_run_params
@@ -18,6 +28,96 @@ from flask import Flask, request, jsonify, render_template
 # Instantiating the Flask app
 app = Flask(__name__)
 
+# Serving from a local model bundle, a booster trained with native categorical
+# support, a fused model or an onnx model, if one is configured
+bundle_path = os.environ.get('MODEL_BUNDLE_PATH')
+categorical_model_path = os.environ.get('CATEGORICAL_MODEL_PATH')
+fused_model_path = os.environ.get('FUSED_MODEL_PATH')
+onnx_model_path = os.environ.get('ONNX_MODEL_PATH')
+
+# Capturing the prediction requests in the background, if a capture folder is configured
+capture_dir = os.environ.get('REQUEST_CAPTURE_DIR')
+request_capture = RequestCapture(
+    capture_dir=capture_dir,
+    file_format=os.environ.get('REQUEST_CAPTURE_FORMAT'),
+    sample_rate=float(os.environ.get('REQUEST_CAPTURE_SAMPLE_RATE', 1.0))
+) if capture_dir else None
+
+# Sketching the served features and scores, if the training baseline of the drift
+# monitor exists
+drift_baseline_path = os.environ.get('DRIFT_BASELINE_PATH', DriftConfig().baseline_path)
+drift_monitor = DriftMonitor(baseline_path=drift_baseline_path) if os.path.exists(drift_baseline_path) else None
+
+# Explaining the predictions of the served model bundle. The explainer is built on the
+# first explanation request and is kept with the version of the bundle it was built
+# from. It is rebuilt when the bundle file changes, with the same version as the model
+# cache, so that it explains the model which is served.
+explainer = None
+
+# Bounding the number of requests scored at once. Under load, requests are scored with
+# fewer boosting rounds, or with a lighter fallback bundle if one is configured, and
+# are shed with a 503 once no slot is free or their deadline cannot be met.
+admission_config = AdmissionConfig()
+admission_controller = AdmissionController(
+    max_in_flight=int(os.environ.get('ADMISSION_MAX_IN_FLIGHT', admission_config.max_in_flight)),
+    degrade_in_flight=int(os.environ.get('ADMISSION_DEGRADE_IN_FLIGHT', admission_config.degrade_in_flight)),
+    deadline_ms=float(os.environ.get('ADMISSION_DEADLINE_MS', admission_config.deadline_ms)),
+    estimate_ttl_s=float(os.environ.get('ADMISSION_ESTIMATE_TTL_S', admission_config.estimate_ttl_s))
+)
+fallback_bundle_path = os.environ.get('FALLBACK_MODEL_BUNDLE_PATH')
+
+# Creating a function to score a request under admission control
+def score_request(df, started, raw_df=None):
+    '''
+    This function admits a request, scores it in full or in degraded mode, and
+    captures it and adds it to the drift sketches. The drift sketches count the raw
+    values, if given, so that categories outside the vocabulary are counted as unknown
+    rather than missing. RequestShed is raised if the request is not admitted.
+    '''
+    admission = admission_controller.admit(started)
+    with admission:
+        prediction = MakePredictions(
+            bundle_path=bundle_path,
+            categorical_model_path=categorical_model_path,
+            fused_model_path=fused_model_path,
+            onnx_model_path=onnx_model_path
+        )
+        start = time.perf_counter()
+        variant = ''
+        if admission.mode == 'degraded' and fallback_bundle_path is not None:
+            prediction = MakePredictions(bundle_path=fallback_bundle_path)
+            num_preds = prediction.predict(df)
+            variant = ':fallback'
+        elif admission.mode == 'degraded':
+            iteration_range = prediction.degraded_iteration_range(admission_config.degraded_fraction)
+            if iteration_range is None:
+                # The model cannot be truncated, so the request is scored in full
+                admission.mode = 'full'
+            num_preds = prediction.predict(df, iteration_range=iteration_range)
+            variant = ':degraded' if iteration_range is not None else ''
+        else:
+            num_preds = prediction.predict(df)
+        latency_ms = (time.perf_counter() - start) * 1000
+    
+    # Capturing the request without waiting for the disk
+    if request_capture is not None:
+        request_capture.capture(df, num_preds, latency_ms, prediction.model_version() + variant)
+    
+    # Adding the request to the drift sketches
+    if drift_monitor is not None:
+        drift_monitor.update(raw_df if raw_df is not None else df, num_preds)
+    
+    return num_preds
+
+# Answering the shed requests with a fast 503
+@app.errorhandler(RequestShed)
+def request_shed(e):
+    '''
+    This function answers a shed request with a 503 and the delay after which the
+    client should retry.
+    '''
+    return jsonify({'error': str(e), 'reason': e.reason}), 503, {'Retry-After': str(e.retry_after_s)}
+
 # Creating the home page
 @app.route('/')
 def index():
@@ -38,6 +138,7 @@ def predict_datapoint():
         return render_template('predict.html')
     elif request.method == 'POST':
         # If the request method not "GET", run the prediction
+        started = time.perf_counter()
         data = CustomData(
             age = int(request.form.get('age')),
             workclass = str(request.form.get('workclass')),
@@ -54,12 +155,13 @@ def predict_datapoint():
             native_country = str(request.form.get('native_country'))
         )
         
-        # Creating a dataframe from the user entered data
-        df = data.create_dataframe()
+        # Creating a dataframe from the user entered data, and encoding it with the
+        # vocabulary
+        raw_df = data.create_raw_dataframe()
+        df = CustomData.encode_dataframe(raw_df)
 
-      # Instantiating the prediction pipeline and making predictions
-        prediction = MakePredictions()
-        num_preds = prediction.predict(df)
+        # Making predictions under admission control
+        num_preds = score_request(df, started, raw_df)
         
         # Converting the predictions to a readable string
         preds = convert_preds_to_string(num_preds)
@@ -78,6 +180,7 @@ def prediction_api():
     '''
     # Creating the api
     if request.method == 'POST':
+        started = time.perf_counter()
         data = CustomData(
             age = int(request.form.get('age')),
             workclass = str(request.form.get('workclass')),
@@ -94,12 +197,13 @@ def prediction_api():
             native_country = str(request.form.get('native_country'))
         )
         
-        # Creating a dataframe from the user entered data
-        df = data.create_dataframe()
+        # Creating a dataframe from the user entered data, and encoding it with the
+        # vocabulary
+        raw_df = data.create_raw_dataframe()
+        df = CustomData.encode_dataframe(raw_df)
         
-        # Instantiating the prediction pipeline and making predictions
-        prediction = MakePredictions()
-        preds = prediction.predict(df)
+        # Making predictions under admission control
+        preds = score_request(df, started, raw_df)
         
         # Creating a dictionary of the predictions
         preds_dict = {
@@ -108,6 +212,63 @@ def prediction_api():
         
         return jsonify(preds_dict)
 
+# Creating a function to explain the predictions as an API call
+@app.route('/api/explain', methods=['POST'])
+def explain_api():
+    '''
+    This function explains the predictions of a batch of profiles. The body is either
+    a single record, a list of records, or an object holding the records and an optional
+    latency budget in milliseconds. Each record holds the fields of the prediction form.
+    ---------------------
+    Returns:
+    ---------------------
+    explanations : json - These are the probability, the bias and the contribution of
+    each field for every record.
+    '''
+    global explainer
+    if bundle_path is None or not os.path.exists(bundle_path):
+        return jsonify({'error': 'The explanations need the served model to be a local model bundle.'}), 404
+    _, version = model_file_version(bundle_path)
+    current = explainer
+    if current is None or current[0] != version:
+        current = (version, PredictionExplainer.from_bundle(bundle_path))
+        explainer = current
+    
+    # Reading the records and the latency budget
+    body = request.get_json(silent=True)
+    if body is None:
+        body = request.form.to_dict()
+    records = body.get('records', body) if isinstance(body, dict) else body
+    records = [records] if isinstance(records, dict) else records
+    budget_ms = float(body.get('budget_ms', ExplainConfig().budget_ms)) if isinstance(body, dict) else None
+    try:
+        df = CustomData.create_batch_dataframe(records)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify({'explanations': current[1].explain(df, budget_ms=budget_ms)})
+
+# Creating a function to report the admission control counters
+@app.route('/api/admission', methods=['GET'])
+def admission_report():
+    '''
+    This function returns the number of requests admitted, scored in full, degraded and
+    shed, the number in flight and the moving average latency of each scoring mode.
+    '''
+    return jsonify(admission_controller.stats())
+
+# Creating a function to report the drift of the served features and scores
+@app.route('/api/drift', methods=['GET'])
+def drift_report():
+    '''
+    This function returns the population stability index of each feature and of the
+    predicted scores against the training baselines, together with the summaries of the
+    sketches, as a JSON response. The sketches of this worker process are reported.
+    '''
+    if drift_monitor is None:
+        return jsonify({'error': 'The drift monitor has no training baseline.'}), 404
+    return jsonify(drift_monitor.report())
+
 
 # Running the Flask app
 if __name__ == '__main__':
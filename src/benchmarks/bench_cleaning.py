@@ -0,0 +1,80 @@
+# Importing packages
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from src.components.config_entity import DataIngestionConfig
+from src.components.data_cleaning import DataCleaner
+from src.utils import remove_blank_spaces
+from src.utils import remove_question_mark
+from src.utils import recode_target_class
+from src.utils import convert_to_categorical
+
+
+# Creating a function to build a raw dataset of a given size
+def make_dataset(n_rows, seed=42):
+    '''
+    This function builds a raw dataset of the given size by sampling rows from the
+    train dataset in the artifacts folder.
+    ========================================================================================
+    ---------------------
+    Parameters:
+    ---------------------
+    n_rows : int - This is the number of rows in the dataset.
+    seed : int - This is the seed used to sample the rows.
+    
+    ---------------------
+    Returns:
+    ---------------------
+    df : pandas dataframe - This is the sampled raw dataset.
+    =========================================================================================
+    '''
+    source = pd.read_parquet(DataIngestionConfig().train_data_path)
+    idx = np.random.default_rng(seed).integers(0, len(source), size=n_rows)
+    return source.take(idx).reset_index(drop=True)
+
+
+# Creating a function to clean a dataset using the functions in src/utils.py
+def clean_with_utils(df):
+    '''
+    This function cleans the dataset using the cleaning functions in src/utils.py. A
+    copy is made first, as the functions modify their input.
+    '''
+    df = df.copy()
+    df = df.pipe(remove_blank_spaces).pipe(remove_question_mark).pipe(recode_target_class)
+    return convert_to_categorical(df)
+
+
+# Creating a function to time a cleaning function
+def time_function(func, df, repeats):
+    '''
+    This function returns the best wall time of the cleaning function over a number of
+    repeats.
+    '''
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func(df)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+# Running the cleaning benchmark
+if __name__ == '__main__':
+    
+    parser = argparse.ArgumentParser(description='Benchmark the cleaning transforms.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10**4, 10**6, 10**7])
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+    
+    cleaner = DataCleaner(convert_capital=True)
+    print(f"{'rows':>12} {'utils rows/s':>16} {'cleaner rows/s':>16} {'speedup':>8} {'identical':>10}")
+    for n_rows in args.sizes:
+        df = make_dataset(n_rows)
+        utils_time = time_function(clean_with_utils, df, args.repeats)
+        cleaner_time = time_function(cleaner.clean, df, args.repeats)
+        identical = cleaner.clean(df).equals(clean_with_utils(df))
+        print(
+            f'{n_rows:>12} {n_rows / utils_time:>16,.0f} {n_rows / cleaner_time:>16,.0f} '
+            f'{utils_time / cleaner_time:>8.1f} {str(identical):>10}'
+        )
@@ -0,0 +1,112 @@
+# Importing packages
+import os
+import time
+import argparse
+import resource
+import tempfile
+import multiprocessing
+import numpy as np
+import pandas as pd
+from src.components.config_entity import StoreFeatureConfig
+from src.components.store_features import FeatureStoreCreation
+
+
+# Defining the layouts which are compared. The first layout is the earlier gzip path
+LAYOUTS = [
+    ('parquet', 'gzip'),
+    ('parquet', 'zstd'),
+    ('parquet', 'lz4'),
+    ('feather', 'lz4'),
+    ('feather', 'uncompressed')
+]
+
+
+# Creating a function to build a transformed dataset of a given size
+def make_dataset(n_rows, seed=42):
+    '''
+    This function builds a transformed dataset of the given size by sampling rows from
+    the transformed train dataset in the feature store.
+    '''
+    source = pd.read_parquet(StoreFeatureConfig().xform_train_path)
+    idx = np.random.default_rng(seed).integers(0, len(source), size=n_rows)
+    return source.take(idx).reset_index(drop=True)
+
+
+# Creating a function to read the resident memory figures of the process
+def read_memory_kb(field):
+    '''
+    This function reads a memory figure, such as VmRSS or VmHWM, of the current process
+    in kilobytes. It falls back to the peak resident memory from getrusage.
+    '''
+    try:
+        with open('/proc/self/status') as file_obj:
+            for line in file_obj:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+# Creating a function to read a dataset in a fresh process
+def read_in_child(layout, path, queue):
+    '''
+    This function reads a dataset in a fresh process and reports the read time and the
+    peak resident memory used by the read, above the memory used before it.
+    '''
+    store = FeatureStoreCreation()
+    store.feature_store_config.storage_format, store.feature_store_config.compression = layout
+    
+    # Resetting the peak resident memory of the process, where the kernel supports it
+    try:
+        with open('/proc/self/clear_refs', 'w') as file_obj:
+            file_obj.write('5')
+    except OSError:
+        pass
+    before = read_memory_kb('VmRSS')
+    start = time.perf_counter()
+    if layout == ('parquet', 'gzip'):
+        # This is how the model trainer read the feature store before
+        df = pd.read_parquet(path)
+        X = df.copy().drop(columns=['target_class'], axis=1)
+        y = df[['target_class']]
+    else:
+        X, y = store.read_features_target(path)
+    float(X.iloc[:, 0].sum())
+    elapsed = time.perf_counter() - start
+    after = read_memory_kb('VmHWM')
+    queue.put((elapsed, max(after - before, 0) / 1024))
+
+
+# Running the feature store benchmark
+if __name__ == '__main__':
+    
+    parser = argparse.ArgumentParser(description='Benchmark the feature store layouts.')
+    parser.add_argument('--rows', type=int, default=2_000_000)
+    args = parser.parse_args()
+    
+    df = make_dataset(args.rows)
+    context = multiprocessing.get_context('spawn')
+    print(f"{'format':>8} {'compression':>12} {'size MB':>9} {'write s':>8} {'read s':>8} {'peak MB':>8}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for layout in LAYOUTS:
+            store = FeatureStoreCreation()
+            store.feature_store_config.storage_format, store.feature_store_config.compression = layout
+            configured_path = os.path.join(tmp_dir, f'{layout[0]}_{layout[1]}.parquet')
+            
+            start = time.perf_counter()
+            if layout == ('parquet', 'gzip'):
+                df.to_parquet(configured_path, index=False, compression='gzip')
+            else:
+                store.write_table(store.to_store_table(df), configured_path)
+            write_time = time.perf_counter() - start
+            path = store.resolve_path(configured_path)
+            
+            queue = context.Queue()
+            process = context.Process(target=read_in_child, args=(layout, configured_path, queue))
+            process.start()
+            read_time, peak_mb = queue.get()
+            process.join()
+            
+            size_mb = os.path.getsize(path) / 2**20
+            print(f'{layout[0]:>8} {layout[1]:>12} {size_mb:>9.1f} {write_time:>8.2f} {read_time:>8.3f} {peak_mb:>8.1f}')
@@ -0,0 +1,44 @@
+# Importing packages
+import os
+import argparse
+import time
+import numpy as np
+from sklearn import set_config
+set_config(transform_output='pandas')
+from src.benchmarks.bench_cleaning import make_dataset
+from src.components.config_entity import DataTransformationConfig
+from src.components.data_cleaning import DataCleaner
+from src.components.parallel_transform import ParallelTransformer
+from src.utils import load_object
+from src.utils import read_json_file
+from src.utils import apply_vocabulary
+
+
+# Running the parallel transform benchmark
+if __name__ == '__main__':
+    
+    parser = argparse.ArgumentParser(description='Benchmark the parallel transform against the preprocessor object.')
+    parser.add_argument('--rows', type=int, default=2 * 10**6)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, os.cpu_count()])
+    parser.add_argument('--chunk-size', type=int, default=None)
+    args = parser.parse_args()
+    
+    config = DataTransformationConfig()
+    df = make_dataset(args.rows).drop(columns=['fnlwgt', 'target_class'])
+    df = apply_vocabulary(DataCleaner(fill_question_marks=False).clean(df), read_json_file(config.vocabulary_path))
+    
+    # Timing the preprocessor object on the whole dataframe in this process
+    preprocessor = load_object(file_path=config.preprocessor_obj_path)
+    start = time.perf_counter()
+    expected = preprocessor.transform(df).to_numpy(dtype=np.float32)
+    serial_time = time.perf_counter() - start
+    print(f"{'workers':>8} {'seconds':>10} {'rows/s':>14} {'speedup':>8} {'identical':>10}")
+    print(f"{'serial':>8} {serial_time:>10.2f} {args.rows / serial_time:>14,.0f} {1.0:>8.1f} {'True':>10}")
+    
+    for n_workers in sorted(set(args.workers)):
+        transformer = ParallelTransformer(n_workers=n_workers, chunk_size=args.chunk_size)
+        start = time.perf_counter()
+        X, _ = transformer.transform(df)
+        elapsed = time.perf_counter() - start
+        identical = np.array_equal(X, expected)
+        print(f'{n_workers:>8} {elapsed:>10.2f} {args.rows / elapsed:>14,.0f} {serial_time / elapsed:>8.1f} {str(identical):>10}')
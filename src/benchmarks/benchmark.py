@@ -0,0 +1,343 @@
+# Importing packages
+import io
+import os
+import gc
+import sys
+import json
+import shutil
+import platform
+import tempfile
+import warnings
+import contextlib
+import numpy as np
+import pandas as pd
+import optuna
+import xgboost as xgb
+from sklearn import set_config
+set_config(transform_output='pandas')
+from src.components.config_entity import BenchmarkConfig
+from src.components.data_cleaning import DataCleaner
+from src.components.data_ingestion import DataIngestion
+from src.components.data_transformation import DataTransformation
+from src.components.find_best_model import FindBestModel
+from src.components.model_bundle import save_model_bundle
+from src.components.model_bundle import load_model_bundle
+from src.components.store_features import FeatureStoreCreation
+from src.components.synthetic_data import SyntheticDataGenerator
+from src.components.tuning_telemetry import ResourceTimer
+from src.components.tuning_telemetry import read_memory_mb
+from src.exception import CustomException
+from src.logger import logging
+from src.utils import read_categorical_parquet
+from src.utils import build_vocabulary
+from src.utils import apply_vocabulary
+
+# Defining the benchmark cases. The cases of the first list are run for every number of
+# rows, while the model load and the single row prediction do not depend on it.
+SIZED_CASES = [
+    'ingestion', 'cleaning', 'preprocessor_fit', 'preprocessor_transform',
+    'feature_store_write', 'feature_store_read', 'tuning_trial', 'predict_batch'
+]
+MODEL_CASES = ['model_load', 'predict_single']
+
+# Defining the parameters of the tuning trial, so that every run trains the same booster
+TRIAL_PARAMS = {
+    'booster': 'gbtree', 'lambda': 1e-3, 'alpha': 1e-3, 'max_depth': 6,
+    'eta': 0.1, 'gamma': 1e-8, 'grow_policy': 'depthwise'
+}
+
+
+# Creating a class to benchmark the pipelines
+class PipelineBenchmark():
+    '''
+    This class benchmarks the stages of the pipelines on synthetic datasets of several
+    sizes - the streaming ingestion, the cleaning, the fit and transform of the
+    preprocessor, the write and read of the feature store, a single tuning trial and the
+    batch prediction - and the load and single row prediction of a local model bundle.
+    Each case records its wall time, cpu time and peak memory above the memory in use
+    when it started. The results are compared with a stored baseline, and a case which
+    is slower or uses more memory than the tolerances allow is reported as a
+    regression. Everything runs offline in a temporary folder.
+    '''
+    # Creating the constructor for the class
+    def __init__(self, sizes=None, cases=None, repeats:int=None, bundle_path:str=None, work_dir:str=None):
+        '''
+        This is the constructor for the pipeline benchmark class. The settings which are
+        not given are taken from the benchmark config. If no model bundle is given, a
+        reference model is trained on the train dataset.
+        '''
+        self.benchmark_config = BenchmarkConfig()
+        self.sizes = sorted(sizes or self.benchmark_config.sizes)
+        self.cases = list(cases or SIZED_CASES + MODEL_CASES)
+        unknown = set(self.cases) - set(SIZED_CASES + MODEL_CASES)
+        if unknown:
+            raise ValueError(f'Unknown benchmark cases {sorted(unknown)}.')
+        self.repeats = repeats or self.benchmark_config.repeats
+        self.bundle_path = bundle_path
+        self.work_dir = work_dir
+        self.results = []
+
+    # Creating a method to measure a case
+    def measure(self, case:str, rows:int, func, repeats:int=None):
+        '''
+        This method runs a case and records the median wall and cpu time of its runs and
+        the largest peak memory above the memory in use before each run. A case which was
+        not selected is run once without being recorded, since later cases use its
+        result.
+        ================================================================================
+        -------------------
+        Parameters:
+        -------------------
+        case : str - This is the name of the case.
+        rows : int - This is the number of rows the case works on.
+        func : function - This is the function run by the case, without arguments.
+        repeats : int - This is the number of runs. If not given, the number of runs
+        from the benchmark config is used.
+
+        -------------------
+        Returns:
+        -------------------
+        result : object - This is the result of the last run of the function.
+        ================================================================================
+        '''
+        if case not in self.cases:
+            return func()
+
+        usages = []
+        for _ in range(repeats or self.repeats):
+            gc.collect()
+            start_rss = read_memory_mb('VmRSS')
+            timer = ResourceTimer()
+            result = func()
+            usage = timer.read()
+            usage['peak_mb'] = max(usage.pop('peak_rss_mb') - start_rss, 0.0)
+            usages.append(usage)
+
+        wall_s = float(np.median([usage['wall_s'] for usage in usages]))
+        self.results.append({
+            'case': case,
+            'rows': rows,
+            'wall_s': wall_s,
+            'cpu_s': float(np.median([usage['cpu_s'] for usage in usages])),
+            'peak_mb': float(max(usage['peak_mb'] for usage in usages)),
+            'rows_per_s': rows / wall_s if wall_s > 0 else None,
+            'runs': len(usages)
+        })
+        logging.info(f'Benchmarked {case} on {rows} rows in {wall_s:.4f} seconds.')
+        return result
+
+    # Creating a method to train the reference model
+    def create_reference_bundle(self, file_path:str):
+        '''
+        This method trains the reference model on the train dataset with fixed settings
+        and saves it with its preprocessor as a model bundle, so that the prediction
+        cases do not depend on the deployed model.
+        '''
+        config = self.benchmark_config
+        df = DataCleaner(fill_question_marks=False).clean(
+            read_categorical_parquet(DataIngestion().ingestion_config.train_data_path).drop(columns=['fnlwgt'])
+        )
+        df = apply_vocabulary(df, build_vocabulary(df))
+        X, y = df.drop(columns=['target_class']), df[['target_class']]
+        preprocessor = DataTransformation().create_data_transformation_object().fit(X, y)
+        booster = xgb.train(
+            {'objective': 'binary:logistic', 'max_depth': config.max_depth, 'eta': 0.1, 'seed': config.seed, 'verbosity': 0},
+            xgb.DMatrix(preprocessor.transform(X), y),
+            config.n_rounds
+        )
+        save_model_bundle(file_path, preprocessor, booster)
+        return file_path
+
+    # Creating a method to benchmark the pipeline stages on a number of rows
+    def run_size(self, n_rows:int, generator, bundle, work_dir:str):
+        '''
+        This method generates a synthetic raw dataset of n_rows rows and benchmarks the
+        pipeline stages on it, each stage using the output of the one before it, as in
+        the feature and training pipelines. The artifacts are written to the work folder.
+        '''
+        size_dir = os.path.join(work_dir, str(n_rows))
+        os.makedirs(size_dir, exist_ok=True)
+        raw_path = generator.generate(n_rows=n_rows, output_path=os.path.join(size_dir, 'raw_data.csv'))
+
+        # Ingesting the raw data into the work folder
+        ingestion = DataIngestion()
+        ingestion.ingestion_config.train_data_path = os.path.join(size_dir, 'train_data.parquet')
+        ingestion.ingestion_config.test_data_path = os.path.join(size_dir, 'test_data.parquet')
+        train_path, test_path = self.measure('ingestion', n_rows, lambda: ingestion.initiate_streaming_ingestion(raw_path))
+
+        # Cleaning the train and test datasets
+        train_df = read_categorical_parquet(train_path).drop(columns=['fnlwgt'])
+        test_df = read_categorical_parquet(test_path).drop(columns=['fnlwgt'])
+        cleaner = DataCleaner(fill_question_marks=False)
+        train_df, test_df = self.measure(
+            'cleaning', n_rows, lambda: (cleaner.clean(train_df), cleaner.clean(test_df))
+        )
+        vocabulary = build_vocabulary(train_df)
+        train_df, test_df = apply_vocabulary(train_df, vocabulary), apply_vocabulary(test_df, vocabulary)
+        X_train, y_train = train_df.drop(columns=['target_class']), train_df[['target_class']]
+        X_test, y_test = test_df.drop(columns=['target_class']), test_df[['target_class']]
+
+        # Fitting the preprocessor and transforming both datasets
+        transformation = DataTransformation()
+        preprocessor = self.measure(
+            'preprocessor_fit', len(X_train),
+            lambda: transformation.create_data_transformation_object().fit(X_train, y_train)
+        )
+        train_set, test_set = self.measure(
+            'preprocessor_transform', n_rows,
+            lambda: (
+                pd.concat([preprocessor.transform(X_train), y_train], axis=1),
+                pd.concat([preprocessor.transform(X_test), y_test], axis=1)
+            )
+        )
+
+        # Writing and reading the feature store in the work folder
+        feature_store = FeatureStoreCreation()
+        feature_store.feature_store_config.xform_train_path = os.path.join(size_dir, 'xform_train_set.parquet')
+        feature_store.feature_store_config.xform_test_path = os.path.join(size_dir, 'xform_test_set.parquet')
+        feature_store.feature_store_config.row_keys_path = os.path.join(size_dir, 'row_keys')
+        feature_store.feature_store_config.test_segments_path = os.path.join(size_dir, 'test_segments.parquet')
+        xform_train_path, _ = self.measure(
+            'feature_store_write', n_rows, lambda: feature_store.create_feature_store(train_set, test_set)
+        )
+        X, y = self.measure(
+            'feature_store_read', len(train_set), lambda: feature_store.read_features_target(xform_train_path)
+        )
+
+        # Running a single tuning trial with fixed parameters, without the evaluation log
+        # of each fold
+        def run_trial():
+            finder = FindBestModel(X, y['target_class'], n_trials=1, seed=self.benchmark_config.seed)
+            study = optuna.create_study(direction='maximize')
+            study.enqueue_trial(TRIAL_PARAMS)
+            with contextlib.redirect_stdout(io.StringIO()), warnings.catch_warnings():
+                warnings.simplefilter('ignore')
+                study.optimize(finder.objective, n_trials=1)
+            return study.best_value
+        if 'tuning_trial' in self.cases:
+            self.measure('tuning_trial', len(X), run_trial)
+
+        # Predicting the test dataset with the model bundle
+        self.measure('predict_batch', len(X_test), lambda: bundle.predict(X_test))
+        shutil.rmtree(size_dir, ignore_errors=True)
+
+    # Creating a method to run the benchmarks
+    def run(self):
+        '''
+        This method runs the selected benchmark cases for every number of rows and
+        returns the report of the results.
+        ================================================================================
+        -------------------
+        Returns:
+        -------------------
+        report : dict - This is the description of the environment and the results of
+        the cases.
+        ================================================================================
+        '''
+        try:
+            optuna.logging.set_verbosity(optuna.logging.WARNING)
+            work_dir = self.work_dir or tempfile.mkdtemp(prefix='benchmark_')
+            os.makedirs(work_dir, exist_ok=True)
+            self.results = []
+            try:
+                bundle_path = self.bundle_path or self.create_reference_bundle(os.path.join(work_dir, 'model_bundle.awb'))
+
+                # Benchmarking the load of the model bundle and the single row prediction
+                bundle = self.measure(
+                    'model_load', 1, lambda: load_model_bundle(bundle_path), repeats=self.benchmark_config.latency_repeats // 10
+                )
+                row = read_categorical_parquet(DataIngestion().ingestion_config.test_data_path).drop(columns=['fnlwgt', 'target_class'])
+                row = DataCleaner(fill_question_marks=False).clean(row.head(1))
+                self.measure('predict_single', 1, lambda: bundle.predict(row), repeats=self.benchmark_config.latency_repeats)
+
+                if set(self.cases) & set(SIZED_CASES):
+                    generator = SyntheticDataGenerator(seed=self.benchmark_config.seed).fit()
+                    for n_rows in self.sizes:
+                        self.run_size(n_rows, generator, bundle, work_dir)
+            finally:
+                if self.work_dir is None:
+                    shutil.rmtree(work_dir, ignore_errors=True)
+
+            return {
+                'environment': {
+                    'python': platform.python_version(),
+                    'xgboost': xgb.__version__,
+                    'pandas': pd.__version__,
+                    'machine': platform.machine(),
+                    'cpu_count': os.cpu_count(),
+                    'model': self.bundle_path or 'reference'
+                },
+                'results': self.results
+            }
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    # Creating a method to compare the results with a baseline
+    @staticmethod
+    def compare(report, baseline, time_tolerance:float=None, memory_tolerance:float=None):
+        '''
+        This method compares the results of each case and number of rows with the
+        baseline. A case is a regression if its wall time, or its peak memory, grew by
+        more than the tolerance and by more than the noise floor, and an improvement if
+        it shrank by as much.
+        ================================================================================
+        -------------------
+        Parameters:
+        -------------------
+        report : dict - This is the report of the current run.
+        baseline : dict - This is the report of the baseline run.
+        time_tolerance : float - This is the relative slowdown allowed. If not given,
+        the tolerance from the benchmark config is used.
+        memory_tolerance : float - This is the relative memory growth allowed. If not
+        given, the tolerance from the benchmark config is used.
+
+        -------------------
+        Returns:
+        -------------------
+        comparison : list - This is the baseline and current time and memory, their
+        ratios and the status of each case.
+        ================================================================================
+        '''
+        config = BenchmarkConfig()
+        time_tolerance = time_tolerance if time_tolerance is not None else config.time_tolerance
+        memory_tolerance = memory_tolerance if memory_tolerance is not None else config.memory_tolerance
+        if baseline.get('environment') != report.get('environment'):
+            logging.info('The benchmark environment differs from the environment of the baseline.')
+
+        baseline_results = {(result['case'], result['rows']): result for result in baseline.get('results', [])}
+        comparison = []
+        for result in report['results']:
+            previous = baseline_results.get((result['case'], result['rows']))
+            entry = {'case': result['case'], 'rows': result['rows'], 'wall_s': result['wall_s'], 'peak_mb': result['peak_mb']}
+            if previous is None:
+                comparison.append({**entry, 'status': 'new'})
+                continue
+
+            statuses = []
+            for metric, tolerance, floor in [
+                ('wall_s', time_tolerance, config.min_time_s),
+                ('peak_mb', memory_tolerance, config.min_memory_mb)
+            ]:
+                current_value, previous_value = result[metric], previous[metric]
+                entry[f'baseline_{metric}'] = previous_value
+                entry[f'{metric}_ratio'] = current_value / previous_value if previous_value > 0 else None
+                if current_value > previous_value * (1 + tolerance) and current_value - previous_value > floor:
+                    statuses.append('regression')
+                elif current_value < previous_value / (1 + tolerance) and previous_value - current_value > floor:
+                    statuses.append('improvement')
+            status = 'regression' if 'regression' in statuses else 'improvement' if statuses else 'ok'
+            comparison.append({**entry, 'status': status})
+        return comparison
+
+    # Creating a method to save a report
+    @staticmethod
+    def save_report(file_path:str, report):
+        '''
+        This method saves a benchmark report as a json file.
+        '''
+        directory = os.path.dirname(file_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(file_path, 'w') as file_obj:
+            json.dump(report, file_obj, indent=2)
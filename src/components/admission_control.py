@@ -0,0 +1,196 @@
+# Importing packages
+import time
+import threading
+from src.components.config_entity import AdmissionConfig
+from src.logger import logging
+
+
+# Creating an exception for the requests which are shed
+class RequestShed(Exception):
+    '''
+    This exception is raised when a request is not admitted, either because every slot
+    is taken or because it could not be scored within its deadline. It holds the delay
+    after which the client should retry.
+    '''
+    def __init__(self, reason:str, retry_after_s:int):
+        '''
+        This is the constructor for the request shed exception.
+        '''
+        super().__init__(f'The request was shed: {reason}.')
+        self.reason = reason
+        self.retry_after_s = retry_after_s
+
+
+# Creating a class to hold an admitted request
+class Admission():
+    '''
+    This class holds the scoring mode and the deadline of an admitted request. It is
+    used as a context manager, which releases the slot of the request and records its
+    latency on exit. A degraded request which could not be scored any faster is set to
+    the full mode before exit, so that its latency is counted as a full one.
+    '''
+    # Creating the constructor for the class
+    def __init__(self, controller, mode:str, started:float, deadline:float):
+        '''
+        This is the constructor for the admission class.
+        '''
+        self.controller = controller
+        self.mode = mode
+        self.started = started
+        self.deadline = deadline
+
+    # Creating a method to enter the context
+    def __enter__(self):
+        '''
+        This method starts timing the scoring of the request.
+        '''
+        self.scoring_started = time.perf_counter()
+        return self
+
+    # Creating a method to release the slot on exit
+    def __exit__(self, exc_type, exc_value, traceback):
+        '''
+        This method releases the slot of the request. The latency of a failed scoring
+        is not recorded.
+        '''
+        latency_ms = (time.perf_counter() - self.scoring_started) * 1000
+        self.controller.release(self.mode, latency_ms if exc_type is None else None)
+        return False
+
+
+# Creating a class to control the admission of the prediction requests
+class AdmissionController():
+    '''
+    This class bounds the number of requests scored at once and degrades the scoring in
+    stages as the pressure grows. A request waits at most a few milliseconds for a slot.
+    It is scored in full while few requests are in flight and its deadline leaves room
+    for the measured full latency. Otherwise it is scored in degraded mode, with fewer
+    boosting rounds or a lighter fallback model. If no slot is free, or even degraded
+    scoring would miss the deadline, the request is shed at once, so that the latency
+    of the admitted requests stays bounded. A latency estimate which has not been
+    updated for a while expires, so the next request is admitted on its merits and
+    measures the latency afresh, and a few slow requests cannot shed every later one.
+    '''
+    # Creating the constructor for the class
+    def __init__(self, max_in_flight:int=None, degrade_in_flight:int=None, deadline_ms:float=None,
+                 queue_timeout_ms:float=None, retry_after_s:int=None, estimate_ttl_s:float=None):
+        '''
+        This is the constructor for the admission controller class. The settings which
+        are not given are taken from the admission config.
+        '''
+        self.admission_config = AdmissionConfig()
+        self.max_in_flight = max_in_flight or self.admission_config.max_in_flight
+        self.degrade_in_flight = degrade_in_flight if degrade_in_flight is not None else self.admission_config.degrade_in_flight
+        self.deadline_ms = deadline_ms or self.admission_config.deadline_ms
+        self.queue_timeout_ms = queue_timeout_ms if queue_timeout_ms is not None else self.admission_config.queue_timeout_ms
+        self.retry_after_s = retry_after_s or self.admission_config.retry_after_s
+        self.estimate_ttl_s = estimate_ttl_s if estimate_ttl_s is not None else self.admission_config.estimate_ttl_s
+        self.slots = threading.BoundedSemaphore(self.max_in_flight)
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        # The moving average of the scoring latency of each mode in milliseconds, and the
+        # perf_counter time at which it was last updated
+        self.latency_ms = {'full': None, 'degraded': None}
+        self.latency_updated = {'full': None, 'degraded': None}
+        self.counts = {'admitted': 0, 'full': 0, 'degraded': 0, 'shed': 0, 'shed_overloaded': 0, 'shed_deadline': 0}
+
+    # Creating a method to admit a request
+    def admit(self, started:float=None):
+        '''
+        This method admits a request and decides how it is scored.
+        ================================================================================
+        -------------------
+        Parameters:
+        -------------------
+        started : float - This is the perf_counter time at which the request arrived. If
+        not given, the request arrives now.
+
+        -------------------
+        Returns:
+        -------------------
+        admission : Admission - This is the mode and the deadline of the request, to be
+        used as a context manager around the scoring.
+        ================================================================================
+        '''
+        started = started if started is not None else time.perf_counter()
+        deadline = started + self.deadline_ms / 1000
+        if not self.slots.acquire(timeout=self.queue_timeout_ms / 1000):
+            self.shed('overloaded')
+
+        with self.lock:
+            self.in_flight += 1
+            in_flight = self.in_flight
+        remaining_ms = (deadline - time.perf_counter()) * 1000
+        full_ms, degraded_ms = self.estimate('full'), self.estimate('degraded')
+
+        if in_flight <= self.degrade_in_flight and (full_ms is None or full_ms <= remaining_ms):
+            mode = 'full'
+        elif degraded_ms is None or degraded_ms <= remaining_ms:
+            mode = 'degraded'
+        else:
+            self.release(None, None)
+            self.shed('deadline')
+
+        with self.lock:
+            self.counts['admitted'] += 1
+        return Admission(self, mode, started, deadline)
+
+    # Creating a method to read the latency estimate of a mode
+    def estimate(self, mode:str):
+        '''
+        This method returns the moving average latency of a mode in milliseconds, or None
+        if it was never measured or has expired.
+        '''
+        with self.lock:
+            updated = self.latency_updated[mode]
+            if updated is None or time.perf_counter() - updated > self.estimate_ttl_s:
+                return None
+            return self.latency_ms[mode]
+
+    # Creating a method to shed a request
+    def shed(self, reason:str):
+        '''
+        This method counts a shed request and raises RequestShed.
+        '''
+        with self.lock:
+            self.counts['shed'] += 1
+            self.counts[f'shed_{reason}'] += 1
+            shed = self.counts['shed']
+        if shed == 1 or shed % 1000 == 0:
+            logging.info(f'Shed {shed} prediction requests so far, the latest because of {reason}.')
+        raise RequestShed(reason, self.retry_after_s)
+
+    # Creating a method to release the slot of a request
+    def release(self, mode:str, latency_ms:float):
+        '''
+        This method releases the slot of a request, counts its mode and updates the
+        moving average of the scoring latency of the mode. An expired average is
+        replaced by the new latency rather than averaged with it.
+        '''
+        now = time.perf_counter()
+        with self.lock:
+            self.in_flight -= 1
+            if mode is not None:
+                self.counts[mode] += 1
+            if mode is not None and latency_ms is not None:
+                previous, updated = self.latency_ms[mode], self.latency_updated[mode]
+                if previous is None or now - updated > self.estimate_ttl_s:
+                    self.latency_ms[mode] = latency_ms
+                else:
+                    self.latency_ms[mode] = 0.9 * previous + 0.1 * latency_ms
+                self.latency_updated[mode] = now
+        self.slots.release()
+
+    # Creating a method to report the counts of the controller
+    def stats(self):
+        '''
+        This method returns the number of requests admitted, scored in full, degraded
+        and shed, the number in flight and the moving average latency of each mode.
+        '''
+        with self.lock:
+            return {
+                **self.counts,
+                'in_flight': self.in_flight,
+                'max_in_flight': self.max_in_flight,
+                'latency_ms': dict(self.latency_ms)
+            }
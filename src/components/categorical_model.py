@@ -0,0 +1,303 @@
+# Importing packages
+import os
+import sys
+import json
+import time
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from sklearn import set_config
+set_config(transform_output='pandas')
+from sklearn.metrics import roc_auc_score
+from src.components.config_entity import CategoricalModelConfig
+from src.components.config_entity import DataTransformationConfig
+from src.components.config_entity import StoreFeatureConfig
+from src.components.config_entity import ModelTrainerConfig
+from src.components.store_features import FeatureStoreCreation
+from src.components.model_bundle import load_model_bundle
+from src.components.model_bundle import CompactPreprocessor
+from src.components.model_bundle import ModelBundle
+from src.exception import CustomException
+from src.logger import logging
+from src.utils import load_object
+from src.utils import read_json_file
+from src.utils import apply_vocabulary
+
+
+# Creating a class to serve a booster trained with native categorical support
+class CategoricalModel():
+    '''
+    This class makes predictions with a booster trained on dictionary encoded
+    categorical features. The only preprocessing at serving time is mapping each
+    category to its code in the vocabulary fixed at training time. Unknown categories
+    are treated as missing values.
+    '''
+    # Creating the constructor for the class
+    def __init__(self, booster, vocabulary):
+        '''
+        This is the constructor for the categorical model class.
+        '''
+        self.booster = booster
+        self.vocabulary = vocabulary
+        self.feature_names = booster.feature_names
+        self.index = {col: pd.Index(categories) for col, categories in vocabulary.items()}
+
+    # Creating a method to load the categorical model
+    @classmethod
+    def from_files(cls, model_path:str=None, vocabulary_path:str=None):
+        '''
+        This method loads the booster and the vocabulary.
+        '''
+        booster = xgb.Booster()
+        booster.load_model(model_path or CategoricalModelConfig().model_path)
+        vocabulary = read_json_file(vocabulary_path or DataTransformationConfig().vocabulary_path)
+        return cls(booster, vocabulary)
+
+    # Creating a method to encode the raw features
+    def encode(self, df):
+        '''
+        This method encodes the raw features into the float32 matrix used by the booster.
+        The numerical features are kept as they are and the categorical features are
+        replaced by their codes.
+        ================================================================================
+        -------------------
+        Parameters:
+        -------------------
+        df : pandas dataframe - This is the raw feature set, as created by CustomData.
+
+        -------------------
+        Returns:
+        -------------------
+        X : numpy array - This is the encoded feature matrix.
+        ================================================================================
+        '''
+        X = np.empty((len(df), len(self.feature_names)), dtype=np.float32)
+        for i, col in enumerate(self.feature_names):
+            if col in self.index:
+                codes = self.index[col].get_indexer(np.asarray(df[col].astype(object)))
+                X[:, i] = np.where(codes < 0, np.nan, codes)
+            else:
+                X[:, i] = df[col].to_numpy(dtype=np.float32)
+        return X
+
+    # Creating a method to make predictions on the raw features
+    def predict(self, df, iteration_range=None):
+        '''
+        This method encodes the raw features and returns the predicted probabilities.
+        If a range of boosting rounds is given, only those rounds are used.
+        '''
+        return self.booster.inplace_predict(self.encode(df), iteration_range=iteration_range or (0, 0))
+
+
+# Creating a class to train and evaluate the native categorical mode
+class CategoricalModelTrainer():
+    '''
+    This class trains a booster on the dictionary encoded categorical features using
+    the hist tree method with native categorical support, and compares it with the
+    current preprocessing pipeline on the roc auc score and the end to end latency.
+    '''
+    # Creating the constructor for the class
+    def __init__(self):
+        '''
+        This is the constructor for the categorical model trainer class.
+        '''
+        self.categorical_config = CategoricalModelConfig()
+        self.data_transformation_config = DataTransformationConfig()
+        self.feature_store = FeatureStoreCreation()
+
+    # Creating a method to read the encoded datasets
+    def create_feature_target_datasets(self):
+        '''
+        This method reads the encoded train and test datasets from the feature store.
+        ================================================================================
+        -------------------
+        Returns:
+        -------------------
+        X_train : pandas dataframe - The training feature set.
+        X_test : pandas dataframe - The test feature set.
+        y_train : pandas dataframe - The training target set.
+        y_test : pandas dataframe - The test target set.
+        ================================================================================
+        '''
+        try:
+            vocabulary = read_json_file(self.data_transformation_config.vocabulary_path)
+            datasets = []
+            for path in [self.categorical_config.cat_train_path, self.categorical_config.cat_test_path]:
+                df = apply_vocabulary(self.feature_store.read_table(path).to_pandas(), vocabulary)
+                datasets.append((df.drop(labels=['target_class'], axis=1), df[['target_class']]))
+            (X_train, y_train), (X_test, y_test) = datasets
+            return (
+                X_train,
+                X_test,
+                y_train,
+                y_test
+            )
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    # Creating a method to define the training parameters
+    def training_params(self):
+        '''
+        This method returns the training parameters of the native categorical mode.
+        '''
+        return {
+            'verbosity': 0,
+            'objective': 'binary:logistic',
+            'eval_metric': 'auc',
+            'tree_method': 'hist',
+            'max_depth': self.categorical_config.max_depth,
+            'eta': self.categorical_config.eta,
+            'max_cat_to_onehot': self.categorical_config.max_cat_to_onehot,
+            'seed': self.categorical_config.seed
+        }
+
+    # Creating a method to train the booster
+    def train_model(self, X_train, y_train, save_model=True):
+        '''
+        This method trains the booster with native categorical support.
+        ================================================================================
+        -------------------
+        Parameters:
+        -------------------
+        X_train : pandas dataframe - The encoded training feature set.
+        y_train : pandas dataframe - The training target set.
+        save_model : bool - This determines if the booster should be saved.
+
+        -------------------
+        Returns:
+        -------------------
+        booster : xgboost.core.Booster - This is the trained booster.
+        ================================================================================
+        '''
+        try:
+            dtrain = xgb.DMatrix(X_train, label=y_train, enable_categorical=True)
+            booster = xgb.train(self.training_params(), dtrain, num_boost_round=self.categorical_config.num_boost_round)
+            if save_model:
+                os.makedirs(os.path.dirname(self.categorical_config.model_path), exist_ok=True)
+                booster.save_model(self.categorical_config.model_path)
+                logging.info(f'The categorical model has been saved to {self.categorical_config.model_path}.')
+            return booster
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    # Creating a method to measure the end to end latency of a prediction function
+    @staticmethod
+    def measure_latency(predict, df, repeats:int=200, batch_size:int=1000):
+        '''
+        This method measures the median latency of a prediction function on single raw
+        rows and the median latency per row on a batch of raw rows, in milliseconds.
+        '''
+        batch = df.iloc[:batch_size]
+        predict(batch)
+        row_times = []
+        for i in range(repeats):
+            row = df.iloc[i % len(df):i % len(df) + 1]
+            start = time.perf_counter()
+            predict(row)
+            row_times.append(time.perf_counter() - start)
+        batch_times = []
+        for _ in range(max(repeats // 20, 3)):
+            start = time.perf_counter()
+            predict(batch)
+            batch_times.append(time.perf_counter() - start)
+        return float(np.median(row_times) * 1000), float(np.median(batch_times) * 1000 / len(batch))
+
+    # Creating a method to fetch the booster of the current pipeline
+    def baseline_booster(self):
+        '''
+        This method returns the booster of the current pipeline. The model bundle is used
+        if it exists, else a booster with the same settings as the categorical mode is
+        trained on the transformed feature store, so that the comparison is like for like.
+        '''
+        bundle_path = ModelTrainerConfig().model_path
+        if os.path.exists(bundle_path):
+            return load_model_bundle(bundle_path).booster
+        X, y = self.feature_store.read_features_target(StoreFeatureConfig().xform_train_path)
+        params = {key: value for key, value in self.training_params().items() if key != 'max_cat_to_onehot'}
+        return xgb.train(params, xgb.DMatrix(X, label=y), num_boost_round=self.categorical_config.num_boost_round)
+
+    # Creating a method to compare the categorical mode with the current pipeline
+    def compare_with_pipeline(self, booster, X_test, y_test):
+        '''
+        This method compares the categorical mode with the current pipeline on the test
+        set. Each mode is scored end to end, from the raw features to the probabilities.
+        The current pipeline is scored with the preprocessor object, as MakePredictions
+        does, and with the model bundle.
+        ================================================================================
+        -------------------
+        Parameters:
+        -------------------
+        booster : xgboost.core.Booster - This is the categorical booster.
+        X_test : pandas dataframe - The encoded test feature set.
+        y_test : pandas dataframe - The test target set.
+
+        -------------------
+        Returns:
+        -------------------
+        report : pandas dataframe - This is the roc auc score, the single row and batch
+        latency and the model size of each mode.
+        ================================================================================
+        '''
+        try:
+            preprocessor = load_object(file_path=self.data_transformation_config.preprocessor_obj_path)
+            baseline = self.baseline_booster()
+            bundle = ModelBundle(baseline, CompactPreprocessor.from_column_transformer(preprocessor), {})
+            vocabulary = read_json_file(self.data_transformation_config.vocabulary_path)
+            categorical_model = CategoricalModel(booster, vocabulary)
+
+            modes = {
+                'column_transformer': (
+                    lambda df: baseline.predict(xgb.DMatrix(preprocessor.transform(df))),
+                    baseline
+                ),
+                'model_bundle': (bundle.predict, baseline),
+                'native_categorical': (categorical_model.predict, booster)
+            }
+            rows = []
+            for mode, (predict, model) in modes.items():
+                row_ms, batch_row_ms = self.measure_latency(predict, X_test)
+                rows.append({
+                    'mode': mode,
+                    'roc_auc': float(roc_auc_score(y_test, predict(X_test))),
+                    'row_ms': row_ms,
+                    'batch_row_ms': batch_row_ms,
+                    'model_bytes': len(model.save_raw(raw_format='ubj'))
+                })
+            return pd.DataFrame(rows)
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    # Creating a method to initiate the categorical training
+    def initiate_categorical_training(self, save_model=True):
+        '''
+        This method trains the booster on the encoded datasets, compares it with the
+        current pipeline and saves the comparison report.
+        ================================================================================
+        -------------------
+        Parameters:
+        -------------------
+        save_model : bool - This determines if the booster should be saved.
+
+        -------------------
+        Returns:
+        -------------------
+        booster : xgboost.core.Booster - This is the trained booster.
+        report : pandas dataframe - This is the comparison report.
+        ================================================================================
+        '''
+        try:
+            X_train, X_test, y_train, y_test = self.create_feature_target_datasets()
+            booster = self.train_model(X_train, y_train, save_model=save_model)
+            report = self.compare_with_pipeline(booster, X_test, y_test)
+
+            with open(self.categorical_config.report_path, 'w') as file_obj:
+                json.dump(report.to_dict(orient='records'), file_obj, indent=2)
+            logging.info(f'Categorical mode comparison:\n{report.to_string(index=False)}')
+
+            return booster, report
+
+        except Exception as e:
+            raise CustomException(e, sys)
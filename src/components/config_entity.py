@@ -6,34 +6,324 @@ from dataclasses import dataclass
 @dataclass
 class DataIngestionConfig():
     '''
-    This class defines the path for the train and test datasets.
+    This class defines the path for the train and test datasets, as well as the
+    local raw data source, the url of the remote data source which is downloaded when
+    there is no local source, and the settings used when streaming the raw data.
     '''
     train_data_path:str = os.path.join('artifacts', 'train_data.parquet')
     test_data_path:str = os.path.join('artifacts', 'test_data.parquet')
+    raw_data_path:str = os.path.join('raw_data', 'adult.data')
+    source_url:str = 'http://archive.ics.uci.edu/ml/machine-learning-databases/adult/adult.data'
+    source_timeout_s:float = 10.0
+    test_size:float = 0.33
+    seed:int = 42
+    block_size:int = 1 << 20
+    row_group_size:int = 65536
 
 # Creating a config to define the path for the preprocessor object
 @dataclass
 class DataTransformationConfig():
     '''
-    This class defines the path to store the preprocessor object.
+    This class defines the path to store the preprocessor object and the vocabulary
+    of the categorical features, as well as the number of rows read at a time when
+    the preprocessor is fit out of core. The number of workers (0 uses one per cpu)
+    and the chunk size are used when large datasets are transformed in parallel, and
+    the output of the workers is mapped from a file in the output folder, or in the
+    temporary folder when the output folder does not have the space for it.
     '''
     preprocessor_obj_path:str = os.path.join('artifacts', 'preprocessor.pkl')
+    vocabulary_path:str = os.path.join('artifacts', 'vocabulary.json')
+    batch_size:int = 65536
+    n_workers:int = 0
+    parallel_chunk_size:int = 262144
+    parallel_output_dir:str = '/dev/shm'
 
 # Creating a config to to store the transformed datasets
 @dataclass
 class StoreFeatureConfig():
     '''
-    This class defines the path to store the transformed datasets.
+    This class defines the path to store the transformed datasets and the layout of
+    the feature store. The storage format is either 'parquet' or 'feather' (Arrow IPC,
+    which is memory mapped when read). If the compression is not set, parquet files are
+    compressed with zstd and feather files are left uncompressed, so that their memory
+    mapped columns are read without decoding. Feather files are compressed, for example
+    with lz4, only when the compression is set explicitly. The raw values of the
+    segment columns of the test set are stored next to it, row for row, so that the
+    model can be evaluated per segment. The row keys identify the raw rows which are
+    already in the feature store, so that only new rows are transformed when data is
+    appended.
     '''
     xform_train_path:str = os.path.join('feature_store', 'xform_train_set.parquet')
     xform_test_path:str = os.path.join('feature_store', 'xform_test_set.parquet')
+    storage_format:str = 'parquet'
+    compression:str = None
+    row_group_size:int = 65536
+    row_keys_path:str = os.path.join('feature_store', 'row_keys')
+    test_segments_path:str = os.path.join('feature_store', 'test_segments.parquet')
+    segment_cols:tuple = ('sex', 'race', 'workclass')
 
 
 # Creating a class to store the trained model
 @dataclass
 class ModelTrainerConfig():
     '''
-    This class defines the path to store the trained model.
+    This class defines the path to store the model bundle, which holds the trained
+    model together with the fitted preprocessing, and the path to store the fused model,
+    which has the fitted preprocessing compiled into the splits of the trees.
     '''
-    model_path:str = os.path.join('artifacts', 'model.pkl')
+    model_path:str = os.path.join('artifacts', 'model_bundle.awb')
+    fused_model_path:str = os.path.join('artifacts', 'fused_model.npz')
     
+
+# Creating a config to refresh the trained model on newly ingested data
+@dataclass
+class ModelRefreshConfig():
+    '''
+    This class defines the path to the newly ingested data and the settings used
+    to refresh the trained model.
+    '''
+    new_data_path:str = os.path.join('artifacts', 'new_data.parquet')
+    num_boost_round:int = 10
+    holdout_size:float = 0.2
+    auc_tolerance:float = 0.0
+    seed:int = 42
+
+
+# Creating a config to store the manifest of the pipeline stages
+@dataclass
+class StageCacheConfig():
+    '''
+    This class defines the path to the manifest, which records the fingerprint of each
+    pipeline stage after it has run.
+    '''
+    manifest_path:str = os.path.join('artifacts', 'stage_manifest.json')
+
+
+# Creating a config to cache the cross validation folds
+@dataclass
+class FoldCacheConfig():
+    '''
+    This class defines the folder which caches the cross validation folds and their
+    binary DMatrix buffers, the largest size of the cache before the least recently
+    used entries are evicted, and the number of folds.
+    '''
+    cache_dir:str = os.path.join('artifacts', 'fold_cache')
+    max_bytes:int = 2 * 1024**3
+    n_splits:int = 5
+
+
+# Creating a config to store the tuning telemetry
+@dataclass
+class TuningTelemetryConfig():
+    '''
+    This class defines the path to the SQLite database which records the time and
+    resources used by each trial and fold of the hyperparameter search.
+    '''
+    db_path:str = os.path.join('artifacts', 'tuning_telemetry.db')
+
+
+# Creating a config for the latency aware hyperparameter search
+@dataclass
+class TuningConfig():
+    '''
+    This class defines the prediction latency service level objective in milliseconds
+    per row. When it is set, the hyperparameter search optimizes the roc auc score and
+    the latency jointly, and the most accurate model within the objective is picked.
+    It also defines how the latency of each candidate model is measured.
+    '''
+    latency_slo_ms:float = None
+    latency_repeats:int = 50
+    latency_batch_size:int = 1000
+
+
+# Creating a config for the native categorical training mode
+@dataclass
+class CategoricalModelConfig():
+    '''
+    This class defines the paths of the datasets with dictionary encoded categorical
+    features, the path of the booster trained on them with native categorical support,
+    the path of the comparison report and the training settings.
+    '''
+    cat_train_path:str = os.path.join('feature_store', 'cat_train_set.parquet')
+    cat_test_path:str = os.path.join('feature_store', 'cat_test_set.parquet')
+    model_path:str = os.path.join('artifacts', 'categorical_model.ubj')
+    report_path:str = os.path.join('artifacts', 'categorical_report.json')
+    num_boost_round:int = 200
+    max_depth:int = 6
+    eta:float = 0.1
+    max_cat_to_onehot:int = 4
+    seed:int = 42
+
+
+# Creating a config for the onnx export and the onnxruntime serving backend
+@dataclass
+class OnnxConfig():
+    '''
+    This class defines the path of the onnx model, which holds the fitted preprocessing
+    and the trained model in a single graph, and the settings of the onnxruntime
+    session. If the number of intra op threads is 0, the number tuned at export time is
+    used.
+    '''
+    model_path:str = os.path.join('artifacts', 'model.onnx')
+    intra_op_threads:int = 0
+    tune_repeats:int = 20
+    tune_batch_size:int = 1000
+
+
+# Creating a config for the capture of the prediction requests
+@dataclass
+class RequestCaptureConfig():
+    '''
+    This class defines the folder of the captured prediction requests and the settings
+    of the capture - the file format, the share of requests sampled, the policy used
+    when the queue is full, the size of the queue and of the write batches, the flush
+    interval and the size at which a capture file is rotated.
+    '''
+    capture_dir:str = os.path.join('logs', 'requests')
+    file_format:str = 'jsonl'
+    sample_rate:float = 1.0
+    overload_policy:str = 'drop_newest'
+    queue_size:int = 10000
+    batch_size:int = 500
+    flush_interval_s:float = 1.0
+    max_file_bytes:int = 64 * 1024 * 1024
+
+
+# Creating a config for the drift monitor
+@dataclass
+class DriftConfig():
+    '''
+    This class defines the paths of the training baselines of the drift monitor and the
+    settings of the sketches - the numerical features sketched by quantiles, the number
+    of quantile and score bins, the population stability index thresholds of a warning
+    and of drift, and the number of values needed before drift is reported.
+    '''
+    baseline_path:str = os.path.join('artifacts', 'drift_baseline.json')
+    score_baseline_path:str = os.path.join('artifacts', 'score_baseline.json')
+    numeric_cols:tuple = ('age', 'hours-per-week')
+    n_quantile_bins:int = 20
+    n_score_bins:int = 20
+    psi_warning:float = 0.1
+    psi_drift:float = 0.2
+    min_count:int = 100
+
+
+# Creating a config for the bootstrap evaluation of the trained model
+@dataclass
+class ModelEvaluationConfig():
+    '''
+    This class defines the path of the evaluation report and the settings of the
+    bootstrap - the number of replicates, the confidence level of the intervals, the
+    number of calibration bins, the features whose segments are evaluated, which must
+    be among the segment columns stored in the feature store, the number
+    of worker processes, the memory used by each block of replicates and the seed.
+    '''
+    report_path:str = os.path.join('artifacts', 'evaluation_report.json')
+    n_bootstrap:int = 1000
+    confidence:float = 0.95
+    n_calibration_bins:int = 10
+    segment_cols:tuple = ('sex', 'race', 'workclass')
+    n_workers:int = 0
+    max_block_bytes:int = 256 * 1024 * 1024
+    seed:int = 42
+
+
+# Creating a config for the explanations of the predictions
+@dataclass
+class ExplainConfig():
+    '''
+    This class defines the settings of the prediction explanations - the number of
+    explained profiles kept in the cache, the default latency budget of a request in
+    milliseconds, and the number of rows explained per call to the booster.
+    '''
+    cache_size:int = 10000
+    budget_ms:float = 50.0
+    batch_size:int = 256
+
+
+# Creating a config for the admission control of the prediction requests
+@dataclass
+class AdmissionConfig():
+    '''
+    This class defines the settings of the admission control - the maximum number of
+    requests scored at once, the number in flight above which requests are scored in
+    degraded mode, the deadline of a request, how long a request may wait for a slot,
+    the delay suggested to shed requests, the share of boosting rounds used in degraded
+    mode, and the age in seconds after which a latency estimate expires and is measured
+    again.
+    '''
+    max_in_flight:int = 8
+    degrade_in_flight:int = 4
+    deadline_ms:float = 250.0
+    queue_timeout_ms:float = 10.0
+    retry_after_s:int = 1
+    degraded_fraction:float = 0.25
+    estimate_ttl_s:float = 5.0
+
+
+# Creating a config for the synthetic data generator
+@dataclass
+class SyntheticDataConfig():
+    '''
+    This class defines the settings of the synthetic data generator - the raw dataset it
+    learns from, the file it writes, the number of rows, the rows sampled per chunk and
+    written per row group, the number of worker processes, where 0 uses every cpu, the
+    seed, the weight of the marginal distribution added to each conditional
+    distribution, the number of chunks the workers may run ahead of the writer, the
+    parquet compression, the number of quantiles kept of the continuous columns, and the
+    columns each column is sampled conditionally on, in sampling order. The continuous
+    columns are sampled from their quantiles.
+    '''
+    source_path:str = os.path.join('artifacts', 'train_data.parquet')
+    output_path:str = os.path.join('artifacts', 'synthetic_data.parquet')
+    n_rows:int = 100000
+    chunk_size:int = 250000
+    n_workers:int = 0
+    seed:int = 42
+    smoothing:float = 1.0
+    max_pending_chunks:int = 2
+    compression:str = 'snappy'
+    n_quantiles:int = 1000
+    parents:tuple = (
+        ('target_class', ()),
+        ('sex', ('target_class',)),
+        ('relationship', ('target_class', 'sex')),
+        ('marital-status', ('relationship', 'target_class')),
+        ('age', ('marital-status', 'target_class')),
+        ('education', ('target_class',)),
+        ('education-num', ('education',)),
+        ('occupation', ('education', 'sex')),
+        ('workclass', ('occupation',)),
+        ('hours-per-week', ('occupation', 'sex')),
+        ('capital-gain', ('target_class',)),
+        ('capital-loss', ('target_class',)),
+        ('race', ('target_class',)),
+        ('native-country', ('race',))
+    )
+    continuous_cols:tuple = ('fnlwgt',)
+
+
+# Creating a config for the pipeline benchmarks
+@dataclass
+class BenchmarkConfig():
+    '''
+    This class defines the settings of the pipeline benchmarks - the baseline the results
+    are compared with, the report, the numbers of synthetic rows benchmarked, the runs
+    of each case and of the model load and single row prediction, the relative slowdown
+    and memory growth allowed before a case is reported as a regression, the time and
+    memory below which differences are treated as noise, and the boosting rounds, depth
+    and seed of the reference model, which is trained on the train dataset when no model
+    bundle is given.
+    '''
+    baseline_path:str = os.path.join('artifacts', 'benchmark_baseline.json')
+    report_path:str = os.path.join('artifacts', 'benchmark_report.json')
+    sizes:tuple = (10000, 100000, 1000000)
+    repeats:int = 3
+    latency_repeats:int = 200
+    time_tolerance:float = 0.25
+    memory_tolerance:float = 0.25
+    min_time_s:float = 0.005
+    min_memory_mb:float = 32.0
+    n_rounds:int = 100
+    max_depth:int = 6
+    seed:int = 42
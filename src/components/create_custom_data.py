@@ -1,7 +1,29 @@
 # Importing packages
+import os
 import sys
 import pandas as pd
 from src.exception import CustomException
+from src.utils import apply_vocabulary
+from src.utils import read_json_file
+from src.components.config_entity import DataTransformationConfig
+
+# Mapping the fields entered on the website to the columns of the raw dataset
+FIELD_COLUMNS = {
+    'age': 'age',
+    'workclass': 'workclass',
+    'education': 'education',
+    'education_num': 'education-num',
+    'marital_status': 'marital-status',
+    'occupation': 'occupation',
+    'relationship': 'relationship',
+    'race': 'race',
+    'sex': 'sex',
+    'capital_gain': 'capital-gain',
+    'capital_loss': 'capital-loss',
+    'hours_per_week': 'hours-per-week',
+    'native_country': 'native-country'
+}
+NUMERIC_COLUMNS = ['age', 'education-num', 'capital-gain', 'capital-loss', 'hours-per-week']
 
 # Creating a class to convert the user entered data into a pandas dataframe
 class CustomData():
@@ -44,17 +66,17 @@ class CustomData():
         self.hours_per_week = hours_per_week
         self.native_country = native_country
     
-    # Creating a method to convert the user entered data into a dataframe.
-    def create_dataframe(self):
+    # Creating a method to convert the user entered data into a raw dataframe
+    def create_raw_dataframe(self):
         '''
-        This method takes the data input by the user and returns a dataframe. The method 
-        converts the data, input by the user on the website, into a dictionary and then creates
-        a pandas dataframe using the dictionary.
+        This method takes the data input by the user and returns a dataframe of the raw
+        values, before the categorical features are encoded with the vocabulary. Values
+        which are not part of the vocabulary are kept, so that they can be monitored.
         ========================================================================================
         -----------------------
         Returns:
         -----------------------
-        df : pandas dataframe - A pandas dataframe of the data entered by the user.
+        df : pandas dataframe - A pandas dataframe of the raw data entered by the user.
         ========================================================================================
         '''
         try:
@@ -76,9 +98,78 @@ class CustomData():
             }
             
             # Creating a dataframe from the dictionary
-            df = pd.DataFrame(custom_data_input_dict)
+            return pd.DataFrame(custom_data_input_dict)
+        
+        except Exception as e:
+            raise CustomException(e, sys)
+    
+    # Creating a method to encode a raw dataframe with the vocabulary
+    @staticmethod
+    def encode_dataframe(df):
+        '''
+        This method encodes the categorical features of a raw dataframe using the
+        vocabulary fixed at training time. Values which are not part of the vocabulary
+        become missing. The raw dataframe is left unchanged.
+        '''
+        vocabulary_path = DataTransformationConfig().vocabulary_path
+        if os.path.exists(vocabulary_path):
+            df = apply_vocabulary(df.copy(), read_json_file(vocabulary_path))
+        return df
+    
+    # Creating a method to convert the user entered data into a dataframe
+    def create_dataframe(self):
+        '''
+        This method takes the data input by the user and returns a dataframe. The method 
+        converts the data, input by the user on the website, into a dictionary and then creates
+        a pandas dataframe using the dictionary.
+        ========================================================================================
+        -----------------------
+        Returns:
+        -----------------------
+        df : pandas dataframe - A pandas dataframe of the data entered by the user.
+        ========================================================================================
+        '''
+        try:
+            # Encoding the categorical features using the vocabulary fixed at training time
+            return self.encode_dataframe(self.create_raw_dataframe())
+        
+        except Exception as e:
+            raise CustomException(e, sys)
+    
+    # Creating a method to convert a batch of user entered records into a dataframe
+    @staticmethod
+    def create_batch_dataframe(records):
+        '''
+        This method converts a list of records, each holding the fields entered on the
+        website, into a single dataframe with the same columns and encoding as the
+        create_dataframe method.
+        ========================================================================================
+        -----------------------
+        Parameters:
+        -----------------------
+        records : list - These are the records, keyed by the names of the fields.
+        
+        -----------------------
+        Returns:
+        -----------------------
+        df : pandas dataframe - A pandas dataframe of the records.
+        ========================================================================================
+        '''
+        try:
+            missing = [field for field in FIELD_COLUMNS if any(field not in record for record in records)]
+            if missing:
+                raise ValueError(f'The records are missing the fields {missing}.')
+            df = pd.DataFrame({
+                col: [record[field] for record in records]
+                for field, col in FIELD_COLUMNS.items()
+            })
+            
+            # Converting the numerical fields, which may have been entered as text
+            for col in NUMERIC_COLUMNS:
+                df[col] = pd.to_numeric(df[col])
             
-            return df
+            # Encoding the categorical features using the vocabulary fixed at training time
+            return CustomData.encode_dataframe(df)
         
         except Exception as e:
-            raise CustomException(e, sys)
\ No newline at end of file
+            raise CustomException(e, sys)
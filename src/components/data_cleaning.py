@@ -0,0 +1,180 @@
+# Importing packages
+import sys
+import numpy as np
+import pandas as pd
+from src.exception import CustomException
+from src.logger import logging
+
+
+# Creating a class to clean the raw datasets in a single vectorized pass
+class DataCleaner():
+    '''
+    This class applies the cleaning rules from src/utils.py - removing blank spaces,
+    replacing question marks, recoding the target class and converting the capital
+    gain and loss features into categorical features - in a single pass over the
+    columns. Each text column is factorized once, the rules are applied to its unique
+    values only, and the rows are rebuilt with one gather over the integer codes. The
+    input dataframe is never modified.
+    '''
+    # Creating the constructor for the class
+    def __init__(
+        self,
+        fill_question_marks=True,
+        recode_target=True,
+        convert_capital=False
+    ):
+        '''
+        This is the constructor for the data cleaner class. It defines which of the
+        cleaning rules are applied.
+        '''
+        self.fill_question_marks = fill_question_marks
+        self.recode_target = recode_target
+        self.convert_capital = convert_capital
+        self.question_mark_values = {
+            'workclass': 'Private',
+            'occupation': 'Prof-specialty',
+            'native-country': 'United-States'
+        }
+        self.capital_labels = {
+            'capital-gain': ('capital-gain-trns', 'cap_gain', 'no_cap_gain'),
+            'capital-loss': ('capital-loss-trns', 'cap_loss', 'no_cap_loss')
+        }
+
+    # Creating a method to build the function applied to the unique values of a column
+    def value_rule(self, col):
+        '''
+        This method returns the function which is applied to each unique value of a
+        text column.
+        ================================================================================
+        -------------------
+        Parameters:
+        -------------------
+        col : str - This is the name of the column.
+
+        -------------------
+        Returns:
+        -------------------
+        rule : function - This is the function applied to each unique value.
+        ================================================================================
+        '''
+        fill_value = self.question_mark_values.get(col) if self.fill_question_marks else None
+        recode = self.recode_target and col == 'target_class'
+
+        def rule(value):
+            if isinstance(value, str):
+                value = value.strip()
+                if fill_value is not None and value == '?':
+                    value = fill_value
+            if recode:
+                value = 0 if value == '<=50K' else 1
+            return value
+
+        return rule
+
+    # Creating a method to clean a single text column
+    def clean_text_column(self, series):
+        '''
+        This method cleans a text column using its integer codes. Object columns stay
+        object columns and categorical columns stay categorical columns. The target
+        class column is returned as an integer column when it is recoded.
+        ================================================================================
+        -------------------
+        Parameters:
+        -------------------
+        series : pandas series - This is the text column.
+
+        -------------------
+        Returns:
+        -------------------
+        series : pandas series - This is the cleaned column.
+        ================================================================================
+        '''
+        rule = self.value_rule(series.name)
+        is_categorical = isinstance(series.dtype, pd.CategoricalDtype)
+        if is_categorical:
+            codes = series.cat.codes.to_numpy()
+            uniques = series.cat.categories
+        else:
+            codes, uniques = pd.factorize(series.to_numpy(), use_na_sentinel=True)
+
+        # Applying the rule to the unique values only
+        mapped = np.empty(len(uniques) + 1, dtype=object)
+        mapped[:-1] = [rule(value) for value in uniques]
+        mapped[-1] = rule(np.nan)
+
+        if self.recode_target and series.name == 'target_class':
+            values = mapped.astype(int)[codes]
+            return pd.Series(values, index=series.index, name=series.name)
+
+        if is_categorical:
+            new_categories, inverse = np.unique(mapped[:-1], return_inverse=True)
+            new_codes = np.where(codes >= 0, inverse[codes], -1)
+            values = pd.Categorical.from_codes(new_codes, categories=new_categories)
+        else:
+            # Missing values keep their original value, as .str.strip() would
+            mapped[-1] = np.nan
+            values = mapped[codes]
+        return pd.Series(values, index=series.index, name=series.name)
+
+    # Creating a method to convert a capital column into a categorical column
+    def convert_capital_column(self, series):
+        '''
+        This method converts the capital-gain or capital-loss column into a categorical
+        column, in the same way as convert_to_categorical.
+        ================================================================================
+        -------------------
+        Parameters:
+        -------------------
+        series : pandas series - This is the capital-gain or capital-loss column.
+
+        -------------------
+        Returns:
+        -------------------
+        series : pandas series - This is the converted categorical column.
+        ================================================================================
+        '''
+        name, positive, negative = self.capital_labels[series.name]
+        values = pd.Categorical.from_codes(
+            np.where(series.to_numpy() > 0, 0, 1),
+            categories=[positive, negative]
+        )
+        return pd.Series(values, index=series.index, name=name)
+
+    # Creating a method to clean a dataset
+    def clean(self, df):
+        '''
+        This method cleans the dataset in a single pass over its columns and returns a
+        new dataframe. The input dataframe is not modified.
+        ================================================================================
+        -------------------
+        Parameters:
+        -------------------
+        df : pandas dataframe - This is the raw dataset.
+
+        -------------------
+        Returns:
+        -------------------
+        clean_df : pandas dataframe - This is the cleaned dataset.
+        ================================================================================
+        '''
+        try:
+            logging.info('Cleaning the dataset.')
+
+            columns = {}
+            capital_columns = {}
+            for col in df.columns:
+                series = df[col]
+                if self.convert_capital and col in self.capital_labels:
+                    converted = self.convert_capital_column(series)
+                    capital_columns[converted.name] = converted
+                elif series.dtype == object or isinstance(series.dtype, pd.CategoricalDtype):
+                    columns[col] = self.clean_text_column(series)
+                else:
+                    columns[col] = series
+
+            # The converted capital columns are added at the end, as convert_to_categorical does
+            columns.update(capital_columns)
+            return pd.DataFrame(columns, index=df.index)
+
+        except Exception as e:
+            raise CustomException(e, sys)
@@ -1,7 +1,13 @@
 # Importing packages
 import os
 import sys
+import urllib.request
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
 from sklearn import set_config
 set_config(transform_output='pandas')
 from sklearn.model_selection import train_test_split
@@ -9,6 +15,27 @@ from src.logger import logging
 from src.exception import CustomException
 from src.components.config_entity import DataIngestionConfig
 
+# Defining the schema of the raw dataset. The text fields are dictionary encoded so that
+# each string is stored once per category instead of once per row
+TEXT_TYPE = pa.dictionary(pa.int32(), pa.string())
+RAW_SCHEMA = pa.schema([
+    ('age', pa.int64()),
+    ('workclass', TEXT_TYPE),
+    ('fnlwgt', pa.int64()),
+    ('education', TEXT_TYPE),
+    ('education-num', pa.int64()),
+    ('marital-status', TEXT_TYPE),
+    ('occupation', TEXT_TYPE),
+    ('relationship', TEXT_TYPE),
+    ('race', TEXT_TYPE),
+    ('sex', TEXT_TYPE),
+    ('capital-gain', pa.int64()),
+    ('capital-loss', pa.int64()),
+    ('hours-per-week', pa.int64()),
+    ('native-country', TEXT_TYPE),
+    ('target_class', TEXT_TYPE)
+])
+
 # Creating a class to ingest the data from source
 class DataIngestion():
     '''
@@ -45,7 +72,7 @@ class DataIngestion():
             os.makedirs(os.path.dirname(self.ingestion_config.train_data_path), exist_ok=True)
             
             # Defining the url where the data is located
-            URL = "http://archive.ics.uci.edu/ml/machine-learning-databases/adult/adult.data"
+            URL = self.ingestion_config.source_url
             
             # Defining the name of the columns for the dataframe
             COLS = [
@@ -85,3 +112,209 @@ class DataIngestion():
                 
         except Exception as e:
             raise CustomException(e, sys)
+    
+    # Defining a method to identify the version of the remote data source
+    def remote_source_version(self):
+        '''
+        This method identifies the version of the remote data source by its url together
+        with the ETag, or else the last modified date, returned by the server for a HEAD
+        request. The version is None if the server cannot be reached or returns neither.
+        ====================================================================================
+        ---------------
+        Returns:
+        ---------------
+        source : dict - This is the url and the version of the remote data source.
+        ====================================================================================
+        '''
+        url = self.ingestion_config.source_url
+        version = None
+        try:
+            request = urllib.request.Request(url, method='HEAD')
+            with urllib.request.urlopen(request, timeout=self.ingestion_config.source_timeout_s) as response:
+                version = response.headers.get('ETag') or response.headers.get('Last-Modified')
+        except OSError as e:
+            logging.info(f'Could not read the version of {url}: {e}')
+        return {'url': url, 'version': version}
+    
+    # Defining a method to read the local raw data source in record batches
+    def read_source_batches(self, source_path:str, header:bool=False):
+        '''
+        This method reads a local CSV or parquet file in record batches using the raw
+        data schema. The blank spaces in the text fields are removed from each batch as
+        soon as it is parsed and the text fields are dictionary encoded.
+        ====================================================================================
+        ---------------
+        Parameters:
+        ---------------
+        source_path : str - This is the path to the local CSV or parquet file.
+        header : bool - This determines if the CSV file has a header row.
+        
+        ---------------
+        Returns:
+        ---------------
+        batches : generator - This yields pyarrow record batches with the raw data schema.
+        ====================================================================================
+        '''
+        if source_path.endswith('.parquet'):
+            parquet_file = pq.ParquetFile(source_path)
+            batches = parquet_file.iter_batches(
+                batch_size=self.ingestion_config.row_group_size,
+                columns=RAW_SCHEMA.names
+            )
+        else:
+            batches = pa_csv.open_csv(
+                source_path,
+                read_options=pa_csv.ReadOptions(
+                    column_names=None if header else RAW_SCHEMA.names,
+                    block_size=self.ingestion_config.block_size
+                ),
+                convert_options=pa_csv.ConvertOptions(
+                    column_types={
+                        field.name: pa.string() if field.type == TEXT_TYPE else field.type
+                        for field in RAW_SCHEMA
+                    },
+                    include_columns=RAW_SCHEMA.names
+                )
+            )
+        
+        for batch in batches:
+            columns = []
+            for field in RAW_SCHEMA:
+                column = batch.column(field.name)
+                if field.type == TEXT_TYPE:
+                    column = pc.utf8_trim_whitespace(column.cast(pa.string()))
+                    column = pc.dictionary_encode(column).cast(TEXT_TYPE)
+                else:
+                    column = column.cast(field.type)
+                columns.append(column)
+            yield pa.RecordBatch.from_arrays(columns, schema=RAW_SCHEMA)
+    
+    # Defining a method to compute the key of each row from its contents
+    def row_keys(self, batch):
+        '''
+        This method returns a 64 bit hash of the contents of each row in a record batch.
+        The hash identifies a raw row, whatever file or batch it was read from.
+        ====================================================================================
+        ---------------
+        Parameters:
+        ---------------
+        batch : pyarrow record batch - This is the batch of raw data.
+        
+        ---------------
+        Returns:
+        ---------------
+        row_keys : numpy array - These are the uint64 keys of the rows.
+        ====================================================================================
+        '''
+        return pd.util.hash_pandas_object(batch.to_pandas(), index=False).to_numpy()
+    
+    # Defining a method to assign each row to the test set using a hash of its contents
+    def hash_split(self, batch):
+        '''
+        This method assigns the rows in a record batch to the train or test set using a
+        hash of the row contents. The assignment of a row does not depend on the other
+        rows, so the split can be done one batch at a time.
+        ====================================================================================
+        ---------------
+        Parameters:
+        ---------------
+        batch : pyarrow record batch - This is the batch of raw data.
+        
+        ---------------
+        Returns:
+        ---------------
+        is_test : numpy array - This is a boolean mask of the rows in the test set.
+        ====================================================================================
+        '''
+        row_hash = self.row_keys(batch)
+        
+        # Mixing the seed into the hash so that different seeds give different splits
+        with np.errstate(over='ignore'):
+            mixed = row_hash ^ np.uint64(self.ingestion_config.seed) * np.uint64(0x9E3779B97F4A7C15)
+            mixed = (mixed ^ (mixed >> np.uint64(31))) * np.uint64(0xBF58476D1CE4E5B9)
+            mixed = mixed ^ (mixed >> np.uint64(29))
+        
+        # A test size of 1 would give a threshold of 2**64, which does not fit in 64 bits
+        test_size = self.ingestion_config.test_size
+        if not 0 <= test_size < 1:
+            raise ValueError(f'The test size must be at least 0 and below 1, not {test_size}.')
+        threshold = np.uint64(int(test_size * float(2**64)))
+        return mixed < threshold
+    
+    # Defining the function to ingest the data from a local source in a streaming fashion
+    def initiate_streaming_ingestion(self, source_path:str=None, header:bool=False):
+        '''
+        This method streams the data from a local CSV or parquet file, splits each batch
+        into the train and test dataset and writes the datasets into the artifacts folder
+        one row group at a time. The memory used does not grow with the size of the source.
+        ====================================================================================
+        ---------------
+        Parameters:
+        ---------------
+        source_path : str - This is the path to the local source. If not given, the raw
+        data path from the ingestion config is used.
+        header : bool - This determines if the CSV file has a header row.
+        
+        ---------------
+        Returns:
+        ---------------
+        train file path : str - This is the path to the train dataset.
+        test file path : str - This is the path to the test dataset.
+        ====================================================================================
+        '''
+        logging.info("Beginning the streaming data ingestion process.")
+        
+        try:
+            if source_path is None:
+                source_path = self.ingestion_config.raw_data_path
+            
+            # Creating the artifacts directory
+            os.makedirs(os.path.dirname(self.ingestion_config.train_data_path), exist_ok=True)
+            
+            # Creating the writers and the buffers for the train and test datasets
+            row_group_size = self.ingestion_config.row_group_size
+            outputs = {}
+            for name, path in [
+                ('train', self.ingestion_config.train_data_path),
+                ('test', self.ingestion_config.test_data_path)
+            ]:
+                outputs[name] = {
+                    'writer': pq.ParquetWriter(path, RAW_SCHEMA, compression='gzip'),
+                    'buffer': [],
+                    'rows': 0
+                }
+            
+            # Creating a function to write the buffered rows as a single row group
+            def flush(output):
+                if output['rows'] > 0:
+                    table = pa.Table.from_batches(output['buffer'], schema=RAW_SCHEMA)
+                    output['writer'].write_table(table, row_group_size=row_group_size)
+                    output['buffer'] = []
+                    output['rows'] = 0
+            
+            try:
+                for batch in self.read_source_batches(source_path, header=header):
+                    is_test = self.hash_split(batch)
+                    for name, mask in [('train', ~is_test), ('test', is_test)]:
+                        output = outputs[name]
+                        output['buffer'].append(batch.filter(pa.array(mask)))
+                        output['rows'] += int(mask.sum())
+                        if output['rows'] >= row_group_size:
+                            flush(output)
+                
+                for output in outputs.values():
+                    flush(output)
+            
+            finally:
+                for output in outputs.values():
+                    output['writer'].close()
+            
+            logging.info("Completed the streaming data ingestion process.")
+            
+            return (
+                self.ingestion_config.train_data_path,
+                self.ingestion_config.test_data_path
+            )
+        
+        except Exception as e:
+            raise CustomException(e, sys)
@@ -1,17 +1,25 @@
 # Importing packages
 import sys
 import pandas as pd
+import pyarrow.parquet as pq
 from sklearn import set_config
 set_config(transform_output='pandas')
 from src.components.config_entity import DataIngestionConfig
 from src.components.config_entity import DataTransformationConfig
+from src.components.config_entity import StoreFeatureConfig
+from src.components.config_entity import CategoricalModelConfig
+from src.components.data_cleaning import DataCleaner
+from src.components.store_features import FeatureStoreCreation
 from src.exception import CustomException
 from src.logger import logging
 from src.utils import WOE
 from src.utils import convert_to_categorical
-from src.utils import remove_blank_spaces
-from src.utils import recode_target_class
 from src.utils import save_object
+from src.utils import read_categorical_parquet
+from src.utils import build_vocabulary
+from src.utils import apply_vocabulary
+from src.utils import save_vocabulary
+from src.utils import CATEGORICAL_COLS
 from sklearn.preprocessing import FunctionTransformer
 from sklearn.preprocessing import StandardScaler
 from sklearn.preprocessing import OneHotEncoder
@@ -33,6 +41,7 @@ class DataTransformation():
         '''
         self.data_ingestion_config = DataIngestionConfig()
         self.data_transformation_config = DataTransformationConfig()
+        self.feature_store_config = StoreFeatureConfig()
     
     # Creating a method to create the preprocessing object.
     def create_data_transformation_object(self):
@@ -130,9 +139,9 @@ class DataTransformation():
         try:
             logging.info('Initiating the data transformation process.')
             
-            # Reading the train and test datasets
-            train_df = pd.read_parquet(self.data_ingestion_config.train_data_path)
-            test_df = pd.read_parquet(self.data_ingestion_config.test_data_path)
+            # Reading the train and test datasets with the text fields as categorical columns
+            train_df = read_categorical_parquet(self.data_ingestion_config.train_data_path)
+            test_df = read_categorical_parquet(self.data_ingestion_config.test_data_path)
                         
             # Instantiating the preprocessor object
             preprocessor_obj = self.create_data_transformation_object()
@@ -146,12 +155,28 @@ class DataTransformation():
                 test_df.drop(labels=['fnlwgt'], axis=1, inplace=True)
             
             # Removing any spaces in the features and recoding the target class in the 
-            # train dataset
-            train_df_clean = train_df.pipe(remove_blank_spaces).pipe(recode_target_class)
+            # train and test datasets
+            cleaner = DataCleaner(fill_question_marks=False)
+            train_df_clean = cleaner.clean(train_df)
+            test_df_clean = cleaner.clean(test_df)
             
-            # Removing any spaces in the features and recoding the target class in the 
-            # test dataset
-            test_df_clean = test_df.pipe(remove_blank_spaces).pipe(recode_target_class)
+            # Storing the raw values of the segment columns of the test dataset, before the
+            # vocabulary is applied, so that the model can be evaluated per segment
+            feature_store = FeatureStoreCreation()
+            feature_store.write_table(
+                feature_store.to_segments_table(test_df_clean),
+                self.feature_store_config.test_segments_path
+            )
+            
+            # Fixing the vocabulary of the categorical features using the train dataset and
+            # encoding both datasets with the fixed vocabulary
+            vocabulary = build_vocabulary(train_df_clean)
+            train_df_clean = apply_vocabulary(train_df_clean, vocabulary)
+            test_df_clean = apply_vocabulary(test_df_clean, vocabulary)
+            save_vocabulary(
+                file_path=self.data_transformation_config.vocabulary_path,
+                vocabulary=vocabulary
+            )
             
             # Creating train feature and target sets
             input_feature_train_df = train_df_clean.drop(labels=['target_class'], axis=1)
@@ -184,4 +209,246 @@ class DataTransformation():
             )
         
         except Exception as e:
-            raise CustomException(e, sys)
\ No newline at end of file
+            raise CustomException(e, sys)
+    
+    # Creating a method to read and clean a dataset in record batches
+    def read_clean_batches(self, file_path:str):
+        '''
+        This method reads a dataset from a parquet file in record batches and cleans each
+        batch. Only one batch is held in memory at a time.
+        ===============================================================================
+        ----------------
+        Parameters:
+        ----------------
+        file_path : str - The path to the parquet file.
+        
+        ----------------
+        Returns:
+        ----------------
+        batches : generator - This yields the cleaned batches as pandas dataframes.
+        ================================================================================
+        '''
+        schema = pq.read_schema(file_path)
+        text_cols = [name for name in schema.names if name in CATEGORICAL_COLS + ['target_class']]
+        parquet_file = pq.ParquetFile(file_path, read_dictionary=text_cols)
+        cleaner = DataCleaner(fill_question_marks=False)
+        for batch in parquet_file.iter_batches(batch_size=self.data_transformation_config.batch_size):
+            df = batch.to_pandas()
+            if 'fnlwgt' in list(df.columns):
+                df.drop(labels=['fnlwgt'], axis=1, inplace=True)
+            yield cleaner.clean(df)
+    
+    # Creating a method to fit the preprocessor object out of core
+    def fit_streaming_preprocessor(self):
+        '''
+        This method fits the preprocessor object by reading the train dataset in record
+        batches. The scaler moments, the one hot encoder categories, the weight of evidence
+        counts and the vocabulary are accumulated batch by batch, and the fitted
+        preprocessor is equivalent to fitting the whole train dataset in memory.
+        ===============================================================================
+        ----------------
+        Returns:
+        ----------------
+        preprocessor : ColumnTransformer - The fitted preprocessor object.
+        vocabulary : dict - The vocabulary of the categorical features.
+        ================================================================================
+        '''
+        try:
+            logging.info('Fitting the preprocessor object out of core.')
+            
+            preprocessor = self.create_data_transformation_object()
+            cols = {name: columns for name, _, columns in preprocessor.transformers}
+            
+            # Accumulating the statistics of each batch
+            scaler = StandardScaler()
+            woe = WOE()
+            vocabulary = {}
+            cap_values = {}
+            prototype = None
+            for batch in self.read_clean_batches(self.data_ingestion_config.train_data_path):
+                X = batch.drop(labels=['target_class'], axis=1)
+                y = batch[['target_class']]
+                if prototype is None:
+                    prototype = (X, y)
+                scaler.partial_fit(X[cols['num_pipeline']])
+                woe.partial_fit(X[cols['woe_pipeline']], y)
+                for col, values in build_vocabulary(X).items():
+                    vocabulary.setdefault(col, set()).update(values)
+                cap_df = convert_to_categorical(X[cols['ohe_cap_pipeline']].copy())
+                for col in cap_df.columns:
+                    cap_values.setdefault(col, set()).update(cap_df[col].dropna().astype(object))
+            vocabulary = {col: sorted(values) for col, values in vocabulary.items()}
+            
+            # Fitting the structure of the preprocessor on the first batch and replacing the
+            # fitted steps with the ones fit on the accumulated statistics. The weight of
+            # evidence step is skipped in the prototype, as the first batch may hold a
+            # single class of the target
+            preprocessor.set_params(woe_pipeline__woe='passthrough')
+            preprocessor.fit(*prototype)
+            fitted = preprocessor.named_transformers_
+            fitted['num_pipeline'].steps[-1] = ('std', scaler)
+            fitted['ohe_sex_pipeline'].steps[-1] = (
+                'ohe_sex',
+                OneHotEncoder(sparse_output=False).fit(self.create_category_frame({'sex': vocabulary['sex']}))
+            )
+            fitted['ohe_cap_pipeline'].steps[-1] = (
+                'cap_ohe',
+                OneHotEncoder(sparse_output=False).fit(self.create_category_frame(cap_values))
+            )
+            fitted['woe_pipeline'].steps[-1] = ('woe', woe)
+            
+            logging.info('The preprocessor object has been fit out of core.')
+            
+            return preprocessor, vocabulary
+        
+        except Exception as e:
+            raise CustomException(e, sys)
+    
+    # Creating a method to build a dataframe holding every category of each column
+    @staticmethod
+    def create_category_frame(categories):
+        '''
+        This method creates a dataframe in which each column holds every category of that
+        column. The shorter columns are padded by repeating their first category. It is
+        used to fit the one hot encoders on the accumulated categories.
+        ===============================================================================
+        ----------------
+        Parameters:
+        ----------------
+        categories : dict - The categories per column.
+        
+        ----------------
+        Returns:
+        ----------------
+        df : pandas dataframe - The dataframe holding every category.
+        ================================================================================
+        '''
+        n_rows = max(len(values) for values in categories.values())
+        frame = {}
+        for col, values in categories.items():
+            values = sorted(values)
+            frame[col] = values + [values[0]] * (n_rows - len(values))
+        return pd.DataFrame(frame)
+    
+    # Creating a method to initiate the out of core data transformation
+    def initiate_streaming_transformation(self):
+        '''
+        This method fits the preprocessor object out of core and then transforms the train
+        and test datasets in a second streaming pass. The transformed batches are written
+        directly into the feature store.
+        ===============================================================================
+        ----------------
+        Returns:
+        ----------------
+        transformed train data path : str - The path to the transformed train dataset.
+        transformed test data path : str - The path to the transformed test dataset.
+        ================================================================================
+        '''
+        try:
+            logging.info('Initiating the out of core data transformation process.')
+            
+            preprocessor_obj, vocabulary = self.fit_streaming_preprocessor()
+            
+            # Transforming the train and test datasets one batch at a time
+            outputs = [
+                (self.data_ingestion_config.train_data_path, self.feature_store_config.xform_train_path),
+                (self.data_ingestion_config.test_data_path, self.feature_store_config.xform_test_path)
+            ]
+            feature_store = FeatureStoreCreation()
+            feature_store.clear_parts()
+            for source_path, xform_path in outputs:
+                writer = None
+                segments_writer = None
+                try:
+                    for batch in self.read_clean_batches(source_path):
+                        # Storing the raw values of the segment columns of the test dataset
+                        if xform_path == self.feature_store_config.xform_test_path:
+                            segments_table = feature_store.to_segments_table(batch)
+                            if segments_writer is None:
+                                segments_writer = feature_store.open_writer(
+                                    self.feature_store_config.test_segments_path,
+                                    segments_table.schema
+                                )
+                            segments_writer.write_table(segments_table)
+                        batch = apply_vocabulary(batch, vocabulary).reset_index(drop=True)
+                        xform_batch = preprocessor_obj.transform(batch.drop(labels=['target_class'], axis=1))
+                        xform_batch = pd.concat([xform_batch, batch[['target_class']]], axis=1)
+                        table = feature_store.to_store_table(xform_batch)
+                        if writer is None:
+                            writer = feature_store.open_writer(xform_path, table.schema)
+                        writer.write_table(table)
+                finally:
+                    for open_writer in (writer, segments_writer):
+                        if open_writer is not None:
+                            open_writer.close()
+            
+            # Saving the preprocessor object and the vocabulary
+            save_object(
+                file_path=self.data_transformation_config.preprocessor_obj_path,
+                object=preprocessor_obj
+            )
+            save_vocabulary(
+                file_path=self.data_transformation_config.vocabulary_path,
+                vocabulary=vocabulary
+            )
+            
+            logging.info('Out of core data transformation process has been completed.')
+            
+            return (
+                feature_store.resolve_path(self.feature_store_config.xform_train_path),
+                feature_store.resolve_path(self.feature_store_config.xform_test_path)
+            )
+        
+        except Exception as e:
+            raise CustomException(e, sys)
+    
+    # Creating a method to initiate the transformation for the native categorical mode
+    def initiate_categorical_transformation(self):
+        '''
+        This method cleans the train and test datasets and encodes the categorical
+        features as dictionary encoded columns using the vocabulary fixed on the train
+        dataset. No preprocessor object is fit. The numerical features are kept as they
+        are, and the datasets are written into the feature store for training with
+        native categorical support.
+        ===============================================================================
+        ----------------
+        Returns:
+        ----------------
+        train_df : pandas dataframe - The encoded train dataset.
+        test_df : pandas dataframe - The encoded test dataset.
+        ================================================================================
+        '''
+        try:
+            logging.info('Initiating the categorical data transformation process.')
+            
+            categorical_config = CategoricalModelConfig()
+            cleaner = DataCleaner(fill_question_marks=False)
+            datasets = []
+            for path in [self.data_ingestion_config.train_data_path, self.data_ingestion_config.test_data_path]:
+                df = read_categorical_parquet(path)
+                if 'fnlwgt' in list(df.columns):
+                    df.drop(labels=['fnlwgt'], axis=1, inplace=True)
+                datasets.append(cleaner.clean(df))
+            
+            # Fixing the vocabulary on the train dataset and encoding both datasets
+            vocabulary = build_vocabulary(datasets[0])
+            train_df, test_df = [apply_vocabulary(df, vocabulary) for df in datasets]
+            save_vocabulary(
+                file_path=self.data_transformation_config.vocabulary_path,
+                vocabulary=vocabulary
+            )
+            
+            # Storing the encoded datasets into the feature store
+            feature_store = FeatureStoreCreation()
+            feature_store.write_table(feature_store.to_store_table(train_df), categorical_config.cat_train_path)
+            feature_store.write_table(feature_store.to_store_table(test_df), categorical_config.cat_test_path)
+            
+            logging.info('Categorical data transformation process has been completed.')
+            
+            return (
+                train_df,
+                test_df
+            )
+        
+        except Exception as e:
+            raise CustomException(e, sys)
@@ -0,0 +1,442 @@
+# Importing packages
+import os
+import sys
+import json
+import bisect
+import datetime
+import threading
+import numpy as np
+import pandas as pd
+from src.components.config_entity import DataIngestionConfig
+from src.components.config_entity import DataTransformationConfig
+from src.components.config_entity import DriftConfig
+from src.components.data_cleaning import DataCleaner
+from src.components.model_bundle import CompactPreprocessor
+from src.exception import CustomException
+from src.logger import logging
+from src.utils import load_object
+from src.utils import read_json_file
+from src.utils import read_categorical_parquet
+from src.utils import apply_vocabulary
+
+# Batches up to this size are counted with plain python, which is faster than numpy for
+# the single rows of the prediction requests
+SMALL_BATCH_SIZE = 16
+
+
+# Creating a function to compute the population stability index
+def population_stability_index(expected, actual, epsilon:float=1e-4):
+    '''
+    This function returns the population stability index between two count arrays over
+    the same bins. Empty bins are smoothed with a small share, so that the index is
+    always finite.
+    ========================================================================================
+    ---------------------
+    Parameters:
+    ---------------------
+    expected : numpy array - These are the baseline counts of the bins.
+    actual : numpy array - These are the current counts of the bins.
+    epsilon : float - This is the smallest share given to a bin.
+
+    ---------------------
+    Returns:
+    ---------------------
+    psi : float - This is the population stability index, or None if either array is empty.
+    =========================================================================================
+    '''
+    expected = np.asarray(expected, dtype=np.float64)
+    actual = np.asarray(actual, dtype=np.float64)
+    if expected.sum() == 0 or actual.sum() == 0:
+        return None
+    expected_share = np.maximum(expected / expected.sum(), epsilon)
+    actual_share = np.maximum(actual / actual.sum(), epsilon)
+    return float(np.sum((actual_share - expected_share) * np.log(actual_share / expected_share)))
+
+
+# Creating a class to count the categories of a column
+class CategorySketch():
+    '''
+    This class counts the values of a categorical column over a fixed list of categories,
+    with one extra count for unknown categories and one for missing values. Its memory
+    does not grow with the number of values seen.
+    '''
+    # Creating the constructor for the class
+    def __init__(self, categories, counts=None):
+        '''
+        This is the constructor for the category sketch class.
+        '''
+        self.categories = list(categories)
+        self.lookup = {category: i for i, category in enumerate(self.categories)}
+        self.counts = np.zeros(len(self.categories) + 2, dtype=np.int64) if counts is None else np.asarray(counts, dtype=np.int64)
+
+    # Creating a method to find the code of a value
+    def code(self, value):
+        '''
+        This method returns the position of a value in the counts. Strings are stripped,
+        as the cleaner does.
+        '''
+        if value is None or value != value:
+            return len(self.categories) + 1
+        return self.lookup.get(value.strip() if isinstance(value, str) else value, len(self.categories))
+
+    # Creating a method to add values to the sketch
+    def update(self, values):
+        '''
+        This method counts the values of a pandas series or a list. The categories of a
+        categorical series with more rows than categories are looked up once, and its rows
+        are counted by their codes. The rows of a short series are looked up directly.
+        '''
+        if isinstance(values, pd.Series) and isinstance(values.dtype, pd.CategoricalDtype):
+            categories = values.array.categories.to_numpy()
+            value_codes = values.array.codes
+            if len(value_codes) < len(categories):
+                codes = [self.code(categories[i] if i >= 0 else None) for i in value_codes]
+            else:
+                mapping = np.array([self.code(category) for category in categories] + [len(self.categories) + 1])
+                codes = mapping[value_codes]
+        else:
+            codes = [self.code(value) for value in values]
+        if len(codes) <= SMALL_BATCH_SIZE:
+            for code in codes:
+                self.counts[code] += 1
+        else:
+            self.counts += np.bincount(codes, minlength=len(self.counts))
+
+    # Creating a method to describe the sketch
+    def to_dict(self):
+        '''
+        This method returns the json serialisable contents of the sketch.
+        '''
+        return {'type': 'category', 'categories': self.categories, 'counts': self.counts.tolist()}
+
+    # Creating a method to summarize the sketch
+    def summary(self):
+        '''
+        This method returns the number of values and the share of unknown and missing values.
+        '''
+        total = int(self.counts.sum())
+        return {
+            'count': total,
+            'unknown_share': float(self.counts[-2] / total) if total else None,
+            'missing_share': float(self.counts[-1] / total) if total else None
+        }
+
+
+# Creating a class to sketch the distribution of a numerical column
+class QuantileSketch():
+    '''
+    This class sketches the distribution of a numerical column with a histogram over
+    fixed bin edges, taken from the quantiles of the training data, together with the
+    smallest and largest value seen and the number of missing values. Quantiles are
+    interpolated within the bins. Its memory does not grow with the number of values
+    seen.
+    '''
+    # Creating the constructor for the class
+    def __init__(self, edges, counts=None, missing:int=0, minimum:float=None, maximum:float=None):
+        '''
+        This is the constructor for the quantile sketch class. The edges are the inner
+        edges of the bins, so there is one more bin than there are edges.
+        '''
+        self.edges = np.asarray(edges, dtype=np.float64)
+        self.edge_list = self.edges.tolist()
+        self.counts = np.zeros(len(self.edges) + 1, dtype=np.int64) if counts is None else np.asarray(counts, dtype=np.int64)
+        self.missing = int(missing)
+        self.minimum = minimum
+        self.maximum = maximum
+
+    # Creating a method to build a sketch from training values
+    @classmethod
+    def from_values(cls, values, n_bins:int):
+        '''
+        This method creates the sketch of the training values, with bin edges at their
+        quantiles.
+        '''
+        values = np.asarray(values, dtype=np.float64)
+        present = values[~np.isnan(values)]
+        edges = np.unique(np.quantile(present, np.linspace(0, 1, n_bins + 1)[1:-1])) if len(present) else []
+        sketch = cls(edges)
+        sketch.update(values)
+        return sketch
+
+    # Creating a method to add values to the sketch
+    def update(self, values):
+        '''
+        This method counts an array of values into the bins.
+        '''
+        values = np.asarray(values, dtype=np.float64).ravel()
+        if len(values) <= SMALL_BATCH_SIZE:
+            for value in values.tolist():
+                self.add(value)
+            return
+        missing = np.isnan(values)
+        present = values[~missing]
+        self.missing += int(missing.sum())
+        if len(present) == 0:
+            return
+        self.counts += np.bincount(np.searchsorted(self.edges, present, side='right'), minlength=len(self.counts))
+        low, high = float(present.min()), float(present.max())
+        self.minimum = low if self.minimum is None else min(self.minimum, low)
+        self.maximum = high if self.maximum is None else max(self.maximum, high)
+
+    # Creating a method to add a single value to the sketch
+    def add(self, value:float):
+        '''
+        This method counts a single value into its bin.
+        '''
+        if value != value:
+            self.missing += 1
+            return
+        self.counts[bisect.bisect_right(self.edge_list, value)] += 1
+        self.minimum = value if self.minimum is None or value < self.minimum else self.minimum
+        self.maximum = value if self.maximum is None or value > self.maximum else self.maximum
+
+    # Creating a method to estimate a quantile
+    def quantile(self, q:float):
+        '''
+        This method estimates a quantile by interpolating within the bin which holds it.
+        '''
+        total = self.counts.sum()
+        if total == 0:
+            return None
+        bounds = np.concatenate([[self.minimum], self.edges, [self.maximum]])
+        cumulative = np.cumsum(self.counts)
+        target = q * total
+        i = int(np.searchsorted(cumulative, target, side='left'))
+        i = min(i, len(self.counts) - 1)
+        before = cumulative[i - 1] if i > 0 else 0
+        share = (target - before) / self.counts[i] if self.counts[i] else 0.0
+        low, high = bounds[i], bounds[i + 1]
+        return float(low + share * (high - low))
+
+    # Creating a method to describe the sketch
+    def to_dict(self):
+        '''
+        This method returns the json serialisable contents of the sketch.
+        '''
+        return {
+            'type': 'quantile',
+            'edges': self.edges.tolist(),
+            'counts': self.counts.tolist(),
+            'missing': self.missing,
+            'minimum': self.minimum,
+            'maximum': self.maximum
+        }
+
+    # Creating a method to summarize the sketch
+    def summary(self):
+        '''
+        This method returns the number of values, the share of missing values and the
+        estimated quartiles.
+        '''
+        total = int(self.counts.sum())
+        return {
+            'count': total,
+            'missing_share': float(self.missing / (total + self.missing)) if total + self.missing else None,
+            'minimum': self.minimum,
+            'maximum': self.maximum,
+            'quantiles': {str(q): self.quantile(q) for q in (0.05, 0.25, 0.5, 0.75, 0.95)}
+        }
+
+
+# Creating a function to rebuild a sketch from its contents
+def sketch_from_dict(contents:dict, empty:bool=False):
+    '''
+    This function rebuilds a sketch from the contents returned by its to_dict method. If
+    empty is True, a sketch over the same bins but without counts is returned.
+    '''
+    if contents['type'] == 'category':
+        return CategorySketch(contents['categories'], None if empty else contents['counts'])
+    if empty:
+        return QuantileSketch(contents['edges'])
+    return QuantileSketch(contents['edges'], contents['counts'], contents['missing'], contents['minimum'], contents['maximum'])
+
+
+# Creating a class to build the training baselines of the drift monitor
+class DriftBaseline():
+    '''
+    This class builds the training baselines of the drift monitor - the category counts
+    of the categorical features over the weight of evidence vocabularies, the quantile
+    sketches of the numerical features and the histogram of the predicted scores.
+    '''
+    # Creating the constructor for the class
+    def __init__(self):
+        '''
+        This is the constructor for the drift baseline class.
+        '''
+        self.drift_config = DriftConfig()
+        self.data_transformation_config = DataTransformationConfig()
+
+    # Creating a method to build the baseline of the features
+    def initiate_drift_baseline(self, train_path:str=None):
+        '''
+        This method sketches the cleaned training data and saves the feature baseline.
+        ================================================================================
+        -------------------
+        Parameters:
+        -------------------
+        train_path : str - This is the path to the raw training data. If not given, the
+        ingested training data is used.
+
+        -------------------
+        Returns:
+        -------------------
+        baseline : dict - This is the feature baseline.
+        ================================================================================
+        '''
+        try:
+            df = read_categorical_parquet(train_path or DataIngestionConfig().train_data_path)
+            df = DataCleaner(fill_question_marks=False).clean(df.drop(columns=['fnlwgt'], errors='ignore'))
+            if os.path.exists(self.data_transformation_config.vocabulary_path):
+                df = apply_vocabulary(df, read_json_file(self.data_transformation_config.vocabulary_path))
+
+            preprocessor = CompactPreprocessor.from_column_transformer(
+                load_object(file_path=self.data_transformation_config.preprocessor_obj_path)
+            )
+            vocabularies = {preprocessor.params['sex']['col']: preprocessor.params['sex']['categories']}
+            vocabularies.update(preprocessor.params['woe']['categories'])
+
+            features = {}
+            for col, categories in vocabularies.items():
+                sketch = CategorySketch(categories)
+                sketch.update(df[col])
+                features[col] = sketch.to_dict()
+            for col in self.drift_config.numeric_cols:
+                features[col] = QuantileSketch.from_values(df[col].to_numpy(dtype=np.float64), self.drift_config.n_quantile_bins).to_dict()
+
+            baseline = {'created': datetime.datetime.now().isoformat(), 'rows': len(df), 'features': features}
+            self.save_json(self.drift_config.baseline_path, baseline)
+            logging.info(f'The drift baseline of {len(features)} features has been saved to {self.drift_config.baseline_path}.')
+            return baseline
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    # Creating a method to build the baseline of the predicted scores
+    def initiate_score_baseline(self, scores):
+        '''
+        This method sketches the predicted scores of the trained model on the test set
+        and saves the score baseline.
+        '''
+        try:
+            edges = np.linspace(0, 1, self.drift_config.n_score_bins + 1)[1:-1]
+            sketch = QuantileSketch(edges)
+            sketch.update(np.asarray(scores, dtype=np.float64).ravel())
+            baseline = {'created': datetime.datetime.now().isoformat(), 'score': sketch.to_dict()}
+            self.save_json(self.drift_config.score_baseline_path, baseline)
+            return baseline
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    # Creating a method to save a baseline
+    @staticmethod
+    def save_json(file_path:str, contents:dict):
+        '''
+        This method writes a baseline into a json file.
+        '''
+        os.makedirs(os.path.dirname(file_path) or '.', exist_ok=True)
+        with open(file_path, 'w') as file_obj:
+            json.dump(contents, file_obj)
+
+
+# Creating a class to monitor the drift of the serving inputs and scores
+class DriftMonitor():
+    '''
+    This class keeps fixed size sketches of the features and the predicted scores of the
+    prediction requests, and compares them with the training baselines using the
+    population stability index. The sketches are updated under a lock, so the monitor
+    can be shared by the threads of a server. Each process keeps its own sketches.
+    '''
+    # Creating the constructor for the class
+    def __init__(self, baseline_path:str=None, score_baseline_path:str=None):
+        '''
+        This is the constructor for the drift monitor class. It loads the baselines and
+        creates empty sketches over the same bins.
+        '''
+        self.drift_config = DriftConfig()
+        self.baseline = read_json_file(baseline_path or self.drift_config.baseline_path)
+        score_baseline_path = score_baseline_path or self.drift_config.score_baseline_path
+        self.score_baseline = read_json_file(score_baseline_path) if os.path.exists(score_baseline_path) else None
+        self.lock = threading.Lock()
+        self.reset()
+
+    # Creating a method to clear the sketches
+    def reset(self):
+        '''
+        This method clears the serving sketches.
+        '''
+        with self.lock:
+            self.started = datetime.datetime.now().isoformat()
+            self.sketches = {
+                col: sketch_from_dict(contents, empty=True)
+                for col, contents in self.baseline['features'].items()
+            }
+            edges = self.score_baseline['score']['edges'] if self.score_baseline else np.linspace(0, 1, self.drift_config.n_score_bins + 1)[1:-1]
+            self.score_sketch = QuantileSketch(edges)
+
+    # Creating a method to add a prediction request to the sketches
+    def update(self, df, scores=None):
+        '''
+        This method adds the raw features and the predicted scores of a request to the
+        sketches.
+        ================================================================================
+        -------------------
+        Parameters:
+        -------------------
+        df : pandas dataframe - This is the raw feature set, before the vocabulary is
+        applied, as created by the create_raw_dataframe method of CustomData, so that
+        categories outside the vocabulary are counted as unknown rather than missing.
+        scores : numpy array - These are the predicted probabilities.
+        ================================================================================
+        '''
+        columns = {col: df[col] for col in self.sketches if col in df}
+        with self.lock:
+            for col, values in columns.items():
+                self.sketches[col].update(values)
+            if scores is not None:
+                self.score_sketch.update(np.asarray(scores, dtype=np.float64).ravel())
+
+    # Creating a method to compare a sketch with its baseline
+    def compare(self, baseline, sketch):
+        '''
+        This method returns the population stability index of a sketch against its
+        baseline, the drift status and the summaries of both.
+        '''
+        psi = population_stability_index(baseline.counts, sketch.counts)
+        if psi is None or sketch.counts.sum() < self.drift_config.min_count:
+            status = 'insufficient_data'
+        elif psi >= self.drift_config.psi_drift:
+            status = 'drift'
+        elif psi >= self.drift_config.psi_warning:
+            status = 'warning'
+        else:
+            status = 'stable'
+        return {'psi': psi, 'status': status, 'serving': sketch.summary(), 'baseline': baseline.summary()}
+
+    # Creating a method to report the drift
+    def report(self):
+        '''
+        This method compares every serving sketch with its baseline.
+        ================================================================================
+        -------------------
+        Returns:
+        -------------------
+        report : dict - This is the population stability index, the status and the
+        summaries of each feature and of the predicted scores.
+        ================================================================================
+        '''
+        with self.lock:
+            features = {
+                col: self.compare(sketch_from_dict(contents), self.sketches[col])
+                for col, contents in self.baseline['features'].items()
+            }
+            score = None
+            if self.score_baseline is not None:
+                score = self.compare(sketch_from_dict(self.score_baseline['score']), self.score_sketch)
+            return {
+                'since': self.started,
+                'pid': os.getpid(),
+                'baseline_created': self.baseline['created'],
+                'features': features,
+                'score': score
+            }
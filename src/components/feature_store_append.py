@@ -0,0 +1,290 @@
+# Importing packages
+import os
+import sys
+import datetime
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sklearn import set_config
+set_config(transform_output='pandas')
+from src.components.config_entity import DataIngestionConfig
+from src.components.config_entity import DataTransformationConfig
+from src.components.data_cleaning import DataCleaner
+from src.components.data_ingestion import DataIngestion
+from src.components.store_features import FeatureStoreCreation
+from src.exception import CustomException
+from src.logger import logging
+from src.utils import load_object
+from src.utils import read_json_file
+from src.utils import apply_vocabulary
+
+
+# Creating a function to look up keys in a sorted array
+def sorted_contains(sorted_keys, keys):
+    '''
+    This function returns a boolean mask of the keys found in a sorted array of keys,
+    using a binary search rather than reading the whole array.
+    '''
+    if len(sorted_keys) == 0:
+        return np.zeros(len(keys), dtype=bool)
+    position = np.minimum(np.searchsorted(sorted_keys, keys), len(sorted_keys) - 1)
+    return sorted_keys[position] == keys
+
+
+# Creating a class to index the keys of the rows in the feature store
+class RowKeyIndex():
+    '''
+    This class indexes the keys of the rows in the feature store as a few sorted runs of
+    keys, each stored as a numpy file which is memory mapped and binary searched, so a
+    lookup does not read the whole key history. Every append adds a run of its new keys,
+    and runs of similar sizes are merged, so there are at most logarithmically many runs
+    and each key is rewritten only a logarithmic number of times.
+    '''
+    # Creating the constructor for the class
+    def __init__(self, row_keys_path:str):
+        '''
+        This is the constructor for the row key index class. It opens the runs of keys,
+        and converts the key partitions written by earlier versions into a run.
+        '''
+        self.row_keys_path = row_keys_path
+        legacy = self.list_files('.parquet')
+        if legacy:
+            keys = np.concatenate([pq.read_table(file_path).column('row_key').to_numpy() for file_path in legacy])
+            self.write_run(np.unique(keys), 'part-legacy')
+            for file_path in legacy:
+                os.remove(file_path)
+        self.open_runs()
+
+    # Creating a method to list the published files of a type
+    def list_files(self, suffix:str):
+        '''
+        This method lists the published files of the index with the given suffix.
+        '''
+        if not os.path.isdir(self.row_keys_path):
+            return []
+        return [
+            os.path.join(self.row_keys_path, file_name)
+            for file_name in sorted(os.listdir(self.row_keys_path))
+            if file_name.endswith(suffix) and not file_name.startswith(('.', '_'))
+        ]
+
+    # Creating a method to memory map the runs
+    def open_runs(self):
+        '''
+        This method memory maps the runs of keys, ordered from the largest to the smallest.
+        '''
+        runs = [(file_path, np.load(file_path, mmap_mode='r')) for file_path in self.list_files('.npy')]
+        self.runs = sorted(runs, key=lambda run: -len(run[1]))
+
+    # Creating a method to write a run of keys
+    def write_run(self, keys, part_name:str):
+        '''
+        This method writes a sorted run of keys under a hidden name and publishes it.
+        '''
+        os.makedirs(self.row_keys_path, exist_ok=True)
+        staging_path = os.path.join(self.row_keys_path, f'.{part_name}.npy')
+        np.save(staging_path, np.ascontiguousarray(keys, dtype=np.uint64))
+        file_path = os.path.join(self.row_keys_path, f'{part_name}.npy')
+        os.replace(staging_path, file_path)
+        return file_path
+
+    # Creating a method to look up keys
+    def contains(self, keys):
+        '''
+        This method returns a boolean mask of the keys which are in the index.
+        '''
+        found = np.zeros(len(keys), dtype=bool)
+        for _, run in self.runs:
+            found |= sorted_contains(run, keys)
+        return found
+
+    # Creating a method to add the keys of an append
+    def add_run(self, keys, part_name:str):
+        '''
+        This method adds the keys of an append as a new run, and merges two runs of
+        neighbouring sizes while the smaller is at least half the size of the larger, so
+        that every run is more than twice the size of the next. A merged run replaces the
+        larger run before the smaller one is removed, so an interrupted merge leaves keys
+        duplicated but never lost.
+        '''
+        self.write_run(np.unique(keys), part_name)
+        self.open_runs()
+        while True:
+            pairs = [
+                i for i in range(len(self.runs) - 1)
+                if 2 * len(self.runs[i + 1][1]) >= len(self.runs[i][1])
+            ]
+            if not pairs:
+                break
+            (large_path, large), (small_path, small) = self.runs[pairs[-1]], self.runs[pairs[-1] + 1]
+            part_name = os.path.splitext(os.path.basename(large_path))[0]
+            self.write_run(np.union1d(large, small), part_name)
+            os.remove(small_path)
+            self.open_runs()
+
+    # Creating a method to count the keys
+    def __len__(self):
+        '''
+        This method returns the number of keys in the index.
+        '''
+        return sum(len(run) for _, run in self.runs)
+
+
+# Creating a class to append new rows to the feature store
+class FeatureStoreAppend():
+    '''
+    This class appends new raw data to the feature store without refitting the
+    preprocessor object. Each raw row is identified by a hash of its contents, and only
+    the rows which are not already in the feature store are transformed. The new rows
+    are assigned to the train or test set by the same hash split used at ingestion and
+    are written as new partitions of the transformed datasets, together with the raw
+    segment columns of the new test rows.
+    '''
+    # Creating the constructor for the class
+    def __init__(self):
+        '''
+        This is the constructor for the feature store append class. It instantiates the
+        ingestion, transformation and feature store settings.
+        '''
+        self.data_ingestion = DataIngestion()
+        self.data_ingestion_config = DataIngestionConfig()
+        self.data_transformation_config = DataTransformationConfig()
+        self.feature_store = FeatureStoreCreation()
+
+    # Creating a method to open the index of the rows already in the feature store
+    def load_row_keys(self):
+        '''
+        This method opens the index of the keys of the rows already in the feature store.
+        When the feature store has no row keys yet, they are computed from the ingested
+        train and test datasets from which the feature store was built.
+        ===================================================================================
+        ----------------
+        Returns:
+        ----------------
+        row_keys : RowKeyIndex - This is the index of the row keys.
+        ===================================================================================
+        '''
+        row_keys_path = self.feature_store.feature_store_config.row_keys_path
+        if os.path.isdir(row_keys_path):
+            return RowKeyIndex(row_keys_path)
+
+        logging.info('Computing the row keys of the ingested datasets.')
+        keys = [
+            self.data_ingestion.row_keys(batch)
+            for path in [self.data_ingestion_config.train_data_path, self.data_ingestion_config.test_data_path]
+            for batch in self.data_ingestion.read_source_batches(path)
+        ]
+        index = RowKeyIndex(row_keys_path)
+        index.add_run(np.concatenate(keys) if keys else np.empty(0, dtype=np.uint64), 'part-base')
+        return index
+
+    # Creating a method to append new raw data to the feature store
+    def initiate_append(self, source_path:str, header:bool=False):
+        '''
+        This method transforms the rows of a raw CSV or parquet file which are not already
+        in the feature store, using the saved preprocessor object and vocabulary, and
+        writes them as a new partition of the train and test datasets. The source is read
+        in record batches, and the work done is proportional to the size of the source.
+        ===================================================================================
+        ----------------
+        Parameters:
+        ----------------
+        source_path : str - This is the path to the raw CSV or parquet file.
+        header : bool - This determines if the CSV file has a header row.
+
+        ----------------
+        Returns:
+        ----------------
+        counts : dict - This is the number of rows appended to the train and test sets
+        and the number of rows skipped because they were already in the feature store.
+        ===================================================================================
+        '''
+        try:
+            logging.info(f'Appending the new rows of {source_path} to the feature store.')
+
+            # Loading the preprocessor object, the vocabulary and the index of the known row
+            # keys once
+            preprocessor = load_object(file_path=self.data_transformation_config.preprocessor_obj_path)
+            vocabulary = read_json_file(self.data_transformation_config.vocabulary_path)
+            known_keys = self.load_row_keys()
+            cleaner = DataCleaner(fill_question_marks=False)
+
+            # The partitions are written under a hidden name and renamed once complete
+            part_name = 'part-' + datetime.datetime.now().strftime('%Y%m%dT%H%M%S%f')
+            config = self.feature_store.feature_store_config
+            outputs = {}
+            datasets = [('train', config.xform_train_path), ('test', config.xform_test_path)]
+            if os.path.exists(self.feature_store.resolve_path(config.test_segments_path)):
+                datasets.append(('segments', config.test_segments_path))
+            for name, path in datasets:
+                parts_dir = self.feature_store.parts_dir(path)
+                staging_path = self.feature_store.resolve_path(os.path.join(parts_dir, f'.{part_name}.parquet'))
+                schema = self.feature_store.read_schema(path).remove_metadata()
+                outputs[name] = {'staging_path': staging_path, 'schema': schema, 'writer': None, 'rows': 0}
+
+            new_keys = []
+            skipped = 0
+            try:
+                for batch in self.data_ingestion.read_source_batches(source_path, header=header):
+                    # Keeping the first occurrence of each row which is neither in the store
+                    # nor in an earlier batch of this run
+                    keys = self.data_ingestion.row_keys(batch)
+                    _, first = np.unique(keys, return_index=True)
+                    is_new = np.zeros(len(keys), dtype=bool)
+                    is_new[first] = True
+                    is_new &= ~known_keys.contains(keys)
+                    for run_keys in new_keys:
+                        is_new &= ~sorted_contains(run_keys, keys)
+                    skipped += int((~is_new).sum())
+                    if not is_new.any():
+                        continue
+
+                    batch = batch.filter(pa.array(is_new))
+                    keys = keys[is_new]
+                    new_keys.append(np.sort(keys))
+
+                    # Transforming the new rows with the saved preprocessor object
+                    is_test = self.data_ingestion.hash_split(batch)
+                    df = batch.to_pandas().drop(labels=['fnlwgt'], axis=1)
+                    df = cleaner.clean(df)
+                    segments_df = df[list(config.segment_cols)].copy()
+                    df = apply_vocabulary(df, vocabulary)
+                    xform_df = preprocessor.transform(df.drop(labels=['target_class'], axis=1))
+                    xform_df = pd.concat([xform_df, df[['target_class']]], axis=1)
+
+                    for name, mask in [('train', ~is_test), ('test', is_test), ('segments', is_test)]:
+                        if name not in outputs or not mask.any():
+                            continue
+                        output = outputs[name]
+                        # The partitions use the schema of the dataset they are appended to
+                        if name == 'segments':
+                            table = self.feature_store.to_segments_table(segments_df[mask])
+                        else:
+                            table = self.feature_store.to_store_table(xform_df[mask])
+                        table = table.select(output['schema'].names).cast(output['schema'])
+                        if output['writer'] is None:
+                            output['writer'] = self.feature_store.open_writer(output['staging_path'], output['schema'])
+                        output['writer'].write_table(table)
+                        output['rows'] += int(mask.sum())
+            finally:
+                for output in outputs.values():
+                    if output['writer'] is not None:
+                        output['writer'].close()
+
+            # Publishing the partitions and then the keys of the appended rows
+            for output in outputs.values():
+                if output['writer'] is not None:
+                    staging_path = output['staging_path']
+                    directory, file_name = os.path.split(staging_path)
+                    os.replace(staging_path, os.path.join(directory, file_name[1:]))
+            if new_keys:
+                known_keys.add_run(np.concatenate(new_keys), part_name)
+
+            counts = {'train': outputs['train']['rows'], 'test': outputs['test']['rows'], 'skipped': skipped}
+            logging.info(f'Appended the new rows to the feature store: {counts}.')
+
+            return counts
+
+        except Exception as e:
+            raise CustomException(e, sys)
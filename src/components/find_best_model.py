@@ -1,16 +1,23 @@
 # Importing packages
 import sys
+import time
 import numpy as np
 import pandas as pd
 from src.exception import CustomException
 from src.logger import logging
 from src.utils import best_model_callback
+from src.components.config_entity import TuningConfig
+from src.components.config_entity import FoldCacheConfig
+from src.components.fold_cache import FoldCache
+from src.components.model_bundle import booster_name
+from src.components.model_bundle import predict_matrix
+from src.components.tuning_telemetry import ResourceTimer
+from src.components.tuning_telemetry import RoundCounter
 import xgboost as xgb
 import optuna
 from sklearn import set_config
 set_config(transform_output='pandas')
 from sklearn.model_selection import train_test_split
-from sklearn.model_selection import StratifiedKFold
 from sklearn.metrics import roc_auc_score
 
 # Creating a class to find the best xgboost model
@@ -29,21 +36,105 @@ class FindBestModel():
         model_callback=None,
         key='best_booster',
         n_trials=100,
-        seed=42
+        seed=42,
+        fold_cache=None,
+        n_splits=None,
+        telemetry=None,
+        latency_slo_ms=None
     ):
         '''
         This is the constructor for the class. It sets the train set, target set, 
         model callback (if any), key and number of trials. It also defines the 
-        seed.
+        seed. If a fold cache is given, the cross validation folds are read from
+        and written to the cache. The number of folds is taken from the fold cache
+        config if not given. If a telemetry object is given, the time and
+        resources used by each trial and fold are recorded. If a latency service
+        level objective is given, the roc auc score and the prediction latency are
+        optimized jointly.
         '''
         self.train_set = train_set
         self.target_set = target_set
         self.key = key
         self.n_trials = n_trials
         self.seed = seed
+        self.fold_cache = fold_cache
+        self.n_splits = n_splits or FoldCacheConfig().n_splits
+        self.folds = None
+        self.fold_build_s = None
+        self.telemetry = telemetry
+        self.latency_slo_ms = latency_slo_ms
+        self.tuning_config = TuningConfig()
+        self.pareto_front = None
         if model_callback is not None:
             self.model_callback = model_callback
     
+    # Creating a method to fetch the cross validation folds
+    def get_folds(self):
+        '''
+        This method returns the stratified cross validation folds and their DMatrix
+        objects. The folds are built once per study, or read from the fold cache.
+        ================================================================================
+        -------------------
+        Returns:
+        -------------------
+        folds : list - This is a list of (train indices, validation indices, dtrain,
+        dval) tuples.
+        ================================================================================
+        '''
+        if self.folds is None:
+            timer = ResourceTimer(reset_peak=False)
+            if self.fold_cache is not None:
+                self.folds = self.fold_cache.get_folds(self.train_set, self.target_set, self.n_splits, self.seed)
+            else:
+                self.folds = FoldCache.build_folds(self.train_set, self.target_set, self.n_splits, self.seed)
+            self.fold_build_s = timer.read()['wall_s']
+        return self.folds
+    
+    # Creating a method to measure the prediction latency of a booster
+    def measure_latency(self, booster, X):
+        '''
+        This method measures the prediction latency of a booster for a single row and
+        for a batch of rows, and the size of the serialized booster.
+        ================================================================================
+        -------------------
+        Parameters:
+        -------------------
+        booster : xgboost.core.Booster - This is the booster to measure.
+        X : pandas dataframe - These are the rows used to measure the latency.
+        
+        -------------------
+        Returns:
+        -------------------
+        latency : dict - This is the median latency of a single row and the median
+        latency per row of a batch in milliseconds, and the model size in bytes.
+        ================================================================================
+        '''
+        X = np.ascontiguousarray(X.to_numpy(dtype=np.float32))
+        batch = X[:self.tuning_config.latency_batch_size]
+        repeats = self.tuning_config.latency_repeats
+        inplace = booster_name(booster) != 'gblinear'
+        
+        # Warming up the booster before timing it, using the same prediction path as
+        # the model bundle
+        predict_matrix(booster, batch, inplace=inplace)
+        row_times = []
+        for i in range(repeats):
+            row = X[i % len(X):i % len(X) + 1]
+            start = time.perf_counter()
+            predict_matrix(booster, row, inplace=inplace)
+            row_times.append(time.perf_counter() - start)
+        batch_times = []
+        for _ in range(max(repeats // 10, 3)):
+            start = time.perf_counter()
+            predict_matrix(booster, batch, inplace=inplace)
+            batch_times.append(time.perf_counter() - start)
+        
+        return {
+            'row_ms': float(np.median(row_times) * 1000),
+            'batch_row_ms': float(np.median(batch_times) * 1000 / len(batch)),
+            'model_bytes': len(booster.save_raw(raw_format='ubj'))
+        }
+    
     # Creating a method to define the objective function for the training
     def objective(self, trial):
         '''
@@ -60,18 +151,26 @@ class FindBestModel():
         Returns:
         -------------------
         mean_roc_auc_score : float - This is the mean roc auc score for the best model.
+        row_latency : float - This is the latency of a single row prediction in
+        milliseconds. It is only returned when a latency objective is set.
         ================================================================================
         '''
         try:
-            # Defining the stratified kfold object and creating the matrix for 
-            # the train and validation sets
-            skf = StratifiedKFold(n_splits=5, shuffle=True, random_state=self.seed)
+            multi_objective = self.latency_slo_ms is not None
+            # Fetching the stratified folds and the matrix for the train and 
+            # validation sets
+            study_name = trial.study.study_name
+            first_build = self.folds is None
+            folds = self.get_folds()
+            if self.telemetry is not None and first_build:
+                self.telemetry.record_study(study_name, fold_build_s=self.fold_build_s)
+            
+            trial_timer = ResourceTimer()
+            trial_peak_rss = 0.0
+            rounds = 0
             auc_scores = []
-            for train_idx, val_idx in skf.split(self.train_set, self.target_set):
-                X_trn, X_val = self.train_set.iloc[train_idx], self.train_set.iloc[val_idx]
-                y_trn, y_val = self.target_set.iloc[train_idx], self.target_set.iloc[val_idx]
-                dtrain = xgb.DMatrix(X_trn, label=y_trn)
-                dval = xgb.DMatrix(X_val, label=y_val)
+            for fold, (train_idx, val_idx, dtrain, dval) in enumerate(folds):
+                y_val = self.target_set.iloc[val_idx]
                 
                 # Defining the parameters for the model
                 params = {
@@ -95,22 +194,76 @@ class FindBestModel():
                     params['rate_drop'] = trial.suggest_float('rate_drop', 1e-8, 1.0, log=True)
                     params['skip_drop'] = trial.suggest_float('skip_drop', 1e-8, 1.0, log=True)
                 
-                # Adding a callback for the pruner
-                pruning_callback = optuna.integration.XGBoostPruningCallback(trial, 'validation-auc')
+                # Adding a callback for the pruner and a callback to count the rounds.
+                # Optuna does not prune multi-objective studies
+                round_counter = RoundCounter()
+                callbacks = [round_counter]
+                if not multi_objective:
+                    callbacks.append(optuna.integration.XGBoostPruningCallback(trial, 'validation-auc'))
                 
                 # Training the xgboost model
-                bst = xgb.train(params, dtrain, evals=[(dval, 'validation')], callbacks=[pruning_callback])
+                fold_timer = ResourceTimer()
+                try:
+                    bst = xgb.train(params, dtrain, evals=[(dval, 'validation')], callbacks=callbacks)
+                except optuna.TrialPruned:
+                    if self.telemetry is not None:
+                        usage = fold_timer.read()
+                        self.telemetry.record_fold(
+                            study_name, trial.number, fold,
+                            train_wall_s=usage['wall_s'], train_cpu_s=usage['cpu_s'], predict_s=0.0,
+                            peak_rss_mb=usage['peak_rss_mb'], rounds=round_counter.rounds,
+                            pruned_step=round_counter.rounds - 1
+                        )
+                        usage = trial_timer.read()
+                        self.telemetry.record_trial(
+                            study_name, trial.number, params, state='pruned',
+                            wall_s=usage['wall_s'], cpu_s=usage['cpu_s'],
+                            peak_rss_mb=max(trial_peak_rss, usage['peak_rss_mb']),
+                            rounds=rounds + round_counter.rounds,
+                            pruned_step=round_counter.rounds - 1, folds=fold + 1
+                        )
+                    raise
+                train_usage = fold_timer.read()
                 
                 # Predicting on the validation set
+                predict_start = time.perf_counter()
                 y_pred = bst.predict(dval)
+                predict_s = time.perf_counter() - predict_start
                 auc = roc_auc_score(y_val, y_pred)
                 auc_scores.append(auc)
                 
+                rounds += round_counter.rounds
+                trial_peak_rss = max(trial_peak_rss, train_usage['peak_rss_mb'])
+                if self.telemetry is not None:
+                    self.telemetry.record_fold(
+                        study_name, trial.number, fold,
+                        train_wall_s=train_usage['wall_s'], train_cpu_s=train_usage['cpu_s'],
+                        predict_s=predict_s, peak_rss_mb=train_usage['peak_rss_mb'],
+                        rounds=round_counter.rounds, auc=float(auc)
+                    )
+                
             # Calculating the mean roc auc score
             mean_auc = np.mean(auc_scores)
             trial.set_user_attr(key=self.key, value=bst)
+            if self.telemetry is not None:
+                usage = trial_timer.read()
+                self.telemetry.record_trial(
+                    study_name, trial.number, params, state='complete', value=float(mean_auc),
+                    wall_s=usage['wall_s'], cpu_s=usage['cpu_s'],
+                    peak_rss_mb=max(trial_peak_rss, usage['peak_rss_mb']),
+                    rounds=rounds, folds=len(auc_scores)
+                )
+            
+            # Measuring the latency of the booster on the last validation set
+            if multi_objective:
+                latency = self.measure_latency(bst, self.train_set.iloc[val_idx])
+                trial.set_user_attr(key='latency', value=latency)
+                return mean_auc, latency['row_ms']
             return mean_auc
         
+        except optuna.TrialPruned:
+            # Letting Optuna mark the trial as pruned, instead of failing the study
+            raise
         except Exception as e:
             raise CustomException(e, sys)
     
@@ -128,12 +281,91 @@ class FindBestModel():
         ================================================================================
         '''
         try:
-            study = optuna.create_study(pruner=optuna.pruners.MedianPruner(n_warmup_steps=10), direction='maximize')
-            study.optimize(self.objective, n_trials=self.n_trials, callbacks=[self.model_callback])
-            best_model = study.user_attrs[self.key]
-            best_params = study.best_params
+            study_timer = ResourceTimer(reset_peak=False)
+            if self.latency_slo_ms is None:
+                study = optuna.create_study(pruner=optuna.pruners.MedianPruner(n_warmup_steps=10), direction='maximize')
+                study.optimize(self.objective, n_trials=self.n_trials, callbacks=[self.model_callback])
+                best_model = study.user_attrs[self.key]
+                best_params = study.best_params
+            else:
+                study = optuna.create_study(directions=['maximize', 'minimize'])
+                study.optimize(self.objective, n_trials=self.n_trials)
+                best_trial = self.select_trial(study.best_trials, self.latency_slo_ms)
+                self.pareto_front = self.create_pareto_front(study)
+                self.pareto_front['selected'] = self.pareto_front['trial'] == best_trial.number
+                best_model = best_trial.user_attrs[self.key]
+                best_params = best_trial.params
+            
+            # Summarizing where the time of the study went
+            if self.telemetry is not None:
+                self.telemetry.record_study(
+                    study.study_name,
+                    n_trials=len(study.trials),
+                    wall_s=study_timer.read()['wall_s']
+                )
+                logging.info(self.telemetry.format_summary(study.study_name))
+            
             return best_model, best_params
         
         except Exception as e:
             raise CustomException(e, sys)
-
+    
+    # Creating a method to tabulate the pareto front of a multi-objective study
+    @staticmethod
+    def create_pareto_front(study):
+        '''
+        This method tabulates the trials on the pareto front of the roc auc score and
+        the prediction latency.
+        ================================================================================
+        -------------------
+        Parameters:
+        -------------------
+        study : optuna.study.Study - This is the multi-objective study.
+        
+        -------------------
+        Returns:
+        -------------------
+        pareto_front : pandas dataframe - This is the trial number, roc auc score,
+        latencies, model size and booster of each trial on the pareto front, sorted by
+        the latency.
+        ================================================================================
+        '''
+        rows = []
+        for trial in study.best_trials:
+            latency = trial.user_attrs['latency']
+            rows.append({
+                'trial': trial.number,
+                'roc_auc': trial.values[0],
+                'row_ms': latency['row_ms'],
+                'batch_row_ms': latency['batch_row_ms'],
+                'model_bytes': latency['model_bytes'],
+                'booster': trial.params.get('booster'),
+                'max_depth': trial.params.get('max_depth')
+            })
+        return pd.DataFrame(rows).sort_values('row_ms').reset_index(drop=True)
+    
+    # Creating a method to pick the most accurate trial within the latency objective
+    @staticmethod
+    def select_trial(trials, latency_slo_ms):
+        '''
+        This method picks the trial with the highest roc auc score among the trials
+        whose single row latency is within the service level objective. If no trial
+        meets the objective, the fastest trial is picked.
+        ================================================================================
+        -------------------
+        Parameters:
+        -------------------
+        trials : list - These are the trials on the pareto front.
+        latency_slo_ms : float - This is the latency objective in milliseconds per row.
+        
+        -------------------
+        Returns:
+        -------------------
+        trial : optuna.trial.FrozenTrial - This is the picked trial.
+        ================================================================================
+        '''
+        within_slo = [trial for trial in trials if trial.values[1] <= latency_slo_ms]
+        if within_slo:
+            return max(within_slo, key=lambda trial: (trial.values[0], -trial.values[1]))
+        logging.info(f'No model meets the latency objective of {latency_slo_ms} ms, picking the fastest model.')
+        return min(trials, key=lambda trial: trial.values[1])
@@ -0,0 +1,230 @@
+# Importing packages
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import tempfile
+import numpy as np
+import xgboost as xgb
+from sklearn.model_selection import StratifiedKFold
+from src.components.config_entity import FoldCacheConfig
+from src.exception import CustomException
+from src.logger import logging
+
+
+# Creating a class to cache the cross validation folds on disk
+class FoldCache():
+    '''
+    This class caches the stratified cross validation folds of a dataset on disk. Each
+    entry holds the train and validation indices of every fold and the binary DMatrix
+    buffers built from them. An entry is keyed on a hash of the contents of the dataset,
+    the number of folds and the seed, so a changed feature store never reads a stale
+    entry. When the cache grows beyond its size limit, the least recently used entries
+    are evicted.
+    '''
+    # Creating the constructor for the class
+    def __init__(self, cache_dir:str=None, max_bytes:int=None):
+        '''
+        This is the constructor for the fold cache class. It instantiates the folder and
+        the size limit of the cache.
+        '''
+        self.cache_config = FoldCacheConfig()
+        self.cache_dir = cache_dir or self.cache_config.cache_dir
+        self.max_bytes = max_bytes if max_bytes is not None else self.cache_config.max_bytes
+
+    # Creating a method to compute the key of a dataset
+    @staticmethod
+    def dataset_key(X, y, n_splits:int, seed:int):
+        '''
+        This method computes the cache key of a dataset from its contents, the number of
+        folds and the seed.
+        ================================================================================
+        -------------------
+        Parameters:
+        -------------------
+        X : pandas dataframe - This is the feature set.
+        y : pandas dataframe - This is the target set.
+        n_splits : int - This is the number of folds.
+        seed : int - This is the seed used to shuffle the folds.
+
+        -------------------
+        Returns:
+        -------------------
+        key : str - This is the cache key.
+        ================================================================================
+        '''
+        digest = hashlib.sha256()
+        digest.update(json.dumps({
+            'columns': [str(col) for col in X.columns],
+            'dtypes': [str(dtype) for dtype in X.dtypes],
+            'shape': list(X.shape),
+            'n_splits': n_splits,
+            'seed': seed,
+            'xgboost': xgb.__version__
+        }).encode())
+        for col in X.columns:
+            digest.update(np.ascontiguousarray(X[col].to_numpy()).tobytes())
+        digest.update(np.ascontiguousarray(np.asarray(y).ravel()).tobytes())
+        return digest.hexdigest()
+
+    # Creating a method to build the folds of a dataset
+    @staticmethod
+    def build_folds(X, y, n_splits:int, seed:int):
+        '''
+        This method splits the dataset into stratified folds and builds the DMatrix of
+        the train and validation set of each fold.
+        ================================================================================
+        -------------------
+        Parameters:
+        -------------------
+        X : pandas dataframe - This is the feature set.
+        y : pandas dataframe - This is the target set.
+        n_splits : int - This is the number of folds.
+        seed : int - This is the seed used to shuffle the folds.
+
+        -------------------
+        Returns:
+        -------------------
+        folds : list - This is a list of (train indices, validation indices, dtrain,
+        dval) tuples.
+        ================================================================================
+        '''
+        skf = StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=seed)
+        folds = []
+        for train_idx, val_idx in skf.split(X, y):
+            dtrain = xgb.DMatrix(X.iloc[train_idx], label=y.iloc[train_idx])
+            dval = xgb.DMatrix(X.iloc[val_idx], label=y.iloc[val_idx])
+            folds.append((train_idx, val_idx, dtrain, dval))
+        return folds
+
+    # Creating a method to fetch the folds of a dataset
+    def get_folds(self, X, y, n_splits:int=None, seed:int=42):
+        '''
+        This method returns the folds of a dataset from the cache. On a miss, the folds
+        are built and written into the cache.
+        ================================================================================
+        -------------------
+        Parameters:
+        -------------------
+        X : pandas dataframe - This is the feature set.
+        y : pandas dataframe - This is the target set.
+        n_splits : int - This is the number of folds. If not given, the number of folds
+        from the cache config is used.
+        seed : int - This is the seed used to shuffle the folds.
+
+        -------------------
+        Returns:
+        -------------------
+        folds : list - This is a list of (train indices, validation indices, dtrain,
+        dval) tuples.
+        ================================================================================
+        '''
+        try:
+            n_splits = n_splits or self.cache_config.n_splits
+            key = self.dataset_key(X, y, n_splits, seed)
+            entry_dir = os.path.join(self.cache_dir, key)
+
+            if os.path.isdir(entry_dir):
+                logging.info(f'Reading the cross validation folds from the cache entry {key}.')
+                folds = self.read_entry(entry_dir, n_splits)
+                # Marking the entry as recently used
+                os.utime(os.path.join(entry_dir, 'meta.json'))
+                return folds
+
+            folds = self.build_folds(X, y, n_splits, seed)
+            self.write_entry(entry_dir, folds, X.shape)
+            self.evict(keep=key)
+            return folds
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    # Creating a method to read a cache entry
+    @staticmethod
+    def read_entry(entry_dir:str, n_splits:int):
+        '''
+        This method reads the fold indices and the binary DMatrix buffers of a cache entry.
+        '''
+        indices = np.load(os.path.join(entry_dir, 'folds.npz'))
+        folds = []
+        for i in range(n_splits):
+            dtrain = xgb.DMatrix(os.path.join(entry_dir, f'fold{i}_train.buffer'))
+            dval = xgb.DMatrix(os.path.join(entry_dir, f'fold{i}_val.buffer'))
+            folds.append((indices[f'train_{i}'], indices[f'val_{i}'], dtrain, dval))
+        return folds
+
+    # Creating a method to write a cache entry
+    def write_entry(self, entry_dir:str, folds, shape):
+        '''
+        This method writes the fold indices and the binary DMatrix buffers of a dataset
+        into a new cache entry. The entry is written into a temporary folder first and
+        then renamed, so that a partly written entry is never read.
+        '''
+        os.makedirs(self.cache_dir, exist_ok=True)
+        staging_dir = tempfile.mkdtemp(prefix='.staging-', dir=self.cache_dir)
+        try:
+            indices = {}
+            for i, (train_idx, val_idx, dtrain, dval) in enumerate(folds):
+                indices[f'train_{i}'] = train_idx
+                indices[f'val_{i}'] = val_idx
+                dtrain.save_binary(os.path.join(staging_dir, f'fold{i}_train.buffer'), silent=True)
+                dval.save_binary(os.path.join(staging_dir, f'fold{i}_val.buffer'), silent=True)
+            np.savez(os.path.join(staging_dir, 'folds.npz'), **indices)
+            with open(os.path.join(staging_dir, 'meta.json'), 'w') as file_obj:
+                json.dump({'created': time.time(), 'shape': list(shape), 'n_splits': len(folds)}, file_obj)
+            os.replace(staging_dir, entry_dir)
+        except OSError:
+            # Another process has written the same entry in the meantime
+            shutil.rmtree(staging_dir, ignore_errors=True)
+
+    # Creating a method to compute the size of a cache entry
+    @staticmethod
+    def entry_size(entry_dir:str):
+        '''
+        This method returns the size in bytes of a cache entry.
+        '''
+        return sum(
+            os.path.getsize(os.path.join(entry_dir, file_name))
+            for file_name in os.listdir(entry_dir)
+        )
+
+    # Creating a method to evict the least recently used entries
+    def evict(self, keep:str=None):
+        '''
+        This method removes the least recently used entries until the cache fits within
+        its size limit. The entry which was just written is kept.
+        ================================================================================
+        -------------------
+        Parameters:
+        -------------------
+        keep : str - This is the key of an entry which is never evicted.
+
+        -------------------
+        Returns:
+        -------------------
+        evicted : list - These are the keys of the evicted entries.
+        ================================================================================
+        '''
+        entries = []
+        for key in os.listdir(self.cache_dir):
+            entry_dir = os.path.join(self.cache_dir, key)
+            if key.startswith('.') or not os.path.isdir(entry_dir):
+                continue
+            last_used = os.path.getmtime(os.path.join(entry_dir, 'meta.json'))
+            entries.append((last_used, key, self.entry_size(entry_dir)))
+
+        total = sum(size for _, _, size in entries)
+        evicted = []
+        for _, key, size in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            shutil.rmtree(os.path.join(self.cache_dir, key), ignore_errors=True)
+            total -= size
+            evicted.append(key)
+        if evicted:
+            logging.info(f'Evicted {len(evicted)} entries from the fold cache.')
+        return evicted
@@ -0,0 +1,442 @@
+# Importing packages
+import os
+import sys
+import json
+import ctypes
+import ctypes.util
+import numpy as np
+import pandas as pd
+from src.components.model_bundle import CompactPreprocessor
+from src.exception import CustomException
+from src.logger import logging
+
+# Defining the version of the fused model format
+FUSED_VERSION = 1
+
+
+# Loading the float32 exponential of the C math library, which the booster uses in its
+# sigmoid. It is not always correctly rounded, so the exponential of numpy can differ
+# from it in the last bit.
+def _load_expf():
+    try:
+        libm = ctypes.CDLL(ctypes.util.find_library('m'))
+        expf = libm.expf
+        expf.restype = ctypes.c_float
+        expf.argtypes = [ctypes.c_float]
+        return expf
+    except (OSError, AttributeError, TypeError):
+        return None
+
+_EXPF = _load_expf()
+
+
+# Creating a function to compute the sigmoid of float32 margins as the booster does
+def sigmoid(margin):
+    '''
+    This function returns the sigmoid of float32 margins, computed in float32 with the
+    exponential of the C math library, as the booster computes it. The exponential is
+    rounded from float64 when the C math library cannot be loaded.
+    '''
+    exponent = np.minimum(-margin, np.float32(88.7))
+    if _EXPF is None:
+        exp = np.exp(exponent.astype(np.float64)).astype(np.float32)
+    else:
+        exp = np.fromiter((_EXPF(value) for value in exponent.tolist()), dtype=np.float32, count=len(exponent))
+    return np.float32(1.0) / (exp + np.float32(1.0))
+
+
+# Creating a function to map a float64 value to an integer with the same ordering
+def _ordered_key(value:float):
+    '''
+    This function maps a float64 value to an integer, such that adjacent floats map to
+    adjacent integers and the ordering is preserved.
+    '''
+    bits = int(np.float64(value).view(np.int64))
+    return bits if bits >= 0 else -(bits & 0x7FFFFFFFFFFFFFFF)
+
+
+# Creating a function to map an ordered integer back to its float64 value
+def _ordered_value(key:int):
+    '''
+    This function is the inverse of _ordered_key.
+    '''
+    if key >= 0:
+        return float(np.int64(key).view(np.float64))
+    return -float(np.int64(-key).view(np.float64))
+
+
+# Creating a function to move a split threshold of a scaled feature back to the raw input
+def raw_threshold(mean:float, scale:float, threshold:float):
+    '''
+    This function returns the raw threshold equivalent to a split on a standard scaled
+    feature. The booster sends a row to the left when float32((raw - mean) / scale) is
+    below the float32 threshold of the split. That condition is monotonic in the raw
+    value, so the smallest float64 raw value for which it fails is found by bisection
+    over the ordered float64 values, and the split becomes raw < raw_threshold for every
+    float64 input, including the rounding of the scaler and of the cast to float32.
+    ================================================================================
+    -------------------
+    Parameters:
+    -------------------
+    mean : float - This is the mean of the scaler.
+    scale : float - This is the scale of the scaler.
+    threshold : float - This is the threshold of the split on the scaled feature.
+
+    -------------------
+    Returns:
+    -------------------
+    raw_threshold : float - This is the threshold of the split on the raw input.
+    ================================================================================
+    '''
+    threshold = np.float32(threshold)
+
+    def goes_left(value):
+        with np.errstate(over='ignore'):
+            return np.float32((np.float64(value) - mean) / scale) < threshold
+
+    # goes_left(lo) always holds and goes_left(hi) never does
+    lo, hi = _ordered_key(-np.inf), _ordered_key(np.inf)
+    while hi - lo > 1:
+        mid = (lo + hi) // 2
+        if goes_left(_ordered_value(mid)):
+            lo = mid
+        else:
+            hi = mid
+    return _ordered_value(hi)
+
+
+# Creating a class to score raw features with the preprocessing fused into the trees
+class FusedModel():
+    '''
+    This class scores raw features with a tree ensemble whose splits were rewritten as
+    conditions on the raw inputs. A numerical split compares the raw value with a raw
+    threshold, and a categorical split looks up the code of the category in a
+    precomputed bitset. The only work at serving time is mapping each category to its
+    code, so the scaler, the one hot encoders and the weight of evidence tables are
+    never applied.
+    '''
+    # Creating the constructor for the class
+    def __init__(self, params, arrays):
+        '''
+        This is the constructor for the fused model class. It takes the json serialisable
+        parameters and the node arrays of the fused model.
+        '''
+        self.params = params
+        self.arrays = arrays
+        self.index = {
+            spec['col']: pd.Index(spec['categories'])
+            for spec in params['inputs'] if spec['kind'] in ('category', 'woe')
+        }
+
+    # Creating a method to encode the raw features into the inputs of the fused model
+    def encode(self, df):
+        '''
+        This method encodes the raw features into the float64 input matrix of the fused
+        model. Numerical inputs are kept as they are, the capital gain and loss inputs
+        are replaced by their indicators and the categorical inputs are replaced by their
+        codes. Unknown categories and missing values of the weight of evidence inputs get
+        the two codes after the known categories.
+        ================================================================================
+        -------------------
+        Parameters:
+        -------------------
+        df : pandas dataframe - This is the raw feature set, as created by CustomData.
+
+        -------------------
+        Returns:
+        -------------------
+        X : numpy array - This is the input matrix of the fused model.
+        ================================================================================
+        '''
+        X = np.empty((len(df), len(self.params['inputs'])), dtype=np.float64)
+        for i, spec in enumerate(self.params['inputs']):
+            col = spec['col']
+            if spec['kind'] == 'numeric':
+                X[:, i] = df[col].to_numpy(dtype=np.float64)
+            elif spec['kind'] == 'capital':
+                X[:, i] = df[col].to_numpy() > 0
+            else:
+                values = np.asarray(df[col].astype(object))
+                codes = self.index[col].get_indexer(values)
+                if spec['kind'] == 'category':
+                    if (codes < 0).any():
+                        raise ValueError(f'Found unknown categories {set(values[codes < 0])} in column {col}')
+                else:
+                    codes = np.where(codes < 0, len(spec['categories']), codes)
+                    codes[pd.isna(values)] = len(spec['categories']) + 1
+                X[:, i] = codes
+        return X
+
+    # Creating a method to find the leaf reached by each row in each tree
+    def predict_leaf(self, X):
+        '''
+        This method walks every row down every tree at once, one level per step, and
+        returns the index of the leaf reached in each tree. Leaves point to themselves,
+        so rows which reach a leaf early stay there.
+        '''
+        a = self.arrays
+        node = np.tile(a['roots'], (len(X), 1))
+        rows = np.arange(len(X))[:, None]
+        for _ in range(self.params['max_depth']):
+            x = X[rows, a['input'][node]]
+            missing = np.isnan(x)
+            categorical = a['categorical'][node]
+            codes = np.where(categorical & ~missing, x, 0).astype(np.int64)
+            with np.errstate(invalid='ignore'):
+                numeric_left = np.where(missing, a['default_left'][node], x < a['threshold'][node])
+            go_left = np.where(categorical, a['bits'][a['bit_offset'][node] + codes], numeric_left)
+            node = np.where(go_left, a['left'][node], a['right'][node])
+        return node
+
+    # Creating a method to compute the margin of raw features
+    def predict_margin(self, df):
+        '''
+        This method returns the untransformed margin of the raw features. The leaf values
+        are added to the base margin one tree at a time in float32, in the same order as
+        the booster.
+        '''
+        leaves = self.predict_leaf(self.encode(df))
+        values = self.arrays['leaf_value'][leaves] * self.arrays['tree_weight']
+        base = np.full((len(values), 1), self.params['base_margin'], dtype=np.float32)
+        return np.cumsum(np.hstack([base, values]), axis=1, dtype=np.float32)[:, -1]
+
+    # Creating a method to make predictions on raw features
+    def predict(self, df):
+        '''
+        This method returns the predicted probabilities of the raw features.
+        ================================================================================
+        -------------------
+        Parameters:
+        -------------------
+        df : pandas dataframe - This is the raw feature set, as created by CustomData.
+
+        -------------------
+        Returns:
+        -------------------
+        preds : numpy array - These are the predicted probabilities.
+        ================================================================================
+        '''
+        return sigmoid(self.predict_margin(df))
+
+    # Creating a method to save the fused model
+    def save(self, file_path:str):
+        '''
+        This method saves the parameters and the node arrays of the fused model into a
+        single npz file, which is loaded without pickle.
+        '''
+        try:
+            os.makedirs(os.path.dirname(file_path) or '.', exist_ok=True)
+            with open(file_path, 'wb') as file_obj:
+                np.savez(file_obj, params=np.array(json.dumps(self.params)), **self.arrays)
+            logging.info(f'The fused model has been saved to {file_path}.')
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    # Creating a method to load a fused model
+    @classmethod
+    def load(cls, file_path:str):
+        '''
+        This method loads a fused model saved by the save method.
+        '''
+        try:
+            with np.load(file_path, allow_pickle=False) as contents:
+                params = json.loads(str(contents['params']))
+                if params['format_version'] > FUSED_VERSION:
+                    raise ValueError(f'The fused model version {params["format_version"]} is not supported.')
+                arrays = {name: contents[name] for name in contents.files if name != 'params'}
+            return cls(params, arrays)
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+
+# Creating a function to describe the raw inputs and the features computed from them
+def _fused_inputs(preprocessor):
+    '''
+    This function returns the raw inputs of the fused model and, for each feature of the
+    preprocessor, the input it is computed from. Numerical features carry the mean and
+    scale of the scaler. The other features carry their float32 value for every code of
+    their input.
+    '''
+    params, arrays = preprocessor.params, preprocessor.arrays
+    inputs, features = [], {}
+    names = iter(preprocessor.feature_names)
+
+    for i, col in enumerate(params['num']['cols']):
+        features[next(names)] = (len(inputs), float(arrays['num/mean'][i]), float(arrays['num/scale'][i]))
+        inputs.append({'col': col, 'kind': 'numeric'})
+
+    sex_categories = params['sex']['categories']
+    for category in sex_categories:
+        values = np.asarray([code == sex_categories.index(category) for code in range(len(sex_categories))], dtype=np.float32)
+        features[next(names)] = (len(inputs), values)
+    inputs.append({'col': params['sex']['col'], 'kind': 'category', 'categories': sex_categories})
+
+    # The code of a capital input is 1 when the raw value is positive
+    for col, categories in zip(params['cap']['cols'], params['cap']['categories']):
+        for category in categories:
+            values = np.asarray([1.0, 0.0] if category.startswith('no_') else [0.0, 1.0], dtype=np.float32)
+            features[next(names)] = (len(inputs), values)
+        inputs.append({'col': col, 'kind': 'capital'})
+
+    for col in params['woe']['cols']:
+        features[next(names)] = (len(inputs), arrays[f'woe/{col}'].astype(np.float32))
+        inputs.append({'col': col, 'kind': 'woe', 'categories': params['woe']['categories'][col]})
+
+    return inputs, features
+
+
+# Creating a function to read the trees or the weights of a booster
+def read_booster_model(booster):
+    '''
+    This function reads the model of a binary:logistic booster from its json dump.
+    ========================================================================================
+    ---------------------
+    Parameters:
+    ---------------------
+    booster : xgboost.core.Booster - This is the trained booster.
+
+    ---------------------
+    Returns:
+    ---------------------
+    model : dict - This is the type of the booster, the names of its features and its base
+    margin, together with the trees and the tree weights of a gbtree or dart booster, or
+    the weights and the bias of a gblinear booster.
+    =========================================================================================
+    '''
+    learner = json.loads(booster.save_raw(raw_format='json'))['learner']
+    if learner['objective']['name'] != 'binary:logistic':
+        raise ValueError(f'The objective {learner["objective"]["name"]} is not supported.')
+    name = learner['gradient_booster']['name']
+
+    # The base margin is computed in float32 as the booster does, with the logarithm
+    # rounded from float64
+    base_score = float(learner['learner_model_param']['base_score'].strip('[]'))
+    odds = np.float32(1.0) / np.float32(base_score) - np.float32(1.0)
+    model = {
+        'booster': name,
+        'feature_names': learner.get('feature_names') or [],
+        'base_margin': -float(np.float32(np.log(np.float64(odds))))
+    }
+
+    gradient_booster = learner['gradient_booster']
+    if name == 'gblinear':
+        weights = np.asarray(gradient_booster['model']['weights'], dtype=np.float32)
+        model['weights'], model['bias'] = weights[:-1], weights[-1]
+        return model
+    trees = (gradient_booster['model'] if name == 'gbtree' else gradient_booster['gbtree']['model'])['trees']
+    model['trees'] = trees
+    model['tree_weights'] = gradient_booster.get('weight_drop', [1.0] * len(trees))
+    return model
+
+
+# Creating a function to compile the fitted preprocessor and a booster into a fused model
+def compile_fused_model(preprocessor, booster):
+    '''
+    This function rewrites every split of a gbtree or dart booster as a condition on the
+    raw inputs. Splits on a scaled feature move back to a raw threshold, and splits on a
+    one hot, capital indicator or weight of evidence feature become a bitset over the
+    codes of the raw input, with a bit set when the code goes to the left. The fused
+    model gives the same predictions as the preprocessor followed by the booster.
+    ========================================================================================
+    ---------------------
+    Parameters:
+    ---------------------
+    preprocessor : ColumnTransformer or CompactPreprocessor - This is the fitted preprocessor.
+    booster : xgboost.core.Booster - This is the trained booster.
+
+    ---------------------
+    Returns:
+    ---------------------
+    fused_model : FusedModel - This is the fused model.
+    =========================================================================================
+    '''
+    try:
+        if not isinstance(preprocessor, CompactPreprocessor):
+            preprocessor = CompactPreprocessor.from_column_transformer(preprocessor)
+
+        model = read_booster_model(booster)
+        if model['booster'] not in ('gbtree', 'dart'):
+            raise ValueError(f'Only gbtree and dart boosters can be fused, not {model["booster"]}.')
+
+        inputs, features = _fused_inputs(preprocessor)
+        feature_names = model['feature_names'] or preprocessor.feature_names
+        if any(feature not in features for feature in feature_names):
+            raise ValueError('The features of the booster do not match the features of the preprocessor.')
+
+        roots, left, right, input_index, threshold = [], [], [], [], []
+        bit_offset, categorical, default_left, leaf_value = [], [], [], []
+        bits = []
+        raw_thresholds, bitsets = {}, {}
+        max_depth = 0
+
+        for tree in model['trees']:
+            if any(split_type != 0 for split_type in tree['split_type']):
+                raise ValueError('Trees with categorical splits are not supported.')
+            start = len(left)
+            roots.append(start)
+            depth = {0: 0}
+            for node, (lchild, rchild) in enumerate(zip(tree['left_children'], tree['right_children'])):
+                condition = tree['split_conditions'][node]
+                if lchild == -1:
+                    # Leaves point to themselves and hold their value in the split condition
+                    left.append(start + node)
+                    right.append(start + node)
+                    input_index.append(0)
+                    threshold.append(0.0)
+                    bit_offset.append(0)
+                    categorical.append(False)
+                    default_left.append(False)
+                    leaf_value.append(condition)
+                    max_depth = max(max_depth, depth[node])
+                    continue
+
+                depth[lchild] = depth[rchild] = depth[node] + 1
+                feature = features[feature_names[tree['split_indices'][node]]]
+                left.append(start + lchild)
+                right.append(start + rchild)
+                input_index.append(feature[0])
+                default_left.append(bool(tree['default_left'][node]))
+                leaf_value.append(0.0)
+                if len(feature) == 3:
+                    key = (feature[0], condition)
+                    if key not in raw_thresholds:
+                        raw_thresholds[key] = raw_threshold(feature[1], feature[2], condition)
+                    threshold.append(raw_thresholds[key])
+                    bit_offset.append(0)
+                    categorical.append(False)
+                else:
+                    goes_left = tuple(feature[1] < np.float32(condition))
+                    if goes_left not in bitsets:
+                        bitsets[goes_left] = len(bits)
+                        bits.extend(goes_left)
+                    threshold.append(0.0)
+                    bit_offset.append(bitsets[goes_left])
+                    categorical.append(True)
+
+        params = {
+            'format_version': FUSED_VERSION,
+            'booster': model['booster'],
+            'base_margin': model['base_margin'],
+            'max_depth': max_depth,
+            'inputs': inputs
+        }
+        arrays = {
+            'roots': np.asarray(roots, dtype=np.int32),
+            'left': np.asarray(left, dtype=np.int32),
+            'right': np.asarray(right, dtype=np.int32),
+            'input': np.asarray(input_index, dtype=np.int32),
+            'threshold': np.asarray(threshold, dtype=np.float64),
+            'bit_offset': np.asarray(bit_offset, dtype=np.int32),
+            'categorical': np.asarray(categorical, dtype=bool),
+            'default_left': np.asarray(default_left, dtype=bool),
+            'bits': np.asarray(bits or [False], dtype=bool),
+            'leaf_value': np.asarray(leaf_value, dtype=np.float32),
+            'tree_weight': np.asarray(model['tree_weights'], dtype=np.float32)
+        }
+        logging.info(f'Fused {len(roots)} trees with {len(left)} nodes into the raw inputs.')
+        return FusedModel(params, arrays)
+
+    except Exception as e:
+        raise CustomException(e, sys)
@@ -1,5 +1,7 @@
 # Importing packages
+import os
 import sys
+import threading
 import pandas as pd
 import mlflow
 import dagshub
@@ -8,9 +10,40 @@ from src.utils import load_object
 from src.utils import load_run_params
 from src.utils import read_json_file
 from src.components.config_entity import DataTransformationConfig
+from src.components.model_bundle import load_model_bundle
+from src.components.model_bundle import booster_name
+from src.components.categorical_model import CategoricalModel
+from src.components.fused_model import FusedModel
 from src.exception import CustomException
 from src.logger import logging
 
+# Caching the loaded models by path, so that a model is only read once per process. Each
+# path holds the size and modification time of the file it was loaded from, so that only
+# a changed file is reloaded, and the primary and fallback models are both kept.
+_BUNDLE_CACHE = {}
+_BUNDLE_LOCK = threading.Lock()
+
+# Creating a function to find the cache key and version of a model file
+def model_file_version(path:str):
+    '''
+    This function returns the key of a model file in the model cache, which is its
+    absolute path, and its version, which is its size and modification time.
+    ===================================================================================
+    ----------------
+    Parameters:
+    ----------------
+    path : str - This is the path of the model file.
+
+    ----------------
+    Returns:
+    ----------------
+    key : str - This is the absolute path of the model file.
+    version : tuple - This is the size and the modification time of the model file.
+    ===================================================================================
+    '''
+    stat = os.stat(path)
+    return os.path.abspath(path), (stat.st_size, stat.st_mtime_ns)
+
 # Creating a class to make predictions on data received from the website
 class MakePredictions():
     '''
@@ -18,10 +51,22 @@ class MakePredictions():
     the website.
     '''
     # Creating the constructor for the class
-    def __init__(self):
+    def __init__(self, bundle_path:str=None, categorical_model_path:str=None, fused_model_path:str=None,
+                 onnx_model_path:str=None):
         '''
-        This is the constructor for the MakePredictions class.
+        This is the constructor for the MakePredictions class. If the path to a model
+        bundle is given, the predictions are made using the bundle instead of the model
+        from the model registry and the preprocessor object. If the path to a booster
+        trained with native categorical support is given, the predictions are made
+        using that booster, and the categories are only mapped to their codes. If the
+        path to a fused model is given, the predictions are made on the raw features
+        with the preprocessing compiled into the trees. If the path to an onnx model is
+        given, the predictions are made with a local onnxruntime session.
         '''
+        self.bundle_path = bundle_path
+        self.categorical_model_path = categorical_model_path
+        self.fused_model_path = fused_model_path
+        self.onnx_model_path = onnx_model_path
         self.preprocessor_obj = DataTransformationConfig()
         self.model_uri = 'https://dagshub.com/abbeymaj/my-first-repo.mlflow'
         self.columns = ['num_pipeline__age', 
@@ -101,8 +146,113 @@ class MakePredictions():
             raise CustomException(e, sys)
     
     
+    # Creating a method to fetch the path of the local model
+    def local_model_path(self):
+        '''
+        This method returns the path of the local model used for the predictions, or None
+        if the model from the model registry is used.
+        '''
+        local_paths = [self.bundle_path, self.categorical_model_path, self.fused_model_path, self.onnx_model_path]
+        return next((path for path in local_paths if path is not None), None)
+    
+    
+    # Creating a method to describe the version of the model
+    def model_version(self):
+        '''
+        This method returns the version of the model used for the predictions. A local
+        model is described by its file name and modification time, and a model from the
+        model registry by its name and version.
+        '''
+        try:
+            path = self.local_model_path()
+            if path is not None:
+                return f'{os.path.basename(path)}@{int(os.stat(path).st_mtime)}'
+            runs_data, _ = self.retrieve_model_params()
+            return f"{runs_data['model_name']}/{runs_data['model_version']}"
+        
+        except Exception as e:
+            raise CustomException(e, sys)
+    
+    
+    # Creating a method to load the model bundle
+    def retrieve_bundle(self):
+        '''
+        This method loads the model bundle, the booster trained with native categorical
+        support, the fused model or the onnx model. The loaded model is cached and is
+        reloaded only when its file changes. The onnx model is imported only when it is
+        served, so that onnx and onnxruntime are not loaded by the other models.
+        ===================================================================================
+        ----------------
+        Returns:
+        ----------------
+        bundle : ModelBundle, CategoricalModel, FusedModel or OnnxModel - This is the
+        loaded model.
+        ===================================================================================
+        '''
+        try:
+            path = self.local_model_path()
+            key, version = model_file_version(path)
+            cached = _BUNDLE_CACHE.get(key)
+            if cached is not None and cached[0] == version:
+                return cached[1]
+            
+            with _BUNDLE_LOCK:
+                # Checking again, in case another thread loaded the model meanwhile
+                cached = _BUNDLE_CACHE.get(key)
+                if cached is not None and cached[0] == version:
+                    return cached[1]
+                if self.bundle_path is not None:
+                    model = load_model_bundle(path)
+                elif self.categorical_model_path is not None:
+                    model = CategoricalModel.from_files(
+                        model_path=path,
+                        vocabulary_path=self.preprocessor_obj.vocabulary_path
+                    )
+                elif self.fused_model_path is not None:
+                    model = FusedModel.load(path)
+                else:
+                    from src.components.onnx_export import OnnxModel
+                    model = OnnxModel(path)
+                _BUNDLE_CACHE[key] = (version, model)
+                return model
+
+        except Exception as e:
+            raise CustomException(e, sys)
+    
+    
+    # Creating a method to find the boosting rounds used in degraded mode
+    def degraded_iteration_range(self, fraction:float):
+        '''
+        This method returns the range of the first boosting rounds of the local booster,
+        which is used to score faster under load. None is returned if the model cannot
+        be truncated - the fused model, the onnx model, a gblinear booster and the model
+        from the model registry.
+        ===================================================================================
+        ----------------
+        Parameters:
+        ----------------
+        fraction : float - This is the share of the boosting rounds to use.
+
+        ----------------
+        Returns:
+        ----------------
+        iteration_range : tuple - This is the range of boosting rounds, or None.
+        ===================================================================================
+        '''
+        try:
+            if self.bundle_path is None and self.categorical_model_path is None:
+                return None
+            booster = self.retrieve_bundle().booster
+            if booster_name(booster) == 'gblinear':
+                return None
+            return (0, max(1, int(booster.num_boosted_rounds() * fraction)))
+        
+        except Exception as e:
+            raise CustomException(e, sys)
+    
+    
     # Creating  a method to make predictions on the received data
-    def predict(self, features):
+    def predict(self, features, iteration_range=None):
         '''
         This method makes predictions using the feature inputs from the web page and 
         the trained model. This method also transforms the input data using the 
@@ -112,6 +262,8 @@ class MakePredictions():
         Parameters:
         -------------------
         features : pandas dataframe - This is the feature data input received from the web page.
+        iteration_range : tuple - This is the range of boosting rounds used by a local model
+        bundle or categorical booster. If not given, every round is used.
         
         -------------------
         Returns:
@@ -120,6 +272,14 @@ class MakePredictions():
         =============================================================================================
         '''
         try:
+            # Making predictions using the model bundle, the categorical model, the fused
+            # model or the onnx model, if one is given
+            if self.local_model_path() is not None:
+                model = self.retrieve_bundle()
+                if iteration_range is not None:
+                    return model.predict(features, iteration_range=iteration_range)
+                return model.predict(features)
+            
             # Instantiating the preprocessor object
             preprocessor = load_object(file_path=self.preprocessor_obj.preprocessor_obj_path)
             
@@ -0,0 +1,397 @@
+# Importing packages
+import os
+import sys
+import mmap
+import json
+import struct
+import hashlib
+import datetime
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from src.exception import CustomException
+from src.logger import logging
+
+# Defining the magic bytes and the version of the bundle format. Since version 2, the
+# sha256 checksum is stored before the header and covers the header and the data section
+BUNDLE_MAGIC = b'AWBUNDLE'
+BUNDLE_VERSION = 2
+# Aligning every array in the data section, so that it can be memory mapped
+BUNDLE_ALIGNMENT = 64
+
+
+# Creating a function to fetch the type of the gradient booster
+def booster_name(booster):
+    '''
+    This function returns the type of the gradient booster - gbtree, dart or gblinear.
+    '''
+    return json.loads(booster.save_config())['learner']['gradient_booster']['name']
+
+
+# Creating a function to make predictions on a feature matrix
+def predict_matrix(booster, X, iteration_range=None, inplace:bool=True):
+    '''
+    This function makes predictions on a float32 feature matrix. Tree boosters predict
+    in place, without building a DMatrix. The gblinear booster does not support in place
+    prediction, so a DMatrix is built for it.
+    ========================================================================================
+    ---------------------
+    Parameters:
+    ---------------------
+    booster : xgboost.core.Booster - This is the booster.
+    X : numpy array - This is the feature matrix.
+    iteration_range : tuple - This is the range of boosting rounds to use. If not given,
+    every round is used.
+    inplace : bool - This determines if the booster supports in place prediction.
+
+    ---------------------
+    Returns:
+    ---------------------
+    preds : numpy array - These are the predicted probabilities.
+    =========================================================================================
+    '''
+    if iteration_range is None:
+        iteration_range = (0, 0)
+    if inplace:
+        return booster.inplace_predict(X, iteration_range=iteration_range)
+    return booster.predict(xgb.DMatrix(X, feature_names=booster.feature_names), iteration_range=iteration_range)
+
+
+# Creating a class to apply the fitted preprocessing using numpy only
+class CompactPreprocessor():
+    '''
+    This class holds the parameters of the fitted preprocessor object - the scaler
+    arrays, the one hot encoder categories, the capital gain and loss indicators and the
+    weight of evidence tables - and applies them using numpy. The output has the same
+    columns, in the same order, as the ColumnTransformer it was built from.
+    '''
+    # Creating the constructor for the class
+    def __init__(self, params, arrays):
+        '''
+        This is the constructor for the compact preprocessor class. It takes the json
+        serialisable parameters and the numeric arrays of the preprocessor.
+        '''
+        self.params = params
+        self.arrays = arrays
+        self.feature_names = params['feature_names']
+        self.woe_index = {
+            col: pd.Index(categories)
+            for col, categories in params['woe']['categories'].items()
+        }
+
+    # Creating a method to build the compact preprocessor from the fitted preprocessor
+    @classmethod
+    def from_column_transformer(cls, preprocessor):
+        '''
+        This method extracts the parameters of the fitted preprocessor object created by
+        DataTransformation.
+        ================================================================================
+        -------------------
+        Parameters:
+        -------------------
+        preprocessor : ColumnTransformer - This is the fitted preprocessor object.
+
+        -------------------
+        Returns:
+        -------------------
+        compact_preprocessor : CompactPreprocessor - This is the compact preprocessor.
+        ================================================================================
+        '''
+        transformers = {name: (pipeline, cols) for name, pipeline, cols in preprocessor.transformers_}
+        params = {'feature_names': [], 'raw_columns': []}
+        arrays = {}
+
+        # Extracting the scaler arrays
+        num_pipeline, num_cols = transformers['num_pipeline']
+        scaler = num_pipeline.steps[-1][1]
+        params['num'] = {'cols': list(num_cols)}
+        arrays['num/mean'] = np.asarray(scaler.mean_, dtype=np.float64)
+        arrays['num/scale'] = np.asarray(scaler.scale_, dtype=np.float64)
+        params['feature_names'] += [f'num_pipeline__{col}' for col in num_cols]
+
+        # Extracting the categories of the sex feature
+        sex_pipeline, sex_cols = transformers['ohe_sex_pipeline']
+        sex_categories = [str(category) for category in sex_pipeline.steps[-1][1].categories_[0]]
+        params['sex'] = {'col': sex_cols[0], 'categories': sex_categories}
+        params['feature_names'] += [f'ohe_sex_pipeline__{sex_cols[0]}_{category}' for category in sex_categories]
+
+        # Extracting the categories of the capital gain and capital loss indicators
+        cap_pipeline, cap_cols = transformers['ohe_cap_pipeline']
+        cap_encoder = cap_pipeline.steps[-1][1]
+        params['cap'] = {'cols': list(cap_cols), 'categories': []}
+        for col, categories in zip(cap_cols, cap_encoder.categories_):
+            categories = [str(category) for category in categories]
+            params['cap']['categories'].append(categories)
+            params['feature_names'] += [f'ohe_cap_pipeline__{col}-trns_{category}' for category in categories]
+
+        # Extracting the weight of evidence tables
+        woe_pipeline, woe_cols = transformers['woe_pipeline']
+        woe = woe_pipeline.steps[-1][1]
+        params['woe'] = {'cols': list(woe_cols), 'categories': {}}
+        for col in woe_cols:
+            categories, table = cls.extract_woe_table(woe, col)
+            params['woe']['categories'][col] = categories
+            arrays[f'woe/{col}'] = table
+        params['feature_names'] += [f'woe_pipeline__{col}' for col in woe_cols]
+
+        params['raw_columns'] = list(num_cols) + list(sex_cols) + list(cap_cols) + list(woe_cols)
+        return cls(params, arrays)
+
+    # Creating a method to extract the weight of evidence table of a column
+    @staticmethod
+    def extract_woe_table(woe, col):
+        '''
+        This method returns the categories and the weight of evidence table of a column.
+        The table holds one value per category, followed by the value for unknown
+        categories and the value for missing values. Preprocessor objects which still
+        hold a category_encoders WOEEncoder are supported as well.
+        ================================================================================
+        -------------------
+        Parameters:
+        -------------------
+        woe : WOE - This is the fitted weight of evidence encoder.
+        col : str - This is the name of the column.
+
+        -------------------
+        Returns:
+        -------------------
+        categories : list - These are the categories of the column.
+        table : numpy array - This is the weight of evidence table.
+        ================================================================================
+        '''
+        if not hasattr(woe, 'woe_encoder'):
+            categories = [str(category) for category in woe.categories_[col]]
+            return categories, np.asarray(woe.woe_tables_[col], dtype=np.float64)
+
+        encoder = woe.woe_encoder
+        ordinal_mapping = [item for item in encoder.ordinal_encoder.mapping if item['col'] == col][0]['mapping']
+        woe_mapping = encoder.mapping[col]
+        categories = [str(category) for category in ordinal_mapping.index if not pd.isna(category)]
+        values = [woe_mapping.get(ordinal_mapping[category], 0.0) for category in ordinal_mapping.index if not pd.isna(category)]
+        nan_codes = [code for category, code in ordinal_mapping.items() if pd.isna(category)]
+        missing_value = woe_mapping.get(nan_codes[0], 0.0) if nan_codes else 0.0
+        table = np.asarray(values + [woe_mapping.get(-1, 0.0), missing_value], dtype=np.float64)
+        return categories, table
+
+    # Creating a method to look up the weight of evidence of a column
+    def lookup_woe(self, col, values):
+        '''
+        This method returns the weight of evidence of each value in a column using a
+        single gather from the weight of evidence table.
+        '''
+        index = self.woe_index[col]
+        table = self.arrays[f'woe/{col}']
+        codes = index.get_indexer(values)
+        codes = np.where(codes < 0, len(index), codes)
+        codes[pd.isna(values)] = len(index) + 1
+        return table[codes]
+
+    # Creating a method to transform the raw features
+    def transform(self, df):
+        '''
+        This method transforms the raw features into the feature matrix used by the model.
+        ================================================================================
+        -------------------
+        Parameters:
+        -------------------
+        df : pandas dataframe - This is the raw feature set, as created by CustomData.
+
+        -------------------
+        Returns:
+        -------------------
+        X : numpy array - This is the float32 feature matrix.
+        ================================================================================
+        '''
+        X = np.empty((len(df), len(self.feature_names)), dtype=np.float32)
+        pos = 0
+
+        # Scaling the numerical features
+        num_cols = self.params['num']['cols']
+        num_values = df[num_cols].to_numpy(dtype=np.float64)
+        X[:, pos:pos + len(num_cols)] = (num_values - self.arrays['num/mean']) / self.arrays['num/scale']
+        pos += len(num_cols)
+
+        # One hot encoding the sex feature
+        sex_values = np.asarray(df[self.params['sex']['col']].astype(object))
+        sex_categories = self.params['sex']['categories']
+        unknown = ~np.isin(sex_values, sex_categories)
+        if unknown.any():
+            raise ValueError(f'Found unknown categories {set(sex_values[unknown])} in column {self.params["sex"]["col"]}')
+        for category in sex_categories:
+            X[:, pos] = sex_values == category
+            pos += 1
+
+        # One hot encoding the capital gain and capital loss indicators
+        for col, categories in zip(self.params['cap']['cols'], self.params['cap']['categories']):
+            has_capital = df[col].to_numpy() > 0
+            for category in categories:
+                X[:, pos] = has_capital if not category.startswith('no_') else ~has_capital
+                pos += 1
+
+        # Looking up the weight of evidence of the categorical features
+        for col in self.params['woe']['cols']:
+            X[:, pos] = self.lookup_woe(col, np.asarray(df[col].astype(object)))
+            pos += 1
+
+        return X
+
+
+# Creating a class to hold the contents of a model bundle
+class ModelBundle():
+    '''
+    This class holds a loaded model bundle - the booster, the compact preprocessor and
+    the output column schema - and makes predictions on raw features.
+    '''
+    # Creating the constructor for the class
+    def __init__(self, booster, preprocessor, header):
+        '''
+        This is the constructor for the model bundle class.
+        '''
+        self.booster = booster
+        self.preprocessor = preprocessor
+        self.header = header
+        self.feature_names = preprocessor.feature_names
+        self.inplace = booster_name(booster) != 'gblinear'
+
+    # Creating a method to make predictions on raw features
+    def predict(self, df, iteration_range=None):
+        '''
+        This method transforms the raw features and returns the predicted probabilities.
+        ================================================================================
+        -------------------
+        Parameters:
+        -------------------
+        df : pandas dataframe - This is the raw feature set.
+        iteration_range : tuple - This is the range of boosting rounds to use. If not
+        given, every round is used.
+
+        -------------------
+        Returns:
+        -------------------
+        preds : numpy array - These are the predicted probabilities.
+        ================================================================================
+        '''
+        X = self.preprocessor.transform(df)
+        return predict_matrix(self.booster, X, iteration_range=iteration_range, inplace=self.inplace)
+
+
+# Creating a function to save a model bundle
+def save_model_bundle(file_path:str, preprocessor, booster):
+    '''
+    This function saves the fitted preprocessor and the trained booster into a single
+    versioned bundle file. The file holds a json header, the numeric arrays of the
+    preprocessor aligned for memory mapping, and the booster in the UBJSON format. A
+    sha256 checksum of the header and the data section is stored before the header, so
+    that a corrupted header is detected as well as corrupted data.
+    ========================================================================================
+    ---------------------
+    Parameters:
+    ---------------------
+    file_path : str - This is the path to the bundle file.
+    preprocessor : ColumnTransformer or CompactPreprocessor - This is the fitted preprocessor.
+    booster : xgboost.core.Booster - This is the trained booster.
+    =========================================================================================
+    '''
+    try:
+        if not isinstance(preprocessor, CompactPreprocessor):
+            preprocessor = CompactPreprocessor.from_column_transformer(preprocessor)
+
+        # Laying out the arrays and the booster in the data section
+        data = bytearray()
+        array_specs = {}
+        for name, array in preprocessor.arrays.items():
+            array = np.ascontiguousarray(array)
+            data += b'\0' * (-len(data) % BUNDLE_ALIGNMENT)
+            array_specs[name] = {'offset': len(data), 'dtype': array.dtype.str, 'shape': list(array.shape)}
+            data += array.tobytes()
+        booster_raw = booster.save_raw(raw_format='ubj')
+        data += b'\0' * (-len(data) % BUNDLE_ALIGNMENT)
+        booster_spec = {'offset': len(data), 'length': len(booster_raw), 'format': 'ubj'}
+        data += booster_raw
+
+        header = {
+            'format_version': BUNDLE_VERSION,
+            'created': datetime.datetime.now().isoformat(),
+            'xgboost_version': xgb.__version__,
+            'feature_names': preprocessor.feature_names,
+            'preprocessor': preprocessor.params,
+            'arrays': array_specs,
+            'booster': booster_spec
+        }
+        header_bytes = json.dumps(header).encode('utf-8')
+        prefix_length = len(BUNDLE_MAGIC) + 12 + 32 + len(header_bytes)
+        header_bytes += b' ' * (-prefix_length % BUNDLE_ALIGNMENT)
+        checksum = hashlib.sha256(header_bytes)
+        checksum.update(data)
+
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, 'wb') as file_obj:
+            file_obj.write(BUNDLE_MAGIC)
+            file_obj.write(struct.pack('<IQ', BUNDLE_VERSION, len(header_bytes)))
+            file_obj.write(checksum.digest())
+            file_obj.write(header_bytes)
+            file_obj.write(data)
+
+        logging.info(f'The model bundle has been saved to {file_path}.')
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+# Creating a function to load a model bundle
+def load_model_bundle(file_path:str, verify:bool=True):
+    '''
+    This function loads a model bundle. The numeric arrays are memory mapped and the
+    booster is loaded from its UBJSON bytes, so no code is executed while loading.
+    ========================================================================================
+    ---------------------
+    Parameters:
+    ---------------------
+    file_path : str - This is the path to the bundle file.
+    verify : bool - This determines if the checksum of the data section is verified.
+
+    ---------------------
+    Returns:
+    ---------------------
+    bundle : ModelBundle - This is the loaded model bundle.
+    =========================================================================================
+    '''
+    try:
+        with open(file_path, 'rb') as file_obj:
+            if file_obj.read(len(BUNDLE_MAGIC)) != BUNDLE_MAGIC:
+                raise ValueError(f'{file_path} is not a model bundle.')
+            version, header_length = struct.unpack('<IQ', file_obj.read(12))
+            if version > BUNDLE_VERSION:
+                raise ValueError(f'The model bundle version {version} is not supported.')
+            checksum = file_obj.read(32) if version >= 2 else None
+            header_start = file_obj.tell()
+            header = json.loads(file_obj.read(header_length).decode('utf-8'))
+            data_start = file_obj.tell()
+            mapped = mmap.mmap(file_obj.fileno(), 0, access=mmap.ACCESS_READ)
+
+        # Bundles of version 1 only hold the checksum of the data section in the header
+        data = memoryview(mapped)[data_start:]
+        if verify:
+            if checksum is not None:
+                matches = hashlib.sha256(memoryview(mapped)[header_start:]).digest() == checksum
+            else:
+                matches = hashlib.sha256(data).hexdigest() == header['checksum']
+            if not matches:
+                raise ValueError(f'The checksum of the model bundle {file_path} does not match.')
+
+        # Mapping the arrays directly from the file
+        arrays = {}
+        for name, spec in header['arrays'].items():
+            dtype = np.dtype(spec['dtype'])
+            count = int(np.prod(spec['shape']))
+            arrays[name] = np.frombuffer(data, dtype=dtype, count=count, offset=spec['offset']).reshape(spec['shape'])
+
+        booster_spec = header['booster']
+        booster = xgb.Booster()
+        booster.load_model(bytearray(data[booster_spec['offset']:booster_spec['offset'] + booster_spec['length']]))
+
+        preprocessor = CompactPreprocessor(header['preprocessor'], arrays)
+        return ModelBundle(booster, preprocessor, header)
+
+    except Exception as e:
+        raise CustomException(e, sys)
@@ -0,0 +1,372 @@
+# Importing packages
+import os
+import re
+import sys
+import json
+import datetime
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from src.components.config_entity import StoreFeatureConfig
+from src.components.config_entity import ModelTrainerConfig
+from src.components.config_entity import ModelEvaluationConfig
+from src.components.model_bundle import load_model_bundle
+from src.components.model_bundle import booster_name
+from src.components.model_bundle import predict_matrix
+from src.components.store_features import FeatureStoreCreation
+from src.exception import CustomException
+from src.logger import logging
+
+# Holding the groupings of the test set in a worker process. They are set once per worker by the
+# initializer and reused for every block of replicates.
+_WORKER = {}
+
+# Naming the metrics computed for every replicate, in the order they are returned
+METRIC_NAMES = ('roc_auc', 'log_loss', 'calibration_error')
+
+
+# Creating a function to prepare the layout of a set of predictions
+def prepare_layout(y_true, y_prob, n_bins:int):
+    '''
+    This function sorts the distinct scores once and assigns each row to a cell - the
+    group of rows with the same score and target. A bootstrap replicate is then the
+    number of draws of each cell, so no replicate needs to be sorted, and the metrics
+    only touch the distinct scores rather than every row.
+    ========================================================================================
+    ---------------------
+    Parameters:
+    ---------------------
+    y_true : numpy array - This is the target.
+    y_prob : numpy array - These are the predicted probabilities.
+    n_bins : int - This is the number of equal width calibration bins.
+
+    ---------------------
+    Returns:
+    ---------------------
+    layout : dict - These are the cell of each row, the log loss and the residual of each
+    cell and the first score of each calibration bin.
+    =========================================================================================
+    '''
+    y_true = np.asarray(y_true).astype(np.int64)
+    scores, groups = np.unique(np.asarray(y_prob, dtype=np.float64), return_inverse=True)
+    n_scores = len(scores)
+    # The cells of the negatives come first and the cells of the positives second
+    cell_prob = np.concatenate([scores, scores])
+    cell_target = np.repeat([0.0, 1.0], n_scores)
+    clipped = np.clip(cell_prob, 1e-15, 1 - 1e-15)
+    bin_starts = np.searchsorted(scores, np.linspace(0, 1, n_bins + 1)[:-1], side='left')
+    bin_starts = np.unique(bin_starts[bin_starts < n_scores])
+    return {
+        'cells': groups.ravel() + n_scores * y_true,
+        'n_cells': 2 * n_scores,
+        'log_loss': -(cell_target * np.log(clipped) + (1 - cell_target) * np.log(1 - clipped)),
+        'residual': cell_target - cell_prob,
+        'bin_starts': np.concatenate([bin_starts, n_scores + bin_starts])
+    }
+
+
+# Creating a function to compute the metrics of a block of replicates
+def count_metrics(layout, C):
+    '''
+    This function computes the roc auc score, the log loss and the expected calibration
+    error of each row of a matrix of cell counts. The roc auc score is computed from the
+    cumulative negatives in the sorted order of the scores, with ties counted as one
+    half.
+    ========================================================================================
+    ---------------------
+    Parameters:
+    ---------------------
+    layout : dict - This is the layout returned by prepare_layout.
+    C : numpy array - These are the cell counts, with one row per replicate.
+
+    ---------------------
+    Returns:
+    ---------------------
+    metrics : numpy array - These are the metrics, with one row per replicate and one
+    column per metric in METRIC_NAMES.
+    =========================================================================================
+    '''
+    if layout['n_cells'] == 0:
+        return np.full((C.shape[0], len(METRIC_NAMES)), np.nan)
+    n_scores = layout['n_cells'] // 2
+    negatives, positives = C[:, :n_scores], C[:, n_scores:]
+    n_neg, n_pos = negatives.sum(axis=1), positives.sum(axis=1)
+    total = n_neg + n_pos
+    # Each positive ranks above the negatives with a lower score and ties with the
+    # negatives with the same score
+    correct_pairs = (
+        np.einsum('ij,ij->i', positives, np.cumsum(negatives, axis=1))
+        - 0.5 * np.einsum('ij,ij->i', positives, negatives)
+    )
+    bin_residuals = np.add.reduceat(C * layout['residual'], layout['bin_starts'], axis=1)
+    n_bins = bin_residuals.shape[1] // 2
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        roc_auc = correct_pairs / (n_pos * n_neg)
+        log_loss = (C @ layout['log_loss']) / total
+        calibration_error = np.abs(bin_residuals[:, :n_bins] + bin_residuals[:, n_bins:]).sum(axis=1) / total
+    return np.column_stack([roc_auc, log_loss, calibration_error])
+
+
+# Creating a function to initialize a worker process
+def _init_worker(groupings):
+    '''
+    This function keeps the groupings of the test set, once per worker process.
+    '''
+    _WORKER['groupings'] = groupings
+
+
+# Creating a function to evaluate a block of bootstrap replicates
+def _bootstrap_block(n_replicates:int, seed):
+    '''
+    This function draws a matrix of row indices, one row per replicate. For each
+    grouping of the test set, the drawn rows are mapped to the cells of their segments
+    and counted with a single bincount, and the metrics of every segment are computed
+    from its columns of the counts.
+    '''
+    groupings = _WORKER['groupings']
+    n_rows = len(groupings[0]['cells'])
+    rng = np.random.default_rng(seed)
+    indices = rng.integers(0, n_rows, size=(n_replicates, n_rows), dtype=np.int64 if n_rows > 2**31 - 1 else np.int32)
+    results = {}
+    for grouping in groupings:
+        n_cells = grouping['n_cells']
+        cells = grouping['cells'][indices]
+        cells += (np.arange(n_replicates) * n_cells)[:, None]
+        C = np.bincount(cells.ravel(), minlength=n_replicates * n_cells).reshape(n_replicates, n_cells).astype(np.float64)
+        del cells
+        for key, start, layout in grouping['segments']:
+            results[key] = count_metrics(layout, C[:, start:start + layout['n_cells']])
+    return results
+
+
+# Creating a class to evaluate the trained model with bootstrap confidence intervals
+class ModelEvaluation():
+    '''
+    This class scores the test set of the feature store once and computes bootstrap
+    confidence intervals of the roc auc score, the log loss and the expected calibration
+    error, for the whole test set and for the segments of the sex, race and workclass
+    features. The distinct scores are sorted once, every block of replicates is drawn as
+    a matrix of row indices, and the blocks are evaluated in parallel by a pool of worker
+    processes.
+    '''
+    # Creating the constructor for the class
+    def __init__(self, n_bootstrap:int=None, n_workers:int=None):
+        '''
+        This is the constructor for the model evaluation class. The settings which are
+        not given are taken from the model evaluation config.
+        '''
+        self.evaluation_config = ModelEvaluationConfig()
+        self.n_bootstrap = n_bootstrap if n_bootstrap is not None else self.evaluation_config.n_bootstrap
+        self.n_workers = n_workers or self.evaluation_config.n_workers or os.cpu_count()
+
+    # Creating a method to prepare the groupings of the test set
+    def create_groupings(self, y_true, y_prob, segments):
+        '''
+        This method prepares the layout of the whole test set and of every segment. The
+        segments of a feature do not overlap, so their cells are numbered one after the
+        other and a single cell array maps each row to the cell of its segment.
+        ================================================================================
+        -------------------
+        Parameters:
+        -------------------
+        y_true : numpy array - This is the target.
+        y_prob : numpy array - These are the predicted probabilities.
+        segments : dict - This maps the name of a feature to the category of each row.
+
+        -------------------
+        Returns:
+        -------------------
+        groupings : list - These are the cell array, the number of cells and the
+        segments of the test set and of each feature.
+        ================================================================================
+        '''
+        n_bins = self.evaluation_config.n_calibration_bins
+        layout = prepare_layout(y_true, y_prob, n_bins)
+        groupings = [{'cells': layout['cells'], 'n_cells': layout['n_cells'], 'segments': [('overall', 0, layout)]}]
+        for col, labels in segments.items():
+            labels = np.asarray(labels)
+            cells = np.empty(len(labels), dtype=np.int64)
+            grouping = {'cells': cells, 'n_cells': 0, 'segments': []}
+            for label in sorted(set(labels.tolist())):
+                mask = labels == label
+                layout = prepare_layout(y_true[mask], y_prob[mask], n_bins)
+                cells[mask] = grouping['n_cells'] + layout['cells']
+                grouping['segments'].append((f'{col}={label}', grouping['n_cells'], layout))
+                grouping['n_cells'] += layout['n_cells']
+            groupings.append(grouping)
+        return groupings
+
+    # Creating a method to run the bootstrap
+    def bootstrap(self, groupings):
+        '''
+        This method evaluates the replicates in blocks, sized to fit the memory limit of
+        a block. Each block has its own seed, spawned from the configured seed, so the
+        results do not depend on the number of workers.
+        ================================================================================
+        -------------------
+        Parameters:
+        -------------------
+        groupings : list - These are the groupings returned by create_groupings.
+
+        -------------------
+        Returns:
+        -------------------
+        replicates : dict - These are the metrics of every replicate, for the test set
+        and each segment.
+        ================================================================================
+        '''
+        n_rows = len(groupings[0]['cells'])
+        # The index matrix and the mapped cells take about 16 bytes per drawn row
+        block_size = max(1, min(self.n_bootstrap, self.evaluation_config.max_block_bytes // max(16 * n_rows, 1)))
+        sizes = [min(block_size, self.n_bootstrap - start) for start in range(0, self.n_bootstrap, block_size)]
+        seeds = np.random.SeedSequence(self.evaluation_config.seed).spawn(len(sizes))
+        n_workers = min(self.n_workers, len(sizes))
+        logging.info(f'Evaluating {self.n_bootstrap} bootstrap replicates of {n_rows} rows in {len(sizes)} blocks using {n_workers} workers.')
+
+        if n_workers <= 1:
+            _init_worker(groupings)
+            try:
+                blocks = [_bootstrap_block(size, seed) for size, seed in zip(sizes, seeds)]
+            finally:
+                _WORKER.clear()
+        else:
+            with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker, initargs=(groupings,)) as executor:
+                futures = [executor.submit(_bootstrap_block, size, seed) for size, seed in zip(sizes, seeds)]
+                blocks = [future.result() for future in futures]
+        return {key: np.vstack([block[key] for block in blocks]) for key in blocks[0]}
+
+    # Creating a method to summarize the replicates of a metric
+    def summarize(self, estimate, replicates):
+        '''
+        This method returns the point estimate, the percentile confidence interval and
+        the standard error of a metric. Replicates without both classes are ignored.
+        '''
+        alpha = 1 - self.evaluation_config.confidence
+        valid = replicates[~np.isnan(replicates)]
+        if len(valid) == 0:
+            return {'estimate': None if np.isnan(estimate) else float(estimate), 'lower': None, 'upper': None, 'std': None}
+        lower, upper = np.quantile(valid, [alpha / 2, 1 - alpha / 2])
+        return {
+            'estimate': None if np.isnan(estimate) else float(estimate),
+            'lower': float(lower),
+            'upper': float(upper),
+            'std': float(valid.std(ddof=1)) if len(valid) > 1 else 0.0
+        }
+
+    # Creating a method to evaluate a set of predictions
+    def evaluate(self, y_true, y_prob, segments=None):
+        '''
+        This method computes the metrics and their bootstrap confidence intervals for a
+        set of predictions and its segments.
+        ================================================================================
+        -------------------
+        Parameters:
+        -------------------
+        y_true : numpy array - This is the target.
+        y_prob : numpy array - These are the predicted probabilities.
+        segments : dict - This maps the name of a feature to the category of each row.
+
+        -------------------
+        Returns:
+        -------------------
+        report : dict - These are the metrics of the test set and of each segment.
+        ================================================================================
+        '''
+        try:
+            y_true = np.asarray(y_true).astype(np.int64).ravel()
+            y_prob = np.asarray(y_prob, dtype=np.float64).ravel()
+            groupings = self.create_groupings(y_true, y_prob, segments or {})
+            replicates = self.bootstrap(groupings)
+
+            results = {}
+            for grouping in groupings:
+                counts = np.bincount(grouping['cells'], minlength=grouping['n_cells']).astype(np.float64)
+                for key, start, layout in grouping['segments']:
+                    C = counts[None, start:start + layout['n_cells']]
+                    estimates = count_metrics(layout, C)[0]
+                    results[key] = {
+                        'count': int(C.sum()),
+                        'positive_rate': float(C[0, layout['n_cells'] // 2:].sum() / C.sum()) if C.sum() else None,
+                        **{
+                            name: self.summarize(estimates[i], replicates[key][:, i])
+                            for i, name in enumerate(METRIC_NAMES)
+                        }
+                    }
+
+            report = {
+                'created': datetime.datetime.now().isoformat(),
+                'n_rows': len(y_true),
+                'n_bootstrap': self.n_bootstrap,
+                'confidence': self.evaluation_config.confidence,
+                'overall': results.pop('overall'),
+                'segments': {}
+            }
+            for key, result in results.items():
+                col, label = key.split('=', 1)
+                report['segments'].setdefault(col, {})[label] = result
+            return report
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    # Creating a method to evaluate the trained model on the test set
+    def initiate_model_evaluation(self, booster=None, save_report:bool=True):
+        '''
+        This method scores the test set of the feature store once, evaluates the
+        predictions and saves the report.
+        ================================================================================
+        -------------------
+        Parameters:
+        -------------------
+        booster : xgboost Booster - This is the trained model. If not given, the model
+        is loaded from the model bundle.
+        save_report : bool - This determines if the report should be saved or not.
+
+        -------------------
+        Returns:
+        -------------------
+        report : dict - These are the metrics of the test set and of each segment.
+        ================================================================================
+        '''
+        try:
+            if booster is None:
+                booster = load_model_bundle(ModelTrainerConfig().model_path).booster
+            X_test, y_test = FeatureStoreCreation().read_features_target(StoreFeatureConfig().xform_test_path)
+            y_prob = predict_matrix(booster, X_test, inplace=booster_name(booster) != 'gblinear')
+
+            # Segmenting the rows by the raw values stored next to the test dataset
+            segments = FeatureStoreCreation().read_segments(self.evaluation_config.segment_cols)
+            if any(len(labels) != len(y_prob) for labels in segments.values()):
+                raise ValueError('The stored segments do not match the rows of the test dataset.')
+            report = self.evaluate(y_test.to_numpy().ravel(), y_prob, segments)
+
+            if save_report:
+                os.makedirs(os.path.dirname(self.evaluation_config.report_path) or '.', exist_ok=True)
+                with open(self.evaluation_config.report_path, 'w') as file_obj:
+                    json.dump(report, file_obj, indent=2)
+            logging.info(f"The test roc auc score is {report['overall']['roc_auc']['estimate']:.4f}.")
+            return report
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    # Creating a method to flatten the report into metrics
+    @staticmethod
+    def flatten_report(report):
+        '''
+        This method flattens the report into a dictionary of metric names and values,
+        which can be logged to mlflow.
+        '''
+        metrics = {}
+        groups = [('', report['overall'])] + [
+            (f'{col}_{label}_', result)
+            for col, labels in report['segments'].items()
+            for label, result in labels.items()
+        ]
+        for prefix, result in groups:
+            for name in METRIC_NAMES:
+                for stat, value in result[name].items():
+                    if value is not None:
+                        key = f'eval_{prefix}{name}' if stat == 'estimate' else f'eval_{prefix}{name}_{stat}'
+                        metrics[re.sub(r'[^\w\-./ ]', '_', key)] = value
+        return metrics
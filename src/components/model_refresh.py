@@ -0,0 +1,220 @@
+# Importing packages
+import os
+import sys
+import pandas as pd
+import mlflow
+import dagshub
+import xgboost as xgb
+from mlflow import MlflowClient
+from sklearn import set_config
+set_config(transform_output='pandas')
+from sklearn.model_selection import train_test_split
+from sklearn.metrics import roc_auc_score
+from src.utils import load_object
+from src.utils import load_run_params
+from src.utils import read_json_file
+from src.utils import remove_blank_spaces
+from src.utils import recode_target_class
+from src.utils import make_predictions
+from src.utils import read_categorical_parquet
+from src.utils import apply_vocabulary
+from src.components.config_entity import DataTransformationConfig
+from src.components.config_entity import StoreFeatureConfig
+from src.components.config_entity import ModelRefreshConfig
+from src.components.store_features import FeatureStoreCreation
+from src.exception import CustomException
+from src.logger import logging
+
+
+# Creating a class to refresh the trained model using newly ingested data
+class ModelRefresh():
+    '''
+    This class refreshes the active model from the model registry by continuing the
+    boosting process on newly ingested data. The refreshed model is validated on a
+    holdout set and is only accepted if the roc auc score holds.
+    '''
+    # Creating the constructor for the class
+    def __init__(self):
+        '''
+        This is the constructor for the model refresh class. It instantiates the path
+        to the preprocessor object, the feature store and the refresh settings.
+        '''
+        self.preprocessor_path = DataTransformationConfig()
+        self.data_path = StoreFeatureConfig()
+        self.refresh_config = ModelRefreshConfig()
+        self.model_uri = 'https://dagshub.com/abbeymaj/my-first-repo.mlflow'
+
+    # Creating a method to retrieve the active model from the model registry
+    def retrieve_active_model(self):
+        '''
+        This method retrieves the active booster from the model registry along with the
+        hyperparameters that were logged when the booster was trained.
+        ===================================================================================
+        ----------------
+        Returns:
+        ----------------
+        booster : xgboost.core.Booster - This is the active model from the model registry.
+        params : dict - This is the hyperparameters used to train the active model.
+        runs_data : dict - This is the run parameters of the active model.
+        ===================================================================================
+        '''
+        try:
+            # Initializing the dagshub connection to the model registry
+            dagshub.init(repo_owner='abbeymaj', repo_name='my-first-repo', mlflow=True)
+            mlflow.set_tracking_uri(self.model_uri)
+
+            # Reading the run parameters of the latest model
+            runs_data = read_json_file(load_run_params())
+
+            # Fetching the booster and the logged hyperparameters
+            booster = mlflow.xgboost.load_model(runs_data['model_uri'])
+            logged_params = MlflowClient().get_run(runs_data['run_id']).data.params
+            params = self.parse_params(logged_params)
+
+            return booster, params, runs_data
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    # Creating a method to convert the logged hyperparameters back into their types
+    @staticmethod
+    def parse_params(logged_params):
+        '''
+        This method converts the hyperparameters logged in MLflow, which are stored as
+        strings, back into numbers where possible and adds the fixed training parameters.
+        ===================================================================================
+        ----------------
+        Parameters:
+        ----------------
+        logged_params : dict - This is the dictionary of logged hyperparameters.
+
+        ----------------
+        Returns:
+        ----------------
+        params : dict - This is the dictionary of hyperparameters for xgboost.
+        ===================================================================================
+        '''
+        params = {
+            'verbosity': 0,
+            'eval_metric': 'auc',
+            'objective': 'binary:logistic'
+        }
+        for key, value in logged_params.items():
+            try:
+                params[key] = int(value)
+            except ValueError:
+                try:
+                    params[key] = float(value)
+                except ValueError:
+                    params[key] = value
+        return params
+
+    # Creating a method to transform the newly ingested data
+    def create_refresh_datasets(self, new_data_path=None):
+        '''
+        This method reads the newly ingested data and transforms it using the saved
+        preprocessor object. The preprocessor is not refit.
+        ===================================================================================
+        ----------------
+        Parameters:
+        ----------------
+        new_data_path : str - This is the path to the newly ingested data. If not given,
+        the path from the refresh config is used.
+
+        ----------------
+        Returns:
+        ----------------
+        X_new : pandas dataframe - The transformed feature set of the new data.
+        y_new : pandas dataframe - The target set of the new data.
+        ===================================================================================
+        '''
+        try:
+            if new_data_path is None:
+                new_data_path = self.refresh_config.new_data_path
+
+            # Reading and cleaning the new data
+            new_df = read_categorical_parquet(new_data_path)
+            if 'fnlwgt' in list(new_df.columns):
+                new_df.drop(labels=['fnlwgt'], axis=1, inplace=True)
+            new_df_clean = new_df.pipe(remove_blank_spaces).pipe(recode_target_class)
+            if os.path.exists(self.preprocessor_path.vocabulary_path):
+                vocabulary = read_json_file(self.preprocessor_path.vocabulary_path)
+                new_df_clean = apply_vocabulary(new_df_clean, vocabulary)
+
+            # Transforming the features using the saved preprocessor object
+            preprocessor = load_object(file_path=self.preprocessor_path.preprocessor_obj_path)
+            X_new = preprocessor.transform(new_df_clean.drop(labels=['target_class'], axis=1))
+            y_new = new_df_clean[['target_class']].reset_index(drop=True)
+            X_new = X_new.reset_index(drop=True)
+
+            return X_new, y_new
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    # Creating a method to continue boosting the active model on the new data
+    def refresh_model(self, booster, params, X_new, y_new):
+        '''
+        This method appends trees to the active booster using the new data. A part of the
+        new data, together with the test set in the feature store, is held out to compare
+        the active and the refreshed booster.
+        ===================================================================================
+        ----------------
+        Parameters:
+        ----------------
+        booster : xgboost.core.Booster - This is the active model.
+        params : dict - This is the hyperparameters of the active model.
+        X_new : pandas dataframe - The transformed feature set of the new data.
+        y_new : pandas dataframe - The target set of the new data.
+
+        ----------------
+        Returns:
+        ----------------
+        refreshed_booster : xgboost.core.Booster - This is the refreshed model.
+        base_auc : float - The roc auc score of the active model on the holdout set.
+        refreshed_auc : float - The roc auc score of the refreshed model on the holdout set.
+        accepted : bool - This is True if the refreshed model should be registered.
+        ===================================================================================
+        '''
+        try:
+            logging.info('Refreshing the active model with the newly ingested data.')
+
+            # Splitting the new data into a train set and a holdout set
+            X_trn, X_hold, y_trn, y_hold = train_test_split(
+                X_new,
+                y_new,
+                test_size=self.refresh_config.holdout_size,
+                random_state=self.refresh_config.seed,
+                stratify=y_new
+            )
+
+            # Adding the test set from the feature store to the holdout set
+            X_test, y_test = FeatureStoreCreation().read_features_target(self.data_path.xform_test_path)
+            X_hold = pd.concat([X_hold, X_test], axis=0)
+            y_hold = pd.concat([y_hold, y_test], axis=0)
+
+            # Continuing the boosting process from the active booster
+            dtrain = xgb.DMatrix(X_trn, label=y_trn)
+            refreshed_booster = xgb.train(
+                params,
+                dtrain,
+                num_boost_round=self.refresh_config.num_boost_round,
+                xgb_model=booster
+            )
+
+            # Comparing the active and the refreshed booster on the holdout set
+            base_auc = float(roc_auc_score(y_hold, make_predictions(X_hold, booster)))
+            refreshed_auc = float(roc_auc_score(y_hold, make_predictions(X_hold, refreshed_booster)))
+            accepted = refreshed_auc >= base_auc - self.refresh_config.auc_tolerance
+
+            logging.info(f'Holdout roc auc score - active: {base_auc}, refreshed: {refreshed_auc}.')
+
+            return (
+                refreshed_booster,
+                base_auc,
+                refreshed_auc,
+                accepted
+            )
+
+        except Exception as e:
+            raise CustomException(e, sys)
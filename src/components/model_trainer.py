@@ -1,15 +1,24 @@
 # Importing packages
+import os
 import sys
 import pandas as pd
 from sklearn import set_config
 set_config(transform_output='pandas')
 from src.utils import best_model_callback
-from src.utils import save_object
+from src.utils import load_object
 from src.utils import make_predictions
 from src.components.config_entity import DataTransformationConfig
 from src.components.config_entity import StoreFeatureConfig
 from src.components.config_entity import ModelTrainerConfig
+from src.components.config_entity import TuningConfig
 from src.components.find_best_model import FindBestModel
+from src.components.fold_cache import FoldCache
+from src.components.tuning_telemetry import TuningTelemetry
+from src.components.store_features import FeatureStoreCreation
+from src.components.model_bundle import save_model_bundle
+from src.components.model_bundle import booster_name
+from src.components.fused_model import compile_fused_model
+from src.components.drift_monitor import DriftBaseline
 from src.exception import CustomException
 from src.logger import logging
 from sklearn.metrics import roc_auc_score
@@ -33,6 +42,8 @@ class ModelTrainer():
         self.preprocessor_path = DataTransformationConfig()
         # Instantiating the path to the feature store
         self.data_path = StoreFeatureConfig()
+        # Instantiating the pareto front of a latency aware search
+        self.pareto_front = None
     
     # Creating a method to define the feature and target datasets
     def create_feature_target_datasets(self):
@@ -49,17 +60,10 @@ class ModelTrainer():
         =============================================================================
         '''
         try:
-            # Reading the train and test datasets
-            train_data_set = pd.read_parquet(self.data_path.xform_train_path)
-            test_data_set = pd.read_parquet(self.data_path.xform_test_path)
-            
-            # Creating the train feature and target sets
-            X_train = train_data_set.copy().drop(columns=['target_class'], axis=1)
-            y_train = train_data_set[['target_class']]
-            
-            # Creating the test feature and target sets
-            X_test = test_data_set.copy().drop(columns=['target_class'], axis=1)
-            y_test = test_data_set[['target_class']]
+            # Reading the train and test feature and target sets from the feature store
+            feature_store = FeatureStoreCreation()
+            X_train, y_train = feature_store.read_features_target(self.data_path.xform_train_path)
+            X_test, y_test = feature_store.read_features_target(self.data_path.xform_test_path)
             
             return (
                 X_train,
@@ -72,15 +76,19 @@ class ModelTrainer():
             raise CustomException(e, sys)
     
     # Creating the method to initiate the model training process
-    def initiate_model_training(self, save_model=True):
+    def initiate_model_training(self, save_model=True, latency_slo_ms=None):
         '''
         This method trains the model and then saves the trained model to the artifacts
-        folder.
+        folder. If a latency service level objective is set, the most accurate model
+        within the objective is picked from the pareto front of the search, which is
+        kept in the pareto_front attribute.
         ===================================================================================
         ------------------------
         Parameters:
         ------------------------
         save_model : bool - This determines if the model should be saved or not.
+        latency_slo_ms : float - This is the latency objective in milliseconds per row.
+        If not given, the objective from the tuning config is used.
         
         ------------------------
         Returns:
@@ -98,18 +106,30 @@ class ModelTrainer():
             model = FindBestModel(
                 train_set=X_train,
                 target_set=y_train,
-                model_callback=best_model_callback
+                model_callback=best_model_callback,
+                fold_cache=FoldCache(),
+                telemetry=TuningTelemetry(),
+                latency_slo_ms=latency_slo_ms if latency_slo_ms is not None else TuningConfig().latency_slo_ms
             )
             
             # Getting the best model and the best hyperparameters
             best_model, best_params = model.create_study()
+            self.pareto_front = model.pareto_front
             
-            # Saving the best model
+            # Saving the best model together with the fitted preprocessor as a bundle
             if save_model is True:
-                save_object(
+                preprocessor = load_object(file_path=self.preprocessor_path.preprocessor_obj_path)
+                save_model_bundle(
                     file_path=self.trained_model_path.model_path,
-                    object=best_model
+                    preprocessor=preprocessor,
+                    booster=best_model
                 )
+                # Compiling the preprocessing into the trees of a tree booster. The fused
+                # model of an earlier tree booster is removed if a linear booster is picked
+                if booster_name(best_model) != 'gblinear':
+                    compile_fused_model(preprocessor, best_model).save(self.trained_model_path.fused_model_path)
+                elif os.path.exists(self.trained_model_path.fused_model_path):
+                    os.remove(self.trained_model_path.fused_model_path)
             
             # Making predictions using the test set
             y_preds = make_predictions(
@@ -117,6 +137,10 @@ class ModelTrainer():
                 model=best_model
             )
             
+            # Saving the histogram of the test scores as the baseline of the drift monitor
+            if save_model is True:
+                DriftBaseline().initiate_score_baseline(y_preds)
+            
             # Calculating the roc auc score
             metric = roc_auc_score(y_test, y_preds)
             
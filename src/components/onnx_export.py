@@ -0,0 +1,391 @@
+# Importing packages
+import os
+import sys
+import json
+import time
+import datetime
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+import onnx
+import onnxruntime as ort
+from onnx import helper
+from onnx import numpy_helper
+from onnx import TensorProto
+from src.components.config_entity import OnnxConfig
+from src.components.model_bundle import CompactPreprocessor
+from src.components.fused_model import read_booster_model
+from src.exception import CustomException
+from src.logger import logging
+
+# Defining the opsets of the exported graph
+ONNX_OPSET = 17
+ONNX_ML_OPSET = 3
+
+
+# Creating a class to build the onnx graph of the preprocessor and the booster
+class OnnxGraphBuilder():
+    '''
+    This class builds a single onnx graph which takes the raw features, one input per
+    raw column, and returns the predicted probabilities. The numerical columns are
+    scaled in double precision, as the scaler does, the categorical columns are mapped
+    to their codes with label encoders and the trees of the booster become a tree
+    ensemble node.
+    '''
+    # Creating the constructor for the class
+    def __init__(self, preprocessor, booster):
+        '''
+        This is the constructor for the onnx graph builder class.
+        '''
+        if not isinstance(preprocessor, CompactPreprocessor):
+            preprocessor = CompactPreprocessor.from_column_transformer(preprocessor)
+        self.preprocessor = preprocessor
+        self.booster = booster
+        self.inputs, self.nodes, self.initializers = [], [], []
+
+    # Creating a method to add a constant to the graph
+    def constant(self, name:str, array):
+        '''
+        This method adds a constant array to the graph and returns its name.
+        '''
+        self.initializers.append(numpy_helper.from_array(np.asarray(array), name=name))
+        return name
+
+    # Creating a method to add a node to the graph
+    def node(self, op_type:str, inputs, output:str, domain:str='', **attributes):
+        '''
+        This method adds a node with a single output to the graph and returns the name of
+        its output.
+        '''
+        self.nodes.append(helper.make_node(op_type, inputs, [output], name=output, domain=domain, **attributes))
+        return output
+
+    # Creating a method to add a raw input to the graph
+    def raw_input(self, col:str, elem_type):
+        '''
+        This method adds an input of shape (rows, 1) for a raw column and returns its name.
+        '''
+        self.inputs.append(helper.make_tensor_value_info(col, elem_type, [None, 1]))
+        return col
+
+    # Creating a method to map a categorical column to its codes
+    def label_encode(self, col:str, categories, unknown_code:int, missing_code:int):
+        '''
+        This method maps the categories of a column to their codes. Missing values are fed
+        as empty strings.
+        '''
+        return self.node(
+            'LabelEncoder', [self.raw_input(col, TensorProto.STRING)], f'{col}_codes', domain='ai.onnx.ml',
+            keys_strings=list(categories) + [''],
+            values_int64s=list(range(len(categories))) + [missing_code],
+            default_int64=unknown_code
+        )
+
+    # Creating a method to build the preprocessing nodes
+    def build_features(self):
+        '''
+        This method adds the preprocessing nodes and returns the name of the float32
+        feature matrix, whose columns are in the same order as the preprocessor output.
+        '''
+        params, arrays = self.preprocessor.params, self.preprocessor.arrays
+        columns = []
+
+        # Scaling the numerical features in double precision
+        num_inputs = [self.raw_input(col, TensorProto.DOUBLE) for col in params['num']['cols']]
+        num = self.node('Concat', num_inputs, 'num_values', axis=1)
+        num = self.node('Sub', [num, self.constant('num_mean', arrays['num/mean'])], 'num_centered')
+        num = self.node('Div', [num, self.constant('num_scale', arrays['num/scale'])], 'num_scaled')
+        columns.append(self.node('Cast', [num], 'num_features', to=TensorProto.FLOAT))
+
+        # One hot encoding the sex feature. Unknown categories get no indicator.
+        sex_col, sex_categories = params['sex']['col'], params['sex']['categories']
+        sex_codes = self.label_encode(sex_col, sex_categories, unknown_code=-1, missing_code=-1)
+        sex = self.node('Equal', [sex_codes, self.constant('sex_range', np.arange(len(sex_categories), dtype=np.int64)[None, :])], 'sex_onehot')
+        columns.append(self.node('Cast', [sex], 'sex_features', to=TensorProto.FLOAT))
+
+        # One hot encoding the capital gain and capital loss indicators
+        zero = self.constant('zero', np.zeros((1, 1), dtype=np.float64))
+        for col, categories in zip(params['cap']['cols'], params['cap']['categories']):
+            has_capital = self.node('Greater', [self.raw_input(col, TensorProto.DOUBLE), zero], f'{col}_has')
+            no_capital = self.node('Not', [has_capital], f'{col}_has_not')
+            for category in categories:
+                indicator = no_capital if category.startswith('no_') else has_capital
+                columns.append(self.node('Cast', [indicator], f'{col}_{category}', to=TensorProto.FLOAT))
+
+        # Looking up the weight of evidence of the categorical features
+        for col in params['woe']['cols']:
+            categories = params['woe']['categories'][col]
+            codes = self.label_encode(col, categories, unknown_code=len(categories), missing_code=len(categories) + 1)
+            codes = self.node('Squeeze', [codes, self.constant(f'{col}_axis', np.array([1], dtype=np.int64))], f'{col}_flat_codes')
+            table = self.constant(f'{col}_woe_table', arrays[f'woe/{col}'].astype(np.float32)[:, None])
+            columns.append(self.node('Gather', [table, codes], f'{col}_woe', axis=0))
+
+        return self.node('Concat', columns, 'features', axis=1)
+
+    # Creating a method to build the nodes of the booster
+    def build_margin(self, features:str):
+        '''
+        This method adds the nodes of the booster and returns the name of the margin. A
+        gbtree or dart booster becomes a tree ensemble, with the leaf values of dart
+        scaled by their tree weights, and a gblinear booster becomes a matrix product.
+        '''
+        model = read_booster_model(self.booster)
+        feature_names = self.preprocessor.feature_names
+        booster_features = model['feature_names'] or feature_names
+        if any(feature not in feature_names for feature in booster_features):
+            raise ValueError('The features of the booster do not match the features of the preprocessor.')
+        positions = [feature_names.index(feature) for feature in booster_features]
+
+        if model['booster'] == 'gblinear':
+            weights = np.zeros((len(feature_names), 1), dtype=np.float32)
+            weights[positions, 0] = model['weights']
+            # Missing values do not contribute to the margin of a linear booster
+            is_missing = self.node('IsNaN', [features], 'features_missing')
+            zero = self.constant('linear_zero', np.zeros((1, 1), dtype=np.float32))
+            features = self.node('Where', [is_missing, zero, features], 'linear_features')
+            margin = self.node('MatMul', [features, self.constant('linear_weights', weights)], 'linear_margin')
+            bias = np.array([[model['bias'] + np.float32(model['base_margin'])]], dtype=np.float32)
+            return self.node('Add', [margin, self.constant('linear_bias', bias)], 'margin')
+
+        attributes = {key: [] for key in [
+            'nodes_treeids', 'nodes_nodeids', 'nodes_featureids', 'nodes_modes', 'nodes_values',
+            'nodes_truenodeids', 'nodes_falsenodeids', 'nodes_missing_value_tracks_true',
+            'target_treeids', 'target_nodeids', 'target_ids', 'target_weights'
+        ]}
+        for tree_id, (tree, weight) in enumerate(zip(model['trees'], model['tree_weights'])):
+            for node, (left, right) in enumerate(zip(tree['left_children'], tree['right_children'])):
+                is_leaf = left == -1
+                attributes['nodes_treeids'].append(tree_id)
+                attributes['nodes_nodeids'].append(node)
+                attributes['nodes_featureids'].append(0 if is_leaf else positions[tree['split_indices'][node]])
+                attributes['nodes_modes'].append('LEAF' if is_leaf else 'BRANCH_LT')
+                attributes['nodes_values'].append(0.0 if is_leaf else tree['split_conditions'][node])
+                attributes['nodes_truenodeids'].append(0 if is_leaf else left)
+                attributes['nodes_falsenodeids'].append(0 if is_leaf else right)
+                attributes['nodes_missing_value_tracks_true'].append(0 if is_leaf else int(tree['default_left'][node]))
+                if is_leaf:
+                    attributes['target_treeids'].append(tree_id)
+                    attributes['target_nodeids'].append(node)
+                    attributes['target_ids'].append(0)
+                    attributes['target_weights'].append(float(np.float32(tree['split_conditions'][node]) * np.float32(weight)))
+
+        return self.node(
+            'TreeEnsembleRegressor', [features], 'margin', domain='ai.onnx.ml',
+            n_targets=1, aggregate_function='SUM', post_transform='NONE',
+            base_values=[model['base_margin']], **attributes
+        )
+
+    # Creating a method to build the onnx model
+    def build(self):
+        '''
+        This method builds the onnx model, which returns the margin and the predicted
+        probability of each row.
+        ================================================================================
+        -------------------
+        Returns:
+        -------------------
+        onnx_model : onnx.ModelProto - This is the onnx model.
+        ================================================================================
+        '''
+        features = self.build_features()
+        margin = self.build_margin(features)
+        self.node('Sigmoid', [margin], 'probabilities')
+        graph = helper.make_graph(
+            self.nodes,
+            'adult_wages',
+            self.inputs,
+            [
+                helper.make_tensor_value_info('margin', TensorProto.FLOAT, [None, 1]),
+                helper.make_tensor_value_info('probabilities', TensorProto.FLOAT, [None, 1])
+            ],
+            initializer=self.initializers
+        )
+        onnx_model = helper.make_model(
+            graph,
+            opset_imports=[helper.make_opsetid('', ONNX_OPSET), helper.make_opsetid('ai.onnx.ml', ONNX_ML_OPSET)],
+            producer_name='adult_wages'
+        )
+        onnx_model.ir_version = 8
+        onnx.checker.check_model(onnx_model)
+        return onnx_model
+
+
+# Creating a class to make predictions with an onnxruntime session
+class OnnxModel():
+    '''
+    This class makes predictions on raw features with a local onnxruntime session. The
+    session runs the whole graph in native code, without pandas, sklearn or xgboost, and
+    releases the GIL while it runs.
+    '''
+    # Creating the constructor for the class
+    def __init__(self, file_path:str=None, intra_op_threads:int=None):
+        '''
+        This is the constructor for the onnx model class. It creates the session using the
+        number of intra op threads given, else the number from the config, else the
+        number tuned at export time.
+        '''
+        self.onnx_config = OnnxConfig()
+        self.file_path = file_path or self.onnx_config.model_path
+        self.metadata = self.read_metadata(self.file_path)
+        self.intra_op_threads = (
+            intra_op_threads
+            or self.onnx_config.intra_op_threads
+            or int(self.metadata.get('intra_op_threads', 1))
+        )
+        self.session = self.create_session(self.file_path, self.intra_op_threads)
+        self.string_inputs = [
+            node.name for node in self.session.get_inputs() if node.type == 'tensor(string)'
+        ]
+        self.input_names = [node.name for node in self.session.get_inputs()]
+
+    # Creating a method to read the metadata of an onnx model
+    @staticmethod
+    def read_metadata(file_path:str):
+        '''
+        This method reads the metadata properties of an onnx model, without loading the
+        weights of the graph.
+        '''
+        onnx_model = onnx.load(file_path, load_external_data=False)
+        return {prop.key: prop.value for prop in onnx_model.metadata_props}
+
+    # Creating a method to create an onnxruntime session
+    @staticmethod
+    def create_session(file_path:str, intra_op_threads:int):
+        '''
+        This method creates an onnxruntime session which runs the graph sequentially with
+        the given number of intra op threads.
+        '''
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = intra_op_threads
+        options.inter_op_num_threads = 1
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        return ort.InferenceSession(file_path, sess_options=options, providers=['CPUExecutionProvider'])
+
+    # Creating a method to create the inputs of the session
+    def create_feed(self, df):
+        '''
+        This method creates the inputs of the session from the raw features. Missing
+        categories are fed as empty strings.
+        '''
+        feed = {}
+        for name in self.input_names:
+            if name in self.string_inputs:
+                values = df[name].to_numpy(dtype=object)
+                missing = pd.isna(values)
+                if missing.any():
+                    values = np.where(missing, '', values)
+                feed[name] = values.reshape(-1, 1)
+            else:
+                feed[name] = df[name].to_numpy(dtype=np.float64).reshape(-1, 1)
+        return feed
+
+    # Creating a method to make predictions on raw features
+    def predict(self, df, output_margin:bool=False):
+        '''
+        This method returns the predicted probabilities of the raw features.
+        ================================================================================
+        -------------------
+        Parameters:
+        -------------------
+        df : pandas dataframe - This is the raw feature set, as created by CustomData.
+        output_margin : bool - This determines if the margin is returned instead of the
+        probabilities.
+
+        -------------------
+        Returns:
+        -------------------
+        preds : numpy array - These are the predicted probabilities.
+        ================================================================================
+        '''
+        output = 'margin' if output_margin else 'probabilities'
+        return self.session.run([output], self.create_feed(df))[0].ravel()
+
+
+# Creating a function to tune the number of intra op threads
+def tune_intra_op_threads(file_path:str, df, candidates=None, repeats:int=None, batch_size:int=None):
+    '''
+    This function measures the median latency of a batch of raw rows for each number of
+    intra op threads and returns the fastest. Ties go to fewer threads.
+    ========================================================================================
+    ---------------------
+    Parameters:
+    ---------------------
+    file_path : str - This is the path to the onnx model.
+    df : pandas dataframe - These are the raw rows used for the measurements.
+    candidates : list - These are the numbers of threads to try. By default, the powers of
+    two up to the number of cpus are tried.
+
+    ---------------------
+    Returns:
+    ---------------------
+    intra_op_threads : int - This is the fastest number of intra op threads.
+    latencies : dict - This is the median batch latency in milliseconds per number of threads.
+    =========================================================================================
+    '''
+    onnx_config = OnnxConfig()
+    repeats = repeats or onnx_config.tune_repeats
+    batch = df.iloc[:batch_size or onnx_config.tune_batch_size]
+    cpus = os.cpu_count() or 1
+    candidates = candidates or sorted({2 ** i for i in range(cpus.bit_length()) if 2 ** i <= cpus} | {cpus})
+
+    latencies = {}
+    for threads in candidates:
+        model = OnnxModel(file_path, intra_op_threads=threads)
+        feed = model.create_feed(batch)
+        model.session.run(['probabilities'], feed)
+        times = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            model.session.run(['probabilities'], feed)
+            times.append(time.perf_counter() - start)
+        latencies[threads] = float(np.median(times) * 1000)
+    return min(latencies, key=lambda threads: (latencies[threads], threads)), latencies
+
+
+# Creating a function to export the preprocessor and the booster to onnx
+def export_onnx_model(file_path:str, preprocessor, booster, sample=None):
+    '''
+    This function converts the fitted preprocessor and the trained booster into a single
+    onnx graph and saves it. If sample rows are given, the number of intra op threads is
+    tuned on them and recorded in the metadata of the model.
+    ========================================================================================
+    ---------------------
+    Parameters:
+    ---------------------
+    file_path : str - This is the path to the onnx model.
+    preprocessor : ColumnTransformer or CompactPreprocessor - This is the fitted preprocessor.
+    booster : xgboost.core.Booster - This is the trained booster.
+    sample : pandas dataframe - These are raw rows used to tune the number of threads.
+
+    ---------------------
+    Returns:
+    ---------------------
+    intra_op_threads : int - This is the number of intra op threads recorded in the model.
+    =========================================================================================
+    '''
+    try:
+        builder = OnnxGraphBuilder(preprocessor, booster)
+        onnx_model = builder.build()
+        metadata = {
+            'created': datetime.datetime.now().isoformat(),
+            'xgboost_version': xgb.__version__,
+            'feature_names': json.dumps(builder.preprocessor.feature_names),
+            'intra_op_threads': '1'
+        }
+        helper.set_model_props(onnx_model, metadata)
+        os.makedirs(os.path.dirname(file_path) or '.', exist_ok=True)
+        onnx.save(onnx_model, file_path)
+
+        if sample is not None:
+            threads, latencies = tune_intra_op_threads(file_path, sample)
+            metadata['intra_op_threads'] = str(threads)
+            helper.set_model_props(onnx_model, metadata)
+            onnx.save(onnx_model, file_path)
+            logging.info(f'Batch latency in ms per number of intra op threads: {latencies}.')
+
+        logging.info(f'The onnx model has been saved to {file_path}.')
+        return int(metadata['intra_op_threads'])
+
+    except Exception as e:
+        raise CustomException(e, sys)
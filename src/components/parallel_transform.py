@@ -0,0 +1,262 @@
+# Importing packages
+import os
+import sys
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+from concurrent.futures import ProcessPoolExecutor
+from sklearn import set_config
+set_config(transform_output='pandas')
+from src.components.config_entity import DataTransformationConfig
+from src.components.data_cleaning import DataCleaner
+from src.exception import CustomException
+from src.logger import logging
+from src.utils import load_object
+from src.utils import read_json_file
+from src.utils import apply_vocabulary
+from src.utils import CATEGORICAL_COLS
+
+# Holding the preprocessor object and the output matrix of a worker process. They are
+# set once per worker by the initializer and reused for every chunk.
+_WORKER = {}
+
+
+# Creating a function to initialize a worker process
+def _init_worker(preprocessor_path, vocabulary_path, output_path, shape):
+    '''
+    This function loads the preprocessor object and the vocabulary and maps the output
+    matrix, once per worker process.
+    '''
+    _WORKER['preprocessor'] = load_object(file_path=preprocessor_path)
+    _WORKER['vocabulary'] = read_json_file(vocabulary_path) if os.path.exists(vocabulary_path) else None
+    _WORKER['output'] = np.memmap(output_path, dtype=np.float32, mode='r+', shape=shape)
+    _WORKER['cleaner'] = DataCleaner(fill_question_marks=False)
+
+
+# Creating a function to transform a chunk of features into the output matrix
+def _transform_chunk(start, df):
+    '''
+    This function transforms a chunk of cleaned features and writes the result into its
+    rows of the output matrix.
+    '''
+    xform = _WORKER['preprocessor'].transform(df)
+    _WORKER['output'][start:start + len(df)] = xform.to_numpy(dtype=np.float32)
+    return len(df)
+
+
+# Creating a function to read, clean and transform a row group of a raw parquet file
+def _transform_row_group(file_path, row_group, start, target):
+    '''
+    This function reads a row group of a raw parquet file, cleans it, transforms it into
+    its rows of the output matrix and returns the target of the rows, if present.
+    '''
+    schema = pq.read_schema(file_path)
+    text_cols = [name for name in schema.names if name in CATEGORICAL_COLS + [target]]
+    parquet_file = pq.ParquetFile(file_path, read_dictionary=text_cols)
+    df = parquet_file.read_row_group(row_group).to_pandas()
+    if 'fnlwgt' in list(df.columns):
+        df.drop(labels=['fnlwgt'], axis=1, inplace=True)
+    df = _WORKER['cleaner'].clean(df)
+    if _WORKER['vocabulary'] is not None:
+        df = apply_vocabulary(df, _WORKER['vocabulary'])
+
+    y = None
+    if target in list(df.columns):
+        y = df[target].to_numpy()
+        df = df.drop(labels=[target], axis=1)
+    _transform_chunk(start, df)
+    return y
+
+
+# Creating a class to transform large datasets in parallel
+class ParallelTransformer():
+    '''
+    This class applies the fitted preprocessor object to large datasets using a pool of
+    worker processes. The input is split into chunks of rows, each worker loads the
+    preprocessor object once, and every chunk is written directly into its rows of a
+    preallocated float32 matrix shared by the workers. No intermediate frames are
+    concatenated.
+    '''
+    # Creating the constructor for the class
+    def __init__(self, n_workers:int=None, chunk_size:int=None):
+        '''
+        This is the constructor for the parallel transformer class. By default, one worker
+        is used per cpu and the chunk size is taken from the transformation config.
+        '''
+        self.data_transformation_config = DataTransformationConfig()
+        self.n_workers = n_workers or self.data_transformation_config.n_workers or os.cpu_count()
+        self.chunk_size = chunk_size or self.data_transformation_config.parallel_chunk_size
+        self.preprocessor = None
+
+    # Creating a method to fetch the names of the transformed features
+    def feature_names(self, df):
+        '''
+        This method returns the names of the transformed features by transforming the
+        first row of the features in this process.
+        '''
+        if self.preprocessor is None:
+            self.preprocessor = load_object(file_path=self.data_transformation_config.preprocessor_obj_path)
+        return list(self.preprocessor.transform(df.head(1)).columns)
+
+    # Creating a method to create the file backing the output matrix
+    @staticmethod
+    def reserve_file(directory:str, n_bytes:int):
+        '''
+        This method creates a file of n_bytes bytes in a folder and reserves its space on
+        disk, so that writing the mapped matrix cannot fail half way. None is returned if
+        the folder does not exist or does not have the space.
+        '''
+        if directory is None or not os.path.isdir(directory):
+            return None
+        try:
+            if shutil.disk_usage(directory).free < n_bytes:
+                return None
+            file_descriptor, output_path = tempfile.mkstemp(suffix='.f32', dir=directory)
+        except OSError:
+            return None
+        try:
+            os.ftruncate(file_descriptor, n_bytes)
+            if n_bytes > 0 and hasattr(os, 'posix_fallocate'):
+                os.posix_fallocate(file_descriptor, 0, n_bytes)
+            return output_path
+        except OSError:
+            os.remove(output_path)
+            return None
+        finally:
+            os.close(file_descriptor)
+
+    # Creating a method to allocate the output matrix
+    def allocate_output(self, shape):
+        '''
+        This method allocates the float32 output matrix as a memory mapped file, which the
+        workers map once each. The file is created in the configured output folder, which
+        is shared memory by default, if it has the space for the matrix, and in the
+        temporary folder otherwise, since writing past the free space of a memory mapped
+        file kills the process. The file is removed once the workers are done, while the
+        returned array keeps the mapping.
+        ================================================================================
+        -------------------
+        Parameters:
+        -------------------
+        shape : tuple - This is the number of rows and columns of the output.
+
+        -------------------
+        Returns:
+        -------------------
+        output_path : str - This is the path to the file backing the output.
+        output : numpy memmap - This is the output matrix.
+        ================================================================================
+        '''
+        n_bytes = int(np.prod(shape, dtype=np.int64)) * np.dtype(np.float32).itemsize
+        output_dir = self.data_transformation_config.parallel_output_dir
+        output_path = self.reserve_file(output_dir, n_bytes)
+        if output_path is None:
+            logging.info(f'{output_dir} does not have {n_bytes} bytes free, so the output is mapped from the temporary folder.')
+            output_path = self.reserve_file(tempfile.gettempdir(), n_bytes)
+        if output_path is None:
+            raise OSError(f'No folder has {n_bytes} bytes free for the output matrix.')
+        output = np.memmap(output_path, dtype=np.float32, mode='r+', shape=shape)
+        return output_path, output
+
+    # Creating a method to run tasks on the worker pool
+    def run_pool(self, output_path, shape, func, tasks):
+        '''
+        This method runs the tasks on a pool of worker processes which share the output
+        matrix, and returns the results in the order of the tasks.
+        '''
+        with ProcessPoolExecutor(
+            max_workers=min(self.n_workers, max(len(tasks), 1)),
+            initializer=_init_worker,
+            initargs=(
+                self.data_transformation_config.preprocessor_obj_path,
+                self.data_transformation_config.vocabulary_path,
+                output_path,
+                shape
+            )
+        ) as executor:
+            futures = [executor.submit(func, *task) for task in tasks]
+            return [future.result() for future in futures]
+
+    # Creating a method to transform a dataframe in parallel
+    def transform(self, df):
+        '''
+        This method transforms a dataframe of cleaned features in parallel.
+        ================================================================================
+        -------------------
+        Parameters:
+        -------------------
+        df : pandas dataframe - These are the cleaned features, as passed to the
+        transform method of the preprocessor object.
+
+        -------------------
+        Returns:
+        -------------------
+        X : numpy array - This is the float32 matrix of transformed features.
+        feature_names : list - These are the names of the transformed features.
+        ================================================================================
+        '''
+        try:
+            feature_names = self.feature_names(df)
+            shape = (len(df), len(feature_names))
+            output_path, X = self.allocate_output(shape)
+            try:
+                tasks = [
+                    (start, df.iloc[start:start + self.chunk_size])
+                    for start in range(0, len(df), self.chunk_size)
+                ]
+                logging.info(f'Transforming {len(df)} rows in {len(tasks)} chunks using {self.n_workers} workers.')
+                self.run_pool(output_path, shape, _transform_chunk, tasks)
+            finally:
+                os.remove(output_path)
+            return X, feature_names
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    # Creating a method to transform a raw parquet file in parallel
+    def transform_file(self, file_path:str, target:str='target_class'):
+        '''
+        This method cleans and transforms a raw parquet file in parallel. Each row group
+        is read by a worker, so the file is never loaded into a single dataframe.
+        ================================================================================
+        -------------------
+        Parameters:
+        -------------------
+        file_path : str - This is the path to the raw parquet file.
+        target : str - This is the name of the target column.
+
+        -------------------
+        Returns:
+        -------------------
+        X : numpy array - This is the float32 matrix of transformed features.
+        y : numpy array - This is the recoded target, or None if the file has no target.
+        feature_names : list - These are the names of the transformed features.
+        ================================================================================
+        '''
+        try:
+            metadata = pq.ParquetFile(file_path).metadata
+            offsets = np.concatenate([[0], np.cumsum([
+                metadata.row_group(i).num_rows for i in range(metadata.num_row_groups)
+            ])])
+
+            # Fetching the names of the transformed features from a few cleaned rows
+            sample = pq.ParquetFile(file_path).read_row_group(0).slice(0, 1).to_pandas()
+            sample = DataCleaner(fill_question_marks=False).clean(sample.drop(columns=['fnlwgt', target], errors='ignore'))
+            feature_names = self.feature_names(sample)
+
+            shape = (int(offsets[-1]), len(feature_names))
+            output_path, X = self.allocate_output(shape)
+            try:
+                tasks = [(file_path, i, int(offsets[i]), target) for i in range(metadata.num_row_groups)]
+                logging.info(f'Transforming {shape[0]} rows in {len(tasks)} row groups using {self.n_workers} workers.')
+                targets = self.run_pool(output_path, shape, _transform_row_group, tasks)
+            finally:
+                os.remove(output_path)
+
+            y = np.concatenate(targets) if targets and targets[0] is not None else None
+            return X, y, feature_names
+
+        except Exception as e:
+            raise CustomException(e, sys)
@@ -0,0 +1,251 @@
+# Importing packages
+import sys
+import time
+import threading
+import collections
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from src.components.config_entity import ExplainConfig
+from src.components.create_custom_data import FIELD_COLUMNS
+from src.components.model_bundle import load_model_bundle
+from src.exception import CustomException
+from src.logger import logging
+
+
+# Creating a class to explain the predictions of a model bundle
+class PredictionExplainer():
+    '''
+    This class explains the predictions of a model bundle with the feature contributions
+    computed natively by the booster. The contributions of the transformed features are
+    summed back into the 13 fields entered on the website, so the one hot columns of sex
+    and of the capital indicators and the weight of evidence columns each count towards
+    their own field. Explained profiles are kept in a bounded cache, identical profiles
+    within a request are explained once, and the rows which would not fit the latency
+    budget of a request are explained with the faster approximate contributions.
+    '''
+    # Creating the constructor for the class
+    def __init__(self, booster, preprocessor, cache_size:int=None, batch_size:int=None):
+        '''
+        This is the constructor for the prediction explainer class. The settings which
+        are not given are taken from the explain config.
+        '''
+        self.explain_config = ExplainConfig()
+        self.booster = booster
+        self.preprocessor = preprocessor
+        self.cache_size = cache_size if cache_size is not None else self.explain_config.cache_size
+        self.batch_size = batch_size or self.explain_config.batch_size
+        self.fields = list(FIELD_COLUMNS.values())
+        self.aggregation = self.create_aggregation()
+        self.cache = collections.OrderedDict()
+        self.lock = threading.Lock()
+        # The cost of an exact explanation in milliseconds per row, updated on every call
+        self.row_cost_ms = None
+        self.counts = {'rows': 0, 'cached': 0, 'exact': 0, 'approximate': 0}
+
+    # Creating a method to build the explainer from a model bundle file
+    @classmethod
+    def from_bundle(cls, file_path:str, **kwargs):
+        '''
+        This method loads a model bundle and creates its explainer.
+        '''
+        try:
+            bundle = load_model_bundle(file_path)
+            logging.info(f'Explaining the predictions of the model bundle {file_path}.')
+            return cls(bundle.booster, bundle.preprocessor, **kwargs)
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    # Creating a method to map the transformed features back to the raw fields
+    def create_aggregation(self):
+        '''
+        This method creates the matrix which sums the contributions of the transformed
+        features, and the bias, into the raw fields. The transformed features are laid
+        out in the order of the compact preprocessor.
+        ================================================================================
+        -------------------
+        Returns:
+        -------------------
+        aggregation : numpy array - This is a matrix with one row per transformed
+        feature, followed by the bias, and one column per field, followed by the bias.
+        ================================================================================
+        '''
+        params = self.preprocessor.params
+        feature_fields = list(params['num']['cols'])
+        feature_fields += [params['sex']['col']] * len(params['sex']['categories'])
+        for col, categories in zip(params['cap']['cols'], params['cap']['categories']):
+            feature_fields += [col] * len(categories)
+        feature_fields += list(params['woe']['cols'])
+        if len(feature_fields) != len(self.preprocessor.feature_names):
+            raise ValueError('The transformed features could not be mapped to the raw fields.')
+
+        aggregation = np.zeros((len(feature_fields) + 1, len(self.fields) + 1))
+        for i, field in enumerate(feature_fields):
+            aggregation[i, self.fields.index(field)] = 1.0
+        aggregation[-1, -1] = 1.0
+        return aggregation
+
+    # Creating a method to compute the contributions of the fields
+    def contributions(self, X, approximate:bool=False):
+        '''
+        This method computes the contributions of the transformed features with the
+        booster and sums them into the fields. The last column is the bias.
+        '''
+        if len(X) == 0:
+            return np.zeros((0, len(self.fields) + 1))
+        dmatrix = xgb.DMatrix(X, feature_names=self.booster.feature_names)
+        contribs = self.booster.predict(dmatrix, pred_contribs=True, approx_contribs=approximate)
+        return contribs.astype(np.float64) @ self.aggregation
+
+    # Creating a method to create the cache keys of the rows
+    def profile_keys(self, df):
+        '''
+        This method returns the values of the fields of each row as a hashable key.
+        Missing values are replaced by None, so that equal profiles have equal keys.
+        '''
+        values = df[self.fields].astype(object)
+        values = values.where(values.notna(), None)
+        return list(values.itertuples(index=False, name=None))
+
+    # Creating a method to explain a dataframe
+    def explain_frame(self, df, budget_ms:float=None, use_cache:bool=True, approximate:bool=False):
+        '''
+        This method explains every row of a dataframe. The rows are explained in
+        batches. Before each batch, the rows which still fit the latency budget, at the
+        measured cost of an exact explanation, are explained exactly, and the rest are
+        explained with approximate contributions. Only exact explanations are cached.
+        ================================================================================
+        -------------------
+        Parameters:
+        -------------------
+        df : pandas dataframe - This is the raw feature set, as created by CustomData.
+        budget_ms : float - This is the latency budget in milliseconds. If not given,
+        every row is explained exactly.
+        use_cache : bool - This determines if the cache is used. Large batches which are
+        not repeated can skip the cache.
+        approximate : bool - This determines if every row is explained approximately.
+
+        -------------------
+        Returns:
+        -------------------
+        explanations : pandas dataframe - These are the contributions of each field, the
+        bias, the margin, the probability and the method of each row.
+        ================================================================================
+        '''
+        try:
+            deadline = time.perf_counter() + budget_ms / 1000 if budget_ms is not None else None
+            values = np.zeros((len(df), len(self.fields) + 1))
+            methods = np.full(len(df), 'exact', dtype=object)
+
+            # Reading the cached profiles and grouping the identical profiles
+            if use_cache:
+                keys = self.profile_keys(df)
+                pending = collections.OrderedDict()
+                with self.lock:
+                    for i, key in enumerate(keys):
+                        if key in self.cache:
+                            self.cache.move_to_end(key)
+                            values[i] = self.cache[key]
+                            methods[i] = 'cached'
+                        else:
+                            pending.setdefault(key, []).append(i)
+                groups = list(pending.values())
+            else:
+                keys = None
+                groups = [[i] for i in range(len(df))]
+
+            first_rows = [rows[0] for rows in groups]
+            X = self.preprocessor.transform(df.iloc[first_rows]) if first_rows else None
+            for start in range(0, len(first_rows), self.batch_size):
+                stop = min(start + self.batch_size, len(first_rows))
+                n_exact = 0 if approximate else stop - start
+                if deadline is not None and self.row_cost_ms is not None:
+                    remaining_ms = (deadline - time.perf_counter()) * 1000
+                    n_exact = int(np.clip(remaining_ms // self.row_cost_ms, 0, n_exact))
+
+                batch = np.empty((stop - start, len(self.fields) + 1))
+                if n_exact > 0:
+                    started = time.perf_counter()
+                    batch[:n_exact] = self.contributions(X[start:start + n_exact])
+                    cost_ms = (time.perf_counter() - started) * 1000 / n_exact
+                    self.row_cost_ms = cost_ms if self.row_cost_ms is None else 0.8 * self.row_cost_ms + 0.2 * cost_ms
+                if n_exact < stop - start:
+                    batch[n_exact:] = self.contributions(X[start + n_exact:stop], approximate=True)
+
+                for j, rows in enumerate(groups[start:stop]):
+                    values[rows] = batch[j]
+                    if j >= n_exact:
+                        methods[rows] = 'approximate'
+                if use_cache and n_exact > 0:
+                    self.store(keys, groups[start:start + n_exact], batch[:n_exact])
+
+            self.counts['rows'] += len(df)
+            for method in ('cached', 'exact', 'approximate'):
+                self.counts[method] += int((methods == method).sum())
+
+            explanations = pd.DataFrame(values[:, :-1], columns=self.fields, index=df.index)
+            explanations['bias'] = values[:, -1]
+            explanations['margin'] = values.sum(axis=1)
+            explanations['probability'] = 1 / (1 + np.exp(-explanations['margin']))
+            explanations['method'] = methods
+            return explanations
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    # Creating a method to store exact explanations in the cache
+    def store(self, keys, groups, batch):
+        '''
+        This method stores exact explanations in the cache, and removes the least
+        recently used profiles once the cache is full.
+        '''
+        if self.cache_size <= 0:
+            return
+        with self.lock:
+            for rows, row_values in zip(groups, batch):
+                self.cache[keys[rows[0]]] = row_values
+                self.cache.move_to_end(keys[rows[0]])
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+
+    # Creating a method to explain a dataframe as a list of records
+    def explain(self, df, budget_ms:float=None):
+        '''
+        This method explains every row of a dataframe and returns one record per row,
+        with the contributions of the fields ordered by their absolute size.
+        ================================================================================
+        -------------------
+        Parameters:
+        -------------------
+        df : pandas dataframe - This is the raw feature set, as created by CustomData.
+        budget_ms : float - This is the latency budget in milliseconds. If not given,
+        the budget from the explain config is used.
+
+        -------------------
+        Returns:
+        -------------------
+        explanations : list - These are the probability, the bias, the contributions of
+        the fields and the method of each row.
+        ================================================================================
+        '''
+        budget_ms = budget_ms if budget_ms is not None else self.explain_config.budget_ms
+        explanations = self.explain_frame(df, budget_ms=budget_ms)
+        records = []
+        for row in explanations.itertuples(index=False, name=None):
+            contributions = dict(zip(self.fields, row[:len(self.fields)]))
+            records.append({
+                'probability': float(row[-2]),
+                'bias': float(row[len(self.fields)]),
+                'contributions': dict(sorted(contributions.items(), key=lambda item: -abs(item[1]))),
+                'method': row[-1]
+            })
+        return records
+
+    # Creating a method to report the counts of the explainer
+    def stats(self):
+        '''
+        This method returns the number of rows explained from the cache, exactly and
+        approximately, the size of the cache and the measured cost of an exact row.
+        '''
+        return {**self.counts, 'cache_entries': len(self.cache), 'row_cost_ms': self.row_cost_ms}
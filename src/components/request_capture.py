@@ -0,0 +1,246 @@
+# Importing packages
+import os
+import sys
+import json
+import time
+import queue
+import atexit
+import random
+import datetime
+import threading
+import pyarrow as pa
+import pyarrow.parquet as pq
+from src.components.config_entity import RequestCaptureConfig
+from src.exception import CustomException
+from src.logger import logging
+
+# Fixing the schema of the captured rows, so that every parquet batch matches the
+# schema of the file, even when the model version of the first batch is missing
+CAPTURE_SCHEMA = pa.schema([
+    ('captured_at', pa.string()),
+    ('model_version', pa.string()),
+    ('probability', pa.float64()),
+    ('latency_ms', pa.float64()),
+    ('inputs', pa.string())
+])
+
+# Creating a class to capture the prediction requests without blocking them
+class RequestCapture():
+    '''
+    This class captures the inputs, the model version, the predicted probability and the
+    latency of each prediction request. The request thread only samples the record and
+    puts it on a bounded queue. A background writer thread turns the records into rows
+    and writes them in batches to rotating JSONL or parquet files. When the queue is
+    full, the newest or the oldest record is dropped, so that the request never waits
+    for the disk.
+    '''
+    # Creating the constructor for the class
+    def __init__(self, capture_dir:str=None, file_format:str=None, sample_rate:float=None,
+                 overload_policy:str=None, queue_size:int=None, autostart:bool=True):
+        '''
+        This is the constructor for the request capture class. The settings which are not
+        given are taken from the request capture config. The writer thread is started
+        with the first captured record, unless autostart is False.
+        '''
+        self.capture_config = RequestCaptureConfig()
+        self.capture_dir = capture_dir or self.capture_config.capture_dir
+        self.file_format = file_format or self.capture_config.file_format
+        self.sample_rate = sample_rate if sample_rate is not None else self.capture_config.sample_rate
+        self.overload_policy = overload_policy or self.capture_config.overload_policy
+        if self.file_format not in ('jsonl', 'parquet'):
+            raise ValueError(f'The capture file format {self.file_format} is not supported.')
+        if self.overload_policy not in ('drop_newest', 'drop_oldest'):
+            raise ValueError(f'The overload policy {self.overload_policy} is not supported.')
+
+        self.queue = queue.Queue(maxsize=queue_size or self.capture_config.queue_size)
+        self.autostart = autostart
+        self.counts = {'captured': 0, 'sampled_out': 0, 'dropped': 0, 'written': 0, 'files': 0}
+        self.counts_lock = threading.Lock()
+        self.writer = None
+        self.stop_event = threading.Event()
+        self.start_lock = threading.Lock()
+        self.file_obj = None
+        self.parquet_writer = None
+        self.file_path = None
+
+    # Creating a method to capture a prediction request
+    def capture(self, features, probability, latency_ms:float, model_version:str=None):
+        '''
+        This method samples a prediction request and puts it on the queue. It never blocks
+        and does no formatting, so it only adds microseconds to the request.
+        ================================================================================
+        -------------------
+        Parameters:
+        -------------------
+        features : pandas dataframe - These are the raw features of the request.
+        probability : numpy array - These are the predicted probabilities.
+        latency_ms : float - This is the latency of the prediction in milliseconds.
+        model_version : str - This is the version of the model which made the prediction.
+
+        -------------------
+        Returns:
+        -------------------
+        queued : bool - This is True if the record was put on the queue.
+        ================================================================================
+        '''
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            self.count('sampled_out')
+            return False
+        if self.writer is None and self.autostart:
+            self.start()
+
+        record = (time.time(), features, probability, latency_ms, model_version)
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.count('dropped')
+            if self.overload_policy == 'drop_newest':
+                return False
+            # Making room for the newest record by dropping the oldest one
+            try:
+                self.queue.get_nowait()
+                self.queue.put_nowait(record)
+            except (queue.Empty, queue.Full):
+                return False
+        self.count('captured')
+        return True
+
+    # Creating a method to update a count of the capture
+    def count(self, name:str, n:int=1):
+        '''
+        This method adds to a count of the capture under a lock, as the counts are updated
+        by the request threads and the writer thread at once.
+        '''
+        with self.counts_lock:
+            self.counts[name] += n
+
+    # Creating a method to start the writer thread
+    def start(self):
+        '''
+        This method starts the background writer thread, once.
+        '''
+        with self.start_lock:
+            if self.writer is None:
+                self.writer = threading.Thread(target=self.run_writer, name='request-capture-writer', daemon=True)
+                self.writer.start()
+                atexit.register(self.close)
+
+    # Creating a method to turn a queued record into rows
+    @staticmethod
+    def create_rows(record):
+        '''
+        This method turns a queued record into one row per predicted row. The inputs are
+        kept as a json string, so that the schema of the rows never changes.
+        '''
+        timestamp, features, probability, latency_ms, model_version = record
+        captured_at = datetime.datetime.fromtimestamp(timestamp).isoformat()
+        rows = []
+        for inputs, prob in zip(features.to_dict(orient='records'), list(probability)):
+            rows.append({
+                'captured_at': captured_at,
+                'model_version': model_version,
+                'probability': float(prob),
+                'latency_ms': float(latency_ms),
+                'inputs': json.dumps(inputs, default=str)
+            })
+        return rows
+
+    # Creating a method to run the writer thread
+    def run_writer(self):
+        '''
+        This method collects records from the queue and writes them in batches, when the
+        batch is full or the flush interval has passed.
+        '''
+        batch = []
+        last_flush = time.monotonic()
+        while not (self.stop_event.is_set() and self.queue.empty()):
+            try:
+                batch.extend(self.create_rows(self.queue.get(timeout=self.capture_config.flush_interval_s)))
+            except queue.Empty:
+                pass
+            except Exception as e:
+                logging.info(f'Skipped a captured request which could not be converted: {e}')
+            if batch and (len(batch) >= self.capture_config.batch_size
+                          or time.monotonic() - last_flush >= self.capture_config.flush_interval_s):
+                self.write_batch(batch)
+                batch = []
+                last_flush = time.monotonic()
+        if batch:
+            self.write_batch(batch)
+        self.close_file()
+
+    # Creating a method to open a new capture file
+    def open_file(self):
+        '''
+        This method closes the current capture file and opens a new one, named after the
+        process and the time it was opened.
+        '''
+        self.close_file()
+        os.makedirs(self.capture_dir, exist_ok=True)
+        stamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+        self.file_path = os.path.join(self.capture_dir, f'requests_{os.getpid()}_{stamp}.{self.file_format}')
+        if self.file_format == 'jsonl':
+            self.file_obj = open(self.file_path, 'a', encoding='utf-8')
+        self.count('files')
+
+    # Creating a method to close the current capture file
+    def close_file(self):
+        '''
+        This method closes the current capture file, if one is open.
+        '''
+        if self.file_obj is not None:
+            self.file_obj.close()
+            self.file_obj = None
+        if self.parquet_writer is not None:
+            self.parquet_writer.close()
+            self.parquet_writer = None
+
+    # Creating a method to write a batch of rows
+    def write_batch(self, batch):
+        '''
+        This method writes a batch of rows to the current capture file, and rotates the
+        file once it exceeds the size limit. A failed write is logged and the batch is
+        dropped, so the writer thread keeps running.
+        '''
+        try:
+            if self.file_path is None or (
+                os.path.exists(self.file_path)
+                and os.path.getsize(self.file_path) >= self.capture_config.max_file_bytes
+            ):
+                self.open_file()
+            if self.file_format == 'jsonl':
+                self.file_obj.write(''.join(json.dumps(row) + '\n' for row in batch))
+                self.file_obj.flush()
+            else:
+                table = pa.Table.from_pylist(batch, schema=CAPTURE_SCHEMA)
+                if self.parquet_writer is None:
+                    self.parquet_writer = pq.ParquetWriter(self.file_path, CAPTURE_SCHEMA)
+                self.parquet_writer.write_table(table)
+            self.count('written', len(batch))
+        except Exception as e:
+            self.count('dropped', len(batch))
+            logging.info(f'Dropped {len(batch)} captured requests which could not be written: {e}')
+
+    # Creating a method to stop the writer thread
+    def close(self, timeout:float=10.0):
+        '''
+        This method writes the records left on the queue, closes the capture file and
+        stops the writer thread.
+        '''
+        try:
+            self.stop_event.set()
+            if self.writer is not None:
+                self.writer.join(timeout=timeout)
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    # Creating a method to report the counts of the capture
+    def stats(self):
+        '''
+        This method returns the number of records captured, sampled out, dropped and
+        written, the number of files opened and the current depth of the queue.
+        '''
+        with self.counts_lock:
+            counts = dict(self.counts)
+        return {**counts, 'queued': self.queue.qsize()}
@@ -0,0 +1,227 @@
+# Importing packages
+import os
+import sys
+import json
+import hashlib
+import inspect
+from dataclasses import dataclass, field
+from typing import Callable, List
+from src.exception import CustomException
+from src.logger import logging
+from src.components.config_entity import StageCacheConfig
+
+
+# Creating a class to describe a pipeline stage
+@dataclass
+class Stage():
+    '''
+    This class describes a stage of a pipeline. A stage has a name, a function which
+    runs it, the files it reads and writes, the source files of the code it runs and
+    the parameters it depends on.
+    '''
+    name:str
+    func:Callable
+    inputs:List[str] = field(default_factory=list)
+    outputs:List[str] = field(default_factory=list)
+    code:List[object] = field(default_factory=list)
+    params:dict = field(default_factory=dict)
+
+
+# Creating a class to run pipeline stages and skip the ones which are up to date
+class StageRunner():
+    '''
+    This class runs the stages of a pipeline in order. Each stage is fingerprinted using
+    the contents of its inputs, the source of its code and its parameters. A stage is
+    skipped when its fingerprint matches the one recorded after its last run and its
+    outputs still exist and are unchanged. An optional output, which the stage did not
+    write on its last run, may stay missing.
+    '''
+    # Creating the constructor for the class
+    def __init__(self, manifest_path:str=None):
+        '''
+        This is the constructor for the stage runner class. It loads the manifest of the
+        earlier runs.
+        '''
+        self.cache_config = StageCacheConfig()
+        self.manifest_path = manifest_path or self.cache_config.manifest_path
+        self.manifest = {'stages': {}, 'file_hashes': {}}
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, 'r') as file_obj:
+                self.manifest = json.load(file_obj)
+
+    # Creating a method to hash the contents of a file or a directory
+    def hash_path(self, path:str):
+        '''
+        This method returns the content hash of a file or directory. The hash of a file is
+        reused when its size and modification time have not changed since it was hashed.
+        ================================================================================
+        -------------------
+        Parameters:
+        -------------------
+        path : str - This is the path to the file or directory.
+
+        -------------------
+        Returns:
+        -------------------
+        digest : str - This is the content hash, or None if the path does not exist.
+        ================================================================================
+        '''
+        if os.path.isdir(path):
+            digest = hashlib.sha256()
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for file_name in sorted(files):
+                    file_path = os.path.join(root, file_name)
+                    digest.update(os.path.relpath(file_path, path).encode())
+                    digest.update(self.hash_path(file_path).encode())
+            return digest.hexdigest()
+
+        if not os.path.exists(path):
+            return None
+
+        stat = os.stat(path)
+        key = f'{stat.st_size}:{stat.st_mtime_ns}'
+        cached = self.manifest['file_hashes'].get(path)
+        if cached is not None and cached['key'] == key:
+            return cached['digest']
+
+        digest = hashlib.sha256()
+        with open(path, 'rb') as file_obj:
+            for chunk in iter(lambda: file_obj.read(1 << 20), b''):
+                digest.update(chunk)
+        self.manifest['file_hashes'][path] = {'key': key, 'digest': digest.hexdigest()}
+        return digest.hexdigest()
+
+    # Creating a method to fingerprint a stage
+    def fingerprint(self, stage:Stage):
+        '''
+        This method fingerprints a stage using the contents of its inputs, the source of
+        its code and its parameters.
+        ================================================================================
+        -------------------
+        Parameters:
+        -------------------
+        stage : Stage - This is the stage to fingerprint.
+
+        -------------------
+        Returns:
+        -------------------
+        fingerprint : str - This is the fingerprint of the stage.
+        ================================================================================
+        '''
+        code_files = [
+            item if isinstance(item, str) else inspect.getsourcefile(item)
+            for item in stage.code
+        ]
+        payload = {
+            'inputs': {path: self.hash_path(path) for path in stage.inputs},
+            'code': {os.path.relpath(path): self.hash_path(path) for path in code_files},
+            'params': stage.params
+        }
+        encoded = json.dumps(payload, sort_keys=True, default=str).encode()
+        return hashlib.sha256(encoded).hexdigest()
+
+    # Creating a method to check whether a stage needs to run
+    def check_stage(self, stage:Stage):
+        '''
+        This method checks whether a stage is up to date.
+        ================================================================================
+        -------------------
+        Parameters:
+        -------------------
+        stage : Stage - This is the stage to check.
+
+        -------------------
+        Returns:
+        -------------------
+        up_to_date : bool - This is True if the stage can be skipped.
+        reason : str - This is the reason why the stage needs to run.
+        ================================================================================
+        '''
+        record = self.manifest['stages'].get(stage.name)
+        if record is None:
+            return False, 'never run'
+        if record['fingerprint'] != self.fingerprint(stage):
+            return False, 'inputs, code or parameters changed'
+        for path in stage.outputs:
+            # An output which the stage did not write on its last run may stay missing
+            if not os.path.exists(path) and record['outputs'].get(path) is not None:
+                return False, f'output {path} is missing'
+            if record['outputs'].get(path) != self.hash_path(path):
+                return False, f'output {path} was modified'
+        return True, 'up to date'
+
+    # Creating a method to save the manifest
+    def save_manifest(self):
+        '''
+        This method saves the manifest of the stages which have run.
+        '''
+        os.makedirs(os.path.dirname(self.manifest_path), exist_ok=True)
+        with open(self.manifest_path, 'w') as file_obj:
+            json.dump(self.manifest, file_obj, indent=2)
+
+    # Creating a method to run the stages
+    def run(self, stages, dry_run=False, force=False):
+        '''
+        This method runs the stages in order and skips the ones which are up to date. In
+        a dry run, no stage is run and the report shows what would run. A stage whose
+        upstream stage would run is reported as running as well.
+        ================================================================================
+        -------------------
+        Parameters:
+        -------------------
+        stages : list - This is the list of stages in the order they should run.
+        dry_run : bool - This determines if the stages are only checked.
+        force : bool - This determines if every stage is run.
+
+        -------------------
+        Returns:
+        -------------------
+        report : list - This is a list of (stage name, action, reason) tuples.
+        ================================================================================
+        '''
+        try:
+            report = []
+            changed_outputs = set()
+            for stage in stages:
+                upstream = changed_outputs.intersection(stage.inputs)
+                if force:
+                    up_to_date, reason = False, 'forced'
+                elif dry_run and upstream:
+                    up_to_date, reason = False, f'upstream output {sorted(upstream)[0]} will change'
+                else:
+                    up_to_date, reason = self.check_stage(stage)
+
+                if up_to_date:
+                    report.append((stage.name, 'skip', reason))
+                    logging.info(f'Skipping the {stage.name} stage, which is up to date.')
+                    continue
+
+                report.append((stage.name, 'would run' if dry_run else 'run', reason))
+                changed_outputs.update(stage.outputs)
+                if dry_run:
+                    continue
+
+                logging.info(f'Running the {stage.name} stage: {reason}.')
+                stage.func()
+                self.manifest['stages'][stage.name] = {
+                    'fingerprint': self.fingerprint(stage),
+                    'outputs': {path: self.hash_path(path) for path in stage.outputs}
+                }
+                self.save_manifest()
+
+            return report
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    # Creating a method to format the report of a run
+    @staticmethod
+    def format_report(report):
+        '''
+        This method formats the report of a run as a table.
+        '''
+        lines = [f"{'stage':<24} {'action':<10} reason"]
+        for name, action, reason in report:
+            lines.append(f'{name:<24} {action:<10} {reason}')
+        return '\n'.join(lines)
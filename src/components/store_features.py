@@ -1,10 +1,20 @@
 # Importing packages
 import sys
 import os
+import shutil
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import xgboost as xgb
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
 from src.exception import CustomException
 from src.logger import logging
 from src.components.config_entity import StoreFeatureConfig
 
+# Defining the compression of each storage format when none is configured
+DEFAULT_COMPRESSION = {'parquet': 'zstd', 'feather': 'uncompressed'}
+
 # Creating a class to store the transformed dataset
 class FeatureStoreCreation():
     '''
@@ -17,6 +27,384 @@ class FeatureStoreCreation():
         '''
         self.feature_store_config = StoreFeatureConfig()
     
+    # Creating a method to resolve the path of a dataset for the storage format
+    def resolve_path(self, path:str):
+        '''
+        This method returns the path of a dataset for the configured storage format. The
+        feather format uses the ".arrow" extension.
+        ======================================================================================
+        -----------------
+        Parameters:
+        -----------------
+        path : str - This is the configured path of the dataset.
+        
+        -----------------
+        Returns:
+        -----------------
+        path : str - This is the path of the dataset for the storage format.
+        =======================================================================================
+        '''
+        if self.feature_store_config.storage_format == 'feather':
+            return os.path.splitext(path)[0] + '.arrow'
+        return path
+    
+    # Creating a method to convert a transformed dataset into an arrow table
+    @staticmethod
+    def to_store_table(df):
+        '''
+        This method converts a transformed dataset into an arrow table. The features are
+        stored as float32, which is the precision XGBoost uses internally, and the target
+        class is kept as an integer.
+        ======================================================================================
+        -----------------
+        Parameters:
+        -----------------
+        df : pandas dataframe - This is the transformed dataset.
+        
+        -----------------
+        Returns:
+        -----------------
+        table : pyarrow table - This is the table to store.
+        =======================================================================================
+        '''
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        schema = pa.schema([
+            pa.field(field.name, pa.float32()) if pa.types.is_floating(field.type) else field
+            for field in table.schema
+        ])
+        return table.cast(schema)
+    
+    # Creating a method to resolve the compression of the configured storage format
+    def resolve_compression(self):
+        '''
+        This method returns the configured compression, or the default compression of
+        the storage format if none is configured.
+        '''
+        config = self.feature_store_config
+        return config.compression or DEFAULT_COMPRESSION[config.storage_format]
+    
+    # Creating a method to convert the raw segment columns of a dataset into an arrow table
+    def to_segments_table(self, df):
+        '''
+        This method converts the segment columns of a cleaned raw dataset, before the
+        vocabulary is applied, into an arrow table of strings. Missing values are kept
+        as nulls.
+        ======================================================================================
+        -----------------
+        Parameters:
+        -----------------
+        df : pandas dataframe - This is the cleaned raw dataset.
+        
+        -----------------
+        Returns:
+        -----------------
+        table : pyarrow table - This is the table of the segment columns.
+        =======================================================================================
+        '''
+        return pa.table({
+            col: pa.array(df[col].astype('string'), type=pa.string(), from_pandas=True)
+            for col in self.feature_store_config.segment_cols
+        })
+    
+    # Creating a method to read the raw segment columns of the test dataset
+    def read_segments(self, cols=None):
+        '''
+        This method reads the raw values of the segment columns of the test dataset,
+        together with its appended partitions, in the order of the rows of the
+        transformed test dataset. Missing values are labelled "__missing__".
+        ======================================================================================
+        -----------------
+        Parameters:
+        -----------------
+        cols : list - These are the segment columns to read. If not given, all the
+        stored segment columns are read.
+        
+        -----------------
+        Returns:
+        -----------------
+        segments : dict - This maps each column to the raw value of each row.
+        =======================================================================================
+        '''
+        config = self.feature_store_config
+        cols = list(cols or config.segment_cols)
+        missing = [col for col in cols if col not in config.segment_cols]
+        if missing:
+            raise ValueError(f'The columns {missing} are not stored as segments of the test dataset.')
+        table = self.read_table(config.test_segments_path, columns=cols)
+        return {
+            col: np.asarray(table.column(col).fill_null('__missing__').to_pylist(), dtype=object)
+            for col in cols
+        }
+    
+    # Creating a method to write a table into the feature store
+    def write_table(self, table, path:str):
+        '''
+        This method writes a table into the feature store using the configured storage
+        format, compression and row group size. Parquet files are written with row group
+        statistics, so that reads can skip row groups using filters.
+        ======================================================================================
+        -----------------
+        Parameters:
+        -----------------
+        table : pyarrow table - This is the table to store.
+        path : str - This is the configured path of the dataset.
+        
+        -----------------
+        Returns:
+        -----------------
+        path : str - This is the path to which the table was written.
+        =======================================================================================
+        '''
+        path = self.resolve_path(path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        config = self.feature_store_config
+        if config.storage_format == 'feather':
+            feather.write_feather(
+                table,
+                path,
+                compression=self.resolve_compression(),
+                chunksize=config.row_group_size
+            )
+        else:
+            pq.write_table(
+                table,
+                path,
+                compression=self.resolve_compression(),
+                row_group_size=config.row_group_size,
+                write_statistics=True
+            )
+        return path
+    
+    # Creating a method to open a writer which appends batches to a dataset
+    def open_writer(self, path:str, schema):
+        '''
+        This method opens a writer, which writes batches of a dataset into the feature
+        store using the configured storage format and compression.
+        ======================================================================================
+        -----------------
+        Parameters:
+        -----------------
+        path : str - This is the configured path of the dataset.
+        schema : pyarrow schema - This is the schema of the dataset.
+        
+        -----------------
+        Returns:
+        -----------------
+        writer : The parquet or arrow IPC writer. It must be closed after use.
+        =======================================================================================
+        '''
+        path = self.resolve_path(path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        config = self.feature_store_config
+        if config.storage_format == 'feather':
+            compression = self.resolve_compression()
+            options = pa.ipc.IpcWriteOptions(compression=None if compression == 'uncompressed' else compression)
+            return pa.ipc.new_file(path, schema, options=options)
+        return pq.ParquetWriter(path, schema, compression=self.resolve_compression(), write_statistics=True)
+    
+    # Creating a method to resolve the directory holding the appended partitions of a dataset
+    def parts_dir(self, path:str):
+        '''
+        This method returns the directory which holds the partitions appended to a dataset.
+        The partitions of "xform_train_set.parquet" are stored in "xform_train_set.parts".
+        ======================================================================================
+        -----------------
+        Parameters:
+        -----------------
+        path : str - This is the configured path of the dataset.
+        
+        -----------------
+        Returns:
+        -----------------
+        parts_dir : str - This is the directory of the appended partitions.
+        =======================================================================================
+        '''
+        return os.path.splitext(path)[0] + '.parts'
+    
+    # Creating a method to list the appended partitions of a dataset
+    def list_parts(self, path:str):
+        '''
+        This method lists the partitions appended to a dataset in the order they were
+        written. Files whose names start with "." or "_" are partitions which are still
+        being written and are ignored.
+        ======================================================================================
+        -----------------
+        Parameters:
+        -----------------
+        path : str - This is the configured path of the dataset.
+        
+        -----------------
+        Returns:
+        -----------------
+        parts : list - This is the list of paths to the partitions.
+        =======================================================================================
+        '''
+        parts_dir = self.parts_dir(path)
+        if not os.path.isdir(parts_dir):
+            return []
+        return [
+            os.path.join(parts_dir, file_name)
+            for file_name in sorted(os.listdir(parts_dir))
+            if not file_name.startswith(('.', '_'))
+        ]
+    
+    # Creating a method to remove the appended partitions
+    def clear_parts(self):
+        '''
+        This method removes the partitions appended to the train and test datasets and
+        the row keys of the feature store. It is called whenever the datasets are rebuilt,
+        as the partitions were transformed with the previous preprocessor object.
+        '''
+        config = self.feature_store_config
+        for directory in [
+            self.parts_dir(config.xform_train_path),
+            self.parts_dir(config.xform_test_path),
+            self.parts_dir(config.test_segments_path),
+            config.row_keys_path
+        ]:
+            if os.path.isdir(directory):
+                shutil.rmtree(directory)
+    
+    # Creating a method to read a single file of the feature store
+    @staticmethod
+    def read_file(path:str, columns=None, filters=None):
+        '''
+        This method reads a single parquet or feather file of the feature store.
+        '''
+        if path.endswith('.arrow'):
+            return feather.read_table(path, columns=columns, memory_map=True)
+        return pq.read_table(path, columns=columns, filters=filters, memory_map=True)
+    
+    # Creating a method to read the schema of a dataset
+    def read_schema(self, path:str):
+        '''
+        This method reads the schema of a dataset in the feature store without reading
+        its data.
+        ======================================================================================
+        -----------------
+        Parameters:
+        -----------------
+        path : str - This is the configured path of the dataset.
+        
+        -----------------
+        Returns:
+        -----------------
+        schema : pyarrow schema - This is the schema of the dataset.
+        =======================================================================================
+        '''
+        path = self.resolve_path(path)
+        if path.endswith('.arrow'):
+            with pa.memory_map(path) as source:
+                return pa.ipc.open_file(source).schema
+        return pq.read_schema(path)
+    
+    # Creating a method to read a dataset from the feature store
+    def read_table(self, path:str, columns=None, filters=None):
+        '''
+        This method reads a dataset, together with its appended partitions, from the
+        feature store as an arrow table. Only the given columns are read. Feather files
+        are memory mapped, and parquet files skip the row groups excluded by the filters
+        using their statistics.
+        ======================================================================================
+        -----------------
+        Parameters:
+        -----------------
+        path : str - This is the configured path of the dataset.
+        columns : list - This is the list of columns to read. If not given, all columns
+        are read.
+        filters : list - These are the parquet filters, for example
+        [('target_class', '=', 1)]. They are only used for parquet files.
+        
+        -----------------
+        Returns:
+        -----------------
+        table : pyarrow table - This is the dataset.
+        =======================================================================================
+        '''
+        try:
+            paths = [self.resolve_path(path)] + self.list_parts(path)
+            tables = [self.read_file(file_path, columns=columns, filters=filters) for file_path in paths]
+            if len(tables) == 1:
+                return tables[0]
+            return pa.concat_tables(tables)
+        
+        except Exception as e:
+            raise CustomException(e, sys)
+    
+    # Creating a method to read the features and the target of a dataset as arrays
+    def read_features_matrix(self, path:str, target:str='target_class'):
+        '''
+        This method reads the features and the target of a dataset from the feature store
+        as numpy arrays. The float32 feature matrix is allocated once in column major
+        order and each column is copied into it straight from the arrow buffers, so no
+        pandas dataframe is built on the way.
+        ======================================================================================
+        -----------------
+        Parameters:
+        -----------------
+        path : str - This is the configured path of the dataset.
+        target : str - This is the name of the target column.
+        
+        -----------------
+        Returns:
+        -----------------
+        X : numpy array - This is the float32 feature matrix.
+        y : numpy array - This is the target.
+        feature_names : list - These are the names of the features.
+        =======================================================================================
+        '''
+        try:
+            table = self.read_table(path)
+            feature_names = [name for name in table.column_names if name != target]
+            X = np.empty((table.num_rows, len(feature_names)), dtype=np.float32, order='F')
+            for j, name in enumerate(feature_names):
+                offset = 0
+                for chunk in table.column(name).chunks:
+                    values = chunk.cast(pa.float32()).to_numpy(zero_copy_only=False)
+                    X[offset:offset + len(values), j] = values
+                    offset += len(values)
+            y = table.column(target).to_numpy()
+            return X, y, feature_names
+        
+        except Exception as e:
+            raise CustomException(e, sys)
+    
+    # Creating a method to read a dataset as an XGBoost DMatrix
+    def read_dmatrix(self, path:str, target:str='target_class'):
+        '''
+        This method reads a dataset from the feature store into an XGBoost DMatrix,
+        which is built from the float32 feature matrix without a pandas copy.
+        '''
+        X, y, feature_names = self.read_features_matrix(path, target)
+        return xgb.DMatrix(X, label=y, feature_names=feature_names)
+    
+    # Creating a method to read the features and the target of a dataset
+    def read_features_target(self, path:str, target:str='target_class'):
+        '''
+        This method reads the features and the target of a dataset from the feature store.
+        The features are returned as a float32 dataframe, which wraps the feature matrix
+        read from the arrow buffers without copying it.
+        ======================================================================================
+        -----------------
+        Parameters:
+        -----------------
+        path : str - This is the configured path of the dataset.
+        target : str - This is the name of the target column.
+        
+        -----------------
+        Returns:
+        -----------------
+        X : pandas dataframe - This is the feature set.
+        y : pandas dataframe - This is the target set.
+        =======================================================================================
+        '''
+        try:
+            X, y, feature_names = self.read_features_matrix(path, target)
+            return pd.DataFrame(X, columns=feature_names, copy=False), pd.DataFrame({target: y})
+        
+        except Exception as e:
+            raise CustomException(e, sys)
+    
     # Creating a method to store the transformed datasets.
     def create_feature_store(self, train_set, test_set):
         '''
@@ -37,20 +425,19 @@ class FeatureStoreCreation():
         =======================================================================================
         '''
         try:
-            # Creating the directory to store the transformed datasets
-            dirpath = os.path.dirname(self.feature_store_config.xform_train_path)
-            os.makedirs(dirpath, exist_ok=True)
+            # Removing the partitions appended to the previous datasets
+            self.clear_parts()
             
             # Storing the transformed datasets into the feature store
-            train_set.to_parquet(self.feature_store_config.xform_train_path, index=False, compression='gzip')
-            test_set.to_parquet(self.feature_store_config.xform_test_path, index=False, compression='gzip')
+            xform_train_path = self.write_table(self.to_store_table(train_set), self.feature_store_config.xform_train_path)
+            xform_test_path = self.write_table(self.to_store_table(test_set), self.feature_store_config.xform_test_path)
+            
+            logging.info('The transformed datasets have been stored in the feature store.')
             
             return (
-                self.feature_store_config.xform_train_path,
-                self.feature_store_config.xform_test_path
+                xform_train_path,
+                xform_test_path
             )
         
         except Exception as e:
             raise CustomException(e, sys)
-    
-    
\ No newline at end of file
@@ -0,0 +1,253 @@
+# Importing packages
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+from concurrent.futures import ProcessPoolExecutor
+from src.components.config_entity import SyntheticDataConfig
+from src.components.data_ingestion import RAW_SCHEMA
+from src.components.data_ingestion import TEXT_TYPE
+from src.exception import CustomException
+from src.logger import logging
+from src.utils import read_categorical_parquet
+
+# Holding the fitted tables of a worker process. They are set once per worker by the
+# initializer and reused for every chunk.
+_WORKER = {}
+
+
+# Creating a function to initialize a worker process
+def _init_worker(tables):
+    '''
+    This function stores the fitted tables of the generator, once per worker process.
+    '''
+    _WORKER['tables'] = tables
+
+
+# Creating a function to sample a chunk in a worker process
+def _sample_chunk(chunk, n_rows, seed):
+    '''
+    This function samples the rows of a chunk with the fitted tables of the worker.
+    '''
+    return sample_table(_WORKER['tables'], n_rows, seed, chunk)
+
+
+# Creating a function to sample rows from the fitted tables
+def sample_table(tables, n_rows:int, seed:int, chunk:int=0):
+    '''
+    This function samples rows in the raw data schema. Each column is sampled from its
+    distribution conditional on the values already sampled for its parent columns, by
+    inverting the cumulative distributions of every parent combination, which are laid
+    out one after the other so that a single sorted search samples the whole column.
+    The random numbers of a chunk depend only on the seed and the chunk number.
+    ======================================================================================
+    ---------------------
+    Parameters:
+    ---------------------
+    tables : dict - These are the fitted tables of the synthetic data generator.
+    n_rows : int - This is the number of rows to sample.
+    seed : int - This is the seed of the dataset.
+    chunk : int - This is the number of the chunk within the dataset.
+
+    ---------------------
+    Returns:
+    ---------------------
+    table : pyarrow table - These are the sampled rows with the raw data schema.
+    ======================================================================================
+    '''
+    rng = np.random.default_rng(np.random.SeedSequence([seed, chunk]))
+    codes = {}
+    for col, table in tables['conditional'].items():
+        combination = np.zeros(n_rows, dtype=np.int64)
+        for parent, size in zip(table['parents'], table['sizes']):
+            combination = combination * size + codes[parent]
+        n_values = len(table['values'])
+        position = np.searchsorted(table['cdf'], combination + rng.random(n_rows), side='right')
+        codes[col] = np.minimum(position - combination * n_values, n_values - 1).astype(np.int32)
+
+    columns = []
+    for field in RAW_SCHEMA:
+        if field.name in tables['quantiles']:
+            quantiles = tables['quantiles'][field.name]
+            values = np.interp(rng.random(n_rows), np.linspace(0, 1, len(quantiles)), quantiles)
+            columns.append(pa.array(np.rint(values).astype(np.int64), type=field.type))
+        elif field.type == TEXT_TYPE:
+            dictionary = pa.array(tables['conditional'][field.name]['values'], type=pa.string())
+            columns.append(pa.DictionaryArray.from_arrays(pa.array(codes[field.name]), dictionary))
+        else:
+            values = np.asarray(tables['conditional'][field.name]['values'], dtype=np.int64)
+            columns.append(pa.array(values[codes[field.name]], type=field.type))
+    return pa.Table.from_arrays(columns, schema=RAW_SCHEMA)
+
+
+# Creating a class to generate synthetic datasets with the distribution of the raw data
+class SyntheticDataGenerator():
+    '''
+    This class learns the distribution of the raw training data and generates synthetic
+    datasets of any size in the raw data schema, for the scaling benchmarks of the
+    pipelines. Every column is sampled from its frequencies conditional on a few parent
+    columns, mixed with its marginal frequencies so that rare parent combinations stay
+    plausible, and the continuous columns are sampled from their quantiles. The rows
+    are sampled in chunks by a pool of worker processes and written one row group at a
+    time, so the memory used does not grow with the number of rows. A dataset depends
+    only on the seed and the chunk size, not on the number of workers.
+    '''
+    # Creating the constructor for the class
+    def __init__(self, n_workers:int=None, chunk_size:int=None, seed:int=None):
+        '''
+        This is the constructor for the synthetic data generator class. The settings which
+        are not given are taken from the synthetic data config.
+        '''
+        self.synthetic_config = SyntheticDataConfig()
+        self.n_workers = n_workers or self.synthetic_config.n_workers or os.cpu_count()
+        self.chunk_size = chunk_size or self.synthetic_config.chunk_size
+        self.seed = seed if seed is not None else self.synthetic_config.seed
+        self.tables = None
+
+    # Creating a method to learn the distribution of the raw data
+    def fit(self, source_path:str=None):
+        '''
+        This method learns the conditional frequencies of the columns and the quantiles
+        of the continuous columns from a raw parquet file.
+        ================================================================================
+        -------------------
+        Parameters:
+        -------------------
+        source_path : str - This is the path to the raw parquet file. If not given, the
+        train dataset is used.
+
+        -------------------
+        Returns:
+        -------------------
+        generator : SyntheticDataGenerator - This is the fitted generator.
+        ================================================================================
+        '''
+        try:
+            source_path = source_path or self.synthetic_config.source_path
+            df = read_categorical_parquet(source_path)
+            n_source = len(df)
+            df = df.dropna()
+            if len(df) < n_source:
+                logging.info(f'Dropped {n_source - len(df)} rows with missing values before fitting the generator.')
+            smoothing = self.synthetic_config.smoothing
+
+            codes, conditional = {}, {}
+            for col, parents in self.synthetic_config.parents:
+                codes[col], values = pd.factorize(df[col].astype(object), sort=True)
+                n_values = len(values)
+                is_text = RAW_SCHEMA.field(col).type == TEXT_TYPE
+                sizes = [len(conditional[parent]['values']) for parent in parents]
+                combination = np.zeros(len(df), dtype=np.int64)
+                for parent, size in zip(parents, sizes):
+                    combination = combination * size + codes[parent]
+                n_combinations = int(np.prod(sizes, dtype=np.int64))
+
+                # Mixing the frequencies of each parent combination with the marginal ones
+                counts = np.bincount(combination * n_values + codes[col], minlength=n_combinations * n_values)
+                counts = counts.reshape(n_combinations, n_values).astype(np.float64)
+                marginal = counts.sum(axis=0) / counts.sum()
+                probabilities = (counts + smoothing * marginal) / (counts.sum(axis=1, keepdims=True) + smoothing)
+                cdf = np.cumsum(probabilities, axis=1)
+                cdf[:, -1] = 1.0
+                conditional[col] = {
+                    'values': [str(value) for value in values] if is_text else [int(value) for value in values],
+                    'parents': list(parents),
+                    'sizes': sizes,
+                    'cdf': (np.arange(n_combinations)[:, None] + cdf).ravel()
+                }
+
+            quantiles = {
+                col: np.quantile(df[col].to_numpy(dtype=np.float64), np.linspace(0, 1, self.synthetic_config.n_quantiles + 1))
+                for col in self.synthetic_config.continuous_cols
+            }
+            missing = set(RAW_SCHEMA.names) - set(conditional) - set(quantiles)
+            if missing:
+                raise ValueError(f'The synthetic data config does not cover the columns {sorted(missing)}.')
+
+            self.tables = {'conditional': conditional, 'quantiles': quantiles}
+            logging.info(f'Fitted the synthetic data generator on {len(df)} rows of {source_path}.')
+            return self
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    # Creating a method to sample a chunk in this process
+    def sample(self, n_rows:int, chunk:int=0):
+        '''
+        This method samples a chunk of rows in this process and returns it as a pandas
+        dataframe with categorical text fields.
+        '''
+        if self.tables is None:
+            self.fit()
+        return sample_table(self.tables, n_rows, self.seed, chunk).to_pandas()
+
+    # Creating a method to generate a synthetic dataset
+    def generate(self, n_rows:int=None, output_path:str=None):
+        '''
+        This method generates a synthetic dataset and streams it to a parquet file, or to
+        a CSV file without a header row like the raw data source. The chunks are sampled
+        in parallel and written in order, with at most a few chunks held in memory.
+        ================================================================================
+        -------------------
+        Parameters:
+        -------------------
+        n_rows : int - This is the number of rows to generate. If not given, the number
+        of rows from the synthetic data config is used.
+        output_path : str - This is the path to the output file. If not given, the
+        output path from the synthetic data config is used.
+
+        -------------------
+        Returns:
+        -------------------
+        output_path : str - This is the path to the synthetic dataset.
+        ================================================================================
+        '''
+        try:
+            if self.tables is None:
+                self.fit()
+            n_rows = n_rows or self.synthetic_config.n_rows
+            output_path = output_path or self.synthetic_config.output_path
+            sizes = [min(self.chunk_size, n_rows - start) for start in range(0, n_rows, self.chunk_size)]
+            n_workers = min(self.n_workers, len(sizes))
+            logging.info(f'Generating {n_rows} synthetic rows in {len(sizes)} chunks using {n_workers} workers into {output_path}.')
+
+            directory = os.path.dirname(output_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            if output_path.endswith('.csv'):
+                string_schema = pa.schema([
+                    pa.field(field.name, pa.string()) if field.type == TEXT_TYPE else field for field in RAW_SCHEMA
+                ])
+                writer = pa_csv.CSVWriter(output_path, string_schema, write_options=pa_csv.WriteOptions(include_header=False))
+                write = lambda table: writer.write_table(table.cast(string_schema))
+            else:
+                writer = pq.ParquetWriter(output_path, RAW_SCHEMA, compression=self.synthetic_config.compression)
+                write = lambda table: writer.write_table(table, row_group_size=len(table))
+
+            try:
+                if n_workers <= 1:
+                    for chunk, size in enumerate(sizes):
+                        write(sample_table(self.tables, size, self.seed, chunk))
+                else:
+                    # Keeping only a few chunks ahead of the writer, so that the memory used
+                    # does not grow with the number of rows
+                    with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker, initargs=(self.tables,)) as executor:
+                        max_pending = n_workers + self.synthetic_config.max_pending_chunks
+                        pending = []
+                        for chunk, size in enumerate(sizes):
+                            pending.append(executor.submit(_sample_chunk, chunk, size, self.seed))
+                            if len(pending) >= max_pending:
+                                write(pending.pop(0).result())
+                        for future in pending:
+                            write(future.result())
+            finally:
+                writer.close()
+
+            logging.info(f'Generated {n_rows} synthetic rows into {output_path}.')
+            return output_path
+
+        except Exception as e:
+            raise CustomException(e, sys)
@@ -0,0 +1,238 @@
+# Importing packages
+import os
+import sys
+import json
+import time
+import sqlite3
+import resource
+import pandas as pd
+import xgboost as xgb
+from src.components.config_entity import TuningTelemetryConfig
+from src.exception import CustomException
+from src.logger import logging
+
+
+# Creating a function to read the resident memory figures of the process
+def read_memory_mb(field:str='VmHWM'):
+    '''
+    This function reads a memory figure, such as VmRSS or VmHWM, of the current process
+    in megabytes. It falls back to the peak resident memory from getrusage.
+    '''
+    try:
+        with open('/proc/self/status') as file_obj:
+            for line in file_obj:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+# Creating a function to reset the peak resident memory of the process
+def reset_peak_memory():
+    '''
+    This function resets the peak resident memory of the process, where the kernel
+    supports it, so that the peak of each fold can be measured separately.
+    '''
+    try:
+        with open('/proc/self/clear_refs', 'w') as file_obj:
+            file_obj.write('5')
+    except OSError:
+        pass
+
+
+# Creating a class to measure the time and memory used by a block of work
+class ResourceTimer():
+    '''
+    This class measures the wall time, the cpu time of all threads of the process and
+    the peak resident memory from the moment it is created.
+    '''
+    # Creating the constructor for the class
+    def __init__(self, reset_peak:bool=True):
+        '''
+        This is the constructor for the resource timer class. It starts the timers.
+        '''
+        if reset_peak:
+            reset_peak_memory()
+        self.wall_start = time.perf_counter()
+        self.cpu_start = time.process_time()
+
+    # Creating a method to read the measurements
+    def read(self):
+        '''
+        This method returns the wall time and cpu time in seconds and the peak resident
+        memory in megabytes.
+        '''
+        return {
+            'wall_s': time.perf_counter() - self.wall_start,
+            'cpu_s': time.process_time() - self.cpu_start,
+            'peak_rss_mb': read_memory_mb('VmHWM')
+        }
+
+
+# Creating a callback to count the boosting rounds trained
+class RoundCounter(xgb.callback.TrainingCallback):
+    '''
+    This callback records the number of boosting rounds trained, including the round at
+    which a trial was pruned.
+    '''
+    # Creating the constructor for the class
+    def __init__(self):
+        '''
+        This is the constructor for the round counter callback.
+        '''
+        super().__init__()
+        self.rounds = 0
+
+    # Creating a method to count each round
+    def after_iteration(self, model, epoch, evals_log):
+        '''
+        This method counts the round and lets the training continue.
+        '''
+        self.rounds = epoch + 1
+        return False
+
+
+# Creating a class to record the telemetry of a hyperparameter search
+class TuningTelemetry():
+    '''
+    This class records the time and resources used by each trial and each fold of an
+    Optuna study in a local SQLite database, and summarizes them at the end of the
+    study by booster and depth.
+    '''
+    # Creating the constructor for the class
+    def __init__(self, db_path:str=None):
+        '''
+        This is the constructor for the tuning telemetry class. It creates the tables of
+        the database if they do not exist.
+        '''
+        self.telemetry_config = TuningTelemetryConfig()
+        self.db_path = db_path or self.telemetry_config.db_path
+        os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+        with sqlite3.connect(self.db_path) as conn:
+            conn.executescript('''
+                CREATE TABLE IF NOT EXISTS studies (
+                    study_name TEXT PRIMARY KEY, started_at REAL, n_trials INTEGER,
+                    fold_build_s REAL, wall_s REAL
+                );
+                CREATE TABLE IF NOT EXISTS trials (
+                    study_name TEXT, trial_number INTEGER, state TEXT, value REAL,
+                    booster TEXT, max_depth INTEGER, params TEXT, wall_s REAL, cpu_s REAL,
+                    peak_rss_mb REAL, rounds INTEGER, pruned_step INTEGER, folds INTEGER,
+                    PRIMARY KEY (study_name, trial_number)
+                );
+                CREATE TABLE IF NOT EXISTS folds (
+                    study_name TEXT, trial_number INTEGER, fold INTEGER, train_wall_s REAL,
+                    train_cpu_s REAL, predict_s REAL, peak_rss_mb REAL, rounds INTEGER,
+                    pruned_step INTEGER, auc REAL,
+                    PRIMARY KEY (study_name, trial_number, fold)
+                );
+            ''')
+
+    # Creating a method to insert a row into a table
+    def insert(self, table:str, row:dict):
+        '''
+        This method inserts or replaces a row in a table of the database.
+        '''
+        columns = ', '.join(row)
+        placeholders = ', '.join('?' for _ in row)
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute(f'INSERT OR REPLACE INTO {table} ({columns}) VALUES ({placeholders})', list(row.values()))
+
+    # Creating a method to record a study
+    def record_study(self, study_name:str, **fields):
+        '''
+        This method records or updates the study level telemetry, such as the time taken
+        to build the cross validation folds.
+        '''
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute('INSERT OR IGNORE INTO studies (study_name, started_at) VALUES (?, ?)', (study_name, time.time()))
+            for key, value in fields.items():
+                conn.execute(f'UPDATE studies SET {key} = ? WHERE study_name = ?', (value, study_name))
+
+    # Creating a method to record a fold
+    def record_fold(self, study_name:str, trial_number:int, fold:int, **fields):
+        '''
+        This method records the telemetry of a fold of a trial.
+        '''
+        self.insert('folds', {'study_name': study_name, 'trial_number': trial_number, 'fold': fold, **fields})
+
+    # Creating a method to record a trial
+    def record_trial(self, study_name:str, trial_number:int, params:dict, **fields):
+        '''
+        This method records the telemetry of a trial.
+        '''
+        self.insert('trials', {
+            'study_name': study_name,
+            'trial_number': trial_number,
+            'booster': params.get('booster'),
+            'max_depth': params.get('max_depth'),
+            'params': json.dumps(params, default=str),
+            **fields
+        })
+
+    # Creating a method to read a table for a study
+    def read_table(self, table:str, study_name:str):
+        '''
+        This method reads the rows of a table for a study as a dataframe.
+        '''
+        with sqlite3.connect(self.db_path) as conn:
+            return pd.read_sql_query(f'SELECT * FROM {table} WHERE study_name = ?', conn, params=(study_name,))
+
+    # Creating a method to summarize a study
+    def summarize(self, study_name:str):
+        '''
+        This method summarizes the telemetry of a study by booster and depth.
+        ================================================================================
+        -------------------
+        Parameters:
+        -------------------
+        study_name : str - This is the name of the study.
+
+        -------------------
+        Returns:
+        -------------------
+        summary : pandas dataframe - This is the number of trials, the share of pruned
+        trials, the mean wall and cpu time, the mean rounds trained and the peak resident
+        memory per booster and depth.
+        ================================================================================
+        '''
+        try:
+            trials = self.read_table('trials', study_name)
+            if trials.empty:
+                return trials
+            trials['max_depth'] = trials['max_depth'].fillna(-1).astype(int)
+            trials['pruned'] = trials['state'] == 'pruned'
+            summary = trials.groupby(['booster', 'max_depth']).agg(
+                trials=('trial_number', 'count'),
+                pruned=('pruned', 'mean'),
+                mean_wall_s=('wall_s', 'mean'),
+                mean_cpu_s=('cpu_s', 'mean'),
+                mean_rounds=('rounds', 'mean'),
+                peak_rss_mb=('peak_rss_mb', 'max'),
+                best_value=('value', 'max')
+            ).reset_index()
+            return summary.sort_values('mean_wall_s', ascending=False).reset_index(drop=True)
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    # Creating a method to format the summary of a study
+    def format_summary(self, study_name:str):
+        '''
+        This method formats the summary of a study, together with the split of the study
+        time between building the folds, training and predicting.
+        '''
+        summary = self.summarize(study_name)
+        folds = self.read_table('folds', study_name)
+        studies = self.read_table('studies', study_name)
+        lines = [f'Tuning telemetry of study {study_name}']
+        if not studies.empty:
+            study = studies.iloc[0]
+            lines.append(
+                f"fold build {study['fold_build_s'] or 0:.2f}s, training {folds['train_wall_s'].sum():.2f}s, "
+                f"prediction {folds['predict_s'].sum():.2f}s, study {study['wall_s'] or 0:.2f}s"
+            )
+        if not summary.empty:
+            lines.append(summary.to_string(index=False, float_format=lambda value: f'{value:.3f}'))
+        return '\n'.join(lines)
@@ -1,21 +1,203 @@
 # Importing packages
 import logging
+import logging.handlers
 import os
-from datetime import datetime
+import sys
+import glob
+import time
+import queue
+import atexit
+import threading
 
 # Creating the format in which events will be logged
-LOG_FILE = f"{datetime.now().strftime('%m_%d_%Y_%H_%M_%S')}.log"
+LOG_FORMAT = "[ %(asctime)s ] %(lineno)d %(name)s - %(levelname)s - %(message)s"
 
-# Creating the logs directory for the project
-logs_path = os.path.join(os.getcwd(), 'logs')
-os.makedirs(logs_path, exist_ok=True)
+# Defining the settings of the log files. Each of them can be overridden by an
+# environment variable of the same name.
+LOG_DIR = os.environ.get('LOG_DIR', os.path.join(os.getcwd(), 'logs'))
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+LOG_MAX_BYTES = int(os.environ.get('LOG_MAX_BYTES', 10 * 1024 * 1024))
+LOG_BACKUP_COUNT = int(os.environ.get('LOG_BACKUP_COUNT', 5))
+LOG_ROTATE_INTERVAL_S = int(os.environ.get('LOG_ROTATE_INTERVAL_S', 24 * 60 * 60))
+LOG_RETENTION_DAYS = float(os.environ.get('LOG_RETENTION_DAYS', 14))
+LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE', 10000))
 
-# Joining the logs directory to the logs path to store the logs file
-LOG_FILE_PATH = os.path.join(logs_path, LOG_FILE)
 
-# Overriding the the basicConfig of the logging module to include the new log format
-logging.basicConfig(
-    filename = LOG_FILE_PATH,
-    format = "[ %(asctime)s ] %(lineno)d %(name)s - %(levelname)s - %(message)s",
-    level = logging.INFO
+# Creating a function to name the log file of the current process
+def log_file_name():
+    '''
+    This function names the log file after the script which started the process and the
+    process id, so that every worker of a multi worker server writes its own file. The
+    code run from stdin or with python -c is named after python.
+    '''
+    script_path = sys.argv[0] if sys.argv and sys.argv[0] not in ('-', '-c') else ''
+    script = os.path.splitext(os.path.basename(script_path))[0]
+    if script == '__main__':
+        # Naming the file after the package run with python -m
+        script = os.path.basename(os.path.dirname(script_path))
+    script = script or 'python'
+    return f'{script}_{os.getpid()}.log'
+
+
+# Creating a file handler which rotates on size and on age
+class SizedTimedRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    '''
+    This class rotates the log file when it reaches its size limit or when it has been
+    open for longer than the rotation interval, whichever comes first. The rotated files
+    are numbered, and only the latest backup_count of them are kept.
+    '''
+    # Creating the constructor for the class
+    def __init__(self, filename:str, max_bytes:int, backup_count:int, rotate_interval_s:float):
+        '''
+        This is the constructor for the rotating file handler. The file is only opened
+        when the first record is written.
+        '''
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8', delay=True)
+        self.rotate_interval_s = rotate_interval_s
+        self.rollover_at = time.time() + rotate_interval_s
+
+    # Creating a method to decide if the file should be rotated
+    def shouldRollover(self, record):
+        '''
+        This method returns True if the file is due for rotation on size or on age.
+        '''
+        if self.rotate_interval_s > 0 and time.time() >= self.rollover_at:
+            return True
+        return bool(super().shouldRollover(record))
+
+    # Creating a method to rotate the file
+    def doRollover(self):
+        '''
+        This method rotates the file and restarts the rotation interval.
+        '''
+        super().doRollover()
+        self.rollover_at = time.time() + self.rotate_interval_s
+
+
+# Creating a queue handler which never blocks the logging thread
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    '''
+    This class puts the log records on a bounded queue, which a listener thread writes
+    to a rotating log file. Nothing is created until the first record is logged - no
+    folder, no file and no thread. If the queue is full because the disk has stalled,
+    the record is dropped and counted rather than waited for, and the number of dropped
+    records is written to the log file when the handler stops.
+    '''
+    # Creating the constructor for the class
+    def __init__(self, log_dir:str=None, max_bytes:int=None, backup_count:int=None,
+                 rotate_interval_s:float=None, queue_size:int=None):
+        '''
+        This is the constructor for the queue handler. The settings which are not given
+        are taken from the module settings.
+        '''
+        self.queue_size = queue_size or LOG_QUEUE_SIZE
+        super().__init__(queue.Queue(self.queue_size))
+        self.log_dir = log_dir or LOG_DIR
+        self.max_bytes = max_bytes if max_bytes is not None else LOG_MAX_BYTES
+        self.backup_count = backup_count if backup_count is not None else LOG_BACKUP_COUNT
+        self.rotate_interval_s = rotate_interval_s if rotate_interval_s is not None else LOG_ROTATE_INTERVAL_S
+        self.listener = None
+        self.file_handler = None
+        self.start_lock = threading.Lock()
+        self.dropped = 0
+
+    # Creating a method to start the listener thread
+    def start(self):
+        '''
+        This method creates the log file handler and starts the listener thread, once
+        per process. Log files older than the retention period are removed first.
+        '''
+        with self.start_lock:
+            if self.listener is not None:
+                return
+            os.makedirs(self.log_dir, exist_ok=True)
+            self.remove_expired_files()
+            self.file_handler = SizedTimedRotatingFileHandler(
+                os.path.join(self.log_dir, log_file_name()),
+                max_bytes=self.max_bytes,
+                backup_count=self.backup_count,
+                rotate_interval_s=self.rotate_interval_s
+            )
+            self.file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+            self.listener = logging.handlers.QueueListener(self.queue, self.file_handler)
+            self.listener.start()
+            atexit.register(self.stop)
+
+    # Creating a method to remove the expired log files
+    def remove_expired_files(self):
+        '''
+        This method removes the log files, of any process, which have not been written
+        to within the retention period.
+        '''
+        if LOG_RETENTION_DAYS <= 0:
+            return
+        cutoff = time.time() - LOG_RETENTION_DAYS * 24 * 60 * 60
+        for path in glob.glob(os.path.join(self.log_dir, '*.log*')):
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except OSError:
+                pass
+
+    # Creating a method to put a record on the queue
+    def enqueue(self, record):
+        '''
+        This method starts the listener on first use and puts the record on the queue
+        without waiting.
+        '''
+        if self.listener is None:
+            self.start()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    # Creating a method to stop the listener thread
+    def stop(self):
+        '''
+        This method writes the records left on the queue, stops the listener thread and
+        closes the log file. The number of records dropped on a full queue is written
+        last, as the queue may still be full.
+        '''
+        with self.start_lock:
+            if self.listener is None:
+                return
+            try:
+                self.listener.stop()
+            except queue.Full:
+                pass
+            if self.dropped:
+                self.file_handler.handle(logging.makeLogRecord({
+                    'name': __name__,
+                    'levelno': logging.WARNING,
+                    'levelname': logging.getLevelName(logging.WARNING),
+                    'msg': f'Dropped {self.dropped} log records on a full queue.'
+                }))
+            self.file_handler.close()
+            self.listener = None
+
+    # Creating a method to reset the handler in a forked process
+    def reset_after_fork(self):
+        '''
+        This method resets the handler in a forked worker process. The listener thread of
+        the parent does not exist in the child, so the child starts its own listener and
+        log file on first use.
+        '''
+        self.queue = queue.Queue(self.queue_size)
+        self.start_lock = threading.Lock()
+        self.listener = None
+        self.file_handler = None
+        self.dropped = 0
+
+
+# Installing the queue handler on the root logger, once per process
+_QUEUE_HANDLER = next(
+    (handler for handler in logging.getLogger().handlers if isinstance(handler, NonBlockingQueueHandler)),
+    None
 )
+if _QUEUE_HANDLER is None:
+    _QUEUE_HANDLER = NonBlockingQueueHandler()
+    logging.getLogger().addHandler(_QUEUE_HANDLER)
+    logging.getLogger().setLevel(LOG_LEVEL)
+    if hasattr(os, 'register_at_fork'):
+        os.register_at_fork(after_in_child=_QUEUE_HANDLER.reset_after_fork)
@@ -0,0 +1,54 @@
+# Importing packages
+import os
+import sys
+import argparse
+from src.utils import read_json_file
+from src.components.config_entity import BenchmarkConfig
+from src.benchmarks.benchmark import PipelineBenchmark
+from src.benchmarks.benchmark import SIZED_CASES
+from src.benchmarks.benchmark import MODEL_CASES
+
+
+# Running the benchmark script
+if __name__ == '__main__':
+    
+    benchmark_config = BenchmarkConfig()
+    parser = argparse.ArgumentParser(description='Benchmark the pipeline stages offline and compare them with the stored baseline.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=None, help='The numbers of synthetic rows to benchmark.')
+    parser.add_argument('--cases', nargs='+', default=None, choices=SIZED_CASES + MODEL_CASES, help='The cases to benchmark. Every case is benchmarked by default.')
+    parser.add_argument('--repeats', type=int, default=None, help='The number of runs of each case.')
+    parser.add_argument('--bundle', default=None, help='The model bundle to benchmark. A reference model is trained by default.')
+    parser.add_argument('--baseline', default=benchmark_config.baseline_path, help='The baseline report to compare with.')
+    parser.add_argument('--report', default=benchmark_config.report_path, help='The file to write the report to.')
+    parser.add_argument('--save-baseline', action='store_true', help='Store the results as the new baseline.')
+    parser.add_argument('--time-tolerance', type=float, default=None, help='The relative slowdown allowed, for example 0.25.')
+    parser.add_argument('--memory-tolerance', type=float, default=None, help='The relative memory growth allowed, for example 0.25.')
+    args = parser.parse_args()
+    
+    # Running the benchmarks
+    benchmark = PipelineBenchmark(sizes=args.sizes, cases=args.cases, repeats=args.repeats, bundle_path=args.bundle)
+    report = benchmark.run()
+    
+    # Comparing the results with the baseline
+    regressions = []
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        report['comparison'] = PipelineBenchmark.compare(
+            report, read_json_file(args.baseline),
+            time_tolerance=args.time_tolerance, memory_tolerance=args.memory_tolerance
+        )
+        regressions = [entry for entry in report['comparison'] if entry['status'] == 'regression']
+    PipelineBenchmark.save_report(args.report, report)
+    if args.save_baseline:
+        PipelineBenchmark.save_report(args.baseline, report)
+    
+    # Printing the results
+    statuses = {(entry['case'], entry['rows']): entry['status'] for entry in report.get('comparison', [])}
+    print(f"{'case':<24}{'rows':>10}{'wall s':>12}{'cpu s':>12}{'peak MB':>10}  status")
+    for result in report['results']:
+        status = statuses.get((result['case'], result['rows']), '')
+        print(f"{result['case']:<24}{result['rows']:>10}{result['wall_s']:>12.4f}{result['cpu_s']:>12.4f}{result['peak_mb']:>10.1f}  {status}")
+    if args.save_baseline:
+        print(f'Stored the results as the baseline in {args.baseline}.')
+    if regressions:
+        print(f'{len(regressions)} benchmark cases regressed against {args.baseline}.')
+        sys.exit(1)
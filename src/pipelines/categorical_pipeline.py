@@ -0,0 +1,20 @@
+# Importing packages
+import argparse
+from src.components.data_transformation import DataTransformation
+from src.components.categorical_model import CategoricalModelTrainer
+
+
+# Running the native categorical training script
+if __name__ == '__main__':
+    
+    parser = argparse.ArgumentParser(description='Train the booster with native categorical support and compare it with the current pipeline.')
+    parser.add_argument('--skip-transformation', action='store_true', help='Reuse the encoded datasets in the feature store.')
+    args = parser.parse_args()
+    
+    # Encoding the categorical features and storing the datasets in the feature store
+    if not args.skip_transformation:
+        DataTransformation().initiate_categorical_transformation()
+    
+    # Training the booster and comparing it with the current pipeline
+    booster, report = CategoricalModelTrainer().initiate_categorical_training(save_model=True)
+    print(report.to_string(index=False, float_format=lambda value: f'{value:.4f}'))
@@ -0,0 +1,38 @@
+# Importing packages
+import os
+import argparse
+import pandas as pd
+from src.utils import read_json_file
+from src.utils import read_categorical_parquet
+from src.utils import apply_vocabulary
+from src.components.config_entity import DataTransformationConfig
+from src.components.config_entity import ModelTrainerConfig
+from src.components.data_cleaning import DataCleaner
+from src.components.prediction_explainer import PredictionExplainer
+
+
+# Running the batch explanation script
+if __name__ == '__main__':
+    
+    parser = argparse.ArgumentParser(description='Explain the predictions of the model bundle for a file of raw profiles.')
+    parser.add_argument('input', help='The raw parquet file, or CSV file with a header row, to explain.')
+    parser.add_argument('output', help='The parquet file to write the contributions of each field to.')
+    parser.add_argument('--bundle', default=ModelTrainerConfig().model_path, help='The model bundle to explain.')
+    parser.add_argument('--approximate', action='store_true', help='Use the faster approximate contributions.')
+    args = parser.parse_args()
+    
+    # Reading and cleaning the raw profiles as the feature pipeline does
+    if args.input.endswith('.parquet'):
+        df = read_categorical_parquet(args.input)
+    else:
+        df = pd.read_csv(args.input)
+    df = DataCleaner(fill_question_marks=False).clean(df.drop(columns=['fnlwgt', 'target_class'], errors='ignore'))
+    vocabulary_path = DataTransformationConfig().vocabulary_path
+    if os.path.exists(vocabulary_path):
+        df = apply_vocabulary(df, read_json_file(vocabulary_path))
+    
+    # Explaining the profiles in batches, without the cache
+    explainer = PredictionExplainer.from_bundle(args.bundle)
+    explanations = explainer.explain_frame(df, use_cache=False, approximate=args.approximate)
+    explanations.to_parquet(args.output, index=False)
+    print(f'Explained {len(explanations)} rows into {args.output}.')
@@ -1,24 +1,150 @@
 # Importing packages
+import os
+import argparse
+from dataclasses import asdict
 from src.logger import logging
 from src.exception import CustomException
 from src.components.config_entity import DataIngestionConfig
 from src.components.config_entity import DataTransformationConfig
+from src.components.config_entity import StoreFeatureConfig
+from src.components.config_entity import DriftConfig
+from src.components import data_ingestion
+from src.components import data_transformation
+from src.components import data_cleaning
+from src.components import store_features
+from src.components import feature_store_append
+from src.components import drift_monitor
+from src.components import model_bundle
+from src import utils
 from src.components.data_ingestion import DataIngestion
 from src.components.data_transformation import DataTransformation
 from src.components.store_features import FeatureStoreCreation
+from src.components.feature_store_append import FeatureStoreAppend
+from src.components.drift_monitor import DriftBaseline
+from src.components.stage_cache import Stage
+from src.components.stage_cache import StageRunner
 
 
 # Running the feature store creating script
 if __name__ == '__main__':
     
-    # Creating artifacts folder and ingesting the data
-    ingestion_obj = DataIngestion()
-    train_path, test_path = ingestion_obj.initiate_data_ingestion()
+    parser = argparse.ArgumentParser(description='Create the feature store.')
+    parser.add_argument('--out-of-core', action='store_true', help='Fit and transform the datasets in record batches.')
+    parser.add_argument('--dry-run', action='store_true', help='Only report which stages would run.')
+    parser.add_argument('--force', action='store_true', help='Run every stage, even if it is up to date.')
+    parser.add_argument('--append', metavar='PATH', help='Transform the new rows of a raw CSV or parquet file with the saved preprocessor and append them to the feature store.')
+    parser.add_argument('--header', action='store_true', help='The CSV file given to --append has a header row.')
+    args = parser.parse_args()
     
-    # Transforming the datasets
-    data_transf_obj = DataTransformation()
-    train_set, test_set = data_transf_obj.initiate_data_transformation(train_path=train_path, test_path=test_path)
+    ingestion_config = DataIngestionConfig()
+    transformation_config = DataTransformationConfig()
+    feature_store_config = StoreFeatureConfig()
+    drift_config = DriftConfig()
+    
+    # Creating artifacts folder and ingesting the data. The data is streamed from the
+    # local raw data source if it exists, else it is downloaded from the UCI website
+    def run_ingestion():
+        ingestion_obj = DataIngestion()
+        if os.path.exists(ingestion_obj.ingestion_config.raw_data_path):
+            ingestion_obj.initiate_streaming_ingestion()
+        else:
+            ingestion_obj.initiate_data_ingestion()
+    
+    # Transforming the datasets and saving them to the feature store
+    def run_transformation():
+        data_transf_obj = DataTransformation()
+        if args.out_of_core:
+            # The transformed datasets are written directly into the feature store
+            data_transf_obj.initiate_streaming_transformation()
+        else:
+            train_set, test_set = data_transf_obj.initiate_data_transformation(
+                train_path=ingestion_config.train_data_path,
+                test_path=ingestion_config.test_data_path
+            )
+            feature_store_obj = FeatureStoreCreation()
+            feature_store_obj.create_feature_store(train_set=train_set, test_set=test_set)
+    
+    # Appending the new rows of a raw file to the feature store
+    def run_append():
+        counts = FeatureStoreAppend().initiate_append(args.append, header=args.header)
+        print(f"Appended {counts['train']} train rows and {counts['test']} test rows, skipped {counts['skipped']} known rows.")
+    
+    # Sketching the training data as the baseline of the drift monitor
+    def run_drift_baseline():
+        DriftBaseline().initiate_drift_baseline(train_path=ingestion_config.train_data_path)
     
-    # Saving the transformed datasets to the feature store
     feature_store_obj = FeatureStoreCreation()
-    feature_store_obj.create_feature_store(train_set=train_set, test_set=test_set)
\ No newline at end of file
+    
+    # Identifying the data source of the ingestion. The local raw data source is hashed,
+    # and the remote source is identified by its url and the version given by the server.
+    # The server is not asked in append mode, which does not ingest the data source
+    ingestion_inputs, ingestion_source = [], None
+    if os.path.exists(ingestion_config.raw_data_path):
+        ingestion_inputs = [ingestion_config.raw_data_path]
+    elif args.append is None:
+        ingestion_source = DataIngestion().remote_source_version()
+    
+    # Declaring the stages of the feature pipeline with their inputs and outputs
+    stages = [
+        Stage(
+            name='data_ingestion',
+            func=run_ingestion,
+            inputs=ingestion_inputs,
+            outputs=[ingestion_config.train_data_path, ingestion_config.test_data_path],
+            code=[data_ingestion],
+            params={**asdict(ingestion_config), 'source': ingestion_source}
+        ),
+        Stage(
+            name='data_transformation',
+            func=run_transformation,
+            inputs=[ingestion_config.train_data_path, ingestion_config.test_data_path],
+            outputs=[
+                transformation_config.preprocessor_obj_path,
+                transformation_config.vocabulary_path,
+                feature_store_obj.resolve_path(feature_store_config.xform_train_path),
+                feature_store_obj.resolve_path(feature_store_config.xform_test_path),
+                feature_store_obj.resolve_path(feature_store_config.test_segments_path)
+            ],
+            code=[data_transformation, data_cleaning, store_features, utils],
+            params={'out_of_core': args.out_of_core, **asdict(transformation_config), **asdict(feature_store_config)}
+        ),
+        Stage(
+            name='drift_baseline',
+            func=run_drift_baseline,
+            inputs=[
+                ingestion_config.train_data_path,
+                transformation_config.preprocessor_obj_path,
+                transformation_config.vocabulary_path
+            ],
+            outputs=[drift_config.baseline_path],
+            code=[drift_monitor, model_bundle, data_cleaning, utils],
+            params=asdict(drift_config)
+        )
+    ]
+    
+    # In append mode, only the new rows are transformed and the preprocessor is not refit
+    if args.append is not None:
+        stages = [
+            Stage(
+                name='feature_store_append',
+                func=run_append,
+                inputs=[
+                    args.append,
+                    transformation_config.preprocessor_obj_path,
+                    transformation_config.vocabulary_path
+                ],
+                outputs=[
+                    feature_store_obj.parts_dir(feature_store_config.xform_train_path),
+                    feature_store_obj.parts_dir(feature_store_config.xform_test_path),
+                    feature_store_obj.parts_dir(feature_store_config.test_segments_path),
+                    feature_store_config.row_keys_path
+                ],
+                code=[feature_store_append, data_ingestion, data_cleaning, store_features, utils],
+                params={'header': args.header, **asdict(ingestion_config), **asdict(feature_store_config)}
+            )
+        ]
+    
+    # Running the stages which are not up to date
+    runner = StageRunner()
+    report = runner.run(stages, dry_run=args.dry_run, force=args.force)
+    print(runner.format_report(report))
@@ -0,0 +1,55 @@
+# Importing packages
+import mlflow
+from mlflow import MlflowClient
+from src.logger import logging
+from src.utils import save_run_params
+from src.components.model_refresh import ModelRefresh
+
+if __name__ == '__main__':
+
+    # Instantiating the model refresh class
+    refresher = ModelRefresh()
+
+    # Fetching the active model and its hyperparameters from the model registry
+    booster, params, runs_data = refresher.retrieve_active_model()
+
+    # Transforming the newly ingested data using the saved preprocessor object
+    X_new, y_new = refresher.create_refresh_datasets()
+
+    # Continuing the boosting process and validating the refreshed model
+    refreshed_booster, base_auc, refreshed_auc, accepted = refresher.refresh_model(
+        booster=booster,
+        params=params,
+        X_new=X_new,
+        y_new=y_new
+    )
+
+    # Registering the refreshed model as a new version only if the roc auc score holds
+    if accepted:
+        client = MlflowClient()
+        model_name = runs_data['model_name']
+        run_params = {}
+        with mlflow.start_run(run_name='refresh_pipeline') as run:
+            mlflow.log_params(params)
+            mlflow.log_metric('base_roc_auc_score', base_auc)
+            mlflow.log_metric('roc_auc_score', refreshed_auc)
+            mlflow.log_param('refreshed_from', runs_data['model_uri'])
+            model_info = mlflow.xgboost.log_model(
+                xgb_model=refreshed_booster,
+                artifact_path=f'models/{model_name}',
+                registered_model_name=model_name
+            )
+
+            # Fetch the latest version of the model
+            latest_version_info = client.get_latest_versions(model_name, stages=['None'])[0]
+
+            # Storing the model uri and run id into a dictionary
+            run_params['model_uri'] = model_info.model_uri
+            run_params['run_id'] = run.info.run_id
+            run_params['model_name'] = latest_version_info.name
+            run_params['model_version'] = latest_version_info.version
+
+        # Saving the run parameters into a JSON file for future retrieval
+        save_run_params(run_params)
+    else:
+        logging.info('The refreshed model did not hold the roc auc score and was not registered.')
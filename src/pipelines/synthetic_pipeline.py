@@ -0,0 +1,23 @@
+# Importing packages
+import argparse
+from src.components.config_entity import SyntheticDataConfig
+from src.components.synthetic_data import SyntheticDataGenerator
+
+
+# Running the synthetic data script
+if __name__ == '__main__':
+    
+    synthetic_config = SyntheticDataConfig()
+    parser = argparse.ArgumentParser(description='Generate a synthetic dataset with the distribution of the raw training data.')
+    parser.add_argument('n_rows', type=int, help='The number of rows to generate.')
+    parser.add_argument('--output', default=synthetic_config.output_path, help='The parquet file, or CSV file without a header row, to write.')
+    parser.add_argument('--source', default=synthetic_config.source_path, help='The raw parquet file to learn the distribution from.')
+    parser.add_argument('--seed', type=int, default=synthetic_config.seed, help='The seed of the dataset.')
+    parser.add_argument('--workers', type=int, default=None, help='The number of worker processes. Every cpu is used by default.')
+    parser.add_argument('--chunk-size', type=int, default=None, help='The number of rows sampled per chunk and written per row group.')
+    args = parser.parse_args()
+    
+    # Learning the distribution of the raw data and streaming the synthetic rows
+    generator = SyntheticDataGenerator(n_workers=args.workers, chunk_size=args.chunk_size, seed=args.seed)
+    output_path = generator.fit(args.source).generate(n_rows=args.n_rows, output_path=args.output)
+    print(f'Generated {args.n_rows} synthetic rows into {output_path}.')
@@ -1,55 +1,201 @@
 # Importing packages
 import pathlib
+import argparse
+from dataclasses import asdict
 import subprocess
 import dagshub
 import mlflow
 from mlflow import MlflowClient
+from src import utils
 from src.utils import save_run_params
+from src.utils import load_run_params
+from src.utils import read_json_file
+from src.utils import read_categorical_parquet
+from src.utils import apply_vocabulary
+from src.components import model_trainer
+from src.components import find_best_model
+from src.components import model_bundle
+from src.components import fused_model
+from src.components import onnx_export
+from src.components import model_evaluation
+from src.components import fold_cache
+from src.components import tuning_telemetry
+from src.components import drift_monitor
+from src.components import store_features
+from src.components.config_entity import DataTransformationConfig
+from src.components.config_entity import StoreFeatureConfig
+from src.components.config_entity import ModelTrainerConfig
+from src.components.config_entity import OnnxConfig
+from src.components.config_entity import DataIngestionConfig
+from src.components.config_entity import ModelEvaluationConfig
+from src.components.config_entity import TuningConfig
+from src.components.config_entity import FoldCacheConfig
+from src.components.config_entity import DriftConfig
+from src.components.data_cleaning import DataCleaner
+from src.components.model_bundle import load_model_bundle
+from src.components.onnx_export import export_onnx_model
 from src.components.model_trainer import ModelTrainer
+from src.components.model_evaluation import ModelEvaluation
+from src.components.store_features import FeatureStoreCreation
+from src.components.stage_cache import Stage
+from src.components.stage_cache import StageRunner
 
 if __name__ == '__main__':
     
-    # Initiating the Dagshub client
-    dagshub.init(repo_owner='abbeymaj', repo_name='my-first-repo', mlflow=True)
+    parser = argparse.ArgumentParser(description='Train and register the model.')
+    parser.add_argument('--dry-run', action='store_true', help='Only report which stages would run.')
+    parser.add_argument('--force', action='store_true', help='Run every stage, even if it is up to date.')
+    parser.add_argument('--latency-slo-ms', type=float, default=None, help='Pick the most accurate model whose single row latency is within this many milliseconds.')
+    args = parser.parse_args()
     
-    # Setting the tracking uri for the model
-    model_uri = 'https://dagshub.com/abbeymaj/my-first-repo.mlflow'
-    mlflow.set_tracking_uri(model_uri)
+    feature_store_config = StoreFeatureConfig()
+    transformation_config = DataTransformationConfig()
+    trainer_config = ModelTrainerConfig()
+    ingestion_config = DataIngestionConfig()
+    onnx_config = OnnxConfig()
+    evaluation_config = ModelEvaluationConfig()
+    tuning_config = TuningConfig()
+    drift_config = DriftConfig()
     
-    # Instantiating the mlflow client
-    client = MlflowClient()
+    # The latency objective given on the command line overrides the tuning config. The
+    # resolved objective is the one used for training and logged to mlflow
+    if args.latency_slo_ms is not None:
+        tuning_config.latency_slo_ms = args.latency_slo_ms
     
-    # Creating the experiment
-    experiment_id = client.create_experiment('training_1')
+    # Training the model and registering it in the model registry
+    def run_training():
+        # Initiating the Dagshub client
+        dagshub.init(repo_owner='abbeymaj', repo_name='my-first-repo', mlflow=True)
         
-    # Starting the training run
-    run_params = {}
-    with mlflow.start_run(run_name='training_pipeline_1', experiment_id=experiment_id) as run:
-        # Fetching the run id
-        run_id = run.info.run_id
-        # Instantiating the model trainer
-        trainer = ModelTrainer()
-        # Fetching the best model and best model parameters
-        best_model, best_params, metric, _ = trainer.initiate_model_training(save_model=False)
-        # Logging the best model, best metrics and best model parameters into Mlflow DB
-        mlflow.log_params(best_params)
-        mlflow.log_metric('roc_auc_score', metric)
-        model_info = mlflow.xgboost.log_model(
-            xgb_model=best_model,
-            artifact_path='models/training_model_1',
-            registered_model_name='training_model_1'
-        )
+        # Setting the tracking uri for the model
+        model_uri = 'https://dagshub.com/abbeymaj/my-first-repo.mlflow'
+        mlflow.set_tracking_uri(model_uri)
+        
+        # Instantiating the mlflow client
+        client = MlflowClient()
+        
+        # Creating the experiment
+        experiment_id = client.create_experiment('training_1')
+            
+        # Starting the training run
+        run_params = {}
+        with mlflow.start_run(run_name='training_pipeline_1', experiment_id=experiment_id) as run:
+            # Fetching the run id
+            run_id = run.info.run_id
+            # Instantiating the model trainer
+            trainer = ModelTrainer()
+            # Fetching the best model and best model parameters. The model is saved so
+            # that the stage can be skipped when nothing upstream has changed
+            best_model, best_params, metric, _ = trainer.initiate_model_training(
+                save_model=True,
+                latency_slo_ms=tuning_config.latency_slo_ms
+            )
+            # Logging the best model, best metrics and best model parameters into Mlflow DB
+            mlflow.log_params(best_params)
+            mlflow.log_metric('roc_auc_score', metric)
+            # Logging the pareto front and the latency of the picked model, if the search
+            # was latency aware
+            if trainer.pareto_front is not None:
+                picked = trainer.pareto_front[trainer.pareto_front['selected']].iloc[0]
+                mlflow.log_param('latency_slo_ms', tuning_config.latency_slo_ms)
+                mlflow.log_metric('latency_row_ms', picked['row_ms'])
+                mlflow.log_metric('latency_batch_row_ms', picked['batch_row_ms'])
+                mlflow.log_metric('model_bytes', picked['model_bytes'])
+                mlflow.log_text(trainer.pareto_front.to_csv(index=False), 'pareto_front.csv')
+            model_info = mlflow.xgboost.log_model(
+                xgb_model=best_model,
+                artifact_path='models/training_model_1',
+                registered_model_name='training_model_1'
+            )
+            
+            # Fetch the latest version of the model and the model name
+            latest_version_info = client.get_latest_versions('training_model_1', stages=['None'])[0]
+            model_name = latest_version_info.name
+            latest_version = latest_version_info.version
+            
+            # Storing the model uri and run id into a dictionary
+            run_params['model_uri'] = model_info.model_uri
+            run_params['run_id'] = run_id
+            run_params['model_name'] = model_name
+            run_params['model_version'] = latest_version
         
-        # Fetch the latest version of the model and the model name
-        latest_version_info = client.get_latest_versions('training_model_1', stages=['None'])[0]
-        model_name = latest_version_info.name
-        latest_version = latest_version_info.version
+        # Saving the run parameters into a JSON file for future retrieval
+        save_run_params(run_params)
+    
+    # Exporting the model bundle into a single onnx graph. The number of intra op
+    # threads of the onnxruntime session is tuned on the raw test rows.
+    def run_onnx_export():
+        bundle = load_model_bundle(trainer_config.model_path)
+        sample = read_categorical_parquet(ingestion_config.test_data_path)
+        sample = DataCleaner(fill_question_marks=False).clean(sample.drop(columns=['fnlwgt']))
+        sample = apply_vocabulary(sample, read_json_file(transformation_config.vocabulary_path))
+        sample = sample.drop(columns=['target_class'])
+        export_onnx_model(onnx_config.model_path, bundle.preprocessor, bundle.booster, sample=sample)
+    
+    # Evaluating the model bundle on the test set with bootstrap confidence intervals,
+    # and logging the report with the latest training run
+    def run_evaluation():
+        report = ModelEvaluation().initiate_model_evaluation()
         
-        # Storing the model uri and run id into a dictionary
-        run_params['model_uri'] = model_info.model_uri
-        run_params['run_id'] = run_id
-        run_params['model_name'] = model_name
-        run_params['model_version'] = latest_version
-    
-    # Saving the run parameters into a JSON file for future retrieval
-    save_run_params(run_params)
\ No newline at end of file
+        # Resuming the run recorded in the run parameters
+        dagshub.init(repo_owner='abbeymaj', repo_name='my-first-repo', mlflow=True)
+        mlflow.set_tracking_uri('https://dagshub.com/abbeymaj/my-first-repo.mlflow')
+        run_params = read_json_file(load_run_params())
+        with mlflow.start_run(run_id=run_params['run_id']):
+            mlflow.log_metrics(ModelEvaluation.flatten_report(report))
+            mlflow.log_dict(report, 'evaluation_report.json')
+    
+    feature_store_obj = FeatureStoreCreation()
+    
+    # Declaring the stages of the training pipeline with their inputs and outputs
+    stages = [
+        Stage(
+            name='model_training',
+            func=run_training,
+            inputs=[
+                feature_store_obj.resolve_path(feature_store_config.xform_train_path),
+                feature_store_obj.resolve_path(feature_store_config.xform_test_path),
+                feature_store_obj.parts_dir(feature_store_config.xform_train_path),
+                feature_store_obj.parts_dir(feature_store_config.xform_test_path),
+                transformation_config.preprocessor_obj_path
+            ],
+            outputs=[trainer_config.model_path, trainer_config.fused_model_path, drift_config.score_baseline_path],
+            code=[
+                model_trainer, find_best_model, fold_cache, tuning_telemetry, model_bundle,
+                fused_model, drift_monitor, store_features, utils
+            ],
+            params={
+                **asdict(trainer_config),
+                **asdict(tuning_config),
+                'n_splits': FoldCacheConfig().n_splits,
+                'n_score_bins': drift_config.n_score_bins
+            }
+        ),
+        Stage(
+            name='onnx_export',
+            func=run_onnx_export,
+            inputs=[trainer_config.model_path, ingestion_config.test_data_path, transformation_config.vocabulary_path],
+            outputs=[onnx_config.model_path],
+            code=[onnx_export, model_bundle, fused_model],
+            params=asdict(onnx_config)
+        ),
+        Stage(
+            name='model_evaluation',
+            func=run_evaluation,
+            inputs=[
+                trainer_config.model_path,
+                feature_store_obj.resolve_path(feature_store_config.xform_test_path),
+                feature_store_obj.parts_dir(feature_store_config.xform_test_path),
+                feature_store_obj.resolve_path(feature_store_config.test_segments_path),
+                feature_store_obj.parts_dir(feature_store_config.test_segments_path)
+            ],
+            outputs=[evaluation_config.report_path],
+            code=[model_evaluation, model_bundle, store_features],
+            params=asdict(evaluation_config)
+        )
+    ]
+    
+    # Running the stages which are not up to date
+    runner = StageRunner()
+    report = runner.run(stages, dry_run=args.dry_run, force=args.force)
+    print(runner.format_report(report))
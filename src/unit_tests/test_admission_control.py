@@ -0,0 +1,137 @@
+# Importing packages
+import time
+import numpy as np
+import pytest
+import xgboost as xgb
+from src.components.admission_control import AdmissionController
+from src.components.admission_control import RequestShed
+from src.components.data_cleaning import DataCleaner
+from src.components.make_prediction import MakePredictions
+from src.components.model_bundle import save_model_bundle
+from src.components.model_bundle import load_model_bundle
+from src.components.store_features import FeatureStoreCreation
+from src.utils import load_object
+from src.utils import read_categorical_parquet
+from src.utils import read_json_file
+from src.utils import apply_vocabulary
+
+
+# Creating a function to verify that the requests are shed once every slot is taken
+def test_shed_when_overloaded():
+    controller = AdmissionController(max_in_flight=2, degrade_in_flight=1, queue_timeout_ms=1)
+    first = controller.admit()
+    second = controller.admit()
+    assert (first.mode, second.mode) == ('full', 'degraded')
+    with pytest.raises(RequestShed) as shed:
+        controller.admit()
+    assert shed.value.reason == 'overloaded'
+    assert shed.value.retry_after_s == controller.retry_after_s
+
+    # Releasing the slots admits the next request in full
+    with first:
+        pass
+    with second:
+        pass
+    with controller.admit() as third:
+        assert third.mode == 'full'
+    stats = controller.stats()
+    assert stats['admitted'] == 3 and stats['shed_overloaded'] == 1
+    assert stats['in_flight'] == 0
+    assert stats['latency_ms']['full'] is not None
+
+# Creating a function to set the latency estimates of a controller
+def set_estimates(controller, full_ms, degraded_ms):
+    now = time.perf_counter()
+    controller.latency_ms = {'full': full_ms, 'degraded': degraded_ms}
+    controller.latency_updated = {'full': now, 'degraded': now}
+
+# Creating a function to verify that the requests are degraded or shed on their deadline
+def test_deadline():
+    controller = AdmissionController(max_in_flight=4, degrade_in_flight=4, deadline_ms=100)
+    set_estimates(controller, 150.0, 20.0)
+    with controller.admit() as admission:
+        assert admission.mode == 'degraded'
+
+    # A request which waited too long is shed without taking a slot
+    set_estimates(controller, 150.0, 20.0)
+    with pytest.raises(RequestShed) as shed:
+        controller.admit(started=time.perf_counter() - 0.09)
+    assert shed.value.reason == 'deadline'
+    stats = controller.stats()
+    assert stats['in_flight'] == 0 and stats['shed_deadline'] == 1
+
+# Creating a function to verify that the controller recovers after slow requests
+def test_recovery_after_slow_requests():
+    controller = AdmissionController(max_in_flight=4, degrade_in_flight=4, deadline_ms=250, estimate_ttl_s=0.2)
+    for mode in ('full', 'degraded'):
+        admission = controller.admit()
+        admission.mode = mode
+        with admission:
+            admission.scoring_started -= 0.3
+    assert controller.stats()['latency_ms']['full'] > 250
+
+    # While the slow estimates are fresh, the requests cannot meet their deadline
+    with pytest.raises(RequestShed) as shed:
+        controller.admit()
+    assert shed.value.reason == 'deadline'
+
+    # Once they expire, a request is scored in full and its latency replaces the estimate
+    time.sleep(0.25)
+    with controller.admit() as admission:
+        assert admission.mode == 'full'
+    assert controller.stats()['latency_ms']['full'] < 50
+    with controller.admit() as admission:
+        assert admission.mode == 'full'
+
+# Creating a function to verify that a request which could not be degraded counts as full
+def test_degraded_without_degradation():
+    controller = AdmissionController(max_in_flight=2, degrade_in_flight=0)
+    admission = controller.admit()
+    assert admission.mode == 'degraded'
+    admission.mode = 'full'
+    with admission:
+        pass
+    stats = controller.stats()
+    assert (stats['full'], stats['degraded']) == (1, 0)
+    assert stats['latency_ms'] == {'full': stats['latency_ms']['full'], 'degraded': None}
+
+# Creating a function to verify the degraded scoring of a model bundle
+def test_degraded_iteration_range(tmp_path):
+    X_train, y_train = FeatureStoreCreation().read_features_target('feature_store/xform_train_set.parquet')
+    booster = xgb.train({'objective': 'binary:logistic', 'max_depth': 3}, xgb.DMatrix(X_train, y_train), 40)
+    file_path = str(tmp_path / 'model_bundle.awb')
+    save_model_bundle(file_path, load_object('artifacts/preprocessor.pkl'), booster)
+
+    df = read_categorical_parquet('artifacts/test_data.parquet').drop(columns=['fnlwgt', 'target_class']).head(50)
+    df = apply_vocabulary(DataCleaner(fill_question_marks=False).clean(df), read_json_file('artifacts/vocabulary.json'))
+    prediction = MakePredictions(bundle_path=file_path)
+    iteration_range = prediction.degraded_iteration_range(0.25)
+    assert iteration_range == (0, 10)
+
+    # The degraded scores match the scores of the truncated booster
+    preds = prediction.predict(df, iteration_range=iteration_range)
+    expected = load_model_bundle(file_path).predict(df, iteration_range=iteration_range)
+    assert np.allclose(preds, expected)
+    assert not np.allclose(preds, prediction.predict(df))
+
+# Creating a function to verify that the primary and fallback bundles stay loaded together
+def test_bundle_cache_keeps_fallback(tmp_path):
+    X_train, y_train = FeatureStoreCreation().read_features_target('feature_store/xform_train_set.parquet')
+    preprocessor = load_object('artifacts/preprocessor.pkl')
+    paths = {}
+    for name, rounds in [('primary', 20), ('fallback', 5)]:
+        booster = xgb.train({'objective': 'binary:logistic', 'max_depth': 3}, xgb.DMatrix(X_train, y_train), rounds)
+        paths[name] = str(tmp_path / f'{name}.awb')
+        save_model_bundle(paths[name], preprocessor, booster)
+
+    primary = MakePredictions(bundle_path=paths['primary']).retrieve_bundle()
+    fallback = MakePredictions(bundle_path=paths['fallback']).retrieve_bundle()
+    assert primary is not fallback
+    assert MakePredictions(bundle_path=paths['primary']).retrieve_bundle() is primary
+    assert MakePredictions(bundle_path=paths['fallback']).retrieve_bundle() is fallback
+
+    # Rewriting a bundle replaces only its own entry
+    save_model_bundle(paths['primary'], preprocessor, booster)
+    reloaded = MakePredictions(bundle_path=paths['primary']).retrieve_bundle()
+    assert reloaded is not primary and reloaded.booster.num_boosted_rounds() == 5
+    assert MakePredictions(bundle_path=paths['fallback']).retrieve_bundle() is fallback
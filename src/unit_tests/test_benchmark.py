@@ -0,0 +1,56 @@
+# Importing packages
+import os
+from src.benchmarks.benchmark import PipelineBenchmark
+from src.benchmarks.benchmark import SIZED_CASES
+from src.benchmarks.benchmark import MODEL_CASES
+
+
+# Creating a function to verify that every case is benchmarked offline
+def test_run(tmp_path):
+    work_dir = str(tmp_path / 'benchmark')
+    benchmark = PipelineBenchmark(sizes=[3000, 2000], repeats=1, work_dir=work_dir)
+    report = benchmark.run()
+    cases = [(result['case'], result['rows']) for result in report['results']]
+    assert [case for case, _ in cases] == MODEL_CASES + SIZED_CASES * 2
+    assert [rows for case, rows in cases if case == 'ingestion'] == [2000, 3000]
+    for result in report['results']:
+        assert result['wall_s'] > 0 and result['peak_mb'] >= 0
+    assert report['environment']['model'] == 'reference'
+    # Only the reference model is left in the work folder
+    assert os.listdir(work_dir) == ['model_bundle.awb']
+
+    # The cases which were not selected are not recorded
+    report = PipelineBenchmark(sizes=[2000], cases=['predict_batch'], repeats=1, bundle_path=os.path.join(work_dir, 'model_bundle.awb')).run()
+    assert [result['case'] for result in report['results']] == ['predict_batch']
+
+# Creating a function to verify the comparison with the baseline
+def test_compare():
+    def report(*results):
+        return {
+            'environment': {},
+            'results': [{'case': case, 'rows': rows, 'wall_s': wall_s, 'peak_mb': peak_mb} for case, rows, wall_s, peak_mb in results]
+        }
+    baseline = report(
+        ('ingestion', 1000, 1.0, 100.0),
+        ('cleaning', 1000, 1.0, 100.0),
+        ('preprocessor_fit', 1000, 1.0, 100.0),
+        ('predict_single', 1, 0.001, 0.1),
+        ('feature_store_read', 1000, 1.0, 100.0)
+    )
+    current = report(
+        ('ingestion', 1000, 1.5, 100.0),
+        ('cleaning', 1000, 1.1, 100.0),
+        ('preprocessor_fit', 1000, 0.5, 100.0),
+        ('predict_single', 1, 0.003, 0.1),
+        ('feature_store_read', 1000, 1.0, 300.0),
+        ('ingestion', 2000, 1.0, 100.0)
+    )
+    comparison = PipelineBenchmark.compare(current, baseline, time_tolerance=0.25, memory_tolerance=0.25)
+    statuses = [entry['status'] for entry in comparison]
+    # The single row prediction is three times slower, but within the noise floor
+    assert statuses == ['regression', 'ok', 'improvement', 'ok', 'regression', 'new']
+    assert comparison[0]['wall_s_ratio'] == 1.5
+
+    # A looser tolerance accepts the slowdown
+    comparison = PipelineBenchmark.compare(current, baseline, time_tolerance=1.0, memory_tolerance=3.0)
+    assert comparison[0]['status'] == 'ok' and comparison[4]['status'] == 'ok'
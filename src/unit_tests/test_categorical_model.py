@@ -0,0 +1,50 @@
+# Importing packages
+import pytest
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from src.components.config_entity import DataIngestionConfig
+from src.components.config_entity import DataTransformationConfig
+from src.components.data_cleaning import DataCleaner
+from src.components.categorical_model import CategoricalModel
+from src.components.categorical_model import CategoricalModelTrainer
+from src.utils import read_json_file
+from src.utils import read_categorical_parquet
+from src.utils import apply_vocabulary
+
+
+# Creating a fixture to read the encoded train and test datasets
+@pytest.fixture(scope='function')
+def encoded_datasets():
+    vocabulary = read_json_file(DataTransformationConfig().vocabulary_path)
+    datasets = []
+    for path in [DataIngestionConfig().train_data_path, DataIngestionConfig().test_data_path]:
+        df = read_categorical_parquet(path).drop(columns=['fnlwgt'])
+        df = apply_vocabulary(DataCleaner(fill_question_marks=False).clean(df), vocabulary)
+        datasets.append((df.drop(columns=['target_class']), df[['target_class']]))
+    return vocabulary, datasets
+
+# Creating a function to verify that the encoded matrix gives the same predictions as
+# the categorical dataframe
+def test_categorical_model_predict(encoded_datasets):
+    vocabulary, ((X_train, y_train), (X_test, y_test)) = encoded_datasets
+    trainer = CategoricalModelTrainer()
+    trainer.categorical_config.num_boost_round = 20
+    booster = trainer.train_model(X_train, y_train, save_model=False)
+    model = CategoricalModel(booster, vocabulary)
+    expected = booster.predict(xgb.DMatrix(X_test, enable_categorical=True))
+    assert np.allclose(model.predict(X_test), expected)
+
+    # Unknown categories are scored as missing values
+    row = X_test.head(1).astype(object)
+    row['occupation'] = 'Astronaut'
+    missing = X_test.head(1).copy()
+    missing.loc[:, 'occupation'] = np.nan
+    assert np.allclose(model.predict(row), booster.predict(xgb.DMatrix(missing, enable_categorical=True)))
+
+# Creating a function to verify the end to end latency measurements
+def test_measure_latency(encoded_datasets):
+    _, ((X_train, _), _) = encoded_datasets
+    row_ms, batch_row_ms = CategoricalModelTrainer.measure_latency(lambda df: np.zeros(len(df)), X_train, repeats=20)
+    assert row_ms >= 0
+    assert batch_row_ms >= 0
@@ -0,0 +1,62 @@
+# Importing packages
+import pytest
+import pandas as pd
+from src.components.config_entity import DataIngestionConfig
+from src.components.data_cleaning import DataCleaner
+from src.utils import remove_blank_spaces
+from src.utils import remove_question_mark
+from src.utils import recode_target_class
+from src.utils import convert_to_categorical
+from src.utils import read_categorical_parquet
+
+# Creating a function to get the path to the train dataset
+@pytest.fixture(scope='function')
+def train_data_path():
+    train_data_config = DataIngestionConfig()
+    return train_data_config.train_data_path
+
+# Creating a function to get the path to the test dataset
+@pytest.fixture(scope='function')
+def test_data_path():
+    test_data_config = DataIngestionConfig()
+    return test_data_config.test_data_path
+
+# Creating a function to verify that the data cleaner gives the same output as the
+# cleaning functions in src/utils.py on the train dataset
+def test_cleaner_matches_utils_train(train_data_path):
+    df = pd.read_parquet(train_data_path)
+    expected = df.copy().pipe(remove_blank_spaces).pipe(remove_question_mark).pipe(recode_target_class)
+    cleaned = DataCleaner().clean(df)
+    pd.testing.assert_frame_equal(cleaned, expected)
+
+# Creating a function to verify that the data cleaner gives the same output as the
+# cleaning functions in src/utils.py on the test dataset
+def test_cleaner_matches_utils_test(test_data_path):
+    df = pd.read_parquet(test_data_path)
+    expected = df.copy().pipe(remove_blank_spaces).pipe(remove_question_mark).pipe(recode_target_class)
+    cleaned = DataCleaner().clean(df)
+    pd.testing.assert_frame_equal(cleaned, expected)
+
+# Creating a function to verify that the capital features are converted in the same
+# way as convert_to_categorical
+def test_cleaner_converts_capital(train_data_path):
+    df = pd.read_parquet(train_data_path)
+    expected = convert_to_categorical(df.copy().pipe(remove_blank_spaces).pipe(recode_target_class))
+    cleaned = DataCleaner(fill_question_marks=False, convert_capital=True).clean(df)
+    pd.testing.assert_frame_equal(cleaned, expected)
+
+# Creating a function to verify that the data cleaner does not modify its input
+def test_cleaner_does_not_mutate_input(train_data_path):
+    df = pd.read_parquet(train_data_path)
+    original = df.copy()
+    DataCleaner(convert_capital=True).clean(df)
+    pd.testing.assert_frame_equal(df, original)
+
+# Creating a function to verify that categorical columns stay categorical
+def test_cleaner_categorical_columns(train_data_path):
+    df = read_categorical_parquet(train_data_path)
+    cleaned = DataCleaner().clean(df)
+    expected = pd.read_parquet(train_data_path).pipe(remove_blank_spaces).pipe(remove_question_mark)
+    assert isinstance(cleaned['workclass'].dtype, pd.CategoricalDtype)
+    assert (cleaned['workclass'].astype(object) == expected['workclass']).all()
+    assert pd.api.types.is_integer_dtype(cleaned['target_class'])
@@ -1,8 +1,13 @@
 # Importing packages
 import os
+import threading
 import pytest
+import numpy as np
+from http.server import BaseHTTPRequestHandler, HTTPServer
 import pandas as pd
+import pyarrow.parquet as pq
 from src.components.config_entity import DataIngestionConfig
+from src.components.data_ingestion import DataIngestion
 
 # Creating a function to get the path to the train dataset
 @pytest.fixture(scope='function')
@@ -36,4 +41,90 @@ def test_count_train_dataset_columns(train_data_path):
 # Verifying the test dataset has 15 columns
 def test_count_test_dataset_columns(test_data_path):
     df_test = pd.read_parquet(test_data_path)
-    assert len(list(df_test.columns)) == 15
\ No newline at end of file
+    assert len(list(df_test.columns)) == 15
+
+# Creating a function to write a raw CSV file in the UCI format
+@pytest.fixture(scope='function')
+def raw_csv_path(tmp_path, test_data_path):
+    df = pd.read_parquet(test_data_path)
+    csv_path = tmp_path / 'adult.data'
+    df.to_csv(csv_path, header=False, index=False, sep=',')
+    return str(csv_path), len(df)
+
+# Creating a function to create a data ingestion object that writes into a
+# temporary folder
+@pytest.fixture(scope='function')
+def streaming_ingestion(tmp_path):
+    ingestion_obj = DataIngestion()
+    ingestion_obj.ingestion_config.train_data_path = str(tmp_path / 'artifacts' / 'train_data.parquet')
+    ingestion_obj.ingestion_config.test_data_path = str(tmp_path / 'artifacts' / 'test_data.parquet')
+    ingestion_obj.ingestion_config.row_group_size = 1000
+    return ingestion_obj
+
+# Verifying that the streaming ingestion keeps every row of the CSV source and
+# removes the blank spaces from the text fields
+def test_streaming_ingestion_csv(raw_csv_path, streaming_ingestion):
+    csv_path, n_rows = raw_csv_path
+    train_path, test_path = streaming_ingestion.initiate_streaming_ingestion(csv_path)
+    df_train = pd.read_parquet(train_path)
+    df_test = pd.read_parquet(test_path)
+    assert len(df_train) + len(df_test) == n_rows
+    assert len(list(df_train.columns)) == 15
+    assert 0.25 < len(df_test) / n_rows < 0.40
+    assert not df_train['workclass'].str.startswith(' ').any()
+
+# Verifying that the streaming ingestion writes row groups which are no larger
+# than the configured row group size
+def test_streaming_ingestion_row_groups(test_data_path, streaming_ingestion):
+    train_path, _ = streaming_ingestion.initiate_streaming_ingestion(test_data_path)
+    metadata = pq.ParquetFile(train_path).metadata
+    for idx in range(metadata.num_row_groups):
+        assert metadata.row_group(idx).num_rows <= 1000
+
+# Verifying that the hash based split is deterministic
+def test_streaming_ingestion_is_deterministic(test_data_path, streaming_ingestion):
+    train_path, _ = streaming_ingestion.initiate_streaming_ingestion(test_data_path)
+    first_run = pd.read_parquet(train_path)
+    train_path, _ = streaming_ingestion.initiate_streaming_ingestion(test_data_path)
+    second_run = pd.read_parquet(train_path)
+    assert first_run.equals(second_run)
+
+# Verifying that the hash based split handles the bounds of the test size
+def test_hash_split_test_size(test_data_path):
+    ingestion_obj = DataIngestion()
+    batch = pq.read_table(test_data_path).slice(0, 1000).to_batches()[0]
+    ingestion_obj.ingestion_config.test_size = 0.0
+    assert not ingestion_obj.hash_split(batch).any()
+    ingestion_obj.ingestion_config.test_size = float(np.nextafter(1.0, 0.0))
+    assert ingestion_obj.hash_split(batch).all()
+    for test_size in (1.0, -0.1):
+        ingestion_obj.ingestion_config.test_size = test_size
+        with pytest.raises(ValueError):
+            ingestion_obj.hash_split(batch)
+
+
+# Creating a handler which answers HEAD requests with an ETag
+class ETagHandler(BaseHTTPRequestHandler):
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_header('ETag', '"v1"')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+# Verifying that the remote data source is identified by its url and ETag
+def test_remote_source_version():
+    server = HTTPServer(('127.0.0.1', 0), ETagHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        ingestion = DataIngestion()
+        ingestion.ingestion_config.source_url = f'http://127.0.0.1:{server.server_port}/adult.data'
+        assert ingestion.remote_source_version() == {'url': ingestion.ingestion_config.source_url, 'version': '"v1"'}
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    # Only the url is known when the server cannot be reached
+    ingestion.ingestion_config.source_timeout_s = 1.0
+    assert ingestion.remote_source_version()['version'] is None
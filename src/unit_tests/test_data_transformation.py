@@ -2,7 +2,9 @@
 import sys
 import os
 import pytest
+import numpy as np
 import pandas as pd
+from category_encoders import WOEEncoder
 from sklearn import set_config
 set_config(transform_output='pandas')
 from src.components.config_entity import DataIngestionConfig
@@ -12,7 +14,12 @@ from src.utils import remove_blank_spaces
 from src.utils import remove_question_mark
 from src.utils import recode_target_class
 from src.utils import WOE
+from src.utils import CATEGORICAL_COLS
+from src.utils import read_categorical_parquet
+from src.utils import build_vocabulary
+from src.utils import apply_vocabulary
 from src.components.data_transformation import DataTransformation
+from src.components.data_cleaning import DataCleaner
 
 # Creating a function to define the path of the untransformed train dataset
 @pytest.fixture(scope='function')
@@ -158,4 +165,100 @@ def test_targetclass_exists_in_xform_train_dataset(xform_train_dataset_path):
 def test_targetclass_exists_in_xform_test_dataset(xform_test_dataset_path):
     xform_test_df = pd.read_parquet(xform_test_dataset_path)
     cols_list = list(xform_test_df.columns)
-    assert 'target_class' in cols_list
\ No newline at end of file
+    assert 'target_class' in cols_list
+
+# Creating a function to check that the text fields are read as categorical columns
+# and that the blank spaces are removed from the categories
+def test_categorical_blank_spaces_train(train_data_path):
+    train_df = read_categorical_parquet(train_data_path)
+    clean_train_df = remove_blank_spaces(train_df)
+    for col in CATEGORICAL_COLS:
+        assert isinstance(clean_train_df[col].dtype, pd.CategoricalDtype)
+        assert not clean_train_df[col].cat.categories.str.contains(r'\s').any()
+
+# Creating a function to check that the categorical and object columns are cleaned
+# to the same values
+def test_categorical_cleaning_matches_object(train_data_path):
+    object_df = pd.read_parquet(train_data_path).pipe(remove_blank_spaces).pipe(remove_question_mark).pipe(recode_target_class)
+    cat_df = read_categorical_parquet(train_data_path).pipe(remove_blank_spaces).pipe(remove_question_mark).pipe(recode_target_class)
+    for col in CATEGORICAL_COLS:
+        assert (object_df[col] == cat_df[col].astype(object)).all()
+    assert (object_df['target_class'] == cat_df['target_class']).all()
+
+# Creating a function to check that values outside the vocabulary become missing
+def test_apply_vocabulary_unknown_category(train_data_path):
+    train_df = pd.read_parquet(train_data_path).pipe(remove_blank_spaces)
+    vocabulary = build_vocabulary(train_df)
+    new_df = apply_vocabulary(pd.DataFrame({'race': ['White', 'Unknown']}), vocabulary)
+    assert new_df['race'].isna().tolist() == [False, True]
+
+# Creating a function to test that the WOE class gives the same values as
+# category_encoders' WOEEncoder, including unknown and missing values
+def test_woe_matches_woe_encoder(train_data_path, test_data_path):
+    woe_cols = ['workclass', 'education', 'marital-status', 'occupation', 'relationship', 'race', 'native-country']
+    train_df = pd.read_parquet(train_data_path).pipe(remove_blank_spaces).pipe(recode_target_class)
+    test_df = pd.read_parquet(test_data_path).pipe(remove_blank_spaces)
+    X_test = test_df[woe_cols].copy()
+    X_test.iloc[0, 0] = 'Unknown-category'
+    X_test.iloc[1, 1] = np.nan
+    expected = WOEEncoder().fit(train_df[woe_cols], train_df[['target_class']]).transform(X_test)
+    actual = WOE().fit(train_df[woe_cols], train_df[['target_class']]).transform(X_test)
+    assert list(actual.columns) == list(expected.columns)
+    assert np.allclose(actual.values, expected.values, rtol=0, atol=1e-12)
+
+# Creating a function to test that fit requires both classes, while a batch of
+# partial_fit may hold a single class
+def test_woe_single_class_target():
+    X = pd.DataFrame({'workclass': ['Private', 'State-gov', 'Private', 'Private']})
+    with pytest.raises(ValueError):
+        WOE().fit(X, np.zeros(len(X)))
+    with pytest.raises(ValueError):
+        WOE().partial_fit(X, np.array([0, 1, 2, 1]))
+    woe = WOE().partial_fit(X.head(2), np.zeros(2)).partial_fit(X.tail(2), np.ones(2))
+    expected = WOE().fit(X, np.array([0, 0, 1, 1]))
+    assert np.allclose(woe.transform(X).values, expected.transform(X).values)
+
+# Creating a function to test that the out of core fit gives the same preprocessor
+# as the in memory fit
+def test_streaming_preprocessor_matches_in_memory(tmp_path, xform_train_dataset_path, xform_test_dataset_path):
+    data_transformation = DataTransformation()
+    data_transformation.data_transformation_config.batch_size = 5000
+    data_transformation.data_transformation_config.preprocessor_obj_path = str(tmp_path / 'preprocessor.pkl')
+    data_transformation.data_transformation_config.vocabulary_path = str(tmp_path / 'vocabulary.json')
+    data_transformation.feature_store_config.xform_train_path = str(tmp_path / 'xform_train_set.parquet')
+    data_transformation.feature_store_config.xform_test_path = str(tmp_path / 'xform_test_set.parquet')
+    data_transformation.feature_store_config.test_segments_path = str(tmp_path / 'test_segments.parquet')
+    xform_train_path, xform_test_path = data_transformation.initiate_streaming_transformation()
+    in_memory_train = pd.read_parquet(xform_train_dataset_path)
+    in_memory_test = pd.read_parquet(xform_test_dataset_path)
+    streamed_train = pd.read_parquet(xform_train_path)
+    streamed_test = pd.read_parquet(xform_test_path)
+    assert list(streamed_train.columns) == list(in_memory_train.columns)
+    assert np.allclose(streamed_train.values, in_memory_train.values, rtol=1e-6, atol=1e-6)
+    assert np.allclose(streamed_test.values, in_memory_test.values, rtol=1e-6, atol=1e-6)
+    streamed_segments = pd.read_parquet(tmp_path / 'test_segments.parquet')
+    assert len(streamed_segments) == len(streamed_test)
+    assert streamed_segments.equals(pd.read_parquet(StoreFeatureConfig().test_segments_path))
+
+
+# Creating a function to test that the out of core fit does not need both classes of the
+# target in the first batch
+def test_streaming_preprocessor_single_class_first_batch(tmp_path):
+    train_path = str(tmp_path / 'train_data.parquet')
+    train_df = pd.read_parquet(DataIngestionConfig().train_data_path)
+    train_df.sort_values('target_class', kind='stable').reset_index(drop=True).to_parquet(train_path, index=False)
+    data_transformation = DataTransformation()
+    data_transformation.data_transformation_config.batch_size = 5000
+    data_transformation.data_ingestion_config.train_data_path = train_path
+    preprocessor, _ = data_transformation.fit_streaming_preprocessor()
+    first_batch = next(data_transformation.read_clean_batches(train_path))
+    assert first_batch['target_class'].nunique() == 1
+
+    # The fitted preprocessor matches the in memory fit of the same data
+    train_df = DataCleaner(fill_question_marks=False).clean(read_categorical_parquet(train_path).drop(columns=['fnlwgt']))
+    train_df = apply_vocabulary(train_df, build_vocabulary(train_df))
+    X, y = train_df.drop(columns=['target_class']), train_df[['target_class']]
+    expected = data_transformation.create_data_transformation_object().fit(X, y).transform(X)
+    actual = preprocessor.transform(X)
+    assert list(actual.columns) == list(expected.columns)
+    assert np.allclose(actual.values, expected.values, rtol=1e-6, atol=1e-6)
@@ -0,0 +1,90 @@
+# Importing packages
+import numpy as np
+from src.components.create_custom_data import CustomData
+from src.components.drift_monitor import CategorySketch
+from src.components.drift_monitor import QuantileSketch
+from src.components.drift_monitor import DriftBaseline
+from src.components.drift_monitor import DriftMonitor
+from src.components.drift_monitor import population_stability_index
+from src.utils import read_categorical_parquet
+
+
+# Creating a function to build the baselines of the drift monitor in a temporary folder
+def create_monitor(tmp_path):
+    baseline = DriftBaseline()
+    baseline.drift_config.baseline_path = str(tmp_path / 'drift_baseline.json')
+    baseline.drift_config.score_baseline_path = str(tmp_path / 'score_baseline.json')
+    baseline.initiate_drift_baseline()
+    baseline.initiate_score_baseline(np.random.default_rng(42).beta(1, 3, size=10000))
+    return DriftMonitor(baseline.drift_config.baseline_path, baseline.drift_config.score_baseline_path)
+
+# Creating a function to create the data of one person from a country outside the vocabulary
+def create_custom_data():
+    return CustomData(
+        age=75, workclass='State-gov', education='Doctorate', education_num=16,
+        marital_status='Never-married', occupation='Adm-clerical', relationship='Not-in-family',
+        race='White', sex='Male', capital_gain=0, capital_loss=0, hours_per_week=80,
+        native_country='Atlantis'
+    )
+
+# Creating a function to verify the category sketch
+def test_category_sketch():
+    sketch = CategorySketch(['Female', 'Male'])
+    sketch.update([' Male', 'Female', 'Male', 'Other', None])
+    assert sketch.counts.tolist() == [1, 2, 1, 1]
+    assert sketch.summary()['unknown_share'] == 0.2
+
+# Creating a function to verify that small and large batches give the same quantile sketch
+def test_quantile_sketch():
+    values = np.random.default_rng(0).normal(40, 10, size=5000)
+    values[::100] = np.nan
+    sketch = QuantileSketch.from_values(values, n_bins=20)
+    streamed = QuantileSketch(sketch.edges)
+    for i in range(0, len(values), 5):
+        streamed.update(values[i:i + 5])
+    assert streamed.counts.tolist() == sketch.counts.tolist()
+    assert streamed.missing == sketch.missing == 50
+    assert abs(sketch.quantile(0.5) - np.nanmedian(values)) < 1.0
+
+# Creating a function to verify the population stability index
+def test_population_stability_index():
+    assert population_stability_index([10, 20, 30], [10, 20, 30]) == 0.0
+    assert population_stability_index([10, 20, 30], [30, 20, 10]) > 0.2
+    assert population_stability_index([10, 20, 30], [0, 0, 0]) is None
+
+# Creating a function to verify that the test set does not drift from the training set
+def test_drift_monitor_stable(tmp_path):
+    monitor = create_monitor(tmp_path)
+    df = read_categorical_parquet('artifacts/test_data.parquet')
+    for i in range(0, len(df), 1000):
+        monitor.update(df.iloc[i:i + 1000])
+    report = monitor.report()
+    assert report['features']['age']['serving']['count'] == len(df)
+    assert all(feature['status'] == 'stable' for feature in report['features'].values())
+    assert report['score']['status'] == 'insufficient_data'
+
+# Creating a function to verify that repeated requests of one person are reported as drift
+def test_drift_monitor_drift(tmp_path):
+    monitor = create_monitor(tmp_path)
+    df = create_custom_data().create_raw_dataframe()
+    for _ in range(200):
+        monitor.update(df, np.array([0.9]))
+    report = monitor.report()
+    assert report['features']['age']['status'] == 'drift'
+    # Values outside the vocabulary are counted as unknown, not as missing
+    assert report['features']['native-country']['serving']['unknown_share'] == 1.0
+    assert report['features']['native-country']['serving']['missing_share'] == 0.0
+    assert report['features']['native-country']['status'] == 'drift'
+    assert report['score']['status'] == 'drift'
+    monitor.reset()
+    assert monitor.report()['features']['age']['serving']['count'] == 0
+
+# Creating a function to verify that an unseen category is unknown to the monitor but missing to the model
+def test_drift_monitor_unseen_category(tmp_path):
+    monitor = create_monitor(tmp_path)
+    raw_df = create_custom_data().create_raw_dataframe()
+    df = CustomData.encode_dataframe(raw_df)
+    assert df['native-country'].isna().all()
+    monitor.update(raw_df)
+    serving = monitor.report()['features']['native-country']['serving']
+    assert (serving['unknown_share'], serving['missing_share']) == (1.0, 0.0)
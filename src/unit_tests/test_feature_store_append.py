@@ -0,0 +1,113 @@
+# Importing packages
+import os
+import shutil
+import pytest
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sklearn import set_config
+set_config(transform_output='pandas')
+from src.components.config_entity import DataIngestionConfig
+from src.components.config_entity import StoreFeatureConfig
+from src.components.feature_store_append import FeatureStoreAppend
+from src.components.feature_store_append import RowKeyIndex
+
+
+# Creating a fixture to point the appender at a copy of the feature store
+@pytest.fixture(scope='function')
+def appender(tmp_path):
+    config = StoreFeatureConfig()
+    store_config = StoreFeatureConfig(
+        xform_train_path=str(tmp_path / 'feature_store' / os.path.basename(config.xform_train_path)),
+        xform_test_path=str(tmp_path / 'feature_store' / os.path.basename(config.xform_test_path)),
+        row_keys_path=str(tmp_path / 'feature_store' / 'row_keys'),
+        test_segments_path=str(tmp_path / 'feature_store' / os.path.basename(config.test_segments_path))
+    )
+    os.makedirs(tmp_path / 'feature_store')
+    shutil.copy(config.xform_train_path, store_config.xform_train_path)
+    shutil.copy(config.xform_test_path, store_config.xform_test_path)
+    shutil.copy(config.test_segments_path, store_config.test_segments_path)
+    appender = FeatureStoreAppend()
+    appender.feature_store.feature_store_config = store_config
+    return appender
+
+# Creating a fixture to create a raw file holding new and already ingested rows
+@pytest.fixture(scope='function')
+def new_data_path(tmp_path):
+    df = pd.read_parquet(DataIngestionConfig().test_data_path)
+    new_rows = df.head(200).copy()
+    new_rows['fnlwgt'] = new_rows['fnlwgt'] + 1
+    path = str(tmp_path / 'new_data.parquet')
+    pd.concat([df.head(100), new_rows, new_rows.head(10)], axis=0).to_parquet(path, index=False)
+    return path
+
+# Creating a function to verify that only the new rows are appended
+def test_initiate_append(appender, new_data_path):
+    store = appender.feature_store
+    config = store.feature_store_config
+    n_base = len(store.read_table(config.xform_train_path)) + len(store.read_table(config.xform_test_path))
+
+    counts = appender.initiate_append(new_data_path)
+    assert counts['train'] + counts['test'] == 200
+    assert counts['skipped'] == 110
+    assert len(store.list_parts(config.xform_train_path)) == 1
+    n_total = len(store.read_table(config.xform_train_path)) + len(store.read_table(config.xform_test_path))
+    assert n_total == n_base + 200
+
+    # The raw segments of the new test rows are appended with them
+    segments = store.read_segments()
+    assert len(segments['sex']) == len(store.read_table(config.xform_test_path))
+    assert set(segments['sex'][-counts['test']:]) <= {'Female', 'Male'}
+
+    # Appending the same file again does not add any rows
+    counts = appender.initiate_append(new_data_path)
+    assert counts == {'train': 0, 'test': 0, 'skipped': 310}
+    assert len(store.list_parts(config.xform_train_path)) == 1
+
+# Creating a function to verify that the appended rows have the feature store schema
+def test_append_schema(appender, new_data_path):
+    store = appender.feature_store
+    config = store.feature_store_config
+    appender.initiate_append(new_data_path)
+    base_schema = pq.read_schema(config.xform_train_path)
+    for part in store.list_parts(config.xform_train_path) + store.list_parts(config.xform_test_path):
+        assert pq.read_schema(part).equals(base_schema, check_metadata=False)
+    X, y = store.read_features_target(config.xform_train_path)
+    assert len(X) == len(y)
+    assert np.isfinite(X.to_numpy()).all()
+
+    # Rebuilding the feature store removes the appended partitions
+    store.clear_parts()
+    assert store.list_parts(config.xform_train_path) == []
+    assert not os.path.exists(config.row_keys_path)
+
+# Creating a function to verify that the row key index stays small as keys are appended
+def test_row_key_index(tmp_path):
+    rng = np.random.default_rng(0)
+    path = str(tmp_path / 'row_keys')
+    index = RowKeyIndex(path)
+    added = []
+    for i in range(40):
+        keys = rng.integers(0, 2**63, size=rng.integers(1, 500), dtype=np.uint64)
+        index.add_run(keys, f'part-{i:03d}')
+        added.append(keys)
+    added = np.concatenate(added)
+    assert len(index) == len(np.unique(added))
+    assert len(index.runs) <= np.log2(len(added)) + 1
+
+    # The index opened again finds every added key and no other
+    index = RowKeyIndex(path)
+    assert index.contains(added).all()
+    assert not index.contains(rng.integers(0, 2**63, size=1000, dtype=np.uint64)).any()
+
+# Creating a function to verify that the key partitions of earlier versions are converted
+def test_row_key_index_legacy(tmp_path):
+    path = tmp_path / 'row_keys'
+    os.makedirs(path)
+    keys = np.arange(100, dtype=np.uint64)
+    pq.write_table(pa.table({'row_key': pa.array(keys[:60], type=pa.uint64())}), str(path / 'part-base.parquet'))
+    pq.write_table(pa.table({'row_key': pa.array(keys[50:], type=pa.uint64())}), str(path / 'part-1.parquet'))
+    index = RowKeyIndex(str(path))
+    assert len(index) == 100 and index.contains(keys).all()
+    assert sorted(os.listdir(path)) == ['part-legacy.npy']
@@ -0,0 +1,71 @@
+# Importing packages
+import os
+import pytest
+import numpy as np
+import optuna
+from src.components.config_entity import StoreFeatureConfig
+from src.components.config_entity import FoldCacheConfig
+from src.components.store_features import FeatureStoreCreation
+from src.components.fold_cache import FoldCache
+from src.components.find_best_model import FindBestModel
+
+
+# Creating a fixture to read the train set from the feature store
+@pytest.fixture(scope='function')
+def train_data():
+    return FeatureStoreCreation().read_features_target(StoreFeatureConfig().xform_train_path)
+
+# Creating a function to verify that cached folds match freshly built folds
+def test_get_folds(tmp_path, train_data):
+    X, y = train_data
+    cache = FoldCache(cache_dir=str(tmp_path))
+    built = cache.get_folds(X, y, n_splits=3, seed=42)
+    assert len(os.listdir(tmp_path)) == 1
+    cached = cache.get_folds(X, y, n_splits=3, seed=42)
+    for (train_idx, val_idx, dtrain, dval), (c_train_idx, c_val_idx, c_dtrain, c_dval) in zip(built, cached):
+        assert np.array_equal(train_idx, c_train_idx)
+        assert np.array_equal(val_idx, c_val_idx)
+        assert np.array_equal(dval.get_label(), c_dval.get_label())
+        assert c_dtrain.num_row() == len(train_idx)
+        assert c_dtrain.feature_names == list(X.columns)
+
+# Creating a function to verify that the key follows the data and the seed
+def test_dataset_key(train_data):
+    X, y = train_data
+    key = FoldCache.dataset_key(X, y, 5, 42)
+    assert key == FoldCache.dataset_key(X.copy(), y.copy(), 5, 42)
+    assert key != FoldCache.dataset_key(X, y, 5, 7)
+    changed = X.copy()
+    changed.iloc[0, 0] += 1
+    assert key != FoldCache.dataset_key(changed, y, 5, 42)
+
+# Creating a function to verify that the least recently used entries are evicted
+def test_evict(tmp_path, train_data):
+    X, y = train_data
+    X, y = X.head(2000), y.head(2000)
+    cache = FoldCache(cache_dir=str(tmp_path), max_bytes=0)
+    cache.get_folds(X, y, n_splits=2, seed=1)
+    cache.get_folds(X, y, n_splits=2, seed=2)
+    assert os.listdir(tmp_path) == [FoldCache.dataset_key(X, y, 2, 2)]
+
+# Creating a function to verify that the study gives the same result with the cache
+def test_find_best_model_with_cache(tmp_path, train_data):
+    X, y = train_data
+    X, y = X.head(3000), y.head(3000)
+    results = []
+    for fold_cache in [None, FoldCache(cache_dir=str(tmp_path)), FoldCache(cache_dir=str(tmp_path))]:
+        optuna.logging.set_verbosity(optuna.logging.WARNING)
+        model = FindBestModel(X, y, n_trials=2, fold_cache=fold_cache)
+        study = optuna.create_study(direction='maximize', sampler=optuna.samplers.TPESampler(seed=0))
+        study.optimize(model.objective, n_trials=2)
+        results.append([trial.value for trial in study.trials])
+    assert results[0] == results[1] == results[2]
+
+# Creating a function to verify that the number of folds is taken from the fold cache config
+def test_find_best_model_n_splits(train_data):
+    X, y = train_data
+    X, y = X.head(3000), y.head(3000)
+    model = FindBestModel(X, y)
+    assert model.n_splits == FoldCacheConfig().n_splits
+    assert len(model.get_folds()) == FoldCacheConfig().n_splits
+    assert FindBestModel(X, y, n_splits=3).n_splits == 3
@@ -0,0 +1,69 @@
+# Importing packages
+import pytest
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from sklearn import set_config
+set_config(transform_output='pandas')
+from src.components.config_entity import DataIngestionConfig
+from src.components.config_entity import DataTransformationConfig
+from src.components.config_entity import StoreFeatureConfig
+from src.components.data_cleaning import DataCleaner
+from src.components.fused_model import FusedModel
+from src.components.fused_model import compile_fused_model
+from src.components.fused_model import raw_threshold
+from src.utils import load_object
+from src.utils import read_json_file
+from src.utils import read_categorical_parquet
+from src.utils import apply_vocabulary
+from src.exception import CustomException
+
+
+# Creating a fixture to read the raw test features in the form used for serving
+@pytest.fixture(scope='function')
+def raw_features():
+    df = read_categorical_parquet(DataIngestionConfig().test_data_path)
+    df = DataCleaner(fill_question_marks=False).clean(df.drop(columns=['fnlwgt']))
+    df = apply_vocabulary(df, read_json_file(DataTransformationConfig().vocabulary_path))
+    return df.drop(columns=['target_class'])
+
+# Creating a function to train a small booster on the feature store
+def train_booster(booster):
+    df = pd.read_parquet(StoreFeatureConfig().xform_train_path)
+    params = {'objective': 'binary:logistic', 'booster': booster, 'max_depth': 4, 'rate_drop': 0.2, 'verbosity': 0}
+    dtrain = xgb.DMatrix(df.drop(columns=['target_class']), label=df[['target_class']])
+    return xgb.train(params, dtrain, num_boost_round=20)
+
+# Creating a function to verify that the raw threshold reproduces the scaled split
+def test_raw_threshold():
+    mean, scale, threshold = 38.58, 13.64, np.float32(-0.4826)
+    boundary = raw_threshold(mean, scale, threshold)
+    below = np.nextafter(boundary, -np.inf)
+    assert np.float32((boundary - mean) / scale) >= threshold
+    assert np.float32((below - mean) / scale) < threshold
+
+# Creating a function to verify that the fused model reproduces the preprocessor object
+# and the booster, for tree and dart boosters
+@pytest.mark.parametrize('booster_type', ['gbtree', 'dart'])
+def test_fused_model_parity(tmp_path, raw_features, booster_type):
+    booster = train_booster(booster_type)
+    preprocessor = load_object(DataTransformationConfig().preprocessor_obj_path)
+    fused_path = str(tmp_path / 'fused_model.npz')
+    compile_fused_model(preprocessor, booster).save(fused_path)
+    fused_model = FusedModel.load(fused_path)
+
+    # Adding unknown categories and missing values
+    raw_features = raw_features.astype({'workclass': object, 'occupation': object})
+    raw_features.loc[raw_features.index[:5], 'workclass'] = 'Space-force'
+    raw_features.loc[raw_features.index[5:10], 'occupation'] = np.nan
+    raw_features.loc[raw_features.index[10:15], 'age'] = np.nan
+
+    dmatrix = xgb.DMatrix(preprocessor.transform(raw_features).astype(np.float32))
+    assert np.array_equal(fused_model.predict_margin(raw_features), booster.predict(dmatrix, output_margin=True))
+    assert np.array_equal(fused_model.predict(raw_features), booster.predict(dmatrix))
+
+# Creating a function to verify that a gblinear booster is rejected
+def test_fused_model_gblinear():
+    preprocessor = load_object(DataTransformationConfig().preprocessor_obj_path)
+    with pytest.raises(CustomException):
+        compile_fused_model(preprocessor, train_booster('gblinear'))
@@ -0,0 +1,47 @@
+# Importing packages
+import types
+import pytest
+import optuna
+import xgboost as xgb
+from src.components.config_entity import StoreFeatureConfig
+from src.components.store_features import FeatureStoreCreation
+from src.components.find_best_model import FindBestModel
+
+
+# Creating a fixture to read a part of the train set from the feature store
+@pytest.fixture(scope='function')
+def train_data():
+    X, y = FeatureStoreCreation().read_features_target(StoreFeatureConfig().xform_train_path)
+    return X.head(3000), y.head(3000)
+
+# Creating a function to verify the latency measurements of a booster
+def test_measure_latency(train_data):
+    X, y = train_data
+    booster = xgb.train({'max_depth': 3, 'verbosity': 0}, xgb.DMatrix(X, label=y), num_boost_round=5)
+    latency = FindBestModel(X, y).measure_latency(booster, X)
+    assert latency['row_ms'] > 0
+    assert latency['batch_row_ms'] > 0
+    assert latency['model_bytes'] == len(booster.save_raw(raw_format='ubj'))
+
+# Creating a function to verify that the most accurate trial within the objective is picked
+def test_select_trial():
+    trials = [
+        types.SimpleNamespace(number=0, values=[0.90, 0.05]),
+        types.SimpleNamespace(number=1, values=[0.92, 0.20]),
+        types.SimpleNamespace(number=2, values=[0.88, 0.01])
+    ]
+    assert FindBestModel.select_trial(trials, 0.1).number == 0
+    assert FindBestModel.select_trial(trials, 1.0).number == 1
+    assert FindBestModel.select_trial(trials, 0.001).number == 2
+
+# Creating a function to verify that the latency aware study returns a model on the
+# pareto front
+def test_latency_aware_study(train_data):
+    X, y = train_data
+    optuna.logging.set_verbosity(optuna.logging.WARNING)
+    model = FindBestModel(X, y, n_trials=4, n_splits=2, latency_slo_ms=10.0)
+    best_model, best_params = model.create_study()
+    assert isinstance(best_model, xgb.Booster)
+    assert model.pareto_front['selected'].sum() == 1
+    assert model.pareto_front['row_ms'].is_monotonic_increasing
+    assert best_params['booster'] in ['gbtree', 'gblinear', 'dart']
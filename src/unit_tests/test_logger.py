@@ -0,0 +1,81 @@
+# Importing packages
+import os
+import sys
+import time
+import logging
+from src.logger import NonBlockingQueueHandler
+from src.logger import SizedTimedRotatingFileHandler
+from src.logger import log_file_name
+
+
+# Creating a function to create a logger which only writes to the given handler
+def create_logger(name, handler):
+    logger = logging.getLogger(name)
+    logger.propagate = False
+    logger.handlers = [handler]
+    logger.setLevel(logging.INFO)
+    return logger
+
+# Creating a function to verify that nothing is created until the first record
+def test_lazy_start(tmp_path):
+    log_dir = tmp_path / 'logs'
+    handler = NonBlockingQueueHandler(log_dir=str(log_dir))
+    logger = create_logger('test_lazy_start', handler)
+    assert handler.listener is None
+    assert not log_dir.exists()
+
+    logger.info('first record')
+    assert handler.listener is not None
+    handler.stop()
+    contents = (log_dir / log_file_name()).read_text()
+    assert 'first record' in contents
+    assert str(os.getpid()) in log_file_name()
+
+# Creating a function to verify that a full queue drops records instead of blocking
+def test_drop_on_full_queue(tmp_path):
+    handler = NonBlockingQueueHandler(log_dir=str(tmp_path), queue_size=2)
+    # Marking the listener as started, so that nothing drains the queue
+    handler.listener = object()
+    logger = create_logger('test_drop_on_full_queue', handler)
+    start = time.perf_counter()
+    for i in range(100):
+        logger.info(f'record {i}')
+    assert time.perf_counter() - start < 1.0
+    assert handler.dropped == 98
+
+    # The dropped records are reported when the handler stops
+    handler = NonBlockingQueueHandler(log_dir=str(tmp_path / 'logs'))
+    logger = create_logger('test_drop_report', handler)
+    logger.info('last record')
+    handler.dropped = 98
+    handler.stop()
+    contents = (tmp_path / 'logs' / log_file_name()).read_text()
+    assert 'last record' in contents
+    assert 'Dropped 98 log records' in contents
+
+# Creating a function to verify the name of the log file of python -c and stdin
+def test_log_file_name_without_script(monkeypatch):
+    for script in ['-c', '-', '']:
+        monkeypatch.setattr(sys, 'argv', [script])
+        assert log_file_name() == f'python_{os.getpid()}.log'
+
+# Creating a function to verify the rotation on size and on age
+def test_rotation(tmp_path):
+    path = tmp_path / 'rotating.log'
+    handler = SizedTimedRotatingFileHandler(str(path), max_bytes=200, backup_count=2, rotate_interval_s=3600)
+    logger = create_logger('test_rotation_size', handler)
+    for i in range(50):
+        logger.info(f'record {i:04d} ' + 'x' * 20)
+    handler.close()
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['rotating.log', 'rotating.log.1', 'rotating.log.2']
+    assert all(p.stat().st_size <= 200 for p in tmp_path.iterdir())
+
+    path = tmp_path / 'timed.log'
+    handler = SizedTimedRotatingFileHandler(str(path), max_bytes=0, backup_count=2, rotate_interval_s=0.05)
+    logger = create_logger('test_rotation_age', handler)
+    logger.info('before')
+    time.sleep(0.1)
+    logger.info('after')
+    handler.close()
+    assert 'before' in (tmp_path / 'timed.log.1').read_text()
+    assert 'after' in path.read_text()
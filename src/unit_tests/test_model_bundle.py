@@ -0,0 +1,102 @@
+# Importing packages
+import types
+import pytest
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from category_encoders import WOEEncoder
+from sklearn import set_config
+set_config(transform_output='pandas')
+from src.components.config_entity import DataIngestionConfig
+from src.components.config_entity import DataTransformationConfig
+from src.components.config_entity import StoreFeatureConfig
+from src.components.data_cleaning import DataCleaner
+from src.components.model_bundle import CompactPreprocessor
+from src.components.model_bundle import save_model_bundle
+from src.components.model_bundle import load_model_bundle
+from src.utils import load_object
+from src.utils import read_json_file
+from src.utils import read_categorical_parquet
+from src.utils import apply_vocabulary
+from src.utils import WOE
+from src.exception import CustomException
+
+
+# Creating a fixture to read the raw test features in the form used for serving
+@pytest.fixture(scope='function')
+def raw_features():
+    df = read_categorical_parquet(DataIngestionConfig().test_data_path)
+    df = DataCleaner(fill_question_marks=False).clean(df.drop(columns=['fnlwgt']))
+    df = apply_vocabulary(df, read_json_file(DataTransformationConfig().vocabulary_path))
+    return df.drop(columns=['target_class'])
+
+# Creating a fixture to train a small booster on the feature store
+@pytest.fixture(scope='function')
+def booster():
+    df = pd.read_parquet(StoreFeatureConfig().xform_train_path)
+    params = {'objective': 'binary:logistic', 'max_depth': 3, 'verbosity': 0}
+    dtrain = xgb.DMatrix(df.drop(columns=['target_class']), label=df[['target_class']])
+    return xgb.train(params, dtrain, num_boost_round=10)
+
+# Creating a function to verify that the bundle reproduces the preprocessor object
+# and the booster
+def test_bundle_round_trip(tmp_path, raw_features, booster):
+    preprocessor = load_object(DataTransformationConfig().preprocessor_obj_path)
+    bundle_path = str(tmp_path / 'model_bundle.awb')
+    save_model_bundle(bundle_path, preprocessor, booster)
+    bundle = load_model_bundle(bundle_path)
+
+    expected = preprocessor.transform(raw_features)
+    assert bundle.feature_names == list(expected.columns)
+    X = bundle.preprocessor.transform(raw_features)
+    assert np.array_equal(X, expected.to_numpy(dtype=np.float32))
+
+    expected_preds = booster.predict(xgb.DMatrix(expected.astype(np.float32)))
+    assert np.array_equal(bundle.predict(raw_features), expected_preds)
+
+# Creating a function to verify that a corrupted bundle is rejected
+def test_bundle_checksum(tmp_path, booster):
+    preprocessor = load_object(DataTransformationConfig().preprocessor_obj_path)
+    bundle_path = tmp_path / 'model_bundle.awb'
+    save_model_bundle(str(bundle_path), preprocessor, booster)
+    contents = bytearray(bundle_path.read_bytes())
+    contents[-10] ^= 0xFF
+    bundle_path.write_bytes(bytes(contents))
+    with pytest.raises(CustomException):
+        load_model_bundle(str(bundle_path))
+
+# Creating a function to verify that a bundle with a corrupted header is rejected
+def test_bundle_header_checksum(tmp_path, booster):
+    preprocessor = load_object(DataTransformationConfig().preprocessor_obj_path)
+    bundle_path = tmp_path / 'model_bundle.awb'
+    save_model_bundle(str(bundle_path), preprocessor, booster)
+    contents = bundle_path.read_bytes()
+    tampered = contents.replace(b'"created": "2', b'"created": "1', 1)
+    assert len(tampered) == len(contents) and tampered != contents
+    bundle_path.write_bytes(tampered)
+    with pytest.raises(CustomException):
+        load_model_bundle(str(bundle_path))
+    assert load_model_bundle(str(bundle_path), verify=False).header['created'].startswith('1')
+
+# Creating a function to verify that the tables of a WOEEncoder based preprocessor
+# are converted in the same way as the native tables
+def test_extract_legacy_woe_table():
+    X = pd.DataFrame({'workclass': ['a', 'a', 'b', 'b', 'c', np.nan, 'a', 'b']})
+    y = pd.Series([1, 0, 0, 0, 1, 1, 1, 0])
+    native = WOE(cols=['workclass']).fit(X, y)
+    legacy = types.SimpleNamespace(woe_encoder=WOEEncoder(cols=['workclass']).fit(X, y))
+    native_categories, native_table = CompactPreprocessor.extract_woe_table(native, 'workclass')
+    legacy_categories, legacy_table = CompactPreprocessor.extract_woe_table(legacy, 'workclass')
+    assert native_categories == legacy_categories
+    assert np.allclose(native_table, legacy_table)
+
+# Creating a function to verify that a gblinear booster is served from the bundle
+def test_bundle_gblinear(tmp_path, raw_features):
+    df = pd.read_parquet(StoreFeatureConfig().xform_train_path)
+    params = {'objective': 'binary:logistic', 'booster': 'gblinear', 'verbosity': 0}
+    booster = xgb.train(params, xgb.DMatrix(df.drop(columns=['target_class']), label=df[['target_class']]), num_boost_round=5)
+    preprocessor = load_object(DataTransformationConfig().preprocessor_obj_path)
+    bundle_path = str(tmp_path / 'model_bundle.awb')
+    save_model_bundle(bundle_path, preprocessor, booster)
+    expected = booster.predict(xgb.DMatrix(preprocessor.transform(raw_features).astype(np.float32)))
+    assert np.allclose(load_model_bundle(bundle_path).predict(raw_features), expected)
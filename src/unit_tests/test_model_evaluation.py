@@ -0,0 +1,67 @@
+# Importing packages
+import numpy as np
+import xgboost as xgb
+from sklearn.metrics import roc_auc_score
+from sklearn.metrics import log_loss
+from src.components.model_evaluation import ModelEvaluation
+from src.components.model_evaluation import prepare_layout
+from src.components.model_evaluation import count_metrics
+from src.components.store_features import FeatureStoreCreation
+
+
+# Creating a function to create predictions with tied scores
+def create_predictions(n_rows=5000, seed=0):
+    rng = np.random.default_rng(seed)
+    y_true = rng.integers(0, 2, n_rows)
+    y_prob = np.round(np.clip(0.3 * y_true + 0.7 * rng.random(n_rows), 0, 1), 2)
+    return y_true, y_prob
+
+# Creating a function to verify that the sort based metrics match scikit-learn
+def test_count_metrics():
+    y_true, y_prob = create_predictions()
+    layout = prepare_layout(y_true, y_prob, n_bins=10)
+    counts = np.bincount(layout['cells'], minlength=layout['n_cells'])[None, :].astype(np.float64)
+    roc_auc, loss, calibration_error = count_metrics(layout, counts)[0]
+    bins = np.searchsorted(np.linspace(0, 1, 11)[1:-1], y_prob, side='right')
+    expected_error = sum(abs((y_true - y_prob)[bins == b].sum()) for b in range(10)) / len(y_true)
+    assert np.isclose(roc_auc, roc_auc_score(y_true, y_prob))
+    assert np.isclose(loss, log_loss(y_true, y_prob))
+    assert np.isclose(calibration_error, expected_error)
+
+# Creating a function to verify that the bootstrap does not depend on the workers
+def test_bootstrap_workers():
+    y_true, y_prob = create_predictions()
+    segments = {'group': np.where(np.arange(len(y_true)) % 3 == 0, 'a', 'b')}
+    reports = []
+    for n_workers in (1, 2):
+        evaluation = ModelEvaluation(n_bootstrap=200, n_workers=n_workers)
+        evaluation.evaluation_config.max_block_bytes = 16 * len(y_true) * 50
+        reports.append(evaluation.evaluate(y_true, y_prob, segments))
+    assert reports[0]['overall'] == reports[1]['overall']
+    assert reports[0]['segments'] == reports[1]['segments']
+    roc_auc = reports[0]['overall']['roc_auc']
+    assert roc_auc['lower'] < roc_auc['estimate'] < roc_auc['upper']
+    assert reports[0]['segments']['group']['a']['count'] == 1667
+
+# Creating a function to verify the evaluation of a model on the test feature store
+def test_initiate_model_evaluation():
+    X_train, y_train = FeatureStoreCreation().read_features_target('feature_store/xform_train_set.parquet')
+    booster = xgb.train({'objective': 'binary:logistic', 'max_depth': 3}, xgb.DMatrix(X_train, y_train), 20)
+    report = ModelEvaluation(n_bootstrap=100, n_workers=1).initiate_model_evaluation(booster=booster, save_report=False)
+    assert set(report['segments']) == {'sex', 'race', 'workclass'}
+    assert set(report['segments']['sex']) == {'Female', 'Male'}
+    assert sum(segment['count'] for segment in report['segments']['race'].values()) == report['n_rows']
+    # The segments are the raw values of the test split, including the unknown workclass
+    workclass = FeatureStoreCreation().read_segments(['workclass'])['workclass']
+    assert report['segments']['workclass']['?']['count'] == int((workclass == '?').sum()) > 0
+    assert report['overall']['roc_auc']['estimate'] > 0.85
+    metrics = ModelEvaluation.flatten_report(report)
+    assert metrics['eval_roc_auc'] == report['overall']['roc_auc']['estimate']
+    assert 'eval_sex_Male_log_loss_upper' in metrics
+
+# Creating a function to verify the evaluation of a linear booster, which cannot predict in place
+def test_initiate_model_evaluation_gblinear():
+    X_train, y_train = FeatureStoreCreation().read_features_target('feature_store/xform_train_set.parquet')
+    booster = xgb.train({'objective': 'binary:logistic', 'booster': 'gblinear'}, xgb.DMatrix(X_train, y_train), 20)
+    report = ModelEvaluation(n_bootstrap=50, n_workers=1).initiate_model_evaluation(booster=booster, save_report=False)
+    assert report['overall']['roc_auc']['estimate'] > 0.8
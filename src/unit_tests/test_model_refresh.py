@@ -0,0 +1,46 @@
+# Importing packages
+import pytest
+import pandas as pd
+import xgboost as xgb
+from src.components.config_entity import DataIngestionConfig
+from src.components.config_entity import StoreFeatureConfig
+from src.components.model_refresh import ModelRefresh
+
+
+# Creating a fixture to train a small booster on the feature store
+@pytest.fixture(scope='function')
+def active_booster():
+    data_path = StoreFeatureConfig()
+    df = pd.read_parquet(data_path.xform_train_path).sample(frac=0.25, random_state=42)
+    params = {'objective': 'binary:logistic', 'eval_metric': 'auc', 'max_depth': 3, 'verbosity': 0}
+    dtrain = xgb.DMatrix(df.drop(columns=['target_class']), label=df[['target_class']])
+    booster = xgb.train(params, dtrain, num_boost_round=10)
+    return booster, params
+
+# Creating a function to verify that the logged parameters are converted back
+# into numbers
+def test_parse_params():
+    params = ModelRefresh.parse_params({'booster': 'gbtree', 'max_depth': '4', 'eta': '0.1'})
+    assert params['booster'] == 'gbtree'
+    assert params['max_depth'] == 4
+    assert params['eta'] == 0.1
+    assert params['objective'] == 'binary:logistic'
+
+# Creating a function to verify that the new data is transformed with the saved
+# preprocessor object
+def test_create_refresh_datasets():
+    refresher = ModelRefresh()
+    X_new, y_new = refresher.create_refresh_datasets(DataIngestionConfig().test_data_path)
+    assert len(list(X_new.columns)) == 16
+    assert len(X_new) == len(y_new)
+
+# Creating a function to verify that the refreshed booster has additional trees
+def test_refresh_model(active_booster):
+    booster, params = active_booster
+    refresher = ModelRefresh()
+    X_new, y_new = refresher.create_refresh_datasets(DataIngestionConfig().train_data_path)
+    refreshed_booster, base_auc, refreshed_auc, accepted = refresher.refresh_model(booster, params, X_new, y_new)
+    assert refreshed_booster.num_boosted_rounds() == booster.num_boosted_rounds() + refresher.refresh_config.num_boost_round
+    assert isinstance(base_auc, float)
+    assert isinstance(refreshed_auc, float)
+    assert isinstance(accepted, bool)
@@ -0,0 +1,62 @@
+# Importing packages
+import pytest
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from sklearn import set_config
+set_config(transform_output='pandas')
+from src.components.config_entity import DataIngestionConfig
+from src.components.config_entity import DataTransformationConfig
+from src.components.config_entity import StoreFeatureConfig
+from src.components.data_cleaning import DataCleaner
+from src.components.make_prediction import MakePredictions
+from src.components.onnx_export import export_onnx_model
+from src.components.onnx_export import OnnxModel
+from src.utils import load_object
+from src.utils import read_json_file
+from src.utils import read_categorical_parquet
+from src.utils import apply_vocabulary
+
+
+# Creating a fixture to read the raw test features in the form used for serving
+@pytest.fixture(scope='function')
+def raw_features():
+    df = read_categorical_parquet(DataIngestionConfig().test_data_path)
+    df = DataCleaner(fill_question_marks=False).clean(df.drop(columns=['fnlwgt']))
+    df = apply_vocabulary(df, read_json_file(DataTransformationConfig().vocabulary_path))
+    return df.drop(columns=['target_class'])
+
+# Creating a function to verify that the onnx model reproduces the preprocessor object
+# and the booster, including unknown categories and missing values
+@pytest.mark.parametrize('booster_type', ['gbtree', 'dart', 'gblinear'])
+def test_onnx_parity(tmp_path, raw_features, booster_type):
+    df = pd.read_parquet(StoreFeatureConfig().xform_train_path)
+    params = {'objective': 'binary:logistic', 'booster': booster_type, 'max_depth': 4, 'rate_drop': 0.2, 'verbosity': 0}
+    booster = xgb.train(params, xgb.DMatrix(df.drop(columns=['target_class']), label=df[['target_class']]), num_boost_round=20)
+    preprocessor = load_object(DataTransformationConfig().preprocessor_obj_path)
+    onnx_path = str(tmp_path / 'model.onnx')
+    export_onnx_model(onnx_path, preprocessor, booster)
+
+    raw_features = raw_features.astype({'workclass': object})
+    raw_features.loc[raw_features.index[:5], 'workclass'] = 'Space-force'
+    raw_features.loc[raw_features.index[5:10], 'workclass'] = np.nan
+    raw_features.loc[raw_features.index[10:15], 'age'] = np.nan
+
+    dmatrix = xgb.DMatrix(preprocessor.transform(raw_features).astype(np.float32))
+    onnx_model = OnnxModel(onnx_path)
+    assert np.allclose(onnx_model.predict(raw_features, output_margin=True), booster.predict(dmatrix, output_margin=True), atol=1e-5)
+    assert np.allclose(onnx_model.predict(raw_features), booster.predict(dmatrix), atol=1e-6)
+
+    # Serving the onnx model through MakePredictions
+    preds = MakePredictions(onnx_model_path=onnx_path).predict(raw_features.iloc[:3])
+    assert np.allclose(preds, booster.predict(dmatrix)[:3], atol=1e-6)
+
+# Creating a function to verify that the tuned number of threads is recorded
+def test_onnx_thread_tuning(tmp_path, raw_features):
+    df = pd.read_parquet(StoreFeatureConfig().xform_train_path)
+    booster = xgb.train({'objective': 'binary:logistic', 'verbosity': 0}, xgb.DMatrix(df.drop(columns=['target_class']), label=df[['target_class']]), num_boost_round=5)
+    preprocessor = load_object(DataTransformationConfig().preprocessor_obj_path)
+    onnx_path = str(tmp_path / 'model.onnx')
+    threads = export_onnx_model(onnx_path, preprocessor, booster, sample=raw_features)
+    assert threads >= 1
+    assert OnnxModel(onnx_path).intra_op_threads == threads
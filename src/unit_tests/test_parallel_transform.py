@@ -0,0 +1,68 @@
+# Importing packages
+import os
+import shutil
+import pytest
+import numpy as np
+import pandas as pd
+from sklearn import set_config
+set_config(transform_output='pandas')
+from src.components.config_entity import DataIngestionConfig
+from src.components.config_entity import DataTransformationConfig
+from src.components.config_entity import StoreFeatureConfig
+from src.components.data_cleaning import DataCleaner
+from src.components.parallel_transform import ParallelTransformer
+from src.utils import load_object
+from src.utils import read_json_file
+from src.utils import read_categorical_parquet
+from src.utils import apply_vocabulary
+
+
+# Creating a fixture to read the cleaned test features
+@pytest.fixture(scope='function')
+def features():
+    df = read_categorical_parquet(DataIngestionConfig().test_data_path)
+    df = DataCleaner(fill_question_marks=False).clean(df.drop(columns=['fnlwgt', 'target_class']))
+    return apply_vocabulary(df, read_json_file(DataTransformationConfig().vocabulary_path))
+
+# Creating a function to verify that the chunks are written into the right rows
+def test_transform(features):
+    X, feature_names = ParallelTransformer(n_workers=2, chunk_size=1000).transform(features)
+    expected = load_object(DataTransformationConfig().preprocessor_obj_path).transform(features)
+    assert X.dtype == np.float32
+    assert feature_names == list(expected.columns)
+    assert np.array_equal(X, expected.to_numpy(dtype=np.float32))
+
+# Creating a function to verify that a raw file is transformed as in the feature store
+def test_transform_file():
+    X, y, feature_names = ParallelTransformer(n_workers=2).transform_file(DataIngestionConfig().test_data_path)
+    expected = pd.read_parquet(StoreFeatureConfig().xform_test_path)
+    assert feature_names == list(expected.drop(columns=['target_class']).columns)
+    assert np.array_equal(X, expected.drop(columns=['target_class']).to_numpy(dtype=np.float32))
+    assert np.array_equal(y, expected['target_class'].to_numpy())
+
+# Creating a function to verify that the output falls back to the temporary folder
+def test_allocate_output_fallback(tmp_path, monkeypatch):
+    monkeypatch.setattr('tempfile.tempdir', str(tmp_path))
+    transformer = ParallelTransformer(n_workers=1)
+    shape = (1000, 16)
+
+    # The configured folder is used when it has the space
+    transformer.data_transformation_config.parallel_output_dir = str(tmp_path / 'shm')
+    (tmp_path / 'shm').mkdir()
+    output_path, output = transformer.allocate_output(shape)
+    assert output_path.startswith(str(tmp_path / 'shm')) and output.shape == shape
+    
+    # A missing folder, or one without the space, falls back to the temporary folder
+    transformer.data_transformation_config.parallel_output_dir = str(tmp_path / 'missing')
+    output_path, _ = transformer.allocate_output(shape)
+    assert os.path.dirname(output_path) == str(tmp_path)
+    transformer.data_transformation_config.parallel_output_dir = str(tmp_path / 'shm')
+    real_disk_usage = shutil.disk_usage
+    monkeypatch.setattr(
+        'shutil.disk_usage',
+        lambda path: real_disk_usage(path)._replace(free=100) if str(path).endswith('shm') else real_disk_usage(path)
+    )
+    output_path, output = transformer.allocate_output(shape)
+    assert os.path.dirname(output_path) == str(tmp_path)
+    assert os.path.getsize(output_path) == 1000 * 16 * 4
+    output[:] = 1.0
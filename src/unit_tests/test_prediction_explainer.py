@@ -0,0 +1,104 @@
+# Importing packages
+import numpy as np
+import pytest
+import xgboost as xgb
+from src.components.create_custom_data import CustomData
+from src.components.data_cleaning import DataCleaner
+from src.components.model_bundle import save_model_bundle
+from src.components.model_bundle import load_model_bundle
+from src.components.prediction_explainer import PredictionExplainer
+from src.components.store_features import FeatureStoreCreation
+from src.utils import load_object
+from src.utils import read_categorical_parquet
+from src.utils import read_json_file
+from src.utils import apply_vocabulary
+
+
+# Creating a fixture to save a small model bundle
+@pytest.fixture(scope='module')
+def bundle_path(tmp_path_factory):
+    X_train, y_train = FeatureStoreCreation().read_features_target('feature_store/xform_train_set.parquet')
+    booster = xgb.train({'objective': 'binary:logistic', 'max_depth': 4}, xgb.DMatrix(X_train, y_train), 30)
+    file_path = str(tmp_path_factory.mktemp('explain') / 'model_bundle.awb')
+    save_model_bundle(file_path, load_object('artifacts/preprocessor.pkl'), booster)
+    return file_path
+
+# Creating a fixture to read the raw test profiles
+@pytest.fixture(scope='module')
+def raw_test_set():
+    df = read_categorical_parquet('artifacts/test_data.parquet')
+    df = DataCleaner(fill_question_marks=False).clean(df.drop(columns=['fnlwgt']))
+    df = apply_vocabulary(df, read_json_file('artifacts/vocabulary.json'))
+    return df.drop(columns=['target_class']).head(200)
+
+# Creating a function to verify that the contributions of the fields add up to the prediction
+def test_explain_frame(bundle_path, raw_test_set):
+    explainer = PredictionExplainer.from_bundle(bundle_path)
+    explanations = explainer.explain_frame(raw_test_set)
+    assert list(explanations.columns[:13]) == explainer.fields
+    expected = load_model_bundle(bundle_path).predict(raw_test_set)
+    assert np.allclose(explanations['probability'], expected, atol=1e-5)
+    assert set(explanations['method']) == {'exact'}
+
+    # Repeated profiles are read from the cache
+    cached = explainer.explain_frame(raw_test_set)
+    assert set(cached['method']) == {'cached'}
+    assert np.allclose(cached.iloc[:, :13], explanations.iloc[:, :13])
+
+# Creating a function to verify that rows beyond the latency budget are approximated
+def test_explain_budget(bundle_path, raw_test_set):
+    bundle = load_model_bundle(bundle_path)
+    explainer = PredictionExplainer(bundle.booster, bundle.preprocessor, cache_size=0, batch_size=20)
+    explainer.row_cost_ms = 1000.0
+    explanations = explainer.explain_frame(raw_test_set, budget_ms=1.0)
+    assert set(explanations['method']) == {'approximate'}
+    assert len(explainer.cache) == 0
+    assert np.allclose(explanations['margin'], explainer.explain_frame(raw_test_set)['margin'], atol=1e-4)
+
+# Creating a function to verify the explanation of a batch of records
+def test_explain_records(bundle_path):
+    record = dict(
+        age=39, workclass='State-gov', education='Bachelors', education_num=13,
+        marital_status='Never-married', occupation='Adm-clerical', relationship='Not-in-family',
+        race='White', sex='Male', capital_gain='2174', capital_loss=0, hours_per_week=40,
+        native_country='United-States'
+    )
+    df = CustomData.create_batch_dataframe([record, record])
+    explainer = PredictionExplainer.from_bundle(bundle_path)
+    explanations = explainer.explain(df, budget_ms=1000)
+    assert len(explanations) == 2
+    assert explainer.stats()['cache_entries'] == 1
+    contributions = list(explanations[0]['contributions'].values())
+    assert len(contributions) == 13
+    assert abs(contributions[0]) >= abs(contributions[-1])
+
+# Creating a function to verify that the explanation api follows the served bundle
+def test_explain_api_follows_bundle(bundle_path, tmp_path, monkeypatch):
+    import app
+    record = dict(
+        age=39, workclass='State-gov', education='Bachelors', education_num=13,
+        marital_status='Never-married', occupation='Adm-clerical', relationship='Not-in-family',
+        race='White', sex='Male', capital_gain='2174', capital_loss=0, hours_per_week=40,
+        native_country='United-States'
+    )
+    client = app.app.test_client()
+
+    # A model which is not a bundle cannot be explained
+    monkeypatch.setattr(app, 'bundle_path', None)
+    monkeypatch.setattr(app, 'fused_model_path', bundle_path)
+    assert client.post('/api/explain', json=[record]).status_code == 404
+
+    # Rewriting the served bundle rebuilds the explainer
+    served_path = str(tmp_path / 'model_bundle.awb')
+    bundle = load_model_bundle(bundle_path)
+    save_model_bundle(served_path, bundle.preprocessor, bundle.booster)
+    monkeypatch.setattr(app, 'bundle_path', served_path)
+    monkeypatch.setattr(app, 'explainer', None)
+    first = client.post('/api/explain', json=[record]).get_json()['explanations'][0]
+    explainer = app.explainer[1]
+    X_train, y_train = FeatureStoreCreation().read_features_target('feature_store/xform_train_set.parquet')
+    booster = xgb.train({'objective': 'binary:logistic', 'max_depth': 2}, xgb.DMatrix(X_train, y_train), 5)
+    save_model_bundle(served_path, bundle.preprocessor, booster)
+    second = client.post('/api/explain', json=[record]).get_json()['explanations'][0]
+    assert app.explainer[1] is not explainer
+    assert second['probability'] != first['probability']
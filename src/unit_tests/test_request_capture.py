@@ -0,0 +1,91 @@
+# Importing packages
+import json
+import time
+import numpy as np
+import pandas as pd
+from src.components.create_custom_data import CustomData
+from src.components.request_capture import RequestCapture
+
+
+# Creating a function to create a request as received from the website
+def create_request():
+    data = CustomData(
+        age=39, workclass='State-gov', education='Bachelors', education_num=13,
+        marital_status='Never-married', occupation='Adm-clerical', relationship='Not-in-family',
+        race='White', sex='Male', capital_gain=2174, capital_loss=0, hours_per_week=40,
+        native_country='United-States'
+    )
+    return data.create_dataframe()
+
+# Creating a function to verify that the captured requests are written as JSONL
+def test_capture_jsonl(tmp_path):
+    capture = RequestCapture(capture_dir=str(tmp_path), file_format='jsonl')
+    df = create_request()
+    for _ in range(10):
+        assert capture.capture(df, np.array([0.25]), 1.5, 'model_bundle.awb@1')
+    capture.close()
+
+    files = list(tmp_path.glob('*.jsonl'))
+    assert len(files) == 1
+    rows = [json.loads(line) for line in files[0].read_text().splitlines()]
+    assert len(rows) == 10
+    assert rows[0]['probability'] == 0.25
+    assert rows[0]['model_version'] == 'model_bundle.awb@1'
+    assert json.loads(rows[0]['inputs'])['age'] == 39
+    assert capture.stats()['written'] == 10
+
+# Creating a function to verify that the captured requests are written as parquet
+def test_capture_parquet(tmp_path):
+    capture = RequestCapture(capture_dir=str(tmp_path), file_format='parquet')
+    df = create_request()
+    for _ in range(5):
+        capture.capture(df, np.array([0.75]), 2.0)
+    capture.close()
+    captured = pd.read_parquet(next(tmp_path.glob('*.parquet')))
+    assert len(captured) == 5
+    assert (captured['probability'] == 0.75).all()
+
+# Creating a function to verify that the parquet batches keep one schema
+def test_capture_parquet_schema(tmp_path):
+    capture = RequestCapture(capture_dir=str(tmp_path), file_format='parquet', autostart=False)
+    df = create_request()
+    capture.write_batch(capture.create_rows((time.time(), df, np.array([0.1]), 1.0, None)))
+    capture.write_batch(capture.create_rows((time.time(), df, np.array([0.2]), 1.0, 'model_bundle.awb@1')))
+    capture.close_file()
+    assert capture.stats()['written'] == 2
+    captured = pd.read_parquet(next(tmp_path.glob('*.parquet')))
+    assert captured['model_version'].tolist() == [None, 'model_bundle.awb@1']
+
+# Creating a function to verify the sampling and the overload policies
+def test_capture_sampling_and_overload(tmp_path):
+    df = create_request()
+    capture = RequestCapture(capture_dir=str(tmp_path), sample_rate=0.0)
+    assert not capture.capture(df, np.array([0.5]), 1.0)
+    assert capture.stats()['sampled_out'] == 1
+
+    # The writer is not started, so the queue fills up
+    capture = RequestCapture(capture_dir=str(tmp_path), queue_size=3, overload_policy='drop_newest', autostart=False)
+    results = [capture.capture(df, np.array([i / 10]), 1.0) for i in range(5)]
+    assert results == [True, True, True, False, False]
+    assert capture.stats()['dropped'] == 2
+
+    capture = RequestCapture(capture_dir=str(tmp_path / 'oldest'), queue_size=3, overload_policy='drop_oldest', autostart=False)
+    for i in range(5):
+        capture.capture(df, np.array([i / 10]), 1.0)
+    capture.start()
+    capture.close()
+    rows = [json.loads(line) for line in next((tmp_path / 'oldest').glob('*.jsonl')).read_text().splitlines()]
+    assert [row['probability'] for row in rows] == [0.2, 0.3, 0.4]
+
+# Creating a function to verify that capturing a request only takes microseconds
+def test_capture_latency(tmp_path):
+    capture = RequestCapture(capture_dir=str(tmp_path))
+    df = create_request()
+    capture.capture(df, np.array([0.5]), 1.0)
+    times = []
+    for _ in range(1000):
+        start = time.perf_counter()
+        capture.capture(df, np.array([0.5]), 1.0)
+        times.append(time.perf_counter() - start)
+    capture.close()
+    assert np.median(times) < 50e-6
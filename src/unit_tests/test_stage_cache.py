@@ -0,0 +1,74 @@
+# Importing packages
+import pytest
+from src.components.stage_cache import Stage
+from src.components.stage_cache import StageRunner
+
+
+# Creating a fixture to build a two stage pipeline in a temporary folder
+@pytest.fixture(scope='function')
+def pipeline(tmp_path):
+    source = tmp_path / 'source.txt'
+    middle = tmp_path / 'middle.txt'
+    final = tmp_path / 'final.txt'
+    source.write_text('raw')
+    calls = []
+    
+    def first():
+        calls.append('first')
+        middle.write_text(source.read_text().upper())
+    
+    def second():
+        calls.append('second')
+        final.write_text(middle.read_text() + '!')
+    
+    stages = [
+        Stage(name='first', func=first, inputs=[str(source)], outputs=[str(middle)], params={'step': 1}),
+        Stage(name='second', func=second, inputs=[str(middle)], outputs=[str(final)])
+    ]
+    runner = StageRunner(manifest_path=str(tmp_path / 'manifest.json'))
+    return runner, stages, calls, source, final
+
+# Verifying that up to date stages are skipped on the second run
+def test_stages_are_skipped_when_up_to_date(pipeline):
+    runner, stages, calls, _, _ = pipeline
+    runner.run(stages)
+    report = runner.run(stages)
+    assert calls == ['first', 'second']
+    assert [action for _, action, _ in report] == ['skip', 'skip']
+
+# Verifying that a changed input reruns the stage and its downstream stage
+def test_changed_input_reruns_stages(pipeline):
+    runner, stages, calls, source, final = pipeline
+    runner.run(stages)
+    source.write_text('new raw data')
+    runner.run(stages)
+    assert calls == ['first', 'second', 'first', 'second']
+    assert final.read_text() == 'NEW RAW DATA!'
+
+# Verifying that a changed parameter reruns the stage
+def test_changed_params_rerun_stage(pipeline):
+    runner, stages, calls, _, _ = pipeline
+    runner.run(stages)
+    stages[0].params = {'step': 2}
+    runner.run(stages)
+    assert calls == ['first', 'second', 'first']
+
+# Verifying that a dry run does not run any stage
+def test_dry_run_does_not_run_stages(pipeline):
+    runner, stages, calls, _, _ = pipeline
+    report = runner.run(stages, dry_run=True)
+    assert calls == []
+    assert [action for _, action, _ in report] == ['would run', 'would run']
+
+# Verifying that an output which the stage did not write does not rerun the stage
+def test_optional_output_does_not_rerun_stage(pipeline, tmp_path):
+    runner, stages, calls, _, final = pipeline
+    stages[1].outputs.append(str(tmp_path / 'optional.txt'))
+    runner.run(stages)
+    runner.run(stages)
+    assert calls == ['first', 'second']
+
+    # An output which was written and then removed reruns the stage
+    final.unlink()
+    runner.run(stages)
+    assert calls == ['first', 'second', 'second']
@@ -0,0 +1,78 @@
+# Importing packages
+import os
+import pytest
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from src.components.config_entity import StoreFeatureConfig
+from src.components.store_features import FeatureStoreCreation
+
+
+# Creating a fixture to load a sample of the transformed train dataset
+@pytest.fixture(scope='function')
+def xform_train_sample():
+    data_path = StoreFeatureConfig()
+    df = pd.read_parquet(data_path.xform_train_path)
+    return df.sample(n=2000, random_state=42).reset_index(drop=True)
+
+# Creating a function to create a feature store object that writes into a temporary
+# folder using the given storage format
+def create_store(tmp_path, storage_format, compression):
+    store = FeatureStoreCreation()
+    store.feature_store_config.storage_format = storage_format
+    store.feature_store_config.compression = compression
+    store.feature_store_config.row_group_size = 500
+    store.feature_store_config.xform_train_path = str(tmp_path / 'xform_train_set.parquet')
+    store.feature_store_config.xform_test_path = str(tmp_path / 'xform_test_set.parquet')
+    return store
+
+# Verifying that each storage format returns the stored features as float32 and
+# keeps the target class
+@pytest.mark.parametrize('storage_format, compression', [('parquet', 'zstd'), ('feather', 'lz4'), ('feather', None)])
+def test_feature_store_round_trip(tmp_path, xform_train_sample, storage_format, compression):
+    store = create_store(tmp_path, storage_format, compression)
+    train_path, _ = store.create_feature_store(xform_train_sample, xform_train_sample)
+    X, y = store.read_features_target(store.feature_store_config.xform_train_path)
+    assert train_path.endswith('.arrow') == (storage_format == 'feather')
+    assert len(list(X.columns)) == 16
+    assert all(dtype == np.float32 for dtype in X.dtypes)
+    assert np.allclose(X.values, xform_train_sample.drop(columns=['target_class']).values, atol=1e-6)
+    assert (y['target_class'].values == xform_train_sample['target_class'].values).all()
+
+# Verifying that only the requested columns are read and that the row group
+# statistics can be used to filter rows
+def test_feature_store_projection_and_filters(tmp_path, xform_train_sample):
+    store = create_store(tmp_path, 'parquet', 'zstd')
+    store.create_feature_store(xform_train_sample, xform_train_sample)
+    table = store.read_table(
+        store.feature_store_config.xform_train_path,
+        columns=['num_pipeline__age', 'target_class'],
+        filters=[('target_class', '=', 1)]
+    )
+    assert table.column_names == ['num_pipeline__age', 'target_class']
+    assert table.num_rows == int(xform_train_sample['target_class'].sum())
+
+# Verifying that feather files are uncompressed unless a compression is set
+def test_feather_compression(tmp_path, xform_train_sample):
+    sizes = {}
+    for compression in (None, 'lz4'):
+        store = create_store(tmp_path / str(compression), 'feather', compression)
+        train_path, _ = store.create_feature_store(xform_train_sample, xform_train_sample)
+        sizes[compression] = os.path.getsize(train_path)
+    assert sizes[None] >= 4 * xform_train_sample.size
+    assert sizes['lz4'] < sizes[None]
+    assert create_store(tmp_path, 'parquet', None).resolve_compression() == 'zstd'
+
+# Verifying that the DMatrix read from the feature store matches the stored features
+def test_read_dmatrix(tmp_path, xform_train_sample):
+    store = create_store(tmp_path, 'feather', None)
+    store.create_feature_store(xform_train_sample, xform_train_sample)
+    X, y, feature_names = store.read_features_matrix(store.feature_store_config.xform_train_path)
+    assert X.dtype == np.float32 and X.flags['F_CONTIGUOUS']
+    assert feature_names == list(xform_train_sample.drop(columns=['target_class']).columns)
+    dmatrix = store.read_dmatrix(store.feature_store_config.xform_train_path)
+    assert (dmatrix.num_row(), dmatrix.num_col()) == X.shape
+    assert dmatrix.feature_names == feature_names
+    assert (dmatrix.get_label() == xform_train_sample['target_class'].values).all()
+    booster = xgb.train({'max_depth': 2}, dmatrix, 2)
+    assert np.allclose(booster.predict(dmatrix), booster.predict(xgb.DMatrix(X, feature_names=feature_names)))
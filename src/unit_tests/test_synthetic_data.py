@@ -0,0 +1,65 @@
+# Importing packages
+import numpy as np
+import pyarrow.parquet as pq
+import pytest
+from src.components.data_ingestion import DataIngestion
+from src.components.data_ingestion import RAW_SCHEMA
+from src.components.drift_monitor import population_stability_index
+from src.components.synthetic_data import SyntheticDataGenerator
+from src.utils import read_categorical_parquet
+
+
+# Creating a fixture to fit the generator on the train dataset
+@pytest.fixture(scope='module')
+def generator():
+    return SyntheticDataGenerator(n_workers=1, chunk_size=20000, seed=7).fit('artifacts/train_data.parquet')
+
+# Creating a function to compute the share of high incomes for each value of a column
+def high_income_share(df, col):
+    is_high = df['target_class'].astype(str).str.strip() == '>50K'
+    return is_high.groupby(df[col].astype(object)).mean()
+
+# Creating a function to verify that the synthetic rows follow the train dataset
+def test_distribution(generator):
+    source = read_categorical_parquet('artifacts/train_data.parquet')
+    df = generator.sample(200000)
+    assert list(df.columns) == RAW_SCHEMA.names
+
+    # The marginal frequencies of every column match
+    for col in ['workclass', 'education', 'marital-status', 'occupation', 'race', 'native-country', 'target_class', 'age']:
+        expected = source[col].astype(object).value_counts(normalize=True)
+        actual = df[col].astype(object).value_counts(normalize=True).reindex(expected.index, fill_value=0)
+        assert population_stability_index(expected.to_numpy(), actual.to_numpy()) < 0.01
+    assert abs(df['fnlwgt'].median() / source['fnlwgt'].median() - 1) < 0.02
+
+    # The relations between the columns are kept
+    for col in ['marital-status', 'sex', 'education']:
+        expected = high_income_share(source, col)
+        actual = high_income_share(df, col)
+        weights = source[col].astype(object).value_counts(normalize=True)
+        assert (weights * (expected - actual).abs()).sum() < 0.01
+    education_num = df.groupby('education', observed=True)['education-num'].agg(lambda s: s.mode().iloc[0])
+    expected_num = source.groupby('education', observed=True)['education-num'].first()
+    assert education_num.to_dict() == expected_num.to_dict()
+
+# Creating a function to verify that the datasets depend only on the seed
+def test_generate_deterministic(generator, tmp_path):
+    single = generator.generate(n_rows=50000, output_path=str(tmp_path / 'single.parquet'))
+    parallel_generator = SyntheticDataGenerator(n_workers=2, chunk_size=20000, seed=7)
+    parallel_generator.tables = generator.tables
+    parallel = parallel_generator.generate(n_rows=50000, output_path=str(tmp_path / 'parallel.parquet'))
+    assert pq.ParquetFile(single).metadata.num_row_groups == 3
+    assert pq.read_table(single).equals(pq.read_table(parallel))
+
+    other = SyntheticDataGenerator(n_workers=1, chunk_size=20000, seed=8)
+    other.tables = generator.tables
+    assert not other.sample(1000).equals(generator.sample(1000))
+
+# Creating a function to verify that the synthetic CSV is read by the streaming ingestion
+def test_generate_csv(generator, tmp_path):
+    csv_path = generator.generate(n_rows=30000, output_path=str(tmp_path / 'synthetic.csv'))
+    batches = list(DataIngestion().read_source_batches(csv_path))
+    assert sum(batch.num_rows for batch in batches) == 30000
+    assert batches[0].schema.equals(RAW_SCHEMA)
+    ages = np.concatenate([batch.column('age').to_numpy() for batch in batches])
+    assert np.array_equal(ages[:20000], generator.sample(20000, chunk=0)['age'].to_numpy())
@@ -0,0 +1,53 @@
+# Importing packages
+import pytest
+import optuna
+from src.components.config_entity import StoreFeatureConfig
+from src.components.store_features import FeatureStoreCreation
+from src.components.find_best_model import FindBestModel
+from src.components.tuning_telemetry import TuningTelemetry
+
+
+# Creating a pruner which prunes every trial after a fixed step
+class StepPruner(optuna.pruners.BasePruner):
+    def prune(self, study, trial):
+        return trial.last_step is not None and trial.last_step >= 2
+
+# Creating a fixture to read a part of the train set from the feature store
+@pytest.fixture(scope='function')
+def train_data():
+    X, y = FeatureStoreCreation().read_features_target(StoreFeatureConfig().xform_train_path)
+    return X.head(2000), y.head(2000)
+
+# Creating a function to verify that every trial and fold is recorded
+def test_trial_telemetry(tmp_path, train_data):
+    X, y = train_data
+    telemetry = TuningTelemetry(db_path=str(tmp_path / 'telemetry.db'))
+    model = FindBestModel(X, y, n_trials=3, n_splits=3, telemetry=telemetry)
+    study = optuna.create_study(direction='maximize')
+    study.optimize(model.objective, n_trials=3)
+
+    trials = telemetry.read_table('trials', study.study_name)
+    folds = telemetry.read_table('folds', study.study_name)
+    assert len(trials) == 3
+    assert len(folds) == 9
+    assert (trials['state'] == 'complete').all()
+    assert (trials['rounds'] == 30).all()
+    assert (trials['wall_s'] > 0).all()
+    assert (folds['peak_rss_mb'] > 0).all()
+    summary = telemetry.summarize(study.study_name)
+    assert summary['trials'].sum() == 3
+    assert 'Tuning telemetry' in telemetry.format_summary(study.study_name)
+
+# Creating a function to verify that pruned trials are recorded with their step
+def test_pruned_telemetry(tmp_path, train_data):
+    X, y = train_data
+    telemetry = TuningTelemetry(db_path=str(tmp_path / 'telemetry.db'))
+    model = FindBestModel(X, y, n_trials=2, n_splits=3, telemetry=telemetry)
+    study = optuna.create_study(direction='maximize', pruner=StepPruner())
+    study.optimize(model.objective, n_trials=2)
+
+    assert all(trial.state == optuna.trial.TrialState.PRUNED for trial in study.trials)
+    trials = telemetry.read_table('trials', study.study_name)
+    assert (trials['state'] == 'pruned').all()
+    assert (trials['pruned_step'] == 2).all()
+    assert (trials['folds'] == 1).all()
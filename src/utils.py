@@ -5,14 +5,27 @@ import sys
 import dill
 import datetime
 import json
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
 import mlflow
 from src.exception import CustomException
-from category_encoders import WOEEncoder
 import sklearn
 sklearn.set_config(transform_output='pandas')
 from sklearn.base import BaseEstimator, TransformerMixin, ClassifierMixin
 import xgboost as xgb
 
+# Defining the categorical features, which are stored as dictionary encoded columns
+CATEGORICAL_COLS = [
+    'workclass',
+    'education',
+    'marital-status',
+    'occupation',
+    'relationship',
+    'race',
+    'sex',
+    'native-country'
+]
 
 # Creating a function to save objects as pickle files
 def save_object(file_path:str, object):
@@ -90,9 +103,47 @@ def remove_blank_spaces(df):
     df_list = list(df.select_dtypes(include=['object']))
     for col in df_list:
         df[col] = df[col].str.strip()
+    
+    # Removing the blank spaces from the categories of the categorical columns, so
+    # that the rows are only remapped using their integer codes
+    cat_list = list(df.select_dtypes(include=['category']))
+    for col in cat_list:
+        df[col] = remap_categories(df[col], lambda category: category.strip() if isinstance(category, str) else category)
     return df
 
 
+# Creating a function to remap the categories of a categorical column
+def remap_categories(series, func):
+    '''
+    This function applies a function to each category of a categorical column. The
+    function is only called once per category and the rows are remapped using their
+    integer codes. Categories which map to the same value are merged.
+    ======================================================================================
+    ---------------------
+    Parameters:
+    ---------------------
+    series : pandas series - This is the categorical column.
+    func : function - This is the function applied to each category.
+    
+    ---------------------
+    Returns:
+    ---------------------
+    series : pandas series - This is the categorical column with the remapped categories.
+    =======================================================================================
+    '''
+    new_categories = [func(category) for category in series.cat.categories]
+    if new_categories == list(series.cat.categories):
+        return series
+    uniques, inverse = np.unique(np.array(new_categories, dtype=object), return_inverse=True)
+    codes = series.cat.codes.to_numpy()
+    new_codes = np.where(codes >= 0, inverse[codes], -1)
+    return pd.Series(
+        pd.Categorical.from_codes(new_codes, categories=uniques),
+        index=series.index,
+        name=series.name
+    )
+
+
 # Creating the function to remove "?" from certain columns in the dataset
 def remove_question_mark(df):
     '''
@@ -112,12 +163,122 @@ def remove_question_mark(df):
     df : pandas dataframe - This is the transformed pandas dataframe.
     =======================================================================================
     '''
-    df.loc[df.loc[:, 'workclass']=='?', 'workclass'] = 'Private'
-    df.loc[df.loc[:, 'occupation']=='?', 'occupation'] = 'Prof-specialty'
-    df.loc[df.loc[:, 'native-country']=='?', 'native-country'] = 'United-States'
+    replacements = {
+        'workclass': 'Private',
+        'occupation': 'Prof-specialty',
+        'native-country': 'United-States'
+    }
+    for col, value in replacements.items():
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = remap_categories(df[col], lambda category, value=value: value if category == '?' else category)
+        else:
+            df.loc[df.loc[:, col]=='?', col] = value
     return df
 
 
+# Creating a function to read a parquet file with dictionary encoded text fields
+def read_categorical_parquet(file_path:str, columns=None):
+    '''
+    This function reads a parquet file and returns the text fields as pandas categorical
+    columns, so that the strings are stored once per category instead of once per row.
+    ======================================================================================
+    ---------------------
+    Parameters:
+    ---------------------
+    file_path : str - This is the path to the parquet file.
+    columns : list - This is the list of columns to read. If not given, all columns
+    are read.
+    
+    ---------------------
+    Returns:
+    ---------------------
+    df : pandas dataframe - This is the dataframe with the categorical columns.
+    =======================================================================================
+    '''
+    schema = pq.read_schema(file_path)
+    text_cols = [
+        field.name for field in schema
+        if field.name in CATEGORICAL_COLS + ['target_class']
+    ]
+    table = pq.read_table(file_path, columns=columns, read_dictionary=text_cols)
+    return table.to_pandas()
+
+
+# Creating a function to build the vocabulary of the categorical columns
+def build_vocabulary(df, cols=None):
+    '''
+    This function builds the vocabulary of the categorical columns from the training
+    dataset. The vocabulary is fixed after training and is used to encode the datasets
+    and the data received at serving time.
+    ======================================================================================
+    ---------------------
+    Parameters:
+    ---------------------
+    df : pandas dataframe - This is the training dataset.
+    cols : list - This is the list of categorical columns. Defaults to CATEGORICAL_COLS.
+    
+    ---------------------
+    Returns:
+    ---------------------
+    vocabulary : dict - This is the dictionary of sorted categories per column.
+    =======================================================================================
+    '''
+    if cols is None:
+        cols = CATEGORICAL_COLS
+    vocabulary = {}
+    for col in cols:
+        values = df[col].dropna()
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            values = values.cat.remove_unused_categories().cat.categories
+        vocabulary[col] = sorted(str(value) for value in pd.unique(values))
+    return vocabulary
+
+
+# Creating a function to encode the categorical columns using a fixed vocabulary
+def apply_vocabulary(df, vocabulary):
+    '''
+    This function converts the categorical columns into pandas categorical columns using
+    the fixed vocabulary. Values which are not part of the vocabulary become missing.
+    ======================================================================================
+    ---------------------
+    Parameters:
+    ---------------------
+    df : pandas dataframe - This is the dataset to encode.
+    vocabulary : dict - This is the dictionary of categories per column.
+    
+    ---------------------
+    Returns:
+    ---------------------
+    df : pandas dataframe - This is the dataset with the categorical columns.
+    =======================================================================================
+    '''
+    for col, categories in vocabulary.items():
+        if col in df.columns:
+            df[col] = df[col].astype(pd.CategoricalDtype(categories=categories))
+    return df
+
+
+# Creating a function to save the vocabulary as a json file
+def save_vocabulary(file_path:str, vocabulary):
+    '''
+    This function saves the vocabulary of the categorical columns as a json file.
+    ======================================================================================
+    ---------------------
+    Parameters:
+    ---------------------
+    file_path : str - This is the path to the json file.
+    vocabulary : dict - This is the dictionary of categories per column.
+    =======================================================================================
+    '''
+    try:
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, 'w') as file_obj:
+            json.dump(vocabulary, file_obj, indent=2)
+    
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
 # Creating a function to recode the target class
 def recode_target_class(df):
     '''
@@ -135,8 +296,7 @@ def recode_target_class(df):
     The target_class column recoded into a binary column.
     =======================================================================================
     '''
-    df.loc[:, 'target_class'] = df.loc[:, 'target_class'].map(lambda x: 0 if x == '<=50K' else 1)
-    df['target_class'] = df.loc[:, 'target_class'].astype(int)
+    df['target_class'] = np.where(df.loc[:, 'target_class'] == '<=50K', 0, 1).astype(int)
     return df
     
 
@@ -145,14 +305,55 @@ class WOE(TransformerMixin, ClassifierMixin, BaseEstimator):
     '''
     This class encodes categorical variables using the weight of evidence. This class has
     two methods - a fit method and a transform method. The class also inherits from 
-    sklearn's BaseEstimator and TransformerMixin classes.
+    sklearn's BaseEstimator and TransformerMixin classes. The weight of evidence tables
+    are computed with numpy and give the same values as category_encoders' WOEEncoder,
+    including its regularization and its handling of unknown and missing values.
     '''
-    def __init__(self, cols=None):
+    def __init__(self, cols=None, regularization=1.0, handle_unknown='value', handle_missing='value'):
         '''
         This is the constructor of the weight of evidence class. It instantiates the columns
-        which will be transformed using the weight of evidence.  
+        which will be transformed using the weight of evidence, the regularization and
+        the handling of unknown and missing values.  
         '''
         self.cols = cols
+        self.regularization = regularization
+        self.handle_unknown = handle_unknown
+        self.handle_missing = handle_missing
+    
+    @staticmethod
+    def encode_column(series, categories=None):
+        '''
+        This method converts a column into integer codes. If the categories are not given,
+        they are taken from the column. Unknown and missing values get the code -1.
+        ========================================================================================
+        ---------------------
+        Parameters:
+        ---------------------
+        series : pandas series - This is the categorical column.
+        categories : pandas index - These are the fitted categories of the column.
+        
+        ---------------------
+        Returns:
+        ---------------------
+        codes : numpy array - These are the integer codes of the column.
+        categories : pandas index - These are the categories of the column.
+        missing : numpy array - This is a boolean mask of the missing values.
+        =========================================================================================
+        '''
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            # Only the categories are looked up, the rows are mapped with a single gather
+            values, uniques = series.cat.codes.to_numpy(), series.cat.categories
+        else:
+            values, uniques = pd.factorize(series.to_numpy(), use_na_sentinel=True)
+        missing = values < 0
+        
+        if categories is None:
+            categories = pd.Index(uniques)
+            lookup = np.arange(len(uniques))
+        else:
+            lookup = categories.get_indexer(uniques)
+        codes = np.append(lookup, -1)[values]
+        return codes, categories, missing
     
     def fit(self, X, y):
         '''
@@ -172,18 +373,121 @@ class WOE(TransformerMixin, ClassifierMixin, BaseEstimator):
         =========================================================================================
         
         '''
-        self.woe_encoder = WOEEncoder(cols=self.cols)
-        self.woe_encoder.fit(X, y)
-        return self
+        # Requiring both classes in the whole dataset. Only a batch of partial_fit may hold
+        # a single class
+        if set(np.unique(np.asarray(y, dtype=float).ravel())) != {0.0, 1.0}:
+            raise ValueError("The target column y must be binary with values {0, 1}.")
+        
+        # Removing any counts from an earlier fit before counting the dataset
+        for attr in ['cols_', 'categories_', 'event_counts_', 'total_counts_', '_sum', '_count']:
+            if hasattr(self, attr):
+                delattr(self, attr)
+        return self.partial_fit(X, y)
+    
+    def partial_fit(self, X, y):
+        '''
+        This method adds the event and total counts per category of a batch of the dataset
+        to the counts of the earlier batches and recomputes the weight of evidence tables.
+        Fitting the batches one at a time gives the same tables as fitting the whole
+        dataset at once.
+        ========================================================================================
+        ---------------------
+        Parameters:
+        ---------------------
+        X : This is a batch of the feature dataset containing the categorical variables.
+        y : This is the batch of the target dataset.
+        
+        ---------------------
+        Returns:
+        ---------------------
+        The dataset after being fit with the batch.
+        =========================================================================================
+        '''
+        y = np.asarray(y, dtype=float).ravel()
+        if np.isnan(y).any():
+            raise ValueError("The target column y must not contain missing values.")
+        if not set(np.unique(y)) <= {0.0, 1.0}:
+            raise ValueError("The target column y of a batch must only hold the values {0, 1}.")
+        
+        if not hasattr(self, 'cols_'):
+            # Using the text columns when the columns are not given, as WOEEncoder does
+            if self.cols is None:
+                self.cols_ = list(X.select_dtypes(include=['object', 'category', 'string']).columns)
+            else:
+                self.cols_ = list(self.cols)
+            self.feature_names_in_ = np.asarray(X.columns, dtype=object)
+            self.n_features_in_ = X.shape[1]
+            self.categories_ = {col: pd.Index([]) for col in self.cols_}
+            self.event_counts_ = {col: np.zeros(1) for col in self.cols_}
+            self.total_counts_ = {col: np.zeros(1) for col in self.cols_}
+            self._sum = 0.0
+            self._count = 0.0
+        
+        for col in self.cols_:
+            categories = self.categories_[col]
+            codes, _, missing = self.encode_column(X[col], categories)
+            
+            # Adding the categories which were not seen in the earlier batches
+            new_mask = (codes < 0) & ~missing
+            if new_mask.any():
+                new_categories = pd.unique(X[col].to_numpy()[new_mask])
+                categories = categories.append(pd.Index(new_categories))
+                codes, _, missing = self.encode_column(X[col], categories)
+            
+            # Counting the missing values in an extra slot after the categories
+            n_categories = len(categories)
+            codes = np.where(missing, n_categories, codes)
+            events = np.bincount(codes, weights=y, minlength=n_categories + 1)
+            totals = np.bincount(codes, minlength=n_categories + 1).astype(float)
+            
+            # Moving the earlier missing counts into the new missing slot
+            old_events, old_totals = self.event_counts_[col], self.total_counts_[col]
+            n_old = len(old_events) - 1
+            events[:n_old] += old_events[:-1]
+            totals[:n_old] += old_totals[:-1]
+            events[-1] += old_events[-1]
+            totals[-1] += old_totals[-1]
+            
+            self.categories_[col] = categories
+            self.event_counts_[col] = events
+            self.total_counts_[col] = totals
         
+        self._sum += y.sum()
+        self._count += float(len(y))
+        self.compute_woe_tables()
+        return self
+    
+    def compute_woe_tables(self):
+        '''
+        This method computes the weight of evidence tables from the event and total counts
+        per category. Each table has one value per category, followed by the value for
+        unknown categories and the value for missing values.
+        '''
+        reg = self.regularization
+        self.woe_tables_ = {}
+        for col in self.cols_:
+            events = self.event_counts_[col]
+            totals = self.total_counts_[col]
+            nominator = (events + reg) / (self._sum + 2 * reg)
+            denominator = ((totals - events) + reg) / (self._count - self._sum + 2 * reg)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                woe = np.log(nominator / denominator)
+            
+            # Ignoring the categories seen only once, and the categories never seen
+            woe[totals <= 1] = 0.0
+            unknown_value = np.nan if self.handle_unknown == 'return_nan' else 0.0
+            if totals[-1] > 0:
+                missing_value = woe[-1]
+            else:
+                missing_value = np.nan if self.handle_missing == 'return_nan' else 0.0
+            self.woe_tables_[col] = np.concatenate([woe[:-1], [unknown_value, missing_value]])
     
     def transform(self, X, y=None):
         '''
         This method transforms the categorical data into their calculated weight of 
-        evidence after the data has been fit. If the target dataset is present,
-        the method executes the transformation using both the feature and target
-        datasets. Else, the method will only use the feature dataset to transform the
-        dataset.
+        evidence after the data has been fit. Each column is transformed with a single
+        gather from its weight of evidence table. The target dataset is not used, and is
+        accepted for compatibility with the earlier implementation.
         ========================================================================================
         ---------------------
         Parameters:
@@ -197,10 +501,29 @@ class WOE(TransformerMixin, ClassifierMixin, BaseEstimator):
         The dataset after being transformed using the weight of evidence.
         =========================================================================================
         '''
-        if y is not None:
-            return self.woe_encoder.transform(X, y)
-        else:
-            return self.woe_encoder.transform(X)
+        # Preprocessor objects pickled before the native implementation still hold
+        # a fitted WOEEncoder
+        if hasattr(self, 'woe_encoder'):
+            if y is not None:
+                return self.woe_encoder.transform(X, y)
+            else:
+                return self.woe_encoder.transform(X)
+        
+        columns = {}
+        for col in X.columns:
+            if col not in self.woe_tables_:
+                columns[col] = X[col]
+                continue
+            categories = self.categories_[col]
+            codes, _, missing = self.encode_column(X[col], categories)
+            if self.handle_unknown == 'error' and ((codes < 0) & ~missing).any():
+                raise ValueError('Unexpected categories found in dataframe')
+            
+            # Pointing unknown values to the unknown slot and missing values to the missing slot
+            codes = np.where(codes < 0, len(categories), codes)
+            codes[missing] = len(categories) + 1
+            columns[col] = self.woe_tables_[col][codes]
+        return pd.DataFrame(columns, index=X.index)
     
     @classmethod
     def __sklearn_tags__(cls):
@@ -241,11 +564,17 @@ def convert_to_categorical(df):
     =========================================================================================
     '''
     # Transforming the capital-gain feature into a categorical feature
-    df.loc[:, 'capital-gain-trns'] = df.loc[:, 'capital-gain'].map(lambda a: 'cap_gain' if a > 0 else 'no_cap_gain')
+    df['capital-gain-trns'] = pd.Categorical.from_codes(
+        np.where(df.loc[:, 'capital-gain'] > 0, 0, 1),
+        categories=['cap_gain', 'no_cap_gain']
+    )
     df.drop(labels=['capital-gain'], axis=1, inplace=True)
     
     # Transforming the capital-loss feature into a categorical feature
-    df.loc[:, 'capital-loss-trns'] = df.loc[:, 'capital-loss'].map(lambda b: 'cap_loss' if b > 0 else 'no_cap_loss')
+    df['capital-loss-trns'] = pd.Categorical.from_codes(
+        np.where(df.loc[:, 'capital-loss'] > 0, 0, 1),
+        categories=['cap_loss', 'no_cap_loss']
+    )
     df.drop(labels=['capital-loss'], axis=1, inplace=True)
     return df
 